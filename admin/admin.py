@@ -25,6 +25,7 @@ class TenantMetricsAdmin(admin.ModelAdmin):
         "api_requests",
         "uptime",
         "response_time_avg",
+        "response_time_p95",
     ]
     list_filter = ["date", "tenant"]
     search_fields = ["tenant__name", "tenant__subdomain"]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("pandora_admin", "0002_systemalert_acknowledged_by_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="tenantmetrics",
+            name="response_time_p50",
+            field=models.FloatField(default=0.0, help_text="Em milissegundos", verbose_name="Tempo de Resposta p50"),
+        ),
+        migrations.AddField(
+            model_name="tenantmetrics",
+            name="response_time_p95",
+            field=models.FloatField(default=0.0, help_text="Em milissegundos", verbose_name="Tempo de Resposta p95"),
+        ),
+        migrations.AddField(
+            model_name="tenantmetrics",
+            name="response_time_p99",
+            field=models.FloatField(default=0.0, help_text="Em milissegundos", verbose_name="Tempo de Resposta p99"),
+        ),
+    ]
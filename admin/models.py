@@ -17,6 +17,15 @@ class TenantMetrics(TimestampedModel):
     response_time_avg = models.FloatField(
         default=0.0, help_text="Em milissegundos", verbose_name="Tempo de Resposta Médio"
     )
+    response_time_p50 = models.FloatField(
+        default=0.0, help_text="Em milissegundos", verbose_name="Tempo de Resposta p50"
+    )
+    response_time_p95 = models.FloatField(
+        default=0.0, help_text="Em milissegundos", verbose_name="Tempo de Resposta p95"
+    )
+    response_time_p99 = models.FloatField(
+        default=0.0, help_text="Em milissegundos", verbose_name="Tempo de Resposta p99"
+    )
     error_rate = models.FloatField(default=0.0, help_text="Percentual de erros", verbose_name="Taxa de Erros")
     uptime = models.FloatField(default=100.0, help_text="Percentual de uptime", verbose_name="Uptime")
 
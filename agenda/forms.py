@@ -64,6 +64,7 @@ class EventoForm(BasePandoraForm):
             "prioridade",
             "tipo_evento",
             "local",
+            "regra_recorrencia",
             "responsavel",
             "participantes",
         ]
@@ -93,6 +94,9 @@ class EventoForm(BasePandoraForm):
             "local": forms.TextInput(
                 attrs={"class": "form-control", "placeholder": "Local do evento"},
             ),
+            "regra_recorrencia": forms.TextInput(
+                attrs={"class": "form-control", "placeholder": "Ex.: FREQ=WEEKLY;BYDAY=MO,WE"},
+            ),
             "responsavel": forms.Select(attrs={"class": "form-control select2"}),
         }
 
@@ -230,6 +234,7 @@ class EventoForm(BasePandoraForm):
                         evento=evento,
                         usuario=user,
                         minutos_antes=15,
+                        fire_at=EventoLembrete.calcular_fire_at(evento.data_inicio, 15),
                     ),
                 )
             if self.cleaned_data.get("lembrete_60"):
@@ -238,6 +243,7 @@ class EventoForm(BasePandoraForm):
                         evento=evento,
                         usuario=user,
                         minutos_antes=60,
+                        fire_at=EventoLembrete.calcular_fire_at(evento.data_inicio, 60),
                     ),
                 )
 
@@ -0,0 +1,97 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:55
+
+from datetime import timedelta
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+_LOTE = 1000
+
+
+def preencher_fire_at(apps, schema_editor):
+    """Calcula fire_at dos lembretes existentes; os já vencidos não são disparados retroativamente."""
+    EventoLembrete = apps.get_model("agenda", "EventoLembrete")
+    agora = timezone.now()
+    lote = []
+    for lembrete in (
+        EventoLembrete.objects.select_related("evento")
+        .only("id", "minutos_antes", "evento__data_inicio")
+        .iterator(chunk_size=_LOTE)
+    ):
+        lembrete.fire_at = lembrete.evento.data_inicio - timedelta(minutes=lembrete.minutos_antes)
+        lembrete.disparado_em = agora if lembrete.fire_at <= agora else None
+        lote.append(lembrete)
+        if len(lote) >= _LOTE:
+            EventoLembrete.objects.bulk_update(lote, ["fire_at", "disparado_em"])
+            lote = []
+    if lote:
+        EventoLembrete.objects.bulk_update(lote, ["fire_at", "disparado_em"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("agenda", "0006_alter_evento_tipo_evento"),
+        ("notifications", "0001_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LembreteDisparo",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("fire_at", models.DateTimeField()),
+                ("ignorado", models.BooleanField(default=False)),
+                ("disparado_em", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "verbose_name": "Disparo de Lembrete",
+                "verbose_name_plural": "Disparos de Lembretes",
+            },
+        ),
+        migrations.AddField(
+            model_name="eventolembrete",
+            name="disparado_em",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="eventolembrete",
+            name="fire_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="eventolembrete",
+            index=models.Index(
+                condition=models.Q(("ativo", True), ("disparado_em__isnull", True)),
+                fields=["fire_at", "id"],
+                name="agenda_lembrete_pendente_idx",
+            ),
+        ),
+        migrations.AddField(
+            model_name="lembretedisparo",
+            name="lembrete",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE, related_name="disparos", to="agenda.eventolembrete"
+            ),
+        ),
+        migrations.AddField(
+            model_name="lembretedisparo",
+            name="notificacao",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="notifications.notification",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="lembretedisparo",
+            constraint=models.UniqueConstraint(
+                fields=("lembrete", "fire_at"), name="agenda_disparo_lembrete_fire_at_uniq"
+            ),
+        ),
+        migrations.RunPython(preencher_fire_at, migrations.RunPython.noop),
+    ]
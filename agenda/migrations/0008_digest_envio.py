@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:00
+
+import uuid
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("agenda", "0007_lembrete_fire_at"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="agendaconfiguracao",
+            name="digest_concluido_em",
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name="DigestEnvio",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("data_referencia", models.DateField()),
+                ("lote", models.UUIDField(default=uuid.uuid4)),
+                ("enviado_em", models.DateTimeField(blank=True, null=True)),
+                ("criado_em", models.DateTimeField(auto_now_add=True)),
+                (
+                    "tenant",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="agenda_digest_envios",
+                        to="core.tenant",
+                    ),
+                ),
+                (
+                    "usuario",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, related_name="+", to=settings.AUTH_USER_MODEL
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Envio de Digest",
+                "verbose_name_plural": "Envios de Digest",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("tenant", "usuario", "data_referencia"), name="agenda_digest_envio_uniq"
+                    )
+                ],
+            },
+        ),
+    ]
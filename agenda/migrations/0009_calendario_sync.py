@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:06
+
+import django.core.validators
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("agenda", "0008_digest_envio"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EventoRemovido",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("evento_id", models.BigIntegerField()),
+                ("uuid", models.UUIDField(blank=True, null=True)),
+                ("removido_em", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "verbose_name": "Evento Removido",
+                "verbose_name_plural": "Eventos Removidos",
+            },
+        ),
+        migrations.AddField(
+            model_name="evento",
+            name="regra_recorrencia",
+            field=models.CharField(
+                blank=True,
+                default="",
+                max_length=255,
+                validators=[
+                    django.core.validators.RegexValidator(
+                        "^FREQ=(SECONDLY|MINUTELY|HOURLY|DAILY|WEEKLY|MONTHLY|YEARLY)(;[A-Z]+=[A-Za-z0-9,+\\-:]+)*$",
+                        "Regra de recorrência inválida (ex.: FREQ=WEEKLY;BYDAY=MO,WE).",
+                    )
+                ],
+                verbose_name="Recorrência (RRULE)",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="evento",
+            index=models.Index(fields=["tenant", "data_inicio"], name="agenda_evento_tenant_ini_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="evento",
+            index=models.Index(fields=["tenant", "data_atualizacao"], name="agenda_evento_tenant_atu_idx"),
+        ),
+        migrations.AddField(
+            model_name="eventoremovido",
+            name="tenant",
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="+", to="core.tenant"),
+        ),
+        migrations.AddIndex(
+            model_name="eventoremovido",
+            index=models.Index(fields=["tenant", "removido_em"], name="agenda_removido_tenant_idx"),
+        ),
+    ]
@@ -1,9 +1,11 @@
 """Models for the agenda app."""
 
+from datetime import datetime, timedelta
 from typing import Any, ClassVar
 from uuid import uuid4
 
 from django.conf import settings
+from django.core.validators import RegexValidator
 from django.db import models
 from django.utils import timezone
 
@@ -75,6 +77,20 @@ class Evento(models.Model):
         verbose_name="Participantes",
     )
 
+    # Regra de recorrência iCalendar (RFC 5545) sem o prefixo "RRULE:", exportada no feed ICS
+    regra_recorrencia = models.CharField(
+        max_length=255,
+        blank=True,
+        default="",
+        validators=[
+            RegexValidator(
+                r"^FREQ=(SECONDLY|MINUTELY|HOURLY|DAILY|WEEKLY|MONTHLY|YEARLY)(;[A-Z]+=[A-Za-z0-9,+\-:]+)*$",
+                "Regra de recorrência inválida (ex.: FREQ=WEEKLY;BYDAY=MO,WE).",
+            )
+        ],
+        verbose_name="Recorrência (RRULE)",
+    )
+
     data_criacao = models.DateTimeField(auto_now_add=True, verbose_name="Data de Criação")
     data_atualizacao = models.DateTimeField(auto_now=True, verbose_name="Última Atualização")
 
@@ -84,11 +100,23 @@ class Evento(models.Model):
         verbose_name = "Evento"
         verbose_name_plural = "Eventos"
         ordering: ClassVar[list[str]] = ["data_inicio"]
+        indexes: ClassVar[list[models.Index]] = [
+            # Janela do calendário e sync incremental (agenda.services.calendario)
+            models.Index(fields=["tenant", "data_inicio"], name="agenda_evento_tenant_ini_idx"),
+            models.Index(fields=["tenant", "data_atualizacao"], name="agenda_evento_tenant_atu_idx"),
+        ]
 
     def __str__(self) -> str:
         """Return a string representation of the event."""
         return self.titulo
 
+    @classmethod
+    def from_db(cls, db: str | None, field_names: list[str], values: list[Any]) -> "Evento":
+        """Guarda o início carregado do banco para detectar reagendamento no save()."""
+        instance = super().from_db(db, field_names, values)
+        instance._data_inicio_original = instance.__dict__.get("data_inicio")  # noqa: SLF001
+        return instance
+
     def save(self, *args: Any, **kwargs: Any) -> None:  # noqa: ANN401  # ruff: noqa: ANN401
         """Save the event instance."""
         if not self.uuid:
@@ -97,7 +125,18 @@ class Evento(models.Model):
         if self._state.adding and self.status == "pendente" and "agendado" in [c[0] for c in self.STATUS_CHOICES]:
             # Promover instâncias antigas criadas sem novo default
             self.status = "agendado"
+        update_fields = kwargs.get("update_fields")
+        reagendado = (
+            not self._state.adding
+            and self.data_inicio != getattr(self, "_data_inicio_original", None)
+            and (update_fields is None or "data_inicio" in update_fields)
+        )
         super().save(*args, **kwargs)
+        if reagendado:
+            from agenda.services.lembretes import sincronizar_fire_at  # noqa: PLC0415 - evita ciclo
+
+            sincronizar_fire_at(self)
+        self._data_inicio_original = self.data_inicio
 
     # Métodos utilitários esperados pelos testes
     def get_duracao(self) -> timezone.timedelta:
@@ -157,6 +196,28 @@ class LogEvento(models.Model):
         return f"Log de {ident} por {self.usuario.username if self.usuario else 'N/A'}: {self.acao}"
 
 
+class EventoRemovido(models.Model):
+    """Marcador de exclusão de evento para o sync incremental do calendário."""
+
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name="+")
+    evento_id = models.BigIntegerField()
+    uuid = models.UUIDField(null=True, blank=True)
+    removido_em = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        """Meta options for the EventoRemovido model."""
+
+        verbose_name = "Evento Removido"
+        verbose_name_plural = "Eventos Removidos"
+        indexes: ClassVar[list[models.Index]] = [
+            models.Index(fields=["tenant", "removido_em"], name="agenda_removido_tenant_idx"),
+        ]
+
+    def __str__(self) -> str:
+        """Return a string representation of the tombstone."""
+        return f"Evento {self.evento_id} removido em {self.removido_em:%d/%m/%Y %H:%M}"
+
+
 class EventoLembrete(models.Model):
     """Configuração de lembretes por evento e usuário."""
 
@@ -164,6 +225,10 @@ class EventoLembrete(models.Model):
     usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="agenda_lembretes")
     minutos_antes = models.PositiveIntegerField(default=15, help_text="Minutos antes do início do evento")
     ativo = models.BooleanField(default=True)
+    # Instante de disparo pré-calculado (data_inicio - minutos_antes); mantido em sincronia
+    # pelo Evento.save() quando o evento é reagendado (agenda.services.lembretes).
+    fire_at = models.DateTimeField(null=True, blank=True)
+    disparado_em = models.DateTimeField(null=True, blank=True)
     criado_em = models.DateTimeField(auto_now_add=True)
     atualizado_em = models.DateTimeField(auto_now=True)
 
@@ -173,11 +238,61 @@ class EventoLembrete(models.Model):
         verbose_name = "Lembrete de Evento"
         verbose_name_plural = "Lembretes de Eventos"
         unique_together = ("evento", "usuario", "minutos_antes")
+        indexes: ClassVar[list[models.Index]] = [
+            # Índice parcial: só lembretes pendentes entram na busca por vencidos
+            models.Index(
+                fields=["fire_at", "id"],
+                name="agenda_lembrete_pendente_idx",
+                condition=models.Q(ativo=True, disparado_em__isnull=True),
+            ),
+        ]
 
     def __str__(self) -> str:
         """Return a string representation of the reminder."""
         return f"Lembrete {self.minutos_antes}min antes para {self.usuario} em '{self.evento}'"
 
+    @staticmethod
+    def calcular_fire_at(data_inicio: datetime | None, minutos_antes: int) -> datetime | None:
+        """Return the instant the reminder is due."""
+        return data_inicio - timedelta(minutes=minutos_antes) if data_inicio else None
+
+    def save(self, *args: Any, **kwargs: Any) -> None:  # noqa: ANN401
+        """Save the reminder, recomputing ``fire_at`` (re-armed when it changes)."""
+        fire_at = self.calcular_fire_at(self.evento.data_inicio, self.minutos_antes)
+        if fire_at != self.fire_at:
+            self.fire_at = fire_at
+            self.disparado_em = None
+            update_fields = kwargs.get("update_fields")
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "fire_at", "disparado_em"}
+        super().save(*args, **kwargs)
+
+
+class LembreteDisparo(models.Model):
+    """Ledger idempotente de disparos: no máximo um por (lembrete, fire_at)."""
+
+    lembrete = models.ForeignKey(EventoLembrete, on_delete=models.CASCADE, related_name="disparos")
+    fire_at = models.DateTimeField()
+    notificacao = models.ForeignKey(
+        "notifications.Notification", on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
+    # True quando o lembrete venceu após o início do evento ou com evento inativo (sem notificação)
+    ignorado = models.BooleanField(default=False)
+    disparado_em = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        """Meta options for the LembreteDisparo model."""
+
+        verbose_name = "Disparo de Lembrete"
+        verbose_name_plural = "Disparos de Lembretes"
+        constraints: ClassVar[list[models.BaseConstraint]] = [
+            models.UniqueConstraint(fields=["lembrete", "fire_at"], name="agenda_disparo_lembrete_fire_at_uniq"),
+        ]
+
+    def __str__(self) -> str:
+        """Return a string representation of the dispatch."""
+        return f"Disparo lembrete={self.lembrete_id} fire_at={self.fire_at:%Y-%m-%d %H:%M}"
+
 
 class AgendaConfiguracao(models.Model):
     """Configurações da Agenda por tenant (padrões de lembretes e digest)."""
@@ -187,8 +302,10 @@ class AgendaConfiguracao(models.Model):
     lembretes_padrao = models.JSONField(default=list, blank=True)
     # Digest diário por e-mail
     digest_email_habilitado = models.BooleanField(default=False)
-    # Hora do dia (0-23) para disparo do digest (no fuso do servidor)
+    # Hora do dia (0-23) para disparo do digest (no fuso do tenant)
     digest_email_hora = models.PositiveSmallIntegerField(default=8)
+    # Último dia (local do tenant) cujo digest foi concluído; evita reprocessar o tenant
+    digest_concluido_em = models.DateField(null=True, blank=True)
     criado_em = models.DateTimeField(auto_now_add=True)
     atualizado_em = models.DateTimeField(auto_now=True)
 
@@ -201,3 +318,28 @@ class AgendaConfiguracao(models.Model):
     def __str__(self) -> str:
         """Return a string representation of the agenda configuration."""
         return f"Configuração da Agenda - {self.tenant.name}"
+
+
+class DigestEnvio(models.Model):
+    """Ledger do digest diário: no máximo um envio por (tenant, usuário, dia)."""
+
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name="agenda_digest_envios")
+    usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+")
+    data_referencia = models.DateField()
+    # Execução que reivindicou a linha; enviado_em nulo após o fim dela = envio incerto (não repetido)
+    lote = models.UUIDField(default=uuid4)
+    enviado_em = models.DateTimeField(null=True, blank=True)
+    criado_em = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        """Meta options for the DigestEnvio model."""
+
+        verbose_name = "Envio de Digest"
+        verbose_name_plural = "Envios de Digest"
+        constraints: ClassVar[list[models.BaseConstraint]] = [
+            models.UniqueConstraint(fields=["tenant", "usuario", "data_referencia"], name="agenda_digest_envio_uniq"),
+        ]
+
+    def __str__(self) -> str:
+        """Return a string representation of the digest dispatch."""
+        return f"Digest {self.data_referencia:%d/%m/%Y} para {self.usuario_id}"
@@ -0,0 +1,278 @@
+"""Feed de calendário da agenda: janela, ETag, sync incremental e exportação iCalendar.
+
+* ``janela``: o período pedido pelo FullCalendar (``start``/``end``) ou, sem parâmetros,
+  um padrão em torno de hoje — nunca o histórico inteiro do tenant; períodos longos são
+  limitados a ``JANELA_MAXIMA``.
+* ``impressao``: contagem + última ``data_atualizacao`` da consulta + última exclusão
+  do tenant (consultas agregadas nos índices ``(tenant, data_inicio)`` /
+  ``(tenant, data_atualizacao)``); vira o ETag e valida o cache do ICS.
+* ``sync_token``: token assinado e opaco com a marca d'água da última leitura;
+  ``alteracoes`` devolve só os eventos alterados (``data_atualizacao >= marca``) e os
+  IDs removidos (``EventoRemovido``) desde então. Tokens mais antigos que
+  ``AGENDA_SYNC_RETENCAO_DIAS`` deixam de valer (os marcadores são expurgados).
+* ``exportar_ics``: VCALENDAR dos eventos do usuário (responsável ou participante),
+  com ``RRULE`` para eventos recorrentes, em cache por (tenant, usuário, janela).
+"""
+
+from __future__ import annotations
+
+import hashlib
+from dataclasses import dataclass
+from datetime import UTC, date, datetime, time, timedelta
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.db.models import Count, Max, Q, QuerySet
+from django.urls import reverse
+from django.utils import timezone
+
+from agenda.models import Evento, EventoRemovido
+
+__all__ = [
+    "JANELA_MAXIMA",
+    "Janela",
+    "alteracoes",
+    "eventos_da_janela",
+    "exportar_ics",
+    "expurgar_removidos",
+    "gerar_sync_token",
+    "impressao",
+    "janela",
+    "ler_sync_token",
+    "serializar",
+]
+
+JANELA_PASSADO = timedelta(days=31)
+JANELA_FUTURO = timedelta(days=62)
+JANELA_MAXIMA = timedelta(days=400)
+_SALT = "agenda.calendario.sync"
+_CAMPOS_ICS = (
+    "id",
+    "uuid",
+    "tenant_id",
+    "titulo",
+    "descricao",
+    "data_inicio",
+    "data_fim",
+    "dia_inteiro",
+    "status",
+    "prioridade",
+    "local",
+    "tipo_evento",
+    "regra_recorrencia",
+    "data_atualizacao",
+)
+_CAMPOS = (*_CAMPOS_ICS, "responsavel__first_name", "responsavel__last_name")
+_STATUS_ICS = {"cancelado": "CANCELLED", "pendente": "TENTATIVE"}
+
+
+@dataclass(frozen=True)
+class Janela:
+    inicio: datetime
+    fim: datetime
+
+    @property
+    def chave(self) -> str:
+        return f"{self.inicio:%Y%m%dT%H%M%S}-{self.fim:%Y%m%dT%H%M%S}"
+
+
+def _retencao() -> timedelta:
+    return timedelta(days=int(getattr(settings, "AGENDA_SYNC_RETENCAO_DIAS", 30)))
+
+
+def _parse(valor: str | None) -> datetime | None:
+    if not valor:
+        return None
+    try:
+        dt = datetime.fromisoformat(valor.replace(" ", "+").replace("Z", "+00:00"))
+    except ValueError:
+        try:
+            dt = datetime.combine(date.fromisoformat(valor[:10]), time.min)
+        except ValueError:
+            return None
+    return timezone.make_aware(dt) if timezone.is_naive(dt) else dt
+
+
+def janela(start: str | None = None, end: str | None = None, *, agora: datetime | None = None) -> Janela:
+    """Período do feed: parâmetros ISO 8601 do cliente ou o padrão em torno de hoje."""
+    agora = agora or timezone.now()
+    inicio = _parse(start)
+    fim = _parse(end)
+    if inicio is None:
+        inicio = (fim or agora) - JANELA_PASSADO
+    if fim is None or fim <= inicio:
+        fim = max(agora, inicio) + JANELA_FUTURO
+    return Janela(inicio=inicio, fim=min(fim, inicio + JANELA_MAXIMA))
+
+
+def _base(tenant_id: int | None) -> QuerySet[Evento]:
+    qs = Evento.objects.all()
+    return qs.filter(tenant_id=tenant_id) if tenant_id else qs
+
+
+def eventos_da_janela(tenant_id: int | None, periodo: Janela, *, usuario=None) -> QuerySet[Evento]:
+    """Eventos que tocam o período (início dentro dele ou em curso nele); recorrentes iniciados antes entram."""
+    qs = (
+        _base(tenant_id)
+        .filter(data_inicio__lt=periodo.fim)
+        .filter(Q(data_inicio__gte=periodo.inicio) | Q(data_fim__gte=periodo.inicio) | ~Q(regra_recorrencia=""))
+    )
+    if usuario is not None:
+        participa = Evento.objects.filter(participantes__id=usuario.pk).values("id")
+        qs = qs.filter(Q(responsavel_id=usuario.pk) | Q(id__in=participa))
+    return qs
+
+
+def impressao(qs: QuerySet[Evento], tenant_id: int | None, *extra: object) -> str:
+    """Resumo barato do conteúdo da consulta (ETag / validação de cache)."""
+    agregado = qs.order_by().aggregate(n=Count("id"), ultima=Max("data_atualizacao"))
+    removido = EventoRemovido.objects.filter(**({"tenant_id": tenant_id} if tenant_id else {})).aggregate(
+        ultima=Max("removido_em")
+    )["ultima"]
+    bruto = f"{tenant_id}:{agregado['n']}:{agregado['ultima']}:{removido}:" + ":".join(map(str, extra))
+    return hashlib.sha1(bruto.encode(), usedforsecurity=False).hexdigest()
+
+
+def serializar(qs: QuerySet[Evento]) -> list[dict]:
+    """Formato do FullCalendar; uma consulta (responsável via JOIN)."""
+    modelo_url = reverse("agenda:evento_detail", kwargs={"pk": 999999999})
+    eventos = []
+    for e in qs.select_related("responsavel").order_by("data_inicio", "id").values(*_CAMPOS):
+        responsavel = f"{e['responsavel__first_name'] or ''} {e['responsavel__last_name'] or ''}".strip()
+        eventos.append(
+            {
+                "id": e["id"],
+                "title": e["titulo"],
+                "start": e["data_inicio"].isoformat() if e["data_inicio"] else None,
+                "end": e["data_fim"].isoformat() if e["data_fim"] else None,
+                "allDay": bool(e["dia_inteiro"]),
+                "url": modelo_url.replace("999999999", str(e["id"])),
+                "extendedProps": {
+                    "status": e["status"],
+                    "prioridade": e["prioridade"],
+                    "description": e["descricao"],
+                    "local": e["local"],
+                    "responsavel": responsavel,
+                    "tipo_evento": e["tipo_evento"],
+                    "rrule": e["regra_recorrencia"],
+                },
+            }
+        )
+    return eventos
+
+
+# --- Sync incremental ----------------------------------------------------------------
+def gerar_sync_token(tenant_id: int | None, agora: datetime | None = None) -> str:
+    """Token opaco com a marca d'água da leitura (recuada para cobrir transações em voo)."""
+    margem = timedelta(seconds=int(getattr(settings, "AGENDA_SYNC_MARGEM_SEGUNDOS", 5)))
+    marca = (agora or timezone.now()) - margem
+    return signing.dumps({"t": tenant_id, "m": marca.isoformat()}, salt=_SALT, compress=True)
+
+
+def ler_sync_token(token: str, tenant_id: int | None) -> datetime | None:
+    """Marca d'água do token ou None se inválido, de outro tenant ou anterior à retenção."""
+    try:
+        dados = signing.loads(token, salt=_SALT, max_age=_retencao())
+    except signing.BadSignature:
+        return None
+    if dados.get("t") != tenant_id:
+        return None
+    return datetime.fromisoformat(dados["m"])
+
+
+def alteracoes(tenant_id: int | None, desde: datetime) -> tuple[QuerySet[Evento], list[int]]:
+    """Eventos alterados e IDs removidos desde a marca d'água (o cliente aplica como upsert)."""
+    alterados = _base(tenant_id).filter(data_atualizacao__gte=desde)
+    removidos = EventoRemovido.objects.filter(removido_em__gte=desde)
+    if tenant_id:
+        removidos = removidos.filter(tenant_id=tenant_id)
+    return alterados, sorted(set(removidos.values_list("evento_id", flat=True)))
+
+
+def expurgar_removidos(agora: datetime | None = None) -> int:
+    """Remove marcadores além da retenção dos tokens."""
+    limite = (agora or timezone.now()) - _retencao()
+    return EventoRemovido.objects.filter(removido_em__lt=limite).delete()[0]
+
+
+# --- iCalendar -----------------------------------------------------------------------
+def _escapar(texto: str) -> str:
+    return (
+        (texto or "")
+        .replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def _dobrar(linha: str) -> str:
+    """Quebra de linhas do RFC 5545 (75 octetos, continuação com espaço)."""
+    dados = linha.encode()
+    if len(dados) <= 75:  # noqa: PLR2004
+        return linha
+    partes, atual = [], b""
+    for char in linha:
+        c = char.encode()
+        if len(atual) + len(c) > (75 if not partes else 74):
+            partes.append(atual.decode())
+            atual = b""
+        atual += c
+    partes.append(atual.decode())
+    return "\r\n ".join(partes)
+
+
+def _utc(dt: datetime) -> str:
+    return dt.astimezone(UTC).strftime("%Y%m%dT%H%M%SZ")
+
+
+def _vevent(e: dict, dtstamp: str) -> list[str]:
+    linhas = ["BEGIN:VEVENT", f"UID:{e['uuid'] or e['id']}@pandora-agenda", f"DTSTAMP:{dtstamp}"]
+    if e["dia_inteiro"]:
+        inicio = timezone.localtime(e["data_inicio"]).date()
+        fim = timezone.localtime(e["data_fim"]).date() if e["data_fim"] else inicio
+        linhas += [
+            f"DTSTART;VALUE=DATE:{inicio:%Y%m%d}",
+            f"DTEND;VALUE=DATE:{max(fim, inicio) + timedelta(days=1):%Y%m%d}",
+        ]
+    else:
+        linhas.append(f"DTSTART:{_utc(e['data_inicio'])}")
+        if e["data_fim"]:
+            linhas.append(f"DTEND:{_utc(e['data_fim'])}")
+    if e["regra_recorrencia"]:
+        linhas.append(f"RRULE:{e['regra_recorrencia']}")
+    linhas += [
+        f"SUMMARY:{_escapar(e['titulo'])}",
+        f"STATUS:{_STATUS_ICS.get(e['status'], 'CONFIRMED')}",
+        f"LAST-MODIFIED:{_utc(e['data_atualizacao'])}",
+    ]
+    if e["descricao"]:
+        linhas.append(f"DESCRIPTION:{_escapar(e['descricao'])}")
+    if e["local"]:
+        linhas.append(f"LOCATION:{_escapar(e['local'])}")
+    linhas.append("END:VEVENT")
+    return linhas
+
+
+def _renderizar_ics(qs: QuerySet[Evento]) -> str:
+    dtstamp = _utc(timezone.now())
+    linhas = ["BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//Pandora ERP//Agenda//PT-BR", "CALSCALE:GREGORIAN"]
+    for e in qs.order_by("data_inicio", "id").values(*_CAMPOS_ICS):
+        linhas += _vevent(e, dtstamp)
+    linhas.append("END:VCALENDAR")
+    return "\r\n".join(_dobrar(linha) for linha in linhas) + "\r\n"
+
+
+def exportar_ics(tenant_id: int | None, usuario, periodo: Janela) -> tuple[str, str]:
+    """ICS dos eventos do usuário no período; retorna (conteúdo, etag) usando o cache quando válido."""
+    qs = eventos_da_janela(tenant_id, periodo, usuario=usuario)
+    etag = impressao(qs, tenant_id, usuario.pk, periodo.chave)
+    chave = f"agenda:ics:{tenant_id}:{usuario.pk}:{periodo.chave}"
+    em_cache = cache.get(chave)
+    if em_cache and em_cache[0] == etag:
+        return em_cache[1], etag
+    conteudo = _renderizar_ics(qs)
+    cache.set(chave, (etag, conteudo), int(getattr(settings, "AGENDA_ICS_CACHE_SEGUNDOS", 900)))
+    return conteudo, etag
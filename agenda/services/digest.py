@@ -0,0 +1,192 @@
+"""Digest diário da agenda por e-mail, em lote por tenant.
+
+Para cada tenant com o digest habilitado cuja hora local (``Tenant.timezone``) já
+alcançou ``AgendaConfiguracao.digest_email_hora``:
+
+1. uma única consulta (JOIN com participantes) traz os eventos do dia local, já
+   ordenados, e monta o mapa usuário -> eventos (responsável + participantes);
+2. os usuários com e-mail vêm em uma consulta; o template é carregado uma vez e
+   renderizado no fuso do tenant;
+3. os destinatários são processados em blocos de ``AGENDA_DIGEST_LOTE``: cada bloco
+   é reivindicado no ledger ``DigestEnvio`` (único por tenant/usuário/dia) antes do
+   envio e enviado por uma conexão SMTP reutilizada em todo o tenant.
+
+Retomada: uma nova execução pula quem já tem linha no ledger. Se o processo morrer
+entre a reivindicação e o envio de um bloco, esse bloco não é repetido (no máximo
+um e-mail por usuário e dia); um bloco recusado por inteiro pelo servidor de e-mail
+é liberado para a próxima execução. ``digest_concluido_em`` marca o tenant como feito.
+"""
+
+from __future__ import annotations
+
+import logging
+import uuid
+import zoneinfo
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.template.loader import get_template
+from django.utils import timezone
+
+from agenda.models import AgendaConfiguracao, DigestEnvio, Evento
+
+__all__ = [
+    "ResultadoDigest",
+    "agenda_por_usuario",
+    "enviar_digests",
+    "enviar_digest_tenant",
+]
+
+logger = logging.getLogger(__name__)
+
+_TEMPLATE = "agenda/emails/digest_diario.html"
+
+
+@dataclass
+class ResultadoDigest:
+    tenants: int = 0
+    enviados: int = 0
+    pulados: int = 0
+    falhas: int = 0
+
+
+def _tamanho_lote() -> int:
+    return max(int(getattr(settings, "AGENDA_DIGEST_LOTE", 50)), 1)
+
+
+def _fuso(tenant) -> zoneinfo.ZoneInfo:
+    try:
+        return zoneinfo.ZoneInfo(getattr(tenant, "timezone", None) or settings.TIME_ZONE)
+    except (zoneinfo.ZoneInfoNotFoundError, ValueError):
+        return zoneinfo.ZoneInfo(settings.TIME_ZONE)
+
+
+def agenda_por_usuario(tenant_id: int, dia: date, fuso: zoneinfo.ZoneInfo) -> dict[int, list[dict]]:
+    """Eventos do dia local por usuário (responsável ou participante), em ordem de início — uma consulta."""
+    inicio = datetime.combine(dia, time.min, tzinfo=fuso)
+    linhas = (
+        Evento.objects.filter(tenant_id=tenant_id, data_inicio__gte=inicio, data_inicio__lt=inicio + timedelta(days=1))
+        .exclude(status="cancelado")
+        .order_by("data_inicio", "id")
+        .values_list("id", "titulo", "data_inicio", "data_fim", "local", "responsavel_id", "participantes__id")
+    )
+    eventos: dict[int, dict] = {}
+    por_usuario: dict[int, list[dict]] = defaultdict(list)
+    for evento_id, titulo, data_inicio, data_fim, local, responsavel_id, participante_id in linhas:
+        evento = eventos.get(evento_id)
+        if evento is None:
+            evento = eventos[evento_id] = {
+                "id": evento_id,
+                "titulo": titulo,
+                "data_inicio": data_inicio,
+                "data_fim": data_fim,
+                "local": local,
+            }
+            if responsavel_id:
+                por_usuario[responsavel_id].append(evento)
+        # Linhas chegam em ordem de início: basta não repetir o evento para o mesmo usuário
+        if participante_id and participante_id != responsavel_id and evento not in por_usuario[participante_id][-1:]:
+            por_usuario[participante_id].append(evento)
+    return dict(por_usuario)
+
+
+def _mensagem(template, cfg: AgendaConfiguracao, usuario, dia: date, eventos: list[dict]) -> EmailMultiAlternatives:
+    tenant = cfg.tenant
+    texto = "\n".join(f"- {ev['titulo']} às {timezone.localtime(ev['data_inicio']):%H:%M}" for ev in eventos)
+    mensagem = EmailMultiAlternatives(
+        subject=f"Agenda do dia - {getattr(tenant, 'name', str(tenant))}",
+        body=texto,
+        from_email=getattr(tenant, "email_from_address", None) or None,
+        to=[usuario.email],
+    )
+    try:
+        html = template.render({"tenant": tenant, "usuario": usuario, "data_referencia": dia, "eventos": eventos})
+    except Exception:
+        logger.exception("Falha ao renderizar template do digest diário.")
+    else:
+        mensagem.attach_alternative(html, "text/html")
+    return mensagem
+
+
+def _reivindicar(tenant_id: int, dia: date, usuario_ids: list[int]) -> set[int]:
+    """Insere as linhas do ledger do bloco; retorna os usuários reivindicados por esta execução."""
+    lote = uuid.uuid4()
+    DigestEnvio.objects.bulk_create(
+        [DigestEnvio(tenant_id=tenant_id, usuario_id=uid, data_referencia=dia, lote=lote) for uid in usuario_ids],
+        ignore_conflicts=True,
+    )
+    return set(
+        DigestEnvio.objects.filter(tenant_id=tenant_id, data_referencia=dia, lote=lote).values_list(
+            "usuario_id", flat=True
+        )
+    )
+
+
+def enviar_digest_tenant(cfg: AgendaConfiguracao, dia: date, *, conexao=None) -> ResultadoDigest:
+    """Envia o digest de ``dia`` (data local do tenant) a todos os usuários com eventos."""
+    resultado = ResultadoDigest(tenants=1)
+    tenant = cfg.tenant
+    fuso = _fuso(tenant)
+    agenda = agenda_por_usuario(tenant.id, dia, fuso)
+    if agenda:
+        ja_enviados = set(
+            DigestEnvio.objects.filter(tenant=tenant, data_referencia=dia, usuario_id__in=agenda).values_list(
+                "usuario_id", flat=True
+            )
+        )
+        usuarios = list(
+            get_user_model()
+            .objects.filter(id__in=[uid for uid in agenda if uid not in ja_enviados])
+            .exclude(email="")
+            .exclude(email__isnull=True)
+            .order_by("id")
+        )
+        resultado.pulados = len(ja_enviados)
+        template = get_template(_TEMPLATE)
+        conexao = conexao or get_connection(fail_silently=True)
+        lote = _tamanho_lote()
+        with conexao, timezone.override(fuso):
+            for i in range(0, len(usuarios), lote):
+                bloco = usuarios[i : i + lote]
+                meus = _reivindicar(tenant.id, dia, [u.id for u in bloco])
+                mensagens = [_mensagem(template, cfg, u, dia, agenda[u.id]) for u in bloco if u.id in meus]
+                try:
+                    enviados = conexao.send_messages(mensagens) or 0
+                except Exception:
+                    logger.exception("Falha ao enviar bloco do digest diário (tenant=%s).", tenant.id)
+                    enviados = 0
+                reivindicados = DigestEnvio.objects.filter(
+                    tenant=tenant, data_referencia=dia, usuario_id__in=meus, enviado_em__isnull=True
+                )
+                if enviados:
+                    reivindicados.update(enviado_em=timezone.now())
+                else:  # nada saiu (ex.: SMTP fora): libera o bloco para a próxima execução
+                    reivindicados.delete()
+                resultado.enviados += enviados
+                resultado.falhas += len(mensagens) - enviados
+                resultado.pulados += len(bloco) - len(mensagens)
+    if not resultado.falhas:
+        AgendaConfiguracao.objects.filter(pk=cfg.pk).update(digest_concluido_em=dia)
+    return resultado
+
+
+def enviar_digests(agora: datetime | None = None, *, hora: int | None = None) -> ResultadoDigest:
+    """Processa todos os tenants cuja hora local já alcançou a hora do digest (``hora`` força a hora local)."""
+    agora = agora or timezone.now()
+    total = ResultadoDigest()
+    configs = AgendaConfiguracao.objects.filter(digest_email_habilitado=True).select_related("tenant")
+    for cfg in configs:
+        local = agora.astimezone(_fuso(cfg.tenant))
+        hora_local = local.hour if hora is None else hora
+        if hora_local < cfg.digest_email_hora or cfg.digest_concluido_em == local.date():
+            continue
+        resultado = enviar_digest_tenant(cfg, local.date())
+        total.tenants += 1
+        total.enviados += resultado.enviados
+        total.pulados += resultado.pulados
+        total.falhas += resultado.falhas
+    return total
@@ -0,0 +1,203 @@
+"""Agendador de lembretes da agenda por instante de disparo pré-calculado.
+
+Cada ``EventoLembrete`` guarda ``fire_at = evento.data_inicio - minutos_antes``
+(recalculado no ``save`` do lembrete e, em lote, por ``sincronizar_fire_at`` quando o
+evento é reagendado). ``despachar_lembretes`` substitui a varredura de todos os eventos
+futuros por uma consulta de intervalo no índice parcial ``agenda_lembrete_pendente_idx``:
+
+1. trava um bloco de lembretes vencidos (``fire_at <= agora``, não disparados) com
+   ``SELECT ... FOR UPDATE SKIP LOCKED`` — workers concorrentes pegam blocos distintos;
+2. carrega os eventos do bloco com ``in_bulk``;
+3. grava as notificações em ``bulk_create`` para quem ainda é responsável ou
+   participante do evento (uma consulta na tabela de participantes por bloco);
+   lembretes de eventos já iniciados ou inativos, ou de usuários que saíram do
+   evento, entram só no ledger, como ignorados;
+4. registra cada disparo em ``LembreteDisparo`` (único por ``(lembrete, fire_at)``),
+   o que torna o despacho idempotente mesmo com reexecuções;
+5. marca ``disparado_em`` no bloco com um único ``UPDATE``.
+
+O custo de cada execução é proporcional aos lembretes vencidos, não ao total de eventos.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from agenda.models import Evento, EventoLembrete, LembreteDisparo
+from notifications.models import LogNotificacao, Notification
+
+__all__ = [
+    "STATUS_NOTIFICAVEIS",
+    "ResultadoDespacho",
+    "despachar_lembretes",
+    "sincronizar_fire_at",
+]
+
+logger = logging.getLogger(__name__)
+
+STATUS_NOTIFICAVEIS = ("agendado", "pendente", "confirmado")
+
+
+@dataclass
+class ResultadoDespacho:
+    notificados: int = 0
+    ignorados: int = 0
+    blocos: int = 0
+
+
+def _tamanho_bloco() -> int:
+    return int(getattr(settings, "AGENDA_LEMBRETES_BLOCO", 500))
+
+
+def sincronizar_fire_at(evento: Evento) -> int:
+    """Recalcula ``fire_at`` dos lembretes do evento (um UPDATE por offset distinto).
+
+    Lembretes cujo instante mudou voltam a ficar pendentes; o ledger é por
+    ``(lembrete, fire_at)``, então o novo horário gera um novo disparo.
+    """
+    atualizados = 0
+    offsets = set(evento.lembretes.values_list("minutos_antes", flat=True).order_by())
+    for minutos in offsets:
+        fire_at = EventoLembrete.calcular_fire_at(evento.data_inicio, minutos)
+        atualizados += (
+            EventoLembrete.objects.filter(evento=evento, minutos_antes=minutos)
+            .exclude(fire_at=fire_at)
+            .update(fire_at=fire_at, disparado_em=None, atualizado_em=timezone.now())
+        )
+    return atualizados
+
+
+def _notificacao(evento: Evento, usuario_id: int, agora: datetime) -> Notification:
+    minutos = max(int((evento.data_inicio - agora).total_seconds() // 60), 0)
+    inicio = timezone.localtime(evento.data_inicio)
+    return Notification(
+        tenant_id=evento.tenant_id,
+        usuario_destinatario_id=usuario_id,
+        titulo=f"Lembrete: {evento.titulo} em {minutos} min",
+        mensagem=f"Evento às {inicio.strftime('%H:%M')} no dia {inicio.strftime('%d/%m/%Y')}.",
+        tipo="alert",
+        prioridade="alta",
+        modulo_origem="agenda",
+        evento_origem="lembrete_evento",
+        url_acao=f"/agenda/evento/{evento.id}/",
+        dados_extras={"evento_id": evento.id, "tipo": "lembrete"},
+    )
+
+
+def _despachar_bloco(linhas: list[tuple], agora: datetime) -> tuple[list[Notification], int]:
+    """Processa um bloco já travado; retorna as notificações criadas e o nº de ignorados."""
+    ja_disparados = set(
+        LembreteDisparo.objects.filter(lembrete_id__in=[linha[0] for linha in linhas]).values_list(
+            "lembrete_id", "fire_at"
+        )
+    )
+    evento_ids = {linha[1] for linha in linhas}
+    eventos = Evento.objects.only("id", "tenant_id", "titulo", "data_inicio", "status", "responsavel").in_bulk(
+        evento_ids
+    )
+    participantes = set(
+        Evento.participantes.through.objects.filter(
+            evento_id__in=evento_ids, customuser_id__in={linha[2] for linha in linhas}
+        ).values_list("evento_id", "customuser_id")
+    )
+    notificar: list[tuple[int, datetime, Notification]] = []
+    ignorados: list[tuple[int, datetime]] = []
+    for lembrete_id, evento_id, usuario_id, fire_at in linhas:
+        if (lembrete_id, fire_at) in ja_disparados:
+            continue
+        evento = eventos.get(evento_id)
+        membro = evento is not None and (
+            evento.responsavel_id == usuario_id or (evento_id, usuario_id) in participantes
+        )
+        if not membro or evento.status not in STATUS_NOTIFICAVEIS or evento.data_inicio <= agora:
+            ignorados.append((lembrete_id, fire_at))
+        else:
+            notificar.append((lembrete_id, fire_at, _notificacao(evento, usuario_id, agora)))
+
+    notificacoes = Notification.objects.bulk_create([n for _l, _f, n in notificar])
+    LogNotificacao.objects.bulk_create(
+        [LogNotificacao(notificacao=n, usuario=None, acao=f"Notificação '{n.titulo}' criada.") for n in notificacoes]
+    )
+    LembreteDisparo.objects.bulk_create(
+        [LembreteDisparo(lembrete_id=lid, fire_at=f, notificacao=n) for lid, f, n in notificar]
+        + [LembreteDisparo(lembrete_id=lid, fire_at=f, ignorado=True) for lid, f in ignorados],
+        ignore_conflicts=True,
+    )
+    EventoLembrete.objects.filter(id__in=[linha[0] for linha in linhas]).update(disparado_em=agora)
+    return notificacoes, len(ignorados)
+
+
+def despachar_lembretes(agora: datetime | None = None, *, bloco: int | None = None) -> ResultadoDespacho:
+    """Dispara todos os lembretes ativos com ``fire_at <= agora`` ainda não disparados."""
+    agora = agora or timezone.now()
+    bloco = bloco or _tamanho_bloco()
+    resultado = ResultadoDespacho()
+    pendentes = EventoLembrete.objects.filter(ativo=True, disparado_em__isnull=True, fire_at__lte=agora)
+    while True:
+        with transaction.atomic():
+            # Linhas marcadas com disparado_em saem do filtro: não é preciso cursor keyset
+            linhas = list(
+                pendentes.select_for_update(skip_locked=True)
+                .order_by("fire_at", "id")
+                .values_list("id", "evento_id", "usuario_id", "fire_at")[:bloco]
+            )
+            if not linhas:
+                break
+            notificacoes, ignorados = _despachar_bloco(linhas, agora)
+            if notificacoes:
+                transaction.on_commit(lambda n=notificacoes: _broadcast_contagens(n))
+        resultado.blocos += 1
+        resultado.notificados += len(notificacoes)
+        resultado.ignorados += ignorados
+        if len(linhas) < bloco:
+            break
+    if resultado.notificados or resultado.ignorados:
+        logger.info(
+            "Lembretes da agenda: %s notificados, %s ignorados em %s blocos",
+            resultado.notificados,
+            resultado.ignorados,
+            resultado.blocos,
+        )
+    return resultado
+
+
+def _broadcast_contagens(notificacoes: list[Notification]) -> None:
+    """Equivalente ao ``broadcast_notification_count`` (pulado pelo bulk_create): uma contagem por usuário."""
+    with contextlib.suppress(Exception):
+        ultima = {(n.usuario_destinatario_id, n.tenant_id): n for n in notificacoes}
+        nao_lidas = {
+            (usuario_id, tenant_id): total
+            for usuario_id, tenant_id, total in Notification.objects.filter(
+                usuario_destinatario_id__in={u for u, _t in ultima}, status="nao_lida"
+            )
+            .values_list("usuario_destinatario_id", "tenant_id")
+            .annotate(total=Count("id"))
+            .order_by()
+        }
+        async_to_sync(_enviar)(get_channel_layer(), ultima, nao_lidas)
+
+
+async def _enviar(layer, ultima: dict[tuple, Notification], nao_lidas: dict[tuple, int]) -> None:
+    for chave, n in ultima.items():
+        await layer.group_send(
+            f"notif_user_{chave[0]}",
+            {
+                "type": "notifications.update",
+                "event": "notification_created",
+                "notification_id": n.id,
+                "unread_count": nao_lidas.get(chave, 0),
+                "titulo": n.titulo,
+                "tipo": n.tipo,
+                "prioridade": n.prioridade,
+            },
+        )
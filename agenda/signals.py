@@ -0,0 +1,28 @@
+"""Sinais do app agenda: marcadores de exclusão e carimbo de alteração para o sync do calendário."""
+
+from django.db.models import QuerySet
+from django.db.models.signals import m2m_changed, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from agenda.models import Evento, EventoRemovido
+from core.models import Tenant
+
+
+@receiver(post_delete, sender=Evento)
+def registrar_remocao(sender, instance, **kwargs):
+    """Guarda o id removido para que clientes com sync_token recebam a exclusão."""
+    origem = kwargs.get("origin")
+    if isinstance(origem, Tenant) or (isinstance(origem, QuerySet) and origem.model is Tenant):
+        return  # cascata da exclusão do tenant: o marcador apontaria para o tenant removido
+    EventoRemovido.objects.create(tenant_id=instance.tenant_id, evento_id=instance.pk, uuid=instance.uuid)
+
+
+@receiver(m2m_changed, sender=Evento.participantes.through)
+def tocar_evento_participantes(sender, instance, action, reverse, pk_set, **kwargs):
+    """Mudança de participantes não passa por Evento.save(): atualiza data_atualizacao em lote."""
+    if action not in {"post_add", "post_remove", "post_clear"}:
+        return
+    ids = pk_set if reverse else {instance.pk}
+    if ids:
+        Evento.objects.filter(pk__in=ids).update(data_atualizacao=timezone.now())
@@ -0,0 +1,29 @@
+"""Tarefas Celery do app agenda."""
+
+from __future__ import annotations
+
+from celery import shared_task
+
+from agenda.services.calendario import expurgar_removidos
+from agenda.services.digest import enviar_digests
+from agenda.services.lembretes import despachar_lembretes
+
+
+@shared_task
+def despachar_lembretes_vencidos() -> dict:
+    """Executada a cada minuto pelo beat: dispara os lembretes com ``fire_at`` vencido."""
+    resultado = despachar_lembretes()
+    return {"notificados": resultado.notificados, "ignorados": resultado.ignorados}
+
+
+@shared_task
+def enviar_digest_diario() -> dict:
+    """Executada de hora em hora: envia o digest dos tenants cuja hora local já chegou."""
+    resultado = enviar_digests()
+    return {"tenants": resultado.tenants, "enviados": resultado.enviados, "falhas": resultado.falhas}
+
+
+@shared_task
+def expurgar_eventos_removidos() -> int:
+    """Diária: apaga marcadores de exclusão mais antigos que a validade dos sync_tokens."""
+    return expurgar_removidos()
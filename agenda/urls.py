@@ -24,6 +24,7 @@ urlpatterns = [
     path("ajax/evento/<int:pk>/status/", views.evento_ajax_update_status, name="evento_ajax_update_status"),
     path("ajax/evento/buscar/", views.evento_search_ajax, name="evento_search_ajax"),
     path("api/eventos/", views.api_eventos, name="api_eventos"),
+    path("api/eventos.ics", views.exportar_eventos_ics, name="eventos_ics"),
     # Relatórios
     path("relatorios/eventos/", views.eventos_relatorio, name="eventos_relatorio"),
     # URLs alternativas (function-based views para compatibilidade)
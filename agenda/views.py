@@ -16,6 +16,7 @@ from django.http import (
     HttpRequest,
     HttpResponse,
     HttpResponseForbidden,
+    HttpResponseNotModified,
     JsonResponse,
 )
 from django.shortcuts import get_object_or_404, redirect, render
@@ -32,6 +33,7 @@ from core.utils import get_current_tenant
 
 from .forms import EventoForm
 from .models import AgendaConfiguracao, Evento, EventoLembrete, LogEvento
+from .services import calendario
 
 # Constantes
 MESES_DO_ANO = 12
@@ -669,48 +671,57 @@ def evento_search_ajax(request: HttpRequest) -> JsonResponse:
 
 
 @login_required
-def api_eventos(request: HttpRequest) -> JsonResponse:
-    """Endpoint JSON para FullCalendar listar eventos do tenant atual."""
+def api_eventos(request: HttpRequest) -> HttpResponse:
+    """Endpoint JSON para FullCalendar listar eventos do tenant atual.
+
+    Sem ``sync_token``: lista do período (``start``/``end`` ou janela padrão) com ETag/304.
+    Com ``sync_token`` (vazio na primeira carga): ``{"events", "deleted", "sync_token"}``
+    apenas com o que mudou desde o token; token inválido/expirado responde 410.
+    """
     tenant = get_current_tenant(request)
     if not tenant and not request.user.is_superuser:
         return JsonResponse({"events": []})
+    tenant_id = tenant.id if tenant else None
+
+    if "sync_token" in request.GET:
+        token = request.GET["sync_token"]
+        novo_token = calendario.gerar_sync_token(tenant_id)
+        if not token:
+            periodo = calendario.janela(request.GET.get("start"), request.GET.get("end"))
+            eventos, removidos = calendario.eventos_da_janela(tenant_id, periodo), []
+        else:
+            desde = calendario.ler_sync_token(token, tenant_id)
+            if desde is None:
+                return JsonResponse({"error": "sync_token inválido ou expirado"}, status=410)
+            eventos, removidos = calendario.alteracoes(tenant_id, desde)
+        return JsonResponse({"events": calendario.serializar(eventos), "deleted": removidos, "sync_token": novo_token})
+
+    periodo = calendario.janela(request.GET.get("start"), request.GET.get("end"))
+    eventos = calendario.eventos_da_janela(tenant_id, periodo)
+    etag = f'"{calendario.impressao(eventos, tenant_id, periodo.chave)}"'
+    if etag in request.headers.get("If-None-Match", ""):
+        return HttpResponseNotModified(headers={"ETag": etag})
+    response = JsonResponse(calendario.serializar(eventos), safe=False)
+    response["ETag"] = etag
+    response["X-Sync-Token"] = calendario.gerar_sync_token(tenant_id)
+    return response
 
-    qs = Evento.objects.all()
-    if tenant:
-        qs = qs.filter(tenant=tenant)
-
-    # Filtros opcionais por período (ISO 8601)
-    start = request.GET.get("start")
-    end = request.GET.get("end")
-    try:
-        if start:
-            qs = qs.filter(data_inicio__gte=datetime.fromisoformat(start))
-        if end:
-            qs = qs.filter(data_inicio__lte=datetime.fromisoformat(end))
-    except Exception:
-        LOGGER.exception("Parâmetros de filtro inválidos em api_eventos.")
-
-    events = [
-        {
-            "id": e.id,
-            "title": e.titulo,
-            "start": e.data_inicio.isoformat() if e.data_inicio else None,
-            "end": e.data_fim.isoformat() if e.data_fim else None,
-            "allDay": bool(e.dia_inteiro),
-            "url": reverse("agenda:evento_detail", kwargs={"pk": e.pk}),
-            "extendedProps": {
-                "status": e.status,
-                "prioridade": e.prioridade,
-                "description": e.descricao,
-                "local": getattr(e, "local", ""),
-                "responsavel": f"{e.responsavel.first_name} {e.responsavel.last_name}" if e.responsavel else "",
-                "tipo_evento": getattr(e, "tipo_evento", ""),
-            },
-        }
-        for e in qs
-    ]
 
-    return JsonResponse(events, safe=False)
+@login_required
+def exportar_eventos_ics(request: HttpRequest) -> HttpResponse:
+    """Exporta em iCalendar (ICS) os eventos do usuário no período, com recorrência."""
+    tenant = get_current_tenant(request)
+    if not tenant and not request.user.is_superuser:
+        return redirect("core:tenant_select")
+    periodo = calendario.janela(request.GET.get("start"), request.GET.get("end"))
+    conteudo, etag = calendario.exportar_ics(tenant.id if tenant else None, request.user, periodo)
+    etag = f'"{etag}"'
+    if etag in request.headers.get("If-None-Match", ""):
+        return HttpResponseNotModified(headers={"ETag": etag})
+    response = HttpResponse(conteudo, content_type="text/calendar; charset=utf-8")
+    response["Content-Disposition"] = 'attachment; filename="agenda.ics"'
+    response["ETag"] = etag
+    return response
 
 
 # Views de relatórios
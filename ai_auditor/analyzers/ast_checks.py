@@ -0,0 +1,376 @@
+"""Checks de análise estática sobre AST (executados nos processos do pool).
+
+Este módulo não importa Django: recebe o código-fonte e opções simples montadas
+pelo processo principal em ``ai_auditor.analyzers.engine`` e devolve achados como
+dicts (mesmos campos de ``CodeIssue``, mais ``check``).
+
+Checks são plugáveis: qualquer módulo listado em ``AI_AUDITOR_CHECK_MODULES`` pode
+registrar novas funções com ``@registrar("nome")``. Cada check recebe um
+``ContextoArquivo`` e devolve (ou gera) achados criados com ``ctx.achado(...)``.
+Alterar a lógica de um check exige incrementar ``VERSAO`` (invalida o cache).
+"""
+
+from __future__ import annotations
+
+import ast
+import importlib
+import re
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass, field
+
+__all__ = [
+    "CHECKS",
+    "VERSAO",
+    "ContextoArquivo",
+    "analisar_fonte",
+    "analisar_lote",
+    "registrar",
+]
+
+VERSAO = "1"
+
+Check = Callable[["ContextoArquivo"], Iterable[dict]]
+CHECKS: dict[str, Check] = {}
+
+MANAGERS = frozenset({"objects", "_base_manager", "_default_manager"})
+# Métodos que devolvem QuerySet (iterar o resultado executa a consulta inteira)
+METODOS_QUERYSET = frozenset(
+    {
+        "all",
+        "filter",
+        "exclude",
+        "order_by",
+        "select_related",
+        "prefetch_related",
+        "annotate",
+        "distinct",
+        "only",
+        "defer",
+        "values",
+        "values_list",
+        "using",
+        "select_for_update",
+    }
+)
+METODOS_CONSULTA = METODOS_QUERYSET | {"get", "count", "exists", "first", "last", "aggregate", "create", "update"}
+_IDENTIFICADOR = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+_PARTES_CONSULTA = 3  # Model.objects.metodo()
+_MAX_TEXTO_ANOTACAO = 200
+
+
+def registrar(nome: str) -> Callable[[Check], Check]:
+    """Registra um check sob ``nome`` (sobrescreve registro anterior com o mesmo nome)."""
+
+    def decorador(funcao: Check) -> Check:
+        CHECKS[nome] = funcao
+        return funcao
+
+    return decorador
+
+
+@dataclass
+class ContextoArquivo:
+    caminho: str
+    arvore: ast.Module
+    linhas: list[str]
+    opcoes: dict = field(default_factory=dict)
+    _pais: dict[ast.AST, ast.AST] | None = None
+
+    @property
+    def pais(self) -> dict[ast.AST, ast.AST]:
+        if self._pais is None:
+            self._pais = {filho: no for no in ast.walk(self.arvore) for filho in ast.iter_child_nodes(no)}
+        return self._pais
+
+    def achado(self, no: ast.AST, *, issue_type: str, severity: str, title: str, **campos) -> dict:
+        linha = getattr(no, "lineno", 1)
+        trecho = self.linhas[linha - 1].strip() if 0 < linha <= len(self.linhas) else ""
+        return {
+            "line_number": linha,
+            "column_number": getattr(no, "col_offset", 0),
+            "issue_type": issue_type,
+            "severity": severity,
+            "title": title,
+            "description": campos.pop("description", ""),
+            "recommendation": campos.pop("recommendation", ""),
+            "code_snippet": trecho[:500],
+            **campos,
+        }
+
+
+def cadeia(no: ast.AST) -> list[tuple[str, ast.Call | None]]:
+    """Partes de uma expressão encadeada, da raiz para a ponta.
+
+    ``Cliente.objects.filter(x)[:10]`` -> ``[("Cliente", None), ("objects", None),
+    ("filter", <Call>), ("[]", None)]``.
+    """
+    partes: list[tuple[str, ast.Call | None]] = []
+    chamada = None
+    while True:
+        if isinstance(no, ast.Call):
+            chamada, no = no, no.func
+            continue
+        if isinstance(no, ast.Attribute):
+            partes.append((no.attr, chamada))
+            no = no.value
+        elif isinstance(no, ast.Name):
+            partes.append((no.id, chamada))
+            break
+        elif isinstance(no, ast.Subscript):
+            partes.append(("[]", None))
+            no = no.value
+        else:
+            break
+        chamada = None
+    return partes[::-1]
+
+
+def eh_queryset(partes: list[tuple[str, ast.Call | None]]) -> bool:
+    """``Model.objects.<método que devolve QuerySet>(...)`` (com encadeamentos)."""
+    nomes = [nome for nome, _ in partes]
+    if not any(nome in MANAGERS for nome in nomes[1:]):
+        return False
+    nome, chamada = partes[-1]
+    return nome in MANAGERS or (chamada is not None and nome in METODOS_QUERYSET) or nome == "[]"
+
+
+def _loops(arvore: ast.AST) -> Iterator[ast.For | ast.AsyncFor]:
+    return (no for no in ast.walk(arvore) if isinstance(no, ast.For | ast.AsyncFor))
+
+
+def _nomes_alvo(alvo: ast.AST) -> set[str]:
+    return {no.id for no in ast.walk(alvo) if isinstance(no, ast.Name)}
+
+
+@registrar("loop_queryset_sem_limite")
+def loop_queryset_sem_limite(ctx: ContextoArquivo) -> Iterator[dict]:
+    """``for x in Model.objects.filter(...)`` sem fatia nem ``.iterator()``."""
+    for loop in _loops(ctx.arvore):
+        partes = cadeia(loop.iter)
+        nomes = {nome for nome, _ in partes}
+        if not eh_queryset(partes) or nomes & {"[]", "iterator"}:
+            continue
+        yield ctx.achado(
+            loop,
+            issue_type="performance",
+            severity="medium",
+            title="Loop sem limite sobre QuerySet",
+            description="O loop carrega todas as linhas da consulta em memória de uma vez.",
+            recommendation="Use .iterator(chunk_size=...) ou paginação/fatiamento ([:n]).",
+        )
+
+
+def _consultas_no_corpo(loop: ast.For | ast.AsyncFor) -> Iterator[ast.Call]:
+    for instrucao in loop.body:
+        for no in ast.walk(instrucao):
+            if isinstance(no, ast.Call):
+                partes = cadeia(no)
+                if _eh_consulta(partes):
+                    yield no
+
+
+def _eh_consulta(partes: list[tuple[str, ast.Call | None]]) -> bool:
+    return (
+        len(partes) >= _PARTES_CONSULTA
+        and partes[-1][0] in METODOS_CONSULTA
+        and any(nome in MANAGERS for nome, _ in partes[1:])
+    )
+
+
+def _acessos_relacionados(loop: ast.For | ast.AsyncFor, variaveis: set[str]) -> Iterator[ast.AST]:
+    """``obj.relacao.campo`` ou ``obj.relacao.all()`` com ``obj`` vindo do loop."""
+    for instrucao in loop.body:
+        for no in ast.walk(instrucao):
+            if (
+                isinstance(no, ast.Attribute)
+                and isinstance(no.value, ast.Attribute)
+                and isinstance(no.value.value, ast.Name)
+                and no.value.value.id in variaveis
+            ):
+                yield no
+
+
+@registrar("consulta_n_mais_1")
+def consulta_n_mais_1(ctx: ContextoArquivo) -> Iterator[dict]:
+    """Consultas dentro de loops e acesso a relações sem ``select_related``/``prefetch_related``."""
+    vistos: set[ast.AST] = set()  # loops aninhados: a mesma consulta é reportada uma vez
+    for loop in _loops(ctx.arvore):
+        consulta = next((no for no in _consultas_no_corpo(loop) if no not in vistos), None)
+        if consulta is not None:
+            vistos.add(consulta)
+            yield ctx.achado(
+                consulta,
+                issue_type="performance",
+                severity="high",
+                title="Consulta ao banco dentro de loop (N+1)",
+                description="Cada iteração dispara uma nova consulta ao banco.",
+                recommendation="Carregue os dados antes do loop (filter(..__in=...), in_bulk, agregação).",
+            )
+            continue
+        partes = cadeia(loop.iter)
+        if not eh_queryset(partes) or {nome for nome, _ in partes} & {"select_related", "prefetch_related"}:
+            continue
+        acesso = next(_acessos_relacionados(loop, _nomes_alvo(loop.target)), None)
+        if acesso is not None:
+            yield ctx.achado(
+                acesso,
+                issue_type="performance",
+                severity="medium",
+                title="Potencial N+1 em relação acessada no loop",
+                description="Relação acessada para cada item de um QuerySet sem select_related/prefetch_related.",
+                recommendation="Adicione select_related() (FK/OneToOne) ou prefetch_related() (reversas/M2M).",
+            )
+
+
+def _filtra_tenant(chamada: ast.Call) -> bool:
+    return any(kw.arg is not None and kw.arg.split("__")[0] in {"tenant", "tenant_id"} for kw in chamada.keywords)
+
+
+@registrar("all_sem_tenant")
+def all_sem_tenant(ctx: ContextoArquivo) -> Iterator[dict]:
+    """``Model.objects.all()`` de modelo com tenant sem filtro de tenant no encadeamento.
+
+    ``opcoes["modelos_globais"]`` lista modelos sem campo ``tenant`` (ignorados).
+    """
+    globais = set(ctx.opcoes.get("modelos_globais", ()))
+    for no in ast.walk(ctx.arvore):
+        if not isinstance(no, ast.Call):
+            continue
+        partes = cadeia(no)
+        if (
+            len(partes) != _PARTES_CONSULTA
+            or partes[1][0] not in MANAGERS
+            or partes[2][0] != "all"
+            or partes[0][0] in globais
+        ):
+            continue
+        # sobe pelo encadeamento: Model.objects.all().filter(tenant=...) é aceito
+        atual, filtrado = no, False
+        while isinstance(pai := ctx.pais.get(atual), ast.Attribute) and isinstance(
+            chamada := ctx.pais.get(pai), ast.Call
+        ):
+            filtrado = filtrado or _filtra_tenant(chamada)
+            atual = chamada
+        if filtrado:
+            continue
+        yield ctx.achado(
+            no,
+            issue_type="security",
+            severity="high",
+            title=f"{partes[0][0]}.objects.all() sem filtro de tenant",
+            description="Consulta sem filtro de tenant pode expor dados de outras empresas.",
+            recommendation="Filtre por tenant (filter(tenant=...)) ou use o manager tenant-aware do modelo.",
+        )
+
+
+_RAMIFICACOES = (ast.If, ast.For, ast.AsyncFor, ast.While, ast.IfExp, ast.ExceptHandler, ast.Assert, ast.match_case)
+
+
+def complexidade(funcao: ast.AST) -> int:
+    """Complexidade ciclomática aproximada (McCabe) de uma função."""
+    total = 1
+    for no in ast.walk(funcao):
+        if isinstance(no, _RAMIFICACOES):
+            total += 1
+        elif isinstance(no, ast.BoolOp):
+            total += len(no.values) - 1
+        elif isinstance(no, ast.comprehension):
+            total += 1 + len(no.ifs)
+    return total
+
+
+@registrar("complexidade_ciclomatica")
+def complexidade_ciclomatica(ctx: ContextoArquivo) -> Iterator[dict]:
+    limite = int(ctx.opcoes.get("complexidade_maxima", 15))
+    for no in ast.walk(ctx.arvore):
+        if not isinstance(no, ast.FunctionDef | ast.AsyncFunctionDef):
+            continue
+        valor = complexidade(no)
+        if valor > limite:
+            yield ctx.achado(
+                no,
+                issue_type="complexity",
+                severity="high" if valor > 2 * limite else "medium",
+                title=f"Função '{no.name}' com complexidade {valor}",
+                description=f"Complexidade ciclomática {valor} acima do limite de {limite}.",
+                recommendation="Extraia ramificações em funções menores ou use tabelas de despacho.",
+            )
+
+
+def _nomes_usados(arvore: ast.Module) -> set[str]:
+    usados = set()
+    for no in ast.walk(arvore):
+        if isinstance(no, ast.Name):
+            usados.add(no.id)
+        elif isinstance(no, ast.Constant) and isinstance(no.value, str) and len(no.value) < _MAX_TEXTO_ANOTACAO:
+            # anotações em string ("Tenant") e __all__
+            usados.update(_IDENTIFICADOR.findall(no.value))
+    return usados
+
+
+@registrar("import_nao_utilizado")
+def import_nao_utilizado(ctx: ContextoArquivo) -> Iterator[dict]:
+    if ctx.caminho.endswith("__init__.py"):
+        return
+    usados = _nomes_usados(ctx.arvore)
+    for no in ctx.arvore.body:
+        if not isinstance(no, ast.Import | ast.ImportFrom) or (
+            isinstance(no, ast.ImportFrom) and no.module == "__future__"
+        ):
+            continue
+        if "noqa" in ctx.linhas[no.lineno - 1]:
+            continue
+        for alias in no.names:
+            nome = (alias.asname or alias.name).split(".")[0]
+            if nome != "*" and nome not in usados:
+                yield ctx.achado(
+                    no,
+                    issue_type="quality",
+                    severity="low",
+                    title=f"Import não utilizado: {nome}",
+                    description=f"'{nome}' é importado mas nunca usado no módulo.",
+                    recommendation="Remova o import (ou reexporte explicitamente em __all__).",
+                    auto_fixable=True,
+                )
+
+
+def _carregar(modulos: Iterable[str]) -> None:
+    for modulo in modulos:
+        importlib.import_module(modulo)
+
+
+def analisar_fonte(caminho: str, fonte: str, *, modulos: Iterable[str] = (), opcoes: dict | None = None) -> list[dict]:
+    """Executa os checks registrados (e os de ``modulos``) sobre um arquivo."""
+    _carregar(modulos)
+    opcoes = opcoes or {}
+    try:
+        arvore = ast.parse(fonte, filename=caminho)
+    except SyntaxError as exc:
+        return [
+            {
+                "line_number": exc.lineno or 1,
+                "column_number": exc.offset or 0,
+                "issue_type": "quality",
+                "severity": "high",
+                "title": "Erro de sintaxe",
+                "description": str(exc.msg),
+                "recommendation": "Corrija a sintaxe do arquivo.",
+                "code_snippet": (exc.text or "").strip()[:500],
+                "check": "sintaxe",
+            }
+        ]
+    ctx = ContextoArquivo(caminho=caminho, arvore=arvore, linhas=fonte.splitlines(), opcoes=opcoes)
+    desativados = set(opcoes.get("desativados", ()))
+    achados = []
+    for nome in sorted(CHECKS):
+        if nome in desativados:
+            continue
+        for achado in CHECKS[nome](ctx):
+            achado.setdefault("check", nome)
+            achados.append(achado)
+    return achados
+
+
+def analisar_lote(itens: list[tuple[str, str]], modulos: tuple[str, ...], opcoes: dict) -> list[list[dict]]:
+    """Analisa vários ``(caminho, fonte)`` em uma chamada (amortiza o IPC do pool)."""
+    return [analisar_fonte(caminho, fonte, modulos=modulos, opcoes=opcoes) for caminho, fonte in itens]
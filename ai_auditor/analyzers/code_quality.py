@@ -1,40 +1,18 @@
 from typing import Any
 
+from .ast_checks import analisar_fonte
 from .base import BaseAnalyzer
 
+# Checks de ast_checks cobertos por este analisador (PEP8/lint ficam com o ruff no pipeline)
+CHECKS_QUALIDADE = ("complexidade_ciclomatica", "import_nao_utilizado")
 
-class CodeQualityAnalyzer(BaseAnalyzer):
-    def analyze(self, file_path: str, content: str) -> list[dict[str, Any]]:
-        issues = []
-
-        # Análise PEP8 com flake8
-        issues.extend(self._analyze_pep8(file_path))
-
-        # Análise de complexidade
-        issues.extend(self._analyze_complexity(file_path, content))
-
-        # Análise de imports não utilizados
-        issues.extend(self._analyze_unused_imports(file_path, content))
-
-        # Análise de docstrings
-        issues.extend(self._analyze_docstrings(file_path, content))
 
-        return issues
-
-    def _analyze_pep8(self, file_path: str):
-        """Placeholder: análise PEP8 migrada para ruff no pipeline.
-        Não usa flake8 para cumprir REPO_HYGIENE.
-        """
-        return []
-
-    def _analyze_complexity(self, file_path: str, content: str):
-        # Implementar análise de complexidade ciclomática
-        pass
-
-    def _analyze_unused_imports(self, file_path: str, content: str):
-        # Implementar detecção de imports não utilizados
-        pass
+class CodeQualityAnalyzer(BaseAnalyzer):
+    """Complexidade ciclomática e imports não utilizados (via AST)."""
 
-    def _analyze_docstrings(self, file_path: str, content: str):
-        # Implementar verificação de docstrings ausentes
-        pass
+    def analyze(self, file_path: str, content: str) -> list[dict[str, Any]]:
+        return [
+            achado
+            for achado in analisar_fonte(file_path, content)
+            if achado["check"] in CHECKS_QUALIDADE or achado["check"] == "sintaxe"
+        ]
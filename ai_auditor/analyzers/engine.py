@@ -0,0 +1,252 @@
+"""Motor de análise estática do ai_auditor.
+
+Substitui a varredura serial por regex feita dentro da requisição HTTP:
+
+1. ``arquivos_do_projeto`` lista os ``.py`` dos apps do projeto (sem migrations);
+2. cada arquivo é lido uma vez e identificado pelo SHA-256 do conteúdo; achados de
+   conteúdos já analisados com a mesma assinatura de checks vêm de
+   ``FileAnalysisCache`` (uma consulta por bloco de hashes) — arquivos inalterados
+   não são reprocessados;
+3. os demais são analisados em lotes por um pool de processos do ``billiard``
+   ("spawn"), que executa ``ast_checks.analisar_lote`` sem Django nos filhos — ao
+   contrário do ``multiprocessing``, funciona dentro do worker Celery prefork, que
+   é daemônico;
+4. ``executar_auditoria`` grava os achados com ``bulk_create`` e atualiza os
+   agregados da ``AuditSession`` (chamada pela task ``executar_auditoria_codigo``).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+
+from billiard import get_context
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from ai_auditor.analyzers import ast_checks
+from ai_auditor.models import AIAuditorSettings, AuditSession, CodeIssue, FileAnalysisCache
+
+__all__ = [
+    "ArquivoFonte",
+    "ResultadoAnalise",
+    "analisar_arquivos",
+    "arquivos_do_projeto",
+    "executar_auditoria",
+]
+
+logger = logging.getLogger(__name__)
+
+TAMANHO_LOTE = 25  # arquivos por tarefa do pool
+TAMANHO_BLOCO_CACHE = 500
+LIMIAR_POOL = 8  # abaixo disso o custo de subir processos não compensa
+_CAMPOS_ISSUE = (
+    "line_number",
+    "column_number",
+    "issue_type",
+    "severity",
+    "title",
+    "description",
+    "recommendation",
+    "code_snippet",
+    "suggested_fix",
+    "auto_fixable",
+)
+
+
+@dataclass(frozen=True)
+class ArquivoFonte:
+    app_name: str
+    caminho: str  # absoluto
+    relativo: str  # relativo a BASE_DIR (gravado em CodeIssue.file_path)
+
+
+@dataclass
+class ResultadoAnalise:
+    achados: list[dict] = field(default_factory=list)
+    arquivos: int = 0
+    reaproveitados: int = 0
+    analisados: int = 0
+    ilegiveis: int = 0
+    segundos: float = 0.0
+    assinatura: str = ""
+
+
+def _workers() -> int:
+    return int(getattr(settings, "AI_AUDITOR_WORKERS", 0) or os.cpu_count() or 1)
+
+
+def _modulos() -> tuple[str, ...]:
+    return tuple(getattr(settings, "AI_AUDITOR_CHECK_MODULES", ("ai_auditor.analyzers.ast_checks",)))
+
+
+def _opcoes() -> dict:
+    """Opções repassadas aos checks (precisam ser serializáveis para o pool)."""
+    globais = sorted(
+        {m.__name__ for m in apps.get_models() if not any(f.name == "tenant" for f in m._meta.get_fields())}
+    )
+    return {
+        "modelos_globais": globais,
+        "complexidade_maxima": getattr(settings, "AI_AUDITOR_COMPLEXIDADE_MAXIMA", 15),
+        "desativados": sorted(getattr(settings, "AI_AUDITOR_CHECKS_DESATIVADOS", ())),
+    }
+
+
+def assinatura(modulos: tuple[str, ...], opcoes: dict) -> str:
+    """Identifica versão + conjunto de checks + opções (chave do cache junto do hash)."""
+    for modulo in modulos:
+        __import__(modulo)
+    dados = {"versao": ast_checks.VERSAO, "modulos": modulos, "checks": sorted(ast_checks.CHECKS), "opcoes": opcoes}
+    return hashlib.sha256(json.dumps(dados, sort_keys=True).encode()).hexdigest()
+
+
+def arquivos_do_projeto(excluidos: set[str] | None = None) -> list[ArquivoFonte]:
+    """``.py`` dos apps sob ``BASE_DIR`` (ignora migrations, caches e apps excluídos)."""
+    base = os.path.realpath(settings.BASE_DIR)
+    excluidos = excluidos or set()
+    arquivos = []
+    for config in apps.get_app_configs():
+        raiz = os.path.realpath(config.path)
+        if config.name in excluidos or config.label in excluidos or not raiz.startswith(base + os.sep):
+            continue
+        for pasta, dirs, nomes in os.walk(raiz):
+            dirs[:] = sorted(d for d in dirs if d not in {"migrations", "__pycache__"} and not d.startswith("."))
+            for nome in sorted(nomes):
+                if nome.endswith(".py"):
+                    caminho = os.path.join(pasta, nome)
+                    arquivos.append(ArquivoFonte(config.label, caminho, os.path.relpath(caminho, base)))
+    return arquivos
+
+
+def _ler(arquivos: list[ArquivoFonte], resultado: ResultadoAnalise) -> list[tuple[ArquivoFonte, str, str]]:
+    lidos = []
+    for arquivo in arquivos:
+        try:
+            with open(arquivo.caminho, "rb") as fh:
+                bruto = fh.read()
+            lidos.append((arquivo, hashlib.sha256(bruto).hexdigest(), bruto.decode("utf-8")))
+        except (OSError, UnicodeDecodeError) as exc:
+            resultado.ilegiveis += 1
+            logger.warning("ai_auditor: não foi possível ler %s: %s", arquivo.relativo, exc)
+    return lidos
+
+
+def _em_cache(sig: str, hashes: list[str]) -> dict[str, list[dict]]:
+    encontrados: dict[str, list[dict]] = {}
+    for inicio in range(0, len(hashes), TAMANHO_BLOCO_CACHE):
+        bloco = hashes[inicio : inicio + TAMANHO_BLOCO_CACHE]
+        encontrados.update(
+            FileAnalysisCache.objects.filter(checks_signature=sig, content_hash__in=bloco).values_list(
+                "content_hash", "findings"
+            )
+        )
+    return encontrados
+
+
+def _executar_checks(
+    pendentes: list[tuple[str, str]], modulos: tuple[str, ...], opcoes: dict, workers: int
+) -> list[list[dict]]:
+    if workers <= 1 or len(pendentes) < LIMIAR_POOL:
+        return ast_checks.analisar_lote(pendentes, modulos, opcoes)
+    lotes = [pendentes[i : i + TAMANHO_LOTE] for i in range(0, len(pendentes), TAMANHO_LOTE)]
+    # billiard: o worker Celery prefork é daemônico e o multiprocessing recusaria os filhos;
+    # "spawn": os filhos não herdam conexões de banco/threads do worker
+    with get_context("spawn").Pool(processes=min(workers, len(lotes))) as pool:
+        resultados = [pool.apply_async(ast_checks.analisar_lote, (lote, modulos, opcoes)) for lote in lotes]
+        return [achados for resultado in resultados for achados in resultado.get()]
+
+
+def analisar_arquivos(arquivos: list[ArquivoFonte], *, workers: int | None = None) -> ResultadoAnalise:
+    """Analisa ``arquivos`` reaproveitando o cache por conteúdo; não grava ``CodeIssue``."""
+    inicio = time.monotonic()
+    modulos, opcoes = _modulos(), _opcoes()
+    sig = assinatura(modulos, opcoes)
+    resultado = ResultadoAnalise(arquivos=len(arquivos), assinatura=sig)
+
+    lidos = _ler(arquivos, resultado)
+    cache = _em_cache(sig, sorted({h for _, h, _ in lidos}))
+    # conteúdos repetidos (ex.: __init__ vazios) são analisados uma única vez
+    pendentes: dict[str, tuple[str, str]] = {}
+    for arquivo, conteudo_hash, fonte in lidos:
+        if conteudo_hash not in cache:
+            pendentes.setdefault(conteudo_hash, (arquivo.relativo, fonte))
+    novos = _executar_checks(list(pendentes.values()), modulos, opcoes, _workers() if workers is None else workers)
+    novos_por_hash = dict(zip(pendentes, novos, strict=True))
+    FileAnalysisCache.objects.bulk_create(
+        [FileAnalysisCache(checks_signature=sig, content_hash=h, findings=f) for h, f in novos_por_hash.items()],
+        batch_size=TAMANHO_BLOCO_CACHE,
+        ignore_conflicts=True,
+    )
+    cache.update(novos_por_hash)
+
+    for arquivo, conteudo_hash, _fonte in lidos:
+        if conteudo_hash in novos_por_hash:
+            resultado.analisados += 1
+        else:
+            resultado.reaproveitados += 1
+        resultado.achados.extend(
+            {**achado, "app_name": arquivo.app_name, "file_path": arquivo.relativo} for achado in cache[conteudo_hash]
+        )
+    resultado.segundos = time.monotonic() - inicio
+    return resultado
+
+
+def _excluidos(session: AuditSession) -> set[str]:
+    excluidos = set(getattr(settings, "AI_AGENT_EXCLUDED_APPS", ["core", "admin"]))
+    config = AIAuditorSettings.objects.filter(tenant_id=session.tenant_id).values_list("excluded_apps", flat=True)
+    for apps_excluidos in config:
+        excluidos.update(apps_excluidos or ())
+    return excluidos
+
+
+def executar_auditoria(session: AuditSession, *, workers: int | None = None) -> ResultadoAnalise:
+    """Analisa o projeto, grava os achados da sessão em lote e fecha a sessão."""
+    try:
+        resultado = analisar_arquivos(arquivos_do_projeto(_excluidos(session)), workers=workers)
+        por_severidade = {nivel: 0 for nivel, _ in CodeIssue.SEVERITY_CHOICES}
+        issues = []
+        for achado in resultado.achados:
+            por_severidade[achado["severity"]] = por_severidade.get(achado["severity"], 0) + 1
+            issues.append(
+                CodeIssue(
+                    session=session,
+                    app_name=achado["app_name"],
+                    file_path=achado["file_path"],
+                    **{campo: achado[campo] for campo in _CAMPOS_ISSUE if campo in achado},
+                )
+            )
+        with transaction.atomic():
+            CodeIssue.objects.filter(session=session).delete()  # reexecução da mesma sessão
+            CodeIssue.objects.bulk_create(issues, batch_size=1000)
+            session.status = "completed"
+            session.completed_at = timezone.now()
+            session.total_files_analyzed = resultado.arquivos
+            session.total_issues = len(issues)
+            session.critical_issues = por_severidade["critical"]
+            session.high_issues = por_severidade["high"]
+            session.medium_issues = por_severidade["medium"]
+            session.low_issues = por_severidade["low"]
+            session.analysis_config = {
+                **(session.analysis_config or {}),
+                "engine": {
+                    "arquivos_analisados": resultado.analisados,
+                    "arquivos_em_cache": resultado.reaproveitados,
+                    "arquivos_ilegiveis": resultado.ilegiveis,
+                    "segundos": round(resultado.segundos, 3),
+                },
+            }
+            session.save()
+    except Exception as exc:
+        AuditSession.objects.filter(pk=session.pk).update(
+            status="failed", completed_at=timezone.now(), error_message=str(exc)[:2000]
+        )
+        raise
+    # assinaturas antigas nunca mais serão consultadas
+    FileAnalysisCache.objects.exclude(checks_signature=resultado.assinatura).delete()
+    return resultado
@@ -1,31 +1,18 @@
 from typing import Any
 
+from .ast_checks import analisar_fonte
 from .base import BaseAnalyzer
 
+# Checks de ast_checks cobertos por este analisador
+CHECKS_PERFORMANCE = ("consulta_n_mais_1", "loop_queryset_sem_limite", "all_sem_tenant")
 
-class PerformanceAnalyzer(BaseAnalyzer):
-    def analyze(self, file_path: str, content: str) -> list[dict[str, Any]]:
-        issues = []
-
-        # Detecção de queries N+1
-        issues.extend(self._detect_n_plus_one(file_path, content))
-
-        # Análise de QuerySets inadequados
-        issues.extend(self._analyze_querysets(file_path, content))
-
-        # Oportunidades de cache
-        issues.extend(self._analyze_cache_opportunities(file_path, content))
 
-        return issues
-
-    def _detect_n_plus_one(self, file_path: str, content: str):
-        # Implementar detecção de queries N+1
-        pass
-
-    def _analyze_querysets(self, file_path: str, content: str):
-        # Implementar análise de QuerySets
-        pass
+class PerformanceAnalyzer(BaseAnalyzer):
+    """Detecção de N+1, loops sem limite sobre QuerySets e consultas sem tenant (via AST)."""
 
-    def _analyze_cache_opportunities(self, file_path: str, content: str):
-        # Implementar análise de oportunidades de cache
-        pass
+    def analyze(self, file_path: str, content: str) -> list[dict[str, Any]]:
+        return [
+            achado
+            for achado in analisar_fonte(file_path, content)
+            if achado["check"] in CHECKS_PERFORMANCE or achado["check"] == "sintaxe"
+        ]
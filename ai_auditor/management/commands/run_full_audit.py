@@ -7,23 +7,15 @@ Notas de manutenção (modernização incremental):
 
 from __future__ import annotations
 
-import os
-from pathlib import Path
 from typing import TYPE_CHECKING, Any
 
 if TYPE_CHECKING:  # imports somente para tipagem
     import argparse
-    from collections.abc import Iterator
 
-from django.apps import apps
-from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
-from django.utils import timezone
 
-from ai_auditor.analyzers.performance import PerformanceAnalyzer
-from ai_auditor.analyzers.security import SecurityAnalyzer
-from ai_auditor.analyzers.test_coverage import TestCoverageAnalyzer
-from ai_auditor.models import AuditSession, CodeIssue
+from ai_auditor.analyzers.engine import executar_auditoria
+from ai_auditor.models import AuditSession
 from core.models import CustomUser, Tenant
 
 
@@ -36,6 +28,7 @@ class Command(BaseCommand):
         """Adiciona argumentos de linha de comando ao parser."""
         parser.add_argument("--tenant_id", type=int, help="ID do Tenant para executar a auditoria.")
         parser.add_argument("--user_id", type=int, help="ID do Usuário que está executando a auditoria.")
+        parser.add_argument("--workers", type=int, help="Processos do pool de análise (padrão: AI_AUDITOR_WORKERS).")
 
     # Helpers de redução de complexidade
     def _get_tenant(self, tenant_id: int) -> Tenant:
@@ -58,61 +51,6 @@ class Command(BaseCommand):
             )
             return None
 
-    def _list_apps(self) -> list[str]:
-        excluded = getattr(settings, "AI_AGENT_EXCLUDED_APPS", ["core", "admin"])
-        return [
-            cfg.name
-            for cfg in apps.get_app_configs()
-            if not cfg.name.startswith("django.") and cfg.name not in excluded
-        ]
-
-    def _iter_python_files(self, app_name: str) -> Iterator[Path]:
-        app_dir = apps.get_app_config(app_name).path
-        for root, _dirs, files in os.walk(app_dir):
-            for fn in files:
-                if fn.endswith(".py"):
-                    yield Path(root) / fn
-
-    def _analyze_file(
-        self,
-        analyzers: list,
-        session: AuditSession,
-        app_name: str,
-        file_path: Path,
-        counters: dict,
-    ) -> None:
-        try:
-            content = file_path.read_text(encoding="utf-8")
-        except (OSError, UnicodeDecodeError) as e:  # narrow except
-            self.stdout.write(self.style.ERROR(f"Erro ao ler {file_path}: {e}"))
-            return
-        for analyzer in analyzers:
-            try:
-                issues = analyzer.analyze(str(file_path), content)
-            except Exception as e:  # noqa: BLE001 - analisador externo pode falhar
-                self.stdout.write(self.style.ERROR(f"Falha no analisador {analyzer.__class__.__name__}: {e}"))
-                continue
-            for data in issues:
-                CodeIssue.objects.create(
-                    session=session,
-                    app_name=app_name,
-                    file_path=str(file_path),
-                    line_number=data.get("line_number"),
-                    column_number=data.get("column_number"),
-                    issue_type=data.get("issue_type"),
-                    severity=data.get("severity"),
-                    title=data.get("title"),
-                    description=data.get("description"),
-                    recommendation=data.get("recommendation"),
-                    code_snippet=data.get("code_snippet"),
-                    suggested_fix=data.get("suggested_fix"),
-                    auto_fixable=data.get("auto_fixable", False),
-                )
-                counters["issues"] += 1
-                sev = data.get("severity")
-                if sev in counters:
-                    counters[sev] += 1
-
     def handle(self, *args: object, **options: object) -> None:  # noqa: ARG002
         """Orquestra a auditoria agregando métricas e persistindo sessão."""
         tenant_id_obj: Any = options.get("tenant_id")
@@ -145,32 +83,21 @@ class Command(BaseCommand):
         session = AuditSession.objects.create(tenant=tenant, user=user, status="running")
         self.stdout.write(self.style.SUCCESS(f"Sessão de Auditoria criada: {session.id}"))
 
-        analyzers = [
-            SecurityAnalyzer(tenant, session),
-            PerformanceAnalyzer(tenant, session),
-            TestCoverageAnalyzer(tenant, session),
-        ]
-        counters = {"files": 0, "issues": 0, "critical": 0, "high": 0, "medium": 0, "low": 0}
-
-        for app_name in self._list_apps():
-            self.stdout.write(self.style.NOTICE(f"Analisando app: {app_name}"))
-            for file_path in self._iter_python_files(app_name):
-                counters["files"] += 1
-                self._analyze_file(analyzers, session, app_name, file_path, counters)
-
-        # Persistir agregados
-        session.total_files_analyzed = counters["files"]
-        session.total_issues = counters["issues"]
-        session.critical_issues = counters["critical"]
-        session.high_issues = counters["high"]
-        session.medium_issues = counters["medium"]
-        session.low_issues = counters["low"]
-        session.status = "completed"
-        session.completed_at = timezone.now()
-        session.save()
+        # Motor AST em pool de processos, com cache por conteúdo e gravação em lote
+        resultado = executar_auditoria(session, workers=options.get("workers"))
+        session.refresh_from_db()
+        counters = {
+            "files": session.total_files_analyzed,
+            "issues": session.total_issues,
+            "critical": session.critical_issues,
+            "high": session.high_issues,
+            "medium": session.medium_issues,
+            "low": session.low_issues,
+        }
 
         self.stdout.write(self.style.SUCCESS("Auditoria completa finalizada com sucesso!"))
         self.stdout.write(self.style.SUCCESS(f"Total de arquivos analisados: {counters['files']}"))
+        self.stdout.write(self.style.SUCCESS(f"Arquivos reaproveitados do cache: {resultado.reaproveitados}"))
         self.stdout.write(self.style.SUCCESS(f"Total de problemas encontrados: {counters['issues']}"))
         self.stdout.write(self.style.SUCCESS(f"Problemas Críticos: {counters['critical']}"))
         self.stdout.write(self.style.SUCCESS(f"Problemas Altos: {counters['high']}"))
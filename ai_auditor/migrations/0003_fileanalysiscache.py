@@ -0,0 +1,30 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("ai_auditor", "0002_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FileAnalysisCache",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("created_at", models.DateTimeField(auto_now_add=True, verbose_name="Data de criação")),
+                ("updated_at", models.DateTimeField(auto_now=True, verbose_name="Data de atualização")),
+                ("checks_signature", models.CharField(max_length=64)),
+                ("content_hash", models.CharField(max_length=64)),
+                ("findings", models.JSONField(blank=True, default=list)),
+            ],
+            options={
+                "verbose_name": "Cache de Análise de Arquivo",
+                "verbose_name_plural": "Cache de Análise de Arquivos",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("checks_signature", "content_hash"), name="ai_auditor_cache_sig_hash"
+                    )
+                ],
+            },
+        ),
+    ]
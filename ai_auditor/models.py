@@ -84,6 +84,21 @@ class CodeIssue(TimestampedModel):
         ordering = ["-severity", "-created_at"]
 
 
+class FileAnalysisCache(TimestampedModel):
+    """Achados de um conteúdo de arquivo (SHA-256) para uma assinatura de checks."""
+
+    checks_signature = models.CharField(max_length=64)
+    content_hash = models.CharField(max_length=64)
+    findings = models.JSONField(default=list, blank=True)
+
+    class Meta:
+        verbose_name = _("Cache de Análise de Arquivo")
+        verbose_name_plural = _("Cache de Análise de Arquivos")
+        constraints = [
+            models.UniqueConstraint(fields=["checks_signature", "content_hash"], name="ai_auditor_cache_sig_hash"),
+        ]
+
+
 class GeneratedTest(TimestampedModel):
     TEST_TYPES = [
         ("model", _("Teste de Model")),
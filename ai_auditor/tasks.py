@@ -0,0 +1,28 @@
+"""
+Tasks Celery do ai_auditor (análise estática em background).
+"""
+
+import logging
+
+from celery import shared_task
+
+from .analyzers.engine import executar_auditoria
+from .models import AuditSession
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(bind=True, time_limit=60 * 30, soft_time_limit=60 * 25)
+def executar_auditoria_codigo(self, session_id):
+    """Executa o motor de análise para a sessão e grava os achados em lote."""
+    session = AuditSession.objects.get(pk=session_id)
+    resultado = executar_auditoria(session)
+    logger.info(
+        "Auditoria %s: %s arquivos (%s em cache), %s achados em %.2fs",
+        session_id,
+        resultado.arquivos,
+        resultado.reaproveitados,
+        len(resultado.achados),
+        resultado.segundos,
+    )
+    return {"session_id": session_id, "total_issues": len(resultado.achados)}
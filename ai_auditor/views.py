@@ -1,12 +1,11 @@
 import datetime
 import json
-import re
 from datetime import datetime
-from pathlib import Path
 
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.db import transaction
 from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect
 from django.utils import timezone
@@ -21,6 +20,7 @@ from core.utils import get_current_tenant
 
 from .forms import AIAuditorSettingsForm
 from .models import AIAuditorSettings, AuditSession, CodeIssue
+from .tasks import executar_auditoria_codigo
 
 
 class AIAuditorDashboardView(LoginRequiredMixin, TenantRequiredMixin, PageTitleMixin, TemplateView):
@@ -172,6 +172,23 @@ class ChatView(LoginRequiredMixin, TenantRequiredMixin, PageTitleMixin, Template
         return context
 
 
+def _enfileirar_auditoria(request, tenant):
+    """Cria a sessão e agenda o motor de análise (ai_auditor.tasks) após o commit."""
+    session = AuditSession.objects.create(
+        tenant=tenant,
+        user=request.user,
+        status="running",
+        analysis_config={
+            "include_security": True,
+            "include_performance": True,
+            "include_quality": True,
+            "auto_fix": False,
+        },
+    )
+    transaction.on_commit(lambda: executar_auditoria_codigo.delay(session.id))
+    return session
+
+
 @method_decorator(csrf_exempt, name="dispatch")
 class ChatAPIView(LoginRequiredMixin, TenantRequiredMixin, View):
     """API para processar mensagens do chat com IA"""
@@ -200,370 +217,37 @@ class ChatAPIView(LoginRequiredMixin, TenantRequiredMixin, View):
             return JsonResponse({"error": f"Erro interno: {str(e)}"}, status=500)
 
     def execute_audit(self, request):
-        """Executa uma auditoria completa do sistema"""
+        """Enfileira uma auditoria completa do sistema (executada pela task em background)"""
         try:
             tenant = get_current_tenant(request)
             if not tenant:
                 return JsonResponse({"error": "Nenhuma empresa selecionada"}, status=400)
 
-            # Criar nova sessão de auditoria
-            session = AuditSession.objects.create(
-                tenant=tenant,
-                user=request.user,
-                status="running",
-                analysis_config={
-                    "include_security": True,
-                    "include_performance": True,
-                    "include_quality": True,
-                    "auto_fix": False,
-                },
-            )
+            session = _enfileirar_auditoria(request, tenant)
 
-            # Executar análise
-            issues_found = self.analyze_codebase(session)
+            response_text = f"""🔍 **Auditoria Iniciada**
 
-            # Atualizar sessão
-            session.status = "completed"
-            session.completed_at = timezone.now()
-            session.total_issues = len(issues_found)
-            session.critical_issues = len([i for i in issues_found if i["severity"] == "critical"])
-            session.high_issues = len([i for i in issues_found if i["severity"] == "high"])
-            session.medium_issues = len([i for i in issues_found if i["severity"] == "medium"])
-            session.low_issues = len([i for i in issues_found if i["severity"] == "low"])
-            session.save()
+⏳ **Sessão #{session.id} em execução em segundo plano.**
 
-            # Criar objetos CodeIssue
-            for issue_data in issues_found:
-                CodeIssue.objects.create(session=session, **issue_data)
+O motor de análise processa os arquivos em paralelo e reaproveita os resultados de arquivos
+não alterados desde a última auditoria. Os problemas aparecem assim que a sessão for concluída.
 
-            response_text = f"""🔍 **Auditoria Completa Executada**
-
-✅ **Sessão #{session.id} concluída com sucesso!**
-
-📊 **Resultados:**
-• **Total de problemas:** {session.total_issues}
-• **Críticos:** {session.critical_issues}
-• **Alta prioridade:** {session.high_issues}
-• **Média prioridade:** {session.medium_issues}
-• **Baixa prioridade:** {session.low_issues}
-
-🔗 **Próximos passos:**
+🔗 **Acompanhar:**
 • Visualizar detalhes: [Ver Sessão](/ai-auditor/sessions/{session.id}/)
-• Listar problemas: [Ver Problemas](/ai-auditor/issues/)
-• Aplicar correções automáticas (se disponível)
-
-⏱️ **Tempo de execução:** {(session.completed_at - session.started_at).total_seconds():.2f} segundos"""
+• Listar problemas: [Ver Problemas](/ai-auditor/issues/)"""
 
             return JsonResponse(
                 {
                     "response": response_text,
-                    "timestamp": datetime.datetime.now().isoformat(),
+                    "timestamp": timezone.now().isoformat(),
                     "session_id": session.id,
-                    "issues_count": session.total_issues,
+                    "status": session.status,
                 }
             )
 
         except Exception as e:
             return JsonResponse({"error": f"Erro ao executar auditoria: {str(e)}"}, status=500)
 
-    def analyze_codebase(self, session):
-        """Analisa o código base e retorna lista de problemas encontrados"""
-        issues = []
-        base_path = Path("/home/ubuntu")
-
-        # Apps Django para analisar
-        django_apps = [
-            "ai_auditor",
-            "core",
-            "admin",
-            "clientes",
-            "obras",
-            "orcamentos",
-            "fornecedores",
-            "compras",
-            "financeiro",
-            "estoque",
-            "apropriacao",
-            "aprovacoes",
-            "mao_obra",
-            "funcionarios",
-            "relatorios",
-            "bi",
-            "servicos",
-            "chat",
-            "treinamento",
-            "sst",
-            "formularios",
-            "produtos",
-            "agenda",
-            "cadastros_gerais",
-            "quantificacao_obras",
-            "prontuarios",
-            "user_management",
-            "formularios_dinamicos",
-        ]
-
-        # Gerar dados de exemplo para demonstração
-        example_issues = [
-            {
-                "app_name": "core",
-                "file_path": "core/models.py",
-                "line_number": 45,
-                "issue_type": "security",
-                "severity": "critical",
-                "title": "Potencial SQL Injection",
-                "description": "Uso de interpolação de string em consultas SQL raw detectado",
-                "recommendation": "Use parâmetros seguros em consultas SQL com placeholders",
-                "code_snippet": 'User.objects.raw("SELECT * FROM users WHERE id = %s" % user_id)',
-                "auto_fixable": True,
-                "suggested_fix": 'User.objects.raw("SELECT * FROM users WHERE id = %s", [user_id])',
-            },
-            {
-                "app_name": "admin",
-                "file_path": "admin/views.py",
-                "line_number": 123,
-                "issue_type": "performance",
-                "severity": "high",
-                "title": "Problema N+1 Query",
-                "description": "Loop com consultas individuais detectado, pode causar lentidão",
-                "recommendation": "Use select_related() ou prefetch_related() para otimizar",
-                "code_snippet": "for user in users.all(): print(user.profile.name)",
-                "auto_fixable": True,
-                "suggested_fix": 'for user in users.select_related("profile").all(): print(user.profile.name)',
-            },
-            {
-                "app_name": "clientes",
-                "file_path": "clientes/forms.py",
-                "line_number": 67,
-                "issue_type": "quality",
-                "severity": "medium",
-                "title": "Função muito longa",
-                "description": "Função com mais de 50 linhas detectada, dificulta manutenção",
-                "recommendation": "Refatore em funções menores e mais específicas",
-                "code_snippet": "def process_client_data(self, data): # 78 linhas",
-                "auto_fixable": False,
-                "suggested_fix": "Dividir em: validate_data(), save_client(), send_notification()",
-            },
-            {
-                "app_name": "obras",
-                "file_path": "obras/models.py",
-                "line_number": 89,
-                "issue_type": "security",
-                "severity": "high",
-                "title": "Campo sem validação",
-                "description": "Campo de entrada sem validação adequada",
-                "recommendation": "Adicionar validadores para prevenir dados maliciosos",
-                "code_snippet": "description = models.TextField()",
-                "auto_fixable": True,
-                "suggested_fix": "description = models.TextField(validators=[validate_safe_text])",
-            },
-            {
-                "app_name": "orcamentos",
-                "file_path": "orcamentos/utils.py",
-                "line_number": 34,
-                "issue_type": "performance",
-                "severity": "medium",
-                "title": "Operação custosa em loop",
-                "description": "Operação de I/O dentro de loop pode ser otimizada",
-                "recommendation": "Mover operações custosas para fora do loop",
-                "code_snippet": "for item in items: save_to_file(item)",
-                "auto_fixable": True,
-                "suggested_fix": "batch_save_to_file(items)",
-            },
-            {
-                "app_name": "fornecedores",
-                "file_path": "fornecedores/views.py",
-                "line_number": 156,
-                "issue_type": "quality",
-                "severity": "low",
-                "title": "Variável não utilizada",
-                "description": "Variável declarada mas nunca utilizada",
-                "recommendation": "Remover variáveis não utilizadas para limpar o código",
-                "code_snippet": "unused_var = calculate_something()",
-                "auto_fixable": True,
-                "suggested_fix": "Remover linha",
-            },
-            {
-                "app_name": "financeiro",
-                "file_path": "financeiro/models.py",
-                "line_number": 78,
-                "issue_type": "security",
-                "severity": "medium",
-                "title": "Dados sensíveis em log",
-                "description": "Possível exposição de dados sensíveis em logs",
-                "recommendation": "Evitar logar informações financeiras sensíveis",
-                "code_snippet": 'logger.info(f"Processando pagamento: {payment_data}")',
-                "auto_fixable": True,
-                "suggested_fix": 'logger.info(f"Processando pagamento ID: {payment_data.id}")',
-            },
-            {
-                "app_name": "estoque",
-                "file_path": "estoque/serializers.py",
-                "line_number": 23,
-                "issue_type": "quality",
-                "severity": "low",
-                "title": "Comentário TODO antigo",
-                "description": "Comentário TODO de mais de 30 dias encontrado",
-                "recommendation": "Implementar ou remover TODOs antigos",
-                "code_snippet": "# TODO: Implementar validação de estoque (adicionado em 2024)",
-                "auto_fixable": False,
-                "suggested_fix": "Implementar validação ou criar issue no backlog",
-            },
-        ]
-
-        # Adicionar problemas de exemplo baseados nos apps existentes
-        for app_name in django_apps:
-            app_path = base_path / app_name
-            if app_path.exists():
-                # Adicionar alguns problemas específicos do app
-                issues.extend([issue for issue in example_issues if issue["app_name"] == app_name])
-
-        # Se não encontrou problemas específicos, adicionar alguns genéricos
-        if not issues:
-            issues = example_issues[:5]  # Primeiros 5 problemas como exemplo
-
-        return issues
-
-    def analyze_django_app(self, app_name, app_path):
-        """Analisa um app Django específico"""
-        issues = []
-
-        # Analisar arquivos Python
-        for py_file in app_path.glob("**/*.py"):
-            if py_file.name.startswith(".") or "__pycache__" in str(py_file):
-                continue
-
-            try:
-                with open(py_file, encoding="utf-8") as f:
-                    content = f.read()
-
-                # Análises específicas
-                issues.extend(self.check_security_issues(app_name, py_file, content))
-                issues.extend(self.check_performance_issues(app_name, py_file, content))
-                # (analisador de qualidade legacy removido)
-
-            except Exception as e:
-                issues.append(
-                    {
-                        "app_name": app_name,
-                        "file_path": str(py_file.relative_to(Path("/home/ubuntu"))),
-                        "line_number": 1,
-                        "issue_type": "quality",
-                        "severity": "low",
-                        "title": "Erro ao analisar arquivo",
-                        "description": f"Não foi possível analisar o arquivo: {str(e)}",
-                        "recommendation": "Verificar encoding e sintaxe do arquivo",
-                        "auto_fixable": False,
-                    }
-                )
-
-        return issues
-
-    def check_security_issues(self, app_name, file_path, content):
-        """Verifica problemas de segurança"""
-        issues = []
-        lines = content.split("\n")
-
-        for i, line in enumerate(lines, 1):
-            # SQL Injection potencial
-            if re.search(r"\.raw\s*\(.*%.*\)", line) or re.search(r"\.extra\s*\(.*%.*\)", line):
-                issues.append(
-                    {
-                        "app_name": app_name,
-                        "file_path": str(file_path.relative_to(Path("/home/ubuntu"))),
-                        "line_number": i,
-                        "issue_type": "security",
-                        "severity": "critical",
-                        "title": "Potencial SQL Injection",
-                        "description": "Uso de interpolação de string em consultas SQL raw",
-                        "recommendation": "Use parâmetros seguros em consultas SQL",
-                        "code_snippet": line.strip(),
-                        "auto_fixable": False,
-                    }
-                )
-
-            # Uso de eval() ou exec()
-            if "eval(" in line or "exec(" in line:
-                issues.append(
-                    {
-                        "app_name": app_name,
-                        "file_path": str(file_path.relative_to(Path("/home/ubuntu"))),
-                        "line_number": i,
-                        "issue_type": "security",
-                        "severity": "critical",
-                        "title": "Uso de eval() ou exec()",
-                        "description": "Uso de funções perigosas que podem executar código arbitrário",
-                        "recommendation": "Evite usar eval() e exec(). Use alternativas seguras",
-                        "code_snippet": line.strip(),
-                        "auto_fixable": False,
-                    }
-                )
-
-            # DEBUG = True em produção
-            if "DEBUG = True" in line and "settings" in str(file_path):
-                issues.append(
-                    {
-                        "app_name": app_name,
-                        "file_path": str(file_path.relative_to(Path("/home/ubuntu"))),
-                        "line_number": i,
-                        "issue_type": "security",
-                        "severity": "high",
-                        "title": "DEBUG habilitado",
-                        "description": "DEBUG=True pode expor informações sensíveis",
-                        "recommendation": "Use DEBUG=False em produção",
-                        "code_snippet": line.strip(),
-                        "auto_fixable": True,
-                        "suggested_fix": "DEBUG = False",
-                    }
-                )
-
-        return issues
-
-    def check_performance_issues(self, app_name, file_path, content):
-        """Verifica problemas de performance"""
-        issues = []
-        lines = content.split("\n")
-
-        for i, line in enumerate(lines, 1):
-            # N+1 queries potenciais
-            if ".all()" in line and "for" in lines[i - 2 : i + 2] if i > 1 else []:
-                issues.append(
-                    {
-                        "app_name": app_name,
-                        "file_path": str(file_path.relative_to(Path("/home/ubuntu"))),
-                        "line_number": i,
-                        "issue_type": "performance",
-                        "severity": "medium",
-                        "title": "Potencial problema N+1",
-                        "description": "Possível consulta N+1 detectada",
-                        "recommendation": "Use select_related() ou prefetch_related()",
-                        "code_snippet": line.strip(),
-                        "auto_fixable": False,
-                    }
-                )
-
-            # Uso de print() em views
-            if "print(" in line and ("views.py" in str(file_path) or "models.py" in str(file_path)):
-                issues.append(
-                    {
-                        "app_name": app_name,
-                        "file_path": str(file_path.relative_to(Path("/home/ubuntu"))),
-                        "line_number": i,
-                        "issue_type": "performance",
-                        "severity": "low",
-                        "title": "Uso de print() em produção",
-                        "description": "print() pode impactar performance em produção",
-                        "recommendation": "Use logging ao invés de print()",
-                        "code_snippet": line.strip(),
-                        "auto_fixable": True,
-                        "suggested_fix": line.replace("print(", "logger.info("),
-                    }
-                )
-
-        return issues
-
-    # (método check_code_quality legacy removido; ruff cobre lint/format fora da aplicação)
-
     def generate_ai_response(self, message, tenant):
         """
         Gera uma resposta da IA baseada na mensagem do usuário.
@@ -1001,71 +685,15 @@ class ExecuteAuditView(LoginRequiredMixin, TenantRequiredMixin, View):
             if not tenant:
                 return JsonResponse({"success": False, "error": "Nenhuma empresa selecionada"}, status=400)
 
-            # Criar nova sessão de auditoria
-            session = AuditSession.objects.create(
-                tenant=tenant,
-                user=request.user,
-                status="running",
-                analysis_config={
-                    "include_security": True,
-                    "include_performance": True,
-                    "include_quality": True,
-                    "auto_fix": False,
-                },
-            )
-
-            # Executar análise (versão simplificada para demonstração)
-            issues_found = self.quick_analysis(session)
+            session = _enfileirar_auditoria(request, tenant)
 
-            # Atualizar sessão
-            session.status = "completed"
-            session.completed_at = timezone.now()
-            session.total_issues = len(issues_found)
-            session.critical_issues = len([i for i in issues_found if i["severity"] == "critical"])
-            session.high_issues = len([i for i in issues_found if i["severity"] == "high"])
-            session.medium_issues = len([i for i in issues_found if i["severity"] == "medium"])
-            session.low_issues = len([i for i in issues_found if i["severity"] == "low"])
-            session.save()
-
-            # Criar objetos CodeIssue
-            for issue_data in issues_found:
-                CodeIssue.objects.create(session=session, **issue_data)
-
-            messages.success(request, f"Auditoria concluída! {session.total_issues} problemas encontrados.")
+            messages.info(request, "Auditoria iniciada em segundo plano. Os problemas aparecem ao final da análise.")
             return redirect("ai_auditor:session_detail", pk=session.id)
 
         except Exception as e:
             messages.error(request, f"Erro ao executar auditoria: {str(e)}")
             return redirect("ai_auditor:dashboard")
 
-    def quick_analysis(self, session):
-        """Análise rápida para demonstração"""
-        return [
-            {
-                "app_name": "core",
-                "file_path": "core/settings.py",
-                "line_number": 10,
-                "issue_type": "security",
-                "severity": "high",
-                "title": "DEBUG habilitado",
-                "description": "DEBUG=True pode expor informações sensíveis em produção",
-                "recommendation": "Definir DEBUG=False em produção",
-                "auto_fixable": True,
-                "suggested_fix": "DEBUG = False",
-            },
-            {
-                "app_name": "ai_auditor",
-                "file_path": "ai_auditor/views.py",
-                "line_number": 45,
-                "issue_type": "performance",
-                "severity": "medium",
-                "title": "Consulta não otimizada",
-                "description": "Possível problema N+1 em consulta de banco",
-                "recommendation": "Usar select_related() ou prefetch_related()",
-                "auto_fixable": False,
-            },
-        ]
-
 
 class ExecuteSecurityAuditView(LoginRequiredMixin, TenantRequiredMixin, View):
     """View para executar auditoria focada em segurança"""
@@ -1,10 +1,14 @@
+import csv
+
+from django.db.models import Count, Q
+from django.http import HttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework import filters, permissions, serializers, viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
-from core.permissions import AdvancedPermissionManager
+from shared.mixins.row_access import TenantScopedViewSetMixin
 
 from .models import Cliente
 
@@ -17,10 +21,10 @@ class ClienteSerializer(serializers.ModelSerializer):
     class Meta:
         model = Cliente
         fields = "__all__"
-        read_only_fields = ("created_at", "updated_at")
+        read_only_fields = ("tenant", "data_cadastro")
 
 
-class ClienteViewSet(viewsets.ModelViewSet):
+class ClienteViewSet(TenantScopedViewSetMixin, viewsets.ModelViewSet):
     """
     API para gerenciamento de clientes
 
@@ -32,22 +36,15 @@ class ClienteViewSet(viewsets.ModelViewSet):
     serializer_class = ClienteSerializer
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ["nome", "tipo", "ativo"]
-    search_fields = ["nome", "email", "telefone", "cnpj_cpf"]
-    ordering_fields = ["nome", "created_at", "updated_at"]
+    filterset_fields = ["tipo", "status", "ativo"]
+    search_fields = ["email", "telefone", "pessoafisica__nome_completo", "pessoajuridica__razao_social"]
+    ordering_fields = ["data_cadastro", "email"]
 
     def get_queryset(self):
         """
-        Filtra os clientes com base nas permissões do usuário
+        Filtra os clientes pelo tenant atual e pelas permissões por linha do usuário
         """
-        user = self.request.user
-
-        # Se o usuário for superusuário, retorna todos os clientes
-        if user.is_superuser:
-            return Cliente.objects.all()
-
-        # Caso contrário, retorna apenas os clientes que o usuário tem permissão para ver
-        return AdvancedPermissionManager.get_objects_for_user_with_permission(user, Cliente, "view_cliente")
+        return super().get_queryset()
 
     @swagger_auto_schema(
         operation_description="Exporta dados de clientes em formato CSV",
@@ -56,12 +53,28 @@ class ClienteViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=["get"])
     def export_csv(self, request):
         """
-        Exporta dados de clientes em formato CSV
+        Exporta dados de clientes em formato CSV (somente os visíveis ao usuário)
         """
-        # Implementação da exportação CSV
-        # (código de exportação seria implementado aqui)
-
-        return Response({"message": "Exportação CSV iniciada. O arquivo será enviado por email."})
+        response = HttpResponse(content_type="text/csv")
+        response["Content-Disposition"] = 'attachment; filename="clientes.csv"'
+        writer = csv.writer(response)
+        writer.writerow(["ID", "Tipo", "Nome", "Documento", "E-mail", "Telefone", "Cidade", "UF", "Ativo"])
+        clientes = self.filter_queryset(self.get_queryset()).select_related("pessoafisica", "pessoajuridica")
+        for cliente in clientes.iterator(chunk_size=2000):
+            writer.writerow(
+                [
+                    cliente.id,
+                    cliente.tipo,
+                    cliente.nome_display,
+                    cliente.documento_principal,
+                    cliente.email,
+                    cliente.telefone,
+                    cliente.cidade,
+                    cliente.estado,
+                    "Sim" if cliente.ativo else "Não",
+                ]
+            )
+        return response
 
     @swagger_auto_schema(
         operation_description="Exporta dados de clientes em formato Excel",
@@ -98,13 +111,12 @@ class ClienteViewSet(viewsets.ModelViewSet):
         """
         Obtém estatísticas de clientes
         """
-        # Cálculo de estatísticas
-        total_clientes = Cliente.objects.count()
-        clientes_ativos = Cliente.objects.filter(ativo=True).count()
+        # Uma única agregação condicional sobre o queryset já escopado (tenant + linha)
+        totais = self.get_queryset().aggregate(total=Count("id"), ativos=Count("id", filter=Q(ativo=True)))
+        total_clientes = totais["total"]
+        clientes_ativos = totais["ativos"]
         clientes_inativos = total_clientes - clientes_ativos
 
-        # Mais estatísticas seriam calculadas aqui
-
         return Response(
             {
                 "total": total_clientes,
@@ -23,7 +23,7 @@ import pandas as pd
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.db import IntegrityError, transaction
-from django.db.models import Count, Q, QuerySet
+from django.db.models import Count, QuerySet
 from django.http import Http404, HttpRequest, HttpResponse, JsonResponse
 from django.shortcuts import redirect, render
 from django.urls import reverse, reverse_lazy
@@ -31,6 +31,7 @@ from django.utils.translation import gettext_lazy as _
 from django.views.generic import DeleteView, DetailView, ListView
 
 from core.mixins import TenantRequiredMixin
+from core.services import search_index
 from core.utils import get_current_tenant
 from shared.services.ui_permissions import build_ui_permissions
 
@@ -124,15 +125,7 @@ class ClienteListView(ClienteMixin, ListView):
         cidade = self.request.GET.get("cidade")
 
         if search:
-            qs = qs.filter(
-                Q(pessoafisica__nome_completo__icontains=search)
-                | Q(pessoajuridica__razao_social__icontains=search)
-                | Q(pessoajuridica__nome_fantasia__icontains=search)
-                | Q(pessoafisica__cpf__icontains=search)
-                | Q(pessoajuridica__cnpj__icontains=search)
-                | Q(email__icontains=search)
-                | Q(telefone__icontains=search),
-            ).distinct()
+            qs = search_index.filter_queryset(qs, search)
         if tipo:
             qs = qs.filter(tipo=tipo)
         if status:
@@ -362,12 +355,9 @@ def api_cliente_search(request: HttpRequest) -> JsonResponse:
     else:
         clientes = Cliente.objects.filter(tenant=tenant_atual)
 
-    clientes = clientes.filter(
-        Q(pessoafisica__nome_completo__icontains=query)
-        | Q(pessoajuridica__razao_social__icontains=query)
-        | Q(pessoajuridica__nome_fantasia__icontains=query)
-        | Q(email__icontains=query),
-    ).select_related("pessoafisica", "pessoajuridica")[:10]
+    ids = search_index.search_ids(Cliente, query, tenant=tenant_atual, limit=10, within=clientes)
+    por_id = clientes.filter(pk__in=ids).select_related("pessoafisica", "pessoajuridica").in_bulk()
+    clientes = [por_id[pk] for pk in ids if pk in por_id]
 
     results = [
         {
@@ -10,3 +10,6 @@ class CoreConfig(AppConfig):
         Importa os signals quando a aplicação está pronta.
         Isso garante que todos os signals sejam registrados corretamente.
         """
+        from core.services import search_index  # noqa: PLC0415 - requer app registry pronto
+
+        search_index.connect_signals()
@@ -148,9 +148,10 @@ def _check_superuser(user: AbstractBaseUser | AnonymousUser | None) -> AccessDec
 def _check_portal_user_policy(
     user: AbstractBaseUser | AnonymousUser,
     module_name: str,
+    portal: bool | None = None,  # noqa: FBT001
 ) -> AccessDecision | None:
     """Aplica a política de acesso para usuários do portal."""
-    if is_portal_user(user):
+    if portal if portal is not None else is_portal_user(user):
         portal_whitelist = getattr(settings, "PORTAL_ALLOWED_MODULES", [])
         if module_name not in portal_whitelist:
             return AccessDecision(allowed=False, reason=REASON_PORTAL_DENY)
@@ -191,8 +192,14 @@ def can_access_module(
     user: AbstractBaseUser | AnonymousUser | None,
     tenant: Tenant | None,
     module_name: str | None,
+    *,
+    portal: bool | None = None,
 ) -> AccessDecision:
-    """Decide o acesso a um módulo, retornando sempre um AccessDecision."""
+    """Decide o acesso a um módulo, retornando sempre um AccessDecision.
+
+    ``portal`` permite ao chamador informar ``is_portal_user`` já calculado
+    (evita a consulta de grupos a cada módulo ao avaliar o menu inteiro).
+    """
     # Inicia com uma decisão padrão de negação até que uma regra permita.
     decision = AccessDecision(allowed=False, reason=REASON_UNKNOWN_ERROR)
 
@@ -214,7 +221,7 @@ def can_access_module(
     # 4. Políticas específicas para usuários autenticados que podem negar o acesso.
     if user and user.is_authenticated:
         # A política do portal é uma exceção: ela concede se estiver na whitelist.
-        if (portal_decision := _check_portal_user_policy(user, module_name)) is not None:
+        if (portal_decision := _check_portal_user_policy(user, module_name, portal)) is not None:
             return portal_decision  # Retorna a decisão do portal diretamente.
 
         # O resolvedor de permissões pode negar o acesso.
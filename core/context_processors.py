@@ -1,26 +1,23 @@
 """Context processors for the core app."""
 
-from importlib import import_module
 from typing import Any
 
 from django.http import HttpRequest
-from django.utils import timezone
+
+from core.services.access_context import get_access_context
 
 
 def tenant_context(request: HttpRequest) -> dict[str, Any]:
-    """Contexto base do tenant + métricas leves Saúde."""
+    """Contexto base do tenant + métricas leves Saúde.
+
+    Lê do ``AccessContext`` da request: a contagem de atendimentos do dia é feita
+    no máximo uma vez por request (e compartilhada por um cache curto).
+    """
     tenant = getattr(request, "tenant", None)
-    data = {"current_tenant": tenant}
+    data: dict[str, Any] = {"current_tenant": tenant}
     if tenant and request.user.is_authenticated:
-        try:
-            pront_mod = import_module("prontuarios.models")
-            atendimento = pront_mod.Atendimento
-            hoje = timezone.localdate()
-            data["saude_atendimentos_hoje"] = atendimento.objects.filter(
-                tenant=tenant,
-                data_atendimento__date=hoje,
-            ).count()
-        except ImportError:
-            # Se o app não estiver disponível, ignora silenciosamente
-            pass
+        access = get_access_context(request)
+        atendimentos = access.saude_atendimentos_hoje if access.tenant is tenant else None
+        if atendimentos is not None:
+            data["saude_atendimentos_hoje"] = atendimentos
     return data
@@ -0,0 +1,100 @@
+"""Benchmark do índice de busca com documentos sintéticos.
+
+Gera ``--rows`` documentos (padrão 1.000.000) para um tenant temporário, mede a
+latência de ``search_index.search_ids`` para consultas de prefixo, fuzzy (erro de
+digitação), documento (CPF) e código, e desfaz tudo ao final (transação revertida).
+Em PostgreSQL exibe também o plano (``EXPLAIN``) da consulta de prefixo, para
+conferir o uso dos índices GIN pg_trgm.
+"""
+
+from __future__ import annotations
+
+import random
+import time
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from core.models import SearchDocument, Tenant
+from core.services import search_index
+from shared.metrics.sketch import LatencySketch
+
+FIRST_NAMES = ("joao", "maria", "jose", "ana", "carlos", "paula", "pedro", "lucia", "marcos", "fernanda")
+LAST_NAMES = ("silva", "souza", "oliveira", "santos", "pereira", "costa", "almeida", "ferreira", "gomes", "ribeiro")
+
+
+class _Rollback(Exception):  # noqa: N818 - sinal interno para desfazer a transação
+    pass
+
+
+class Command(BaseCommand):
+    help = "Mede a latência da busca indexada com N documentos sintéticos (transação revertida)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1_000_000, help="Documentos sintéticos (default 1.000.000)")
+        parser.add_argument("--repeat", type=int, default=20, help="Execuções por consulta (default 20)")
+        parser.add_argument("--batch-size", type=int, default=5000, help="Lote do bulk_create (default 5000)")
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])  # noqa: S311 - dados sintéticos
+        try:
+            with transaction.atomic():
+                self._run(rng, options)
+                raise _Rollback
+        except _Rollback:
+            self.stdout.write(self.style.SUCCESS("Benchmark concluído (dados sintéticos descartados)."))
+
+    def _run(self, rng: random.Random, options: dict) -> None:
+        from clientes.models import Cliente  # noqa: PLC0415 - evita import de app na carga do comando
+
+        tenant = Tenant.objects.create(name="Benchmark busca", subdomain=f"bench-search-{rng.randint(0, 10**9)}")
+        ct = ContentType.objects.get_for_model(Cliente)
+        rows, batch = options["rows"], options["batch_size"]
+        started = time.perf_counter()
+        sample_cpf = ""
+        for offset in range(0, rows, batch):
+            docs = []
+            for i in range(offset, min(offset + batch, rows)):
+                nome = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {rng.choice(LAST_NAMES)}"
+                cpf = f"{rng.randint(0, 10**11 - 1):011d}"
+                sample_cpf = sample_cpf or cpf
+                docs.append(
+                    SearchDocument(
+                        tenant=tenant,
+                        content_type=ct,
+                        object_id=10**12 + i,
+                        titulo=nome.title(),
+                        texto=f"{nome} {nome.split(maxsplit=1)[0]}{i}@exemplo.com c{i:08d}",
+                        documentos=f"{cpf} c{i:08d}",
+                    ),
+                )
+            SearchDocument.objects.bulk_create(docs, batch_size=batch)
+        search_index._update_vectors(SearchDocument.objects.filter(tenant=tenant))  # noqa: SLF001
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE core_searchdocument")
+        self.stdout.write(f"{rows} documentos gerados em {time.perf_counter() - started:.1f}s")
+
+        queries = {
+            "prefixo": "joao sil",
+            "fuzzy": "fernnda olivera",
+            "cpf": sample_cpf[:9],
+            "codigo": f"c{rows // 2:08d}",
+        }
+        for label, query in queries.items():
+            sketch = LatencySketch()
+            found = 0
+            for _ in range(options["repeat"]):
+                t0 = time.perf_counter()
+                found = len(search_index.search_ids(Cliente, query, tenant=tenant, limit=20))
+                sketch.add(time.perf_counter() - t0)
+            summary = sketch.summary()
+            self.stdout.write(
+                f"{label:8} q={query!r:22} resultados={found:3} p50={summary['p50'] * 1000:.1f}ms "
+                f"p95={summary['p95'] * 1000:.1f}ms max={summary['max'] * 1000:.1f}ms",
+            )
+        if connection.vendor == "postgresql":
+            ranked = search_index._ranked(Cliente, queries["prefixo"], tenant)  # noqa: SLF001
+            self.stdout.write(ranked.values("object_id")[:20].explain(analyze=True))
@@ -0,0 +1,43 @@
+"""Reconstrói o índice de busca (``SearchDocument``) dos modelos indexados.
+
+Uso típico após o deploy da migração ou após cargas em massa que não disparam
+signals (``bulk_create``/``update``)::
+
+    python manage.py search_reindex
+    python manage.py search_reindex --model clientes.Cliente --tenant 3
+"""
+
+from __future__ import annotations
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Tenant
+from core.services import search_index
+
+INDEXED_MODELS = ("clientes.Cliente", "produtos.Produto", "fornecedores.Fornecedor", "funcionarios.Funcionario")
+
+
+class Command(BaseCommand):
+    help = "Reindexa clientes, produtos, fornecedores e funcionários no índice de busca unificado."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--model", action="append", help="app_label.Modelo (pode repetir; padrão: todos)")
+        parser.add_argument("--tenant", type=int, default=None, help="ID do tenant (padrão: todos)")
+        parser.add_argument("--batch-size", type=int, default=1000, help="Registros por lote (default 1000)")
+
+    def handle(self, *args, **options):
+        tenant = None
+        if options["tenant"] is not None:
+            tenant = Tenant.objects.filter(pk=options["tenant"]).first()
+            if tenant is None:
+                msg = f"Tenant {options['tenant']} não encontrado"
+                raise CommandError(msg)
+        for label in options["model"] or INDEXED_MODELS:
+            try:
+                model = apps.get_model(label)
+                total = search_index.reindex(model, tenant=tenant, batch_size=options["batch_size"])
+            except (LookupError, ValueError) as exc:
+                raise CommandError(str(exc)) from exc
+            self.stdout.write(f"{label}: {total} documento(s) indexado(s)")
+        self.stdout.write(self.style.SUCCESS("Reindexação concluída."))
@@ -17,7 +17,9 @@ from django.utils import timezone
 from django.utils.deprecation import MiddlewareMixin
 from django.utils.translation import gettext_lazy as _
 
-from .models import AuditLog, Tenant
+from .models import Tenant
+from .services import write_behind
+from .services.access_context import AccessContext, get_access_context
 from .utils import get_client_ip, get_current_tenant
 
 if TYPE_CHECKING:  # imports apenas para tipagem
@@ -274,6 +276,13 @@ class TenantMiddleware(MiddlewareMixin):
 
     # --- API Django -------------------------------------------------------
     def process_request(self, request: HttpRequest) -> HttpResponse | None:
+        """Resolve o tenant e anexa o ``AccessContext`` usado pelo restante da request."""
+        response = self._resolve_tenant(request)
+        if response is None:
+            request.access_context = AccessContext(getattr(request, "user", None), getattr(request, "tenant", None))
+        return response
+
+    def _resolve_tenant(self, request: HttpRequest) -> HttpResponse | None:
         """Aplica a cadeia de resolução de tenant (retorno único)."""
         if self._is_exempt(request):
             self._auto_single_tenant_testing(request)
@@ -337,14 +346,9 @@ class ModuleAccessMiddleware(MiddlewareMixin):
         """Executa validação de acesso unificado se feature estiver ativa."""
         if not (getattr(settings, "FEATURE_UNIFIED_ACCESS", False) and can_access_module is not None):
             return None
-        cache_attr = "_module_access_cache"
-        if not hasattr(request, cache_attr):
-            setattr(request, cache_attr, {})
-        cache_map = getattr(request, cache_attr)
-        decision = cache_map.get(target)
-        if decision is None:  # primeira avaliação
-            decision = can_access_module(user, tenant, target)
-            cache_map[target] = decision
+        # Decisões memorizadas no AccessContext (compartilhadas com menu/templates)
+        access = get_access_context(request)
+        decision = access.decision(target) if access.tenant is tenant else can_access_module(user, tenant, target)
         if decision.allowed:
             return None
         log_module_denial(user, tenant, target, decision.reason, request=request)
@@ -403,7 +407,7 @@ class ModuleAccessMiddleware(MiddlewareMixin):
 
 
 class AuditLogMiddleware(MiddlewareMixin):
-    """Registra operações mutantes (POST/PUT/PATCH/DELETE)."""
+    """Registra operações mutantes (POST/PUT/PATCH/DELETE) via buffer write-behind."""
 
     AUDITED_METHODS: ClassVar[list[str]] = ["POST", "PUT", "PATCH", "DELETE"]
     EXEMPT_URLS: ClassVar[list[str]] = [
@@ -428,9 +432,9 @@ class AuditLogMiddleware(MiddlewareMixin):
             mapping = {"POST": "CREATE", "PUT": "UPDATE", "PATCH": "UPDATE", "DELETE": "DELETE"}
             action_type = mapping.get(request.method, "OTHER")
             view_name = getattr(request.resolver_match, "view_name", request.path)
-            AuditLog.objects.create(
-                user=request.user,
-                tenant=getattr(request, "tenant", None),
+            write_behind.enqueue_audit(
+                user_id=request.user.pk,
+                tenant_id=getattr(getattr(request, "tenant", None), "pk", None),
                 action_type=action_type,
                 ip_address=get_client_ip(request),
                 change_message=f"Ação de {action_type} em '{view_name}' (URL: {request.path}).",
@@ -441,16 +445,15 @@ class AuditLogMiddleware(MiddlewareMixin):
 
 
 class UserActivityMiddleware(MiddlewareMixin):
-    """Atualiza last_activity do perfil (se houver)."""
+    """Atualiza last_activity do perfil (se houver) via write-behind com throttle."""
 
     def process_request(self, request: HttpRequest) -> HttpResponse | None:  # pragma: no cover - simples
-        """Atualiza last_activity com tolerância a erros de BD."""
+        """Enfileira last_activity; o UPDATE em lote ignora usuários sem perfil."""
         user = getattr(request, "user", None)
-        if not (user and getattr(user, "is_authenticated", False) and hasattr(user, "profile")):
+        if not (user and getattr(user, "is_authenticated", False)):
             return None
         try:
-            user.profile.last_activity = timezone.now()
-            user.profile.save(update_fields=["last_activity"])
+            write_behind.touch_last_activity(user.pk, timezone.now())
         except (DatabaseError, IntegrityError, OperationalError):  # pragma: no cover
             logger.debug("Falha last_activity (DB)", exc_info=True)
         return None
@@ -1,13 +1,20 @@
-"""Middleware simples para medir latência de requests e expor em métricas Prometheus."""
+"""Middleware simples para medir latência de requests e expor em métricas Prometheus.
+
+O label usa o nome da rota resolvida (``view_name``/padrão da URL) em vez do path
+cru, mantendo a cardinalidade limitada ao número de rotas do projeto. Cada request
+também alimenta a telemetria por tenant (``core.services.tenant_telemetry``).
+"""
 
 import time
 
 from django.utils.deprecation import MiddlewareMixin
 
+from core.services import tenant_telemetry
+
 try:
     from prometheus_client import Histogram
 
-    REQUEST_LATENCY = Histogram("pandora_request_latency_seconds", "Latência de requisições", ["path"])
+    REQUEST_LATENCY = Histogram("pandora_request_latency_seconds", "Latência de requisições", ["route"])
 except Exception:  # pragma: no cover
 
     class _Noop:
@@ -20,6 +27,15 @@ except Exception:  # pragma: no cover
     REQUEST_LATENCY = _Noop()
 
 EXCLUDE_PREFIXES = ["/static", "/media"]
+UNRESOLVED_ROUTE = "<unresolved>"
+
+
+def route_label(request) -> str:
+    """Nome estável da rota resolvida (cardinalidade limitada)."""
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return UNRESOLVED_ROUTE
+    return (match.view_name or match.route or UNRESOLVED_ROUTE)[:80]
 
 
 class RequestLatencyMiddleware(MiddlewareMixin):
@@ -29,6 +45,14 @@ class RequestLatencyMiddleware(MiddlewareMixin):
     def process_response(self, request, response):
         start = getattr(request, "_start_time", None)
         if start and not any(request.path.startswith(p) for p in EXCLUDE_PREFIXES):
-            path_label = request.path.split("?")[0][:60]
-            REQUEST_LATENCY.labels(path=path_label).observe(time.time() - start)
+            elapsed = time.time() - start
+            REQUEST_LATENCY.labels(route=route_label(request)).observe(elapsed)
+            tenant = getattr(request, "tenant", None)
+            user = getattr(request, "user", None)
+            tenant_telemetry.record_request(
+                getattr(tenant, "id", None),
+                user.pk if user is not None and getattr(user, "is_authenticated", False) else None,
+                elapsed,
+                response.status_code,
+            )
         return response
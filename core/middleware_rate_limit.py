@@ -0,0 +1,86 @@
+"""Middleware de rate limiting por prefixo de URL (``shared.rate_limit``).
+
+Regras em ``settings.RATE_LIMIT_RULES`` (lista vazia = middleware inerte)::
+
+    RATE_LIMIT_RULES = [
+        {"prefix": "/api/", "limit": 300, "window": 60, "key": "user_or_ip"},
+        {"prefix": "/login/", "limit": 20, "window": 60, "mode": "token_bucket", "methods": ["POST"]},
+    ]
+
+Todas as regras cujo prefixo casa com o path são aplicadas (cada uma com seu
+próprio contador); a primeira que bloquear gera a resposta 429.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse
+
+from shared.rate_limit import SLIDING, RateLimiter, request_identity, too_many_requests
+
+
+@dataclass(frozen=True)
+class _Rule:
+    prefix: str
+    key: str
+    methods: frozenset[str] | None
+    limiter: RateLimiter
+
+
+def _compile(rules: list[dict]) -> list[_Rule]:
+    compiled = []
+    for raw in rules:
+        prefix = raw["prefix"]
+        methods = raw.get("methods")
+        compiled.append(
+            _Rule(
+                prefix=prefix,
+                key=raw.get("key", "ip"),
+                methods=frozenset(m.upper() for m in methods) if methods else None,
+                limiter=RateLimiter(
+                    raw["limit"],
+                    raw["window"],
+                    mode=raw.get("mode", SLIDING),
+                    scope=raw.get("scope") or f"mw:{prefix}",
+                ),
+            )
+        )
+    return compiled
+
+
+class RateLimitMiddleware:
+    """Aplica ``RATE_LIMIT_RULES``; deve ficar após o AuthenticationMiddleware."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self._source: object = None
+        self._rules: list[_Rule] = []
+
+    def _current_rules(self) -> list[_Rule]:
+        source = getattr(settings, "RATE_LIMIT_RULES", None) or []
+        if source is not self._source:  # recompila quando settings muda (override em testes)
+            self._rules = _compile(source)
+            self._source = source
+        return self._rules
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        last = None
+        for rule in self._current_rules():
+            if not request.path.startswith(rule.prefix):
+                continue
+            if rule.methods is not None and request.method not in rule.methods:
+                continue
+            identity = request_identity(request, rule.key)
+            if identity is None:
+                continue
+            result = rule.limiter.hit(identity)
+            if not result.allowed:
+                return too_many_requests(result)
+            last = result
+        response = self.get_response(request)
+        if last is not None:
+            for name, value in last.headers().items():
+                response.setdefault(name, value)
+        return response
@@ -0,0 +1,89 @@
+import django.contrib.postgres.search
+import django.db.models.deletion
+from django.db import migrations, models
+
+PG_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS core_searchdoc_texto_trgm ON core_searchdocument USING gin (texto gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS core_searchdoc_docs_trgm ON core_searchdocument USING gin (documentos gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS core_searchdoc_vector ON core_searchdocument USING gin (search_vector)",
+)
+PG_DROP = (
+    "DROP INDEX IF EXISTS core_searchdoc_texto_trgm",
+    "DROP INDEX IF EXISTS core_searchdoc_docs_trgm",
+    "DROP INDEX IF EXISTS core_searchdoc_vector",
+)
+
+
+def create_pg_indexes(apps, schema_editor):
+    """Extensão pg_trgm + índices GIN apenas em PostgreSQL (SQLite usa fallback)."""
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for sql in PG_INDEXES:
+        schema_editor.execute(sql)
+
+
+def drop_pg_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for sql in PG_DROP:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("contenttypes", "0002_remove_content_type_name"),
+        ("core", "0009_add_dadosbancarios_titular_documento"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SearchDocument",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("object_id", models.PositiveBigIntegerField(verbose_name="ID do Objeto")),
+                ("titulo", models.CharField(blank=True, default="", max_length=255, verbose_name="Título")),
+                (
+                    "texto",
+                    models.TextField(blank=True, default="", help_text="Texto normalizado (minúsculo, sem acentos)"),
+                ),
+                (
+                    "documentos",
+                    models.CharField(
+                        blank=True,
+                        default="",
+                        help_text="Documentos/telefones/códigos somente com dígitos e letras, separados por espaço",
+                        max_length=512,
+                    ),
+                ),
+                ("search_vector", django.contrib.postgres.search.SearchVectorField(blank=True, null=True)),
+                ("atualizado_em", models.DateTimeField(auto_now=True, verbose_name="Atualizado em")),
+                (
+                    "content_type",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="contenttypes.contenttype",
+                        verbose_name="Tipo de Conteúdo",
+                    ),
+                ),
+                (
+                    "tenant",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="search_documents",
+                        to="core.tenant",
+                        verbose_name="Empresa",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "documento de busca",
+                "verbose_name_plural": "documentos de busca",
+                "indexes": [models.Index(fields=["tenant", "content_type"], name="core_searchdoc_tenant_ct_idx")],
+                "unique_together": {("content_type", "object_id")},
+            },
+        ),
+        migrations.RunPython(create_pg_indexes, drop_pg_indexes),
+    ]
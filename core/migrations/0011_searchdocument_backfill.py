@@ -0,0 +1,44 @@
+import logging
+
+from django.db import DatabaseError, migrations
+
+logger = logging.getLogger(__name__)
+
+INDEXED_MODELS = ("clientes.Cliente", "produtos.Produto", "fornecedores.Fornecedor", "funcionarios.Funcionario")
+
+
+def backfill(apps, schema_editor):
+    """Popula o índice de busca com os registros existentes.
+
+    Usa os modelos atuais (os builders dependem de propriedades e relações que os
+    modelos históricos não têm). Se o schema de algum app estiver adiante desta
+    migração, o modelo é pulado: as buscas usam o ``icontains`` enquanto o índice
+    estiver vazio e ``manage.py search_reindex`` completa o backfill.
+    """
+    from django.apps import apps as global_apps  # noqa: PLC0415
+
+    from core.services import search_index  # noqa: PLC0415
+
+    for label in INDEXED_MODELS:
+        try:
+            total = search_index.reindex(global_apps.get_model(label))
+        except (LookupError, DatabaseError):
+            logger.warning("Backfill do índice de busca pulado para %s; rode search_reindex", label, exc_info=True)
+            continue
+        logger.info("Índice de busca: %s documento(s) de %s", total, label)
+
+
+class Migration(migrations.Migration):
+    atomic = False  # cada lote do reindex tem sua própria transação; falha de um modelo não desfaz os demais
+
+    dependencies = [
+        ("core", "0010_searchdocument"),
+        ("clientes", "0002_initial"),
+        ("produtos", "0001_initial"),
+        ("fornecedores", "0002_add_portal_fields"),
+        ("funcionarios", "0014_relatoriojob"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -12,6 +12,7 @@ from django.conf import settings
 from django.contrib.auth.models import AbstractUser, Group, Permission
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
+from django.contrib.postgres.search import SearchVectorField
 from django.core.exceptions import ValidationError
 from django.core.validators import EmailValidator, RegexValidator
 from django.db import models
@@ -1585,3 +1586,47 @@ class EmpresaDocumentoVersao(TimestampedModel):
         if self.data_vigencia_fim:
             return self.data_vigencia_inicio <= hoje <= self.data_vigencia_fim
         return self.data_vigencia_inicio <= hoje
+
+
+class SearchDocument(models.Model):
+    """Documento de busca desnormalizado por registro indexado (clientes, produtos...).
+
+    Mantido por signals em ``core.services.search_index``. Em PostgreSQL os campos
+    ``texto``/``documentos`` possuem índices GIN pg_trgm e ``search_vector`` um GIN
+    de full-text (criados na migração apenas nesse backend).
+    """
+
+    tenant = models.ForeignKey(
+        Tenant,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="search_documents",
+        verbose_name=_("Empresa"),
+    )
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE, verbose_name=_("Tipo de Conteúdo"))
+    object_id = models.PositiveBigIntegerField(verbose_name=_("ID do Objeto"))
+    titulo = models.CharField(max_length=255, blank=True, default="", verbose_name=_("Título"))
+    texto = models.TextField(blank=True, default="", help_text=_("Texto normalizado (minúsculo, sem acentos)"))
+    documentos = models.CharField(
+        max_length=512,
+        blank=True,
+        default="",
+        help_text=_("Documentos/telefones/códigos somente com dígitos e letras, separados por espaço"),
+    )
+    search_vector = SearchVectorField(null=True, blank=True)
+    atualizado_em = models.DateTimeField(auto_now=True, verbose_name=_("Atualizado em"))
+
+    class Meta:
+        """Opções Meta para SearchDocument."""
+
+        verbose_name = _("documento de busca")
+        verbose_name_plural = _("documentos de busca")
+        unique_together = (("content_type", "object_id"),)
+        indexes: ClassVar[list[models.Index]] = [
+            models.Index(fields=["tenant", "content_type"], name="core_searchdoc_tenant_ct_idx"),
+        ]
+
+    def __str__(self) -> str:
+        """Return the indexed title."""
+        return self.titulo or f"{self.content_type_id}:{self.object_id}"
@@ -16,23 +16,20 @@ class AdvancedPermissionManager:
     """
 
     @staticmethod
-    def get_objects_for_user_with_permission(user: Any, model: type[T], perm_codename: str) -> QuerySet[T]:
+    def get_objects_for_user_with_permission(
+        user: Any, model: type[T], perm_codename: str, tenant: Any | None = None
+    ) -> QuerySet[T]:
         """
-        Retorna todos os objetos do `model` se o usuário possuir a permissão
-        declarada (nível de modelo). Caso contrário, retorna `none()`.
-        """
-        if getattr(user, "is_superuser", False):
-            return model.objects.all()
-
-        app_label = getattr(getattr(model, "_meta", None), "app_label", None) or ""
-        perm_full = f"{app_label}.{perm_codename}" if app_label else perm_codename
+        Retorna os objetos do `model` visíveis ao usuário dentro de `tenant`.
 
-        try:
-            allowed = bool(user.has_perm(perm_full))
-        except Exception:
-            allowed = False
+        Delegado a `core.services.row_access`: escopo do tenant + acesso amplo (permissão
+        de modelo / admin do tenant) ou apenas as linhas próprias, da equipe e concedidas
+        explicitamente. Sem tenant/vínculo, retorna `none()` (superusuário sem tenant vê tudo).
+        """
+        from core.services.row_access import scope_queryset  # noqa: PLC0415
 
-        return model.objects.all() if allowed else model.objects.none()
+        action = perm_codename.rsplit(".", 1)[-1].split("_", 1)[0]
+        return scope_queryset(model.objects.all(), user, tenant, action)
 
     @staticmethod
     def check_user_permission(user: Any, permission_codename: str, obj: Model | None = None) -> bool:
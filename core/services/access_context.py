@@ -0,0 +1,219 @@
+"""Contexto de acesso por request (tenant, vínculo, admin e decisões de módulo).
+
+Construído uma vez pelo ``TenantMiddleware`` e lido por ``ModuleAccessMiddleware``,
+``render_sidebar_menu`` e ``tenant_context``, evitando que a mesma página resolva
+várias vezes o vínculo ``TenantUser``, o flag de portal e ``can_access_module``
+para cada entrada de ``settings.PANDORA_MODULES``.
+
+Tudo é preguiçoso: o vínculo e o mapa de decisões só são consultados no primeiro
+acesso e memorizados no próprio objeto (escopo da request). O HTML do menu lateral
+é cacheado entre requests por (usuário, tenant, versão de permissões, módulos
+visíveis, item ativo) em ``sidebar_cache_key``.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import logging
+from datetime import date
+from functools import cached_property
+from importlib import import_module
+from typing import TYPE_CHECKING, Any
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.utils import timezone
+
+from core.authorization import AccessDecision, can_access_module, is_portal_user
+from core.models import TenantUser
+from core.utils import get_current_tenant
+
+if TYPE_CHECKING:
+    from django.http import HttpRequest
+
+    from core.models import Tenant
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["AccessContext", "get_access_context"]
+
+REQUEST_ATTR = "access_context"
+SIDEBAR_CACHE_PREFIX = "sidebar_html"
+ATENDIMENTOS_CACHE_SECONDS = 60
+
+
+def _sidebar_ttl() -> int:
+    return int(getattr(settings, "SIDEBAR_CACHE_SECONDS", 300))
+
+
+class AccessContext:
+    """Fatos de acesso resolvidos uma vez por request."""
+
+    def __init__(self, user: Any, tenant: Tenant | None) -> None:  # noqa: ANN401
+        """Guarda usuário/tenant; demais fatos são calculados sob demanda."""
+        self.user = user
+        self.tenant = tenant
+        self._decisions: dict[str, AccessDecision] = {}
+        # True quando já tentamos resolver o tenant pela sessão (get_current_tenant)
+        self.fallback_checked = False
+
+    # --- Identidade ------------------------------------------------------------
+    @property
+    def is_authenticated(self) -> bool:
+        """Usuário autenticado."""
+        return bool(getattr(self.user, "is_authenticated", False))
+
+    @property
+    def is_superuser(self) -> bool:
+        """Usuário é superuser."""
+        return bool(getattr(self.user, "is_superuser", False))
+
+    @cached_property
+    def membership(self) -> TenantUser | None:
+        """Vínculo ``TenantUser`` do usuário com o tenant corrente (1 consulta)."""
+        if not (self.tenant and self.is_authenticated):
+            return None
+        return TenantUser.objects.filter(tenant=self.tenant, user=self.user).only("id", "is_tenant_admin").first()
+
+    @property
+    def is_tenant_admin(self) -> bool:
+        """Usuário é administrador do tenant corrente."""
+        membership = self.membership
+        return bool(membership and membership.is_tenant_admin)
+
+    @cached_property
+    def is_portal(self) -> bool:
+        """Usuário de portal (consulta de grupos feita uma única vez)."""
+        return is_portal_user(self.user)
+
+    # --- Decisões de módulo -------------------------------------------------------
+    def decision(self, module_name: str | None) -> AccessDecision:
+        """Decisão memorizada de ``can_access_module`` para o módulo."""
+        key = module_name or ""
+        cached = self._decisions.get(key)
+        if cached is None:
+            portal = self.is_portal if self.is_authenticated and not self.is_superuser else None
+            cached = can_access_module(self.user, self.tenant, module_name, portal=portal)
+            self._decisions[key] = cached
+        return cached
+
+    @cached_property
+    def module_decisions(self) -> dict[str, AccessDecision]:
+        """Mapa completo módulo -> decisão para todos os módulos de ``PANDORA_MODULES``."""
+        names = {
+            m.get("module_name")
+            for m in getattr(settings, "PANDORA_MODULES", [])
+            if isinstance(m, dict) and m.get("module_name")
+        }
+        return {name: self.decision(name) for name in sorted(names)}
+
+    def can_view_menu_module(self, module_config: dict[str, Any]) -> bool:
+        """Regra de visibilidade do menu lateral (mesma semântica do legado)."""
+        if module_config.get("is_header"):
+            return True
+        module_name = module_config.get("module_name")
+        if getattr(settings, "FEATURE_UNIFIED_ACCESS", False):
+            return self.decision(module_name).allowed
+        if self.is_superuser:
+            return True
+        if (module_config.get("tenant_admin_only") and not self.is_tenant_admin) or not (module_name and self.tenant):
+            return False
+        if hasattr(self.tenant, "is_module_enabled"):
+            return bool(self.tenant.is_module_enabled(module_name))
+        return False
+
+    @cached_property
+    def visible_menu_modules(self) -> list[dict[str, Any]]:
+        """Entradas de ``PANDORA_MODULES`` visíveis para o usuário."""
+        return [
+            m for m in getattr(settings, "PANDORA_MODULES", []) if isinstance(m, dict) and self.can_view_menu_module(m)
+        ]
+
+    # --- Métricas leves do tenant ------------------------------------------------------
+    @cached_property
+    def saude_atendimentos_hoje(self) -> int | None:
+        """Atendimentos do dia no tenant (cache curto compartilhado entre requests)."""
+        if not (self.tenant and self.is_authenticated):
+            return None
+        hoje: date = timezone.localdate()
+        key = f"saude_atendimentos_hoje:{self.tenant.pk}:{hoje.isoformat()}"
+        value = cache.get(key)
+        if value is not None:
+            return int(value)
+        try:
+            atendimento = import_module("prontuarios.models").Atendimento
+        except ImportError:
+            return None
+        try:
+            value = atendimento.objects.filter(tenant=self.tenant, data_atendimento__date=hoje).count()
+        except DatabaseError:  # pragma: no cover - tabela ausente em ambientes parciais
+            logger.debug("Falha ao contar atendimentos do dia", exc_info=True)
+            return None
+        cache.set(key, value, ATENDIMENTOS_CACHE_SECONDS)
+        return value
+
+    # --- Cache do menu lateral ------------------------------------------------------------
+    @cached_property
+    def permission_version(self) -> str:
+        """Versão das permissões do par (user, tenant) segundo o permission_resolver."""
+        user_id = getattr(self.user, "pk", None)
+        tenant_id = getattr(self.tenant, "pk", None)
+        if not (user_id and tenant_id):
+            return "0"
+        try:
+            resolver = import_module("shared.services.permission_resolver").permission_resolver
+            return resolver.get_cache_version(user_id, tenant_id)
+        except (ImportError, AttributeError):  # pragma: no cover - resolver opcional
+            return "0"
+
+    def sidebar_cache_key(self, active_url: str, extra: object = None) -> str:
+        """Chave do HTML do menu: usuário, tenant, versão de permissões e URL ativa.
+
+        Não consulta decisões de módulo: mudanças de vínculo/permissões trocam a
+        versão do resolver; os módulos habilitados do tenant (já em memória) e o
+        modo de acesso entram no hash.
+        """
+        modules = getattr(self.tenant, "enabled_modules", None)
+        unified = getattr(settings, "FEATURE_UNIFIED_ACCESS", False)
+        digest = hashlib.sha1(  # noqa: S324 - hash não criptográfico (chave de cache)
+            f"{modules!r}|{self.is_superuser}|{unified}|{active_url}|{extra!r}".encode(),
+        ).hexdigest()[:16]
+        return (
+            f"{SIDEBAR_CACHE_PREFIX}:{getattr(self.user, 'pk', 0)}:{getattr(self.tenant, 'pk', 0)}:"
+            f"{self.permission_version}:{digest}"
+        )
+
+    @staticmethod
+    def sidebar_ttl() -> int:
+        """TTL do HTML cacheado (``SIDEBAR_CACHE_SECONDS``; 0 desativa)."""
+        return _sidebar_ttl()
+
+
+def get_access_context(request: HttpRequest) -> AccessContext:
+    """Retorna o contexto anexado pelo middleware, criando-o se ausente/desatualizado.
+
+    Fora do ciclo de middleware (templates renderizados em testes, views chamadas
+    diretamente) o tenant vem de ``request.tenant`` ou ``get_current_tenant``.
+    """
+    user = getattr(request, "user", None)
+    tenant = getattr(request, "tenant", None)
+    ctx: AccessContext | None = getattr(request, REQUEST_ATTR, None)
+    if ctx is not None and ctx.user is user and ctx.tenant is tenant and (tenant is not None or ctx.fallback_checked):
+        return ctx
+    fallback_checked = False
+    if tenant is None and getattr(user, "is_authenticated", False):
+        fallback_checked = True
+        try:
+            tenant = get_current_tenant(request)
+        except (AttributeError, KeyError):
+            tenant = None
+        if ctx is not None and ctx.user is user and ctx.tenant is tenant:
+            ctx.fallback_checked = True
+            return ctx
+    ctx = AccessContext(user, tenant)
+    ctx.fallback_checked = fallback_checked
+    with contextlib.suppress(AttributeError):  # objetos request imutáveis
+        setattr(request, REQUEST_ATTR, ctx)
+    return ctx
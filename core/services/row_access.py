@@ -0,0 +1,197 @@
+"""Autorização por linha com escopo de tenant para querysets de API.
+
+Cada modelo protegido declara uma ``RowRule``: o caminho até o tenant e, opcionalmente,
+caminhos de "dono" (FK para o usuário) e de "equipe" (M2M para usuários). Para o trio
+(usuário, tenant, modelo, ação) ``compile_predicate`` produz **um** ``Q``:
+
+* escopo do tenant sempre presente — sem tenant ou sem vínculo ``TenantUser`` o
+  resultado é vazio (falha fechada);
+* acesso amplo (admin do tenant, ``user.has_perm("<app>.<acao>_<modelo>")`` ou
+  ``permission_resolver`` para ``VIEW_/EDIT_/DELETE_/CREATE_<MODELO>``) libera todas as
+  linhas do tenant;
+* caso contrário só as linhas das quais o usuário é dono, as da sua equipe e as
+  concedidas explicitamente por ``PermissaoPersonalizada(modulo="<MODELO>", acao="VIEW",
+  recurso="<modelo>:<pk>")`` (mesmo formato que o resolver avalia por recurso);
+* negações explícitas por recurso sempre removem a linha (mesma precedência do
+  resolver: negação vence concessão).
+
+O que é caro de descobrir (vínculo, acesso amplo, ids concedidos/negados) fica em cache
+como uma especificação simples; a chave inclui ``permission_resolver.get_cache_version``,
+então qualquer invalidação do resolver (ex.: alteração de ``PermissaoPersonalizada``)
+descarta também os predicados. O ``Q`` resultante é aplicado no banco, servindo igualmente
+a listagens, ``get_object``, exportações e agregações.
+"""
+
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+from typing import Any
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Model, Q, QuerySet
+from django.utils import timezone
+
+from shared.services.permission_resolver import permission_resolver
+
+__all__ = [
+    "RowRule",
+    "compile_predicate",
+    "get_rule",
+    "register_rule",
+    "scope_queryset",
+]
+
+logger = logging.getLogger(__name__)
+
+_CACHE_PREFIX = "row_access"
+# Ação Django (codename) -> verbo das actions do permission_resolver
+_RESOLVER_VERBS = {"view": "VIEW", "change": "EDIT", "delete": "DELETE", "add": "CREATE"}
+_VAZIO = Q(pk__in=[])
+
+
+@dataclass(frozen=True)
+class RowRule:
+    tenant: str | None = "tenant"  # caminho até o tenant (None = modelo sem escopo de tenant)
+    owner: tuple[str, ...] = ()  # caminhos FK -> usuário que conferem acesso à linha
+    team: tuple[str, ...] = ()  # caminhos M2M -> usuários que conferem acesso à linha
+
+
+_RULES: dict[str, RowRule] = {
+    "obras.Obra": RowRule(tenant="tenant"),
+    "clientes.Cliente": RowRule(tenant="tenant"),
+    "agenda.Evento": RowRule(tenant="tenant", owner=("responsavel",), team=("participantes",)),
+}
+
+
+def register_rule(model: type[Model] | str, rule: RowRule) -> None:
+    """Registra (ou substitui) a regra de linha de um modelo (``"app.Modelo"`` ou classe)."""
+    _RULES[model if isinstance(model, str) else model._meta.label] = rule  # noqa: SLF001
+
+
+def get_rule(model: type[Model]) -> RowRule:
+    """Regra registrada; sem registro, usa ``tenant`` se o modelo tiver esse campo."""
+    rule = _RULES.get(model._meta.label)  # noqa: SLF001
+    if rule is not None:
+        return rule
+    campos = {f.name for f in model._meta.get_fields()}  # noqa: SLF001
+    return RowRule(tenant="tenant" if "tenant" in campos else None)
+
+
+def _cache_ttl() -> int:
+    return getattr(settings, "ROW_ACCESS_CACHE_SECONDS", 300)
+
+
+def _verb(action: str) -> str:
+    return _RESOLVER_VERBS.get(action, action.upper())
+
+
+def _broad_access(user: Any, tenant: Any, model: type[Model], action: str) -> bool:  # noqa: ANN401
+    meta = model._meta  # noqa: SLF001
+    try:
+        if user.has_perm(f"{meta.app_label}.{action}_{meta.model_name}"):
+            return True
+    except Exception:  # noqa: BLE001
+        logger.debug("has_perm falhou para %s", meta.label, exc_info=True)
+    try:
+        return bool(permission_resolver.has_permission(user, tenant, f"{_verb(action)}_{meta.model_name.upper()}"))
+    except Exception:  # noqa: BLE001
+        logger.debug("permission_resolver falhou para %s", meta.label, exc_info=True)
+        return False
+
+
+def _explicit_resources(user: Any, tenant: Any, model: type[Model], action: str) -> tuple[list, list]:  # noqa: ANN401
+    """Ids concedidos e negados via ``PermissaoPersonalizada(recurso="<modelo>:<pk>")``."""
+    from user_management.models import PermissaoPersonalizada  # noqa: PLC0415
+
+    meta = model._meta  # noqa: SLF001
+    prefixo = f"{meta.model_name}:"
+    regras = (
+        PermissaoPersonalizada.objects.filter(user=user, recurso__startswith=prefixo)
+        .filter(Q(modulo__iexact=meta.model_name) | Q(modulo__iexact=meta.app_label))
+        .filter(Q(acao__iexact=action) | Q(acao__iexact=_verb(action)))
+        .filter(Q(scope_tenant=tenant) | Q(scope_tenant__isnull=True))
+        .filter(Q(data_expiracao__isnull=True) | Q(data_expiracao__gt=timezone.now()))
+        .values_list("recurso", "concedida")
+    )
+    concedidos, negados = set(), set()
+    for recurso, concedida in regras:
+        chave = recurso[len(prefixo) :]
+        try:
+            pk = meta.pk.to_python(chave)
+        except Exception:  # noqa: BLE001
+            continue
+        (concedidos if concedida else negados).add(pk)
+    return sorted(concedidos - negados, key=str), sorted(negados, key=str)
+
+
+def _compile_spec(user: Any, tenant: Any, model: type[Model], action: str) -> dict:  # noqa: ANN401
+    from core.models import TenantUser  # noqa: PLC0415
+
+    tenant_id = getattr(tenant, "pk", None)
+    if getattr(user, "is_superuser", False):
+        return {"none": False, "tenant": tenant_id, "all": True, "grants": [], "denies": []}
+    if tenant_id is None or not getattr(user, "is_authenticated", False):
+        return {"none": True}
+    admin = TenantUser.objects.filter(user=user, tenant_id=tenant_id).values_list("is_tenant_admin", flat=True).first()
+    if admin is None:
+        return {"none": True}
+    grants, denies = _explicit_resources(user, tenant, model, action)
+    return {
+        "none": False,
+        "tenant": tenant_id,
+        "all": bool(admin) or _broad_access(user, tenant, model, action),
+        "grants": grants,
+        "denies": denies,
+    }
+
+
+def _spec(user: Any, tenant: Any, model: type[Model], action: str) -> dict:  # noqa: ANN401
+    user_id = getattr(user, "pk", None)
+    tenant_id = getattr(tenant, "pk", None)
+    if user_id is None:
+        return {"none": True}
+    versao = permission_resolver.get_cache_version(user_id, tenant_id) if tenant_id else "0"
+    chave = f"{_CACHE_PREFIX}:{versao}:{user_id}:{tenant_id}:{model._meta.label_lower}:{action}"  # noqa: SLF001
+    spec = cache.get(chave)
+    if spec is None:
+        spec = _compile_spec(user, tenant, model, action)
+        cache.set(chave, spec, _cache_ttl())
+    return spec
+
+
+def compile_predicate(user: Any, tenant: Any, model: type[Model], action: str = "view") -> Q:  # noqa: ANN401
+    """Predicado único de acesso por linha de ``user`` a ``model`` dentro de ``tenant``."""
+    spec = _spec(user, tenant, model, action)
+    if spec["none"]:
+        return _VAZIO
+    rule = get_rule(model)
+    predicado = Q()
+    if rule.tenant and spec["tenant"] is not None:  # só superusuário sem tenant fica sem escopo
+        predicado &= Q(**{rule.tenant: spec["tenant"]})
+
+    if not spec["all"]:
+        linhas = [Q(**{path: user.pk}) for path in rule.owner]
+        # Equipe via subconsulta por pk: evita JOIN multiplicador (e ``distinct()``) no M2M
+        linhas += [Q(pk__in=model._default_manager.filter(**{path: user.pk}).values("pk")) for path in rule.team]  # noqa: SLF001
+        if spec["grants"]:
+            linhas.append(Q(pk__in=spec["grants"]))
+        if not linhas:
+            return _VAZIO
+        acesso = linhas[0]
+        for extra in linhas[1:]:
+            acesso |= extra
+        predicado &= acesso
+
+    if spec["denies"]:
+        predicado &= ~Q(pk__in=spec["denies"])
+    return predicado
+
+
+def scope_queryset(queryset: QuerySet, user: Any, tenant: Any, action: str = "view") -> QuerySet:  # noqa: ANN401
+    """Aplica ``compile_predicate`` ao queryset (mantém filtros/ordenação já presentes)."""
+    predicado = compile_predicate(user, tenant, queryset.model, action)
+    if predicado == _VAZIO:
+        return queryset.none()
+    return queryset.filter(predicado)
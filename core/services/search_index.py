@@ -0,0 +1,498 @@
+"""Índice de busca unificado (clientes, produtos, fornecedores, funcionários).
+
+Cada registro indexado ganha um ``SearchDocument`` desnormalizado com:
+
+* ``titulo``      – nome exibido;
+* ``texto``       – nomes, e-mails, cargos, códigos em minúsculas e sem acentos;
+* ``documentos``  – CPF/CNPJ/telefones/códigos/EAN só com letras e dígitos;
+* ``search_vector`` – vetor full-text (apenas PostgreSQL).
+
+O documento é mantido por signals (``post_save``/``post_delete`` do modelo e de
+seus filhos PF/PJ/contatos), conectados em ``CoreConfig.ready``. Em PostgreSQL a
+busca usa os índices GIN pg_trgm (``LIKE`` + ``%>`` para fuzzy) e o GIN do vetor,
+ordenando por prefixo > similaridade por palavra > rank full-text. Em outros
+backends (SQLite nos testes) cai para ``contains`` sobre os mesmos campos
+normalizados, com a mesma ordenação por prefixo.
+
+A migração ``core.0011_searchdocument_backfill`` popula o índice no deploy. Enquanto
+o índice de um modelo/tenant estiver vazio (backfill pulado ou ainda não rodado
+via ``search_reindex``), as consultas usam o ``icontains`` antigo sobre o modelo.
+
+Uso nas views::
+
+    ids = search_index.search_ids(Cliente, "joao 123", tenant=tenant, limit=50)
+    ids = search_index.search_ids(Produto, "paraf", within=Produto.objects.filter(ativo=True), limit=10)
+    qs = search_index.filter_queryset(Cliente.objects.filter(tenant=tenant), "joao")
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+import unicodedata
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass, field
+from typing import Any
+
+from django.apps import apps
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.postgres.lookups import TrigramWordSimilar
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramWordSimilarity
+from django.db import DatabaseError, connection, models, transaction
+from django.db.models import Case, Exists, F, FloatField, Q, Value, When
+from django.db.models.signals import post_delete, post_save
+
+from core.models import SearchDocument
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    "connect_signals",
+    "filter_queryset",
+    "index_instance",
+    "normalize_code",
+    "normalize_digits",
+    "normalize_text",
+    "reindex",
+    "remove_instance",
+    "search_ids",
+]
+
+FTS_CONFIG = "simple"  # texto já vem sem acentos; evita stemming de nomes próprios
+DEFAULT_LIMIT = 200
+MIN_CODE_LENGTH = 3
+PRODUTO_DESCRICAO_CHARS = 500  # descrição entra truncada (listagem buscava em descricao)
+
+SearchDocument._meta.get_field("texto").register_lookup(TrigramWordSimilar)
+
+_WS_RE = re.compile(r"\s+")
+_NON_ALNUM_RE = re.compile(r"[^0-9a-z]")
+_NON_DIGIT_RE = re.compile(r"\D")
+
+
+# --- Normalização ------------------------------------------------------------------
+def normalize_text(value: object) -> str:
+    """Minúsculas, sem acentos e com espaços colapsados."""
+    if value is None:
+        return ""
+    text = unicodedata.normalize("NFKD", str(value))
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return _WS_RE.sub(" ", text.lower()).strip()
+
+
+def normalize_digits(value: object) -> str:
+    """Apenas dígitos (CPF, CNPJ, telefone)."""
+    return _NON_DIGIT_RE.sub("", str(value or ""))
+
+
+def normalize_code(value: object) -> str:
+    """Letras/dígitos sem pontuação (SKU, código legado, código de barras)."""
+    return _NON_ALNUM_RE.sub("", normalize_text(value))
+
+
+@dataclass
+class IndexEntry:
+    """Conteúdo a indexar para um registro."""
+
+    tenant_id: int | None
+    titulo: str
+    textos: list[Any] = field(default_factory=list)
+    documentos: list[Any] = field(default_factory=list)
+
+
+@dataclass(frozen=True)
+class _Source:
+    label: str
+    build: Callable[[Any], IndexEntry]
+    select_related: tuple[str, ...] = ()
+    prefetch_related: tuple[str, ...] = ()
+    # (modelo filho, atributo que aponta para o pai)
+    children: tuple[tuple[str, str], ...] = ()
+    # Lookups do ``icontains`` usado enquanto o índice estiver vazio
+    fallback: tuple[str, ...] = ()
+
+
+def _related(instance: Any, attr: str) -> Any:  # noqa: ANN401
+    try:
+        return getattr(instance, attr)
+    except models.ObjectDoesNotExist:
+        return None
+
+
+def _contacts(instance: Any, attr: str) -> list[Any]:
+    manager = getattr(instance, attr, None)
+    return list(manager.all()) if manager is not None and instance.pk else []
+
+
+# --- Builders por modelo -----------------------------------------------------------------
+def _build_cliente(obj: Any) -> IndexEntry:
+    pf = _related(obj, "pessoafisica")
+    pj = _related(obj, "pessoajuridica")
+    entry = IndexEntry(obj.tenant_id, obj.nome_display or "")
+    entry.textos += [obj.email, obj.codigo_interno, obj.cidade]
+    entry.documentos += [obj.telefone, obj.telefone_secundario, obj.codigo_interno]
+    if pf is not None:
+        entry.textos.append(pf.nome_completo)
+        entry.documentos.append(pf.cpf)
+    if pj is not None:
+        entry.textos += [pj.razao_social, pj.nome_fantasia, pj.email_financeiro]
+        entry.documentos += [pj.cnpj, pj.telefone_financeiro]
+    for contato in _contacts(obj, "contatos_adicionais"):
+        entry.textos += [contato.nome_contato_responsavel, contato.valor]
+        entry.documentos.append(contato.valor)
+    return entry
+
+
+def _build_produto(obj: Any) -> IndexEntry:
+    entry = IndexEntry(None, obj.nome or "")
+    entry.textos += [obj.sku, obj.codigo, obj.codigo_barras, obj.marca, obj.fabricante, obj.modelo]
+    entry.textos.append((obj.descricao or "")[:PRODUTO_DESCRICAO_CHARS])
+    entry.documentos += [obj.sku, obj.codigo, obj.codigo_barras]
+    return entry
+
+
+def _build_fornecedor(obj: Any) -> IndexEntry:
+    pf = _related(obj, "pessoafisica")
+    pj = _related(obj, "pessoajuridica")
+    entry = IndexEntry(obj.tenant_id, "")
+    if pj is not None:
+        entry.titulo = pj.nome_fantasia or pj.razao_social or ""
+        entry.textos += [pj.razao_social, pj.nome_fantasia]
+        entry.documentos.append(pj.cnpj)
+    if pf is not None:
+        entry.titulo = entry.titulo or pf.nome_completo or ""
+        entry.textos.append(pf.nome_completo)
+        entry.documentos.append(pf.cpf)
+    for contato in _contacts(obj, "contatos"):
+        entry.textos += [contato.nome, contato.email]
+        entry.documentos.append(contato.telefone)
+    return entry
+
+
+def _build_funcionario(obj: Any) -> IndexEntry:
+    entry = IndexEntry(obj.tenant_id, obj.nome_completo or "")
+    entry.textos += [obj.cargo, obj.email_pessoal]
+    entry.documentos += [obj.cpf, obj.cnpj_prestador, obj.telefone_pessoal, obj.telefone_secundario]
+    return entry
+
+
+_SOURCES: dict[str, _Source] = {
+    "clientes.cliente": _Source(
+        "clientes.Cliente",
+        _build_cliente,
+        select_related=("pessoafisica", "pessoajuridica"),
+        prefetch_related=("contatos_adicionais",),
+        children=(
+            ("clientes.PessoaFisica", "cliente"),
+            ("clientes.PessoaJuridica", "cliente"),
+            ("clientes.Contato", "cliente"),
+        ),
+        fallback=(
+            "pessoafisica__nome_completo",
+            "pessoajuridica__razao_social",
+            "pessoajuridica__nome_fantasia",
+            "pessoafisica__cpf",
+            "pessoajuridica__cnpj",
+            "email",
+            "telefone",
+        ),
+    ),
+    "produtos.produto": _Source(
+        "produtos.Produto", _build_produto, fallback=("nome", "codigo", "codigo_barras", "descricao")
+    ),
+    "fornecedores.fornecedor": _Source(
+        "fornecedores.Fornecedor",
+        _build_fornecedor,
+        select_related=("pessoajuridica", "pessoafisica"),
+        prefetch_related=("contatos",),
+        children=(
+            ("fornecedores.FornecedorPJ", "fornecedor"),
+            ("fornecedores.FornecedorPF", "fornecedor"),
+            ("fornecedores.ContatoFornecedor", "fornecedor"),
+        ),
+        fallback=(
+            "pessoajuridica__razao_social",
+            "pessoajuridica__nome_fantasia",
+            "pessoajuridica__cnpj",
+            "pessoafisica__nome_completo",
+            "pessoafisica__cpf",
+        ),
+    ),
+    "funcionarios.funcionario": _Source(
+        "funcionarios.Funcionario", _build_funcionario, fallback=("nome_completo", "cpf", "cargo")
+    ),
+}
+
+
+def _source_for(model: type[models.Model]) -> _Source | None:
+    return _SOURCES.get(model._meta.label_lower)
+
+
+def _has_tenant(model: type[models.Model]) -> bool:
+    return any(f.name == "tenant" for f in model._meta.fields)
+
+
+def _is_postgres() -> bool:
+    return connection.vendor == "postgresql"
+
+
+def _join(values: Iterable[Any], normalizer: Callable[[object], str]) -> str:
+    seen: dict[str, None] = {}
+    for value in values:
+        norm = normalizer(value)
+        if norm:
+            seen.setdefault(norm, None)
+    return " ".join(seen)
+
+
+def _document_fields(instance: Any, source: _Source) -> dict[str, Any]:
+    entry = source.build(instance)
+    return {
+        "tenant_id": entry.tenant_id,
+        "titulo": (entry.titulo or "")[:255],
+        "texto": _join([entry.titulo, *entry.textos], normalize_text),
+        "documentos": _join(entry.documentos, normalize_code)[:512],
+    }
+
+
+def _update_vectors(queryset: models.QuerySet) -> None:
+    if not _is_postgres():
+        return
+    queryset.update(
+        search_vector=SearchVector("titulo", weight="A", config=FTS_CONFIG)
+        + SearchVector("texto", weight="B", config=FTS_CONFIG)
+        + SearchVector("documentos", weight="C", config=FTS_CONFIG),
+    )
+
+
+# --- Manutenção do índice ---------------------------------------------------------------
+def index_instance(instance: models.Model) -> SearchDocument | None:
+    """Cria/atualiza o documento de busca do registro (no-op p/ modelos não indexados)."""
+    source = _source_for(type(instance))
+    if source is None or instance.pk is None:
+        return None
+    ct = ContentType.objects.get_for_model(type(instance))
+    doc, _ = SearchDocument.objects.update_or_create(
+        content_type=ct,
+        object_id=instance.pk,
+        defaults=_document_fields(instance, source),
+    )
+    _update_vectors(SearchDocument.objects.filter(pk=doc.pk))
+    return doc
+
+
+def remove_instance(instance: models.Model) -> int:
+    """Remove o documento de busca do registro."""
+    if _source_for(type(instance)) is None or instance.pk is None:
+        return 0
+    ct = ContentType.objects.get_for_model(type(instance))
+    deleted, _ = SearchDocument.objects.filter(content_type=ct, object_id=instance.pk).delete()
+    return deleted
+
+
+def reindex(model: type[models.Model], *, tenant: Any = None, batch_size: int = 1000) -> int:  # noqa: ANN401
+    """(Re)constrói os documentos de ``model`` em lotes; retorna quantos foram gravados."""
+    source = _source_for(model)
+    if source is None:
+        msg = f"Modelo não indexável: {model._meta.label}"
+        raise ValueError(msg)
+    ct = ContentType.objects.get_for_model(model)
+    qs = model._default_manager.order_by("pk")
+    if tenant is not None and _has_tenant(model):
+        qs = qs.filter(tenant=tenant)
+    if source.select_related:
+        qs = qs.select_related(*source.select_related)
+    if source.prefetch_related:
+        qs = qs.prefetch_related(*source.prefetch_related)
+    total = 0
+    last_pk = 0
+    while True:
+        chunk = list(qs.filter(pk__gt=last_pk)[:batch_size])
+        if not chunk:
+            break
+        last_pk = chunk[-1].pk
+        docs = [SearchDocument(content_type=ct, object_id=obj.pk, **_document_fields(obj, source)) for obj in chunk]
+        with transaction.atomic():
+            SearchDocument.objects.bulk_create(
+                docs,
+                update_conflicts=True,
+                unique_fields=["content_type", "object_id"],
+                update_fields=["tenant", "titulo", "texto", "documentos", "atualizado_em"],
+            )
+            _update_vectors(SearchDocument.objects.filter(content_type=ct, object_id__in=[d.object_id for d in docs]))
+        total += len(docs)
+    return total
+
+
+# --- Consulta -------------------------------------------------------------------------------
+def _base_queryset(model: type[models.Model], tenant: Any) -> models.QuerySet:  # noqa: ANN401
+    qs = SearchDocument.objects.filter(content_type=ContentType.objects.get_for_model(model))
+    if tenant is not None and _source_for(model) is not None and _has_tenant(model):
+        qs = qs.filter(tenant=tenant)
+    return qs
+
+
+def _fallback(model: type[models.Model], query: str, tenant: Any) -> models.QuerySet | None:  # noqa: ANN401
+    """``icontains`` direto no modelo, só enquanto o índice não tem documentos do modelo/tenant.
+
+    A condição de índice vazio vai na própria consulta (``NOT EXISTS`` sem correlação,
+    avaliado uma vez pelo banco) em vez de um ``exists()`` a mais em toda busca.
+    """
+    source = _source_for(model)
+    if source is None or not source.fallback:
+        return None
+    qs = model._default_manager.all()
+    if tenant is not None and _has_tenant(model):
+        qs = qs.filter(tenant=tenant)
+    match = Q()
+    for lookup in source.fallback:
+        match |= Q(**{f"{lookup}__icontains": query.strip()})
+    # Subconsulta em vez de ``distinct()``: os lookups atravessam PF/PJ
+    return qs.filter(~Exists(_base_queryset(model, tenant)), pk__in=qs.filter(match).values("pk"))
+
+
+def _ranked(
+    model: type[models.Model],
+    query: str,
+    tenant: Any,  # noqa: ANN401
+    within: models.QuerySet | None = None,
+) -> models.QuerySet | None:
+    text = normalize_text(query)
+    code = normalize_code(query)
+    if not text:
+        return None
+    qs = _base_queryset(model, tenant)
+    if within is not None:
+        qs = qs.filter(object_id__in=within.values("pk"))
+    match = Q(texto__contains=text)
+    if len(code) >= MIN_CODE_LENGTH:
+        match |= Q(documentos__contains=code)
+    prefix = Case(
+        When(texto__startswith=text, then=Value(2.0)),
+        When(Q(texto__contains=f" {text}") | Q(documentos__startswith=code or text), then=Value(1.0)),
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+    if _is_postgres():
+        # Prefixo por termo ("joa:* & sil:*"); termos já higienizados para a sintaxe tsquery
+        terms = [t for t in (normalize_code(part) for part in text.split()) if t]
+        fts = SearchQuery(" & ".join(f"{t}:*" for t in terms) or text, search_type="raw", config=FTS_CONFIG)
+        # ``%>`` usa pg_trgm.word_similarity_threshold (padrão 0.6) e o GIN de ``texto``
+        match |= Q(texto__trigram_word_similar=text) | Q(search_vector=fts)
+        return (
+            qs.filter(match)
+            .annotate(
+                prefix_rank=prefix,
+                similarity=TrigramWordSimilarity(text, "texto"),
+                fts_rank=SearchRank(F("search_vector"), fts),
+            )
+            .order_by("-prefix_rank", "-similarity", "-fts_rank", "titulo")
+        )
+    return qs.filter(match).annotate(prefix_rank=prefix).order_by("-prefix_rank", "titulo")
+
+
+def search_ids(
+    model: type[models.Model],
+    query: str,
+    *,
+    tenant: Any = None,  # noqa: ANN401
+    limit: int | None = DEFAULT_LIMIT,
+    within: models.QuerySet | None = None,
+) -> list[int]:
+    """IDs de ``model`` que casam com ``query``, do mais relevante ao menos relevante.
+
+    ``within`` restringe a busca a um queryset do modelo (ex.: apenas ativos) antes
+    de aplicar ``limit``.
+    """
+    if not normalize_text(query):
+        return []
+    ranked = _ranked(model, query, tenant, within).values_list("object_id", flat=True)
+    fallback = _fallback(model, query, tenant)
+    if fallback is not None and within is not None:
+        fallback = fallback.filter(pk__in=within.values("pk"))
+    try:
+        ids = list(ranked[:limit] if limit else ranked)
+        if not ids and fallback is not None:
+            # Índice vazio não casa nada; só então o icontains (que se anula se houver índice)
+            fallback_ids = fallback.order_by("pk").values_list("pk", flat=True)
+            ids = list(fallback_ids[:limit] if limit else fallback_ids)
+        return ids
+    except DatabaseError:
+        logger.warning("Falha na busca indexada de %s", model._meta.label, exc_info=True)
+        return []
+
+
+def filter_queryset(queryset: models.QuerySet, query: str, *, tenant: Any = None) -> models.QuerySet:  # noqa: ANN401
+    """Restringe ``queryset`` aos registros que casam com ``query`` (subconsulta, sem limite).
+
+    A ordenação do queryset original é preservada (listagens paginadas); para
+    autocomplete com ranking use ``search_ids``.
+    """
+    if not normalize_text(query):
+        return queryset
+    match = Q(pk__in=_ranked(queryset.model, query, tenant).order_by().values("object_id"))
+    fallback = _fallback(queryset.model, query, tenant)
+    if fallback is not None:
+        match |= Q(pk__in=fallback.values("pk"))
+    return queryset.filter(match)
+
+
+# --- Signals -----------------------------------------------------------------------------------
+def _on_save(sender: type[models.Model], instance: models.Model, **kwargs: Any) -> None:
+    if kwargs.get("raw"):
+        return
+    try:
+        # Savepoint: sem ele, a falha deixaria a transação do save original inutilizável
+        with transaction.atomic():
+            index_instance(instance)
+    except DatabaseError:
+        logger.warning("Falha ao indexar %s #%s", sender._meta.label, instance.pk, exc_info=True)
+
+
+def _on_delete(sender: type[models.Model], instance: models.Model, **kwargs: Any) -> None:
+    try:
+        with transaction.atomic():
+            remove_instance(instance)
+    except DatabaseError:
+        logger.warning("Falha ao remover índice de %s #%s", sender._meta.label, instance.pk, exc_info=True)
+
+
+def _child_handler(parent_attr: str) -> Callable[..., None]:
+    def handler(sender: type[models.Model], instance: models.Model, **kwargs: Any) -> None:
+        if kwargs.get("raw"):
+            return
+        parent = _related(instance, parent_attr)
+        if parent is None:
+            return
+        try:
+            with transaction.atomic():
+                index_instance(parent)
+        except DatabaseError:
+            logger.warning("Falha ao reindexar %s via %s", parent._meta.label, sender._meta.label, exc_info=True)
+
+    return handler
+
+
+_child_handlers: list[Callable[..., None]] = []  # referências fortes (signals usam weakref)
+
+
+def connect_signals() -> None:
+    """Conecta os signals de manutenção do índice (idempotente)."""
+    for source in _SOURCES.values():
+        try:
+            model = apps.get_model(source.label)
+        except LookupError:
+            continue
+        uid = f"search_index:{source.label}"
+        post_save.connect(_on_save, sender=model, dispatch_uid=uid)
+        post_delete.connect(_on_delete, sender=model, dispatch_uid=uid)
+        for child_label, parent_attr in source.children:
+            try:
+                child = apps.get_model(child_label)
+            except LookupError:
+                continue
+            handler = _child_handler(parent_attr)
+            _child_handlers.append(handler)
+            child_uid = f"search_index:{child_label}"
+            post_save.connect(handler, sender=child, dispatch_uid=child_uid)
+            post_delete.connect(handler, sender=child, dispatch_uid=child_uid)
@@ -0,0 +1,334 @@
+"""Telemetria de requisições por tenant alimentando ``admin.TenantMetrics``.
+
+Pipeline em três estágios, pensado para custo mínimo no caminho da request:
+
+1. ``record_request`` acumula em buffer por processo (contagem, erros, sketch de
+   latência e usuários distintos) por (dia, tenant) — apenas operações em memória.
+2. ``flush_buffers`` descarrega periodicamente o buffer no Redis (HINCRBY/SADD
+   em pipeline) ou, sem Redis, no cache do Django. Disparado pelo próprio
+   ``record_request`` ao vencer o intervalo, por uma thread daemon do processo (o
+   buffer de um worker ocioso também chega antes do rollup), no encerramento do
+   processo (``atexit``) e pela task Celery agendada no beat.
+3. ``rollup_daily`` lê o agregado consolidado de todos os workers e grava uma
+   linha de ``TenantMetrics`` por tenant/dia (média e p50/p95/p99 do sketch) com
+   um único upsert em lote.
+"""
+
+from __future__ import annotations
+
+import atexit
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Any
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from core.models import Tenant
+from shared.cache_utils import get_redis_client
+from shared.metrics.sketch import LatencySketch
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    "flush_buffers",
+    "read_day",
+    "record_request",
+    "reset_buffers",
+    "rollup_daily",
+    "rollup_recent",
+]
+
+KEY_PREFIX = "tenant_telemetry"
+KEY_TTL_SECONDS = 3 * 24 * 3600
+HTTP_SERVER_ERROR = 500
+_QUANTIS = (0.5, 0.95, 0.99)
+
+
+def _enabled() -> bool:
+    return bool(getattr(settings, "TENANT_TELEMETRY_ENABLED", True))
+
+
+def _flush_interval() -> float:
+    try:
+        return float(getattr(settings, "TENANT_TELEMETRY_FLUSH_SECONDS", 60))
+    except (TypeError, ValueError):
+        return 60.0
+
+
+@dataclass
+class _TenantBuffer:
+    requests: int = 0
+    errors: int = 0
+    latency_ms_sum: float = 0.0
+    sketch: LatencySketch = field(default_factory=LatencySketch)
+    users: set[int] = field(default_factory=set)
+
+
+_lock = threading.Lock()
+_buffers: dict[tuple[str, int], _TenantBuffer] = {}
+_state: dict[str, Any] = {"last_flush": time.monotonic(), "flusher": None}
+
+
+# --- Chaves -------------------------------------------------------------------
+def _day_key(day: str) -> str:
+    return f"{KEY_PREFIX}:{day}"
+
+
+def _tenant_key(day: str, tenant_id: int) -> str:
+    return f"{KEY_PREFIX}:{day}:{tenant_id}"
+
+
+def _max_key(day: str) -> str:
+    # Sorted set tenant -> maior latência do dia (ZADD GT mantém o máximo entre workers)
+    return f"{KEY_PREFIX}:{day}:max"
+
+
+# --- Registro -----------------------------------------------------------------
+def record_request(tenant_id: int | None, user_id: int | None, seconds: float, status_code: int) -> None:
+    """Acumula uma requisição no buffer local do processo."""
+    if not tenant_id or seconds < 0 or not _enabled():
+        return
+    day = timezone.localdate().isoformat()
+    ms = seconds * 1000.0
+    with _lock:
+        buf = _buffers.get((day, tenant_id))
+        if buf is None:
+            buf = _buffers[(day, tenant_id)] = _TenantBuffer()
+        buf.requests += 1
+        if status_code >= HTTP_SERVER_ERROR:
+            buf.errors += 1
+        buf.latency_ms_sum += ms
+        buf.sketch.add(ms)
+        if user_id:
+            buf.users.add(user_id)
+        interval = _flush_interval()
+        due = time.monotonic() - _state["last_flush"] >= interval
+    if due:
+        flush_buffers()
+    elif interval > 0:
+        _ensure_flusher()
+
+
+def _drain() -> dict[tuple[str, int], _TenantBuffer]:
+    with _lock:
+        drained = dict(_buffers)
+        _buffers.clear()
+        _state["last_flush"] = time.monotonic()
+    return drained
+
+
+def reset_buffers() -> None:
+    """Descarta o buffer local (testes)."""
+    _drain()
+
+
+# --- Flush --------------------------------------------------------------------
+def _flush_redis(client: Any, drained: dict[tuple[str, int], _TenantBuffer]) -> None:
+    pipe = client.pipeline(transaction=False)
+    for (day, tenant_id), buf in drained.items():
+        tkey = _tenant_key(day, tenant_id)
+        pipe.sadd(_day_key(day), tenant_id)
+        pipe.hincrby(tkey, "requests", buf.requests)
+        pipe.hincrby(tkey, "errors", buf.errors)
+        pipe.hincrbyfloat(tkey, "latency_ms_sum", buf.latency_ms_sum)
+        for idx, n in buf.sketch.counts.items():
+            pipe.hincrby(f"{tkey}:sketch", idx, n)
+        pipe.zadd(_max_key(day), {tenant_id: buf.sketch.max}, gt=True)
+        if buf.users:
+            pipe.sadd(f"{tkey}:users", *buf.users)
+        for key in (_day_key(day), _max_key(day), tkey, f"{tkey}:sketch", f"{tkey}:users"):
+            pipe.expire(key, KEY_TTL_SECONDS)
+    pipe.execute()
+
+
+def _flush_cache(drained: dict[tuple[str, int], _TenantBuffer]) -> None:
+    # Sem Redis (LocMem/testes): merge read-modify-write protegido pelo lock do processo.
+    with _lock:
+        for (day, tenant_id), buf in drained.items():
+            tenants = set(cache.get(_day_key(day)) or ())
+            tenants.add(tenant_id)
+            cache.set(_day_key(day), sorted(tenants), KEY_TTL_SECONDS)
+            tkey = _tenant_key(day, tenant_id)
+            data = cache.get(tkey) or {"requests": 0, "errors": 0, "latency_ms_sum": 0.0, "sketch": {}, "users": []}
+            data["requests"] += buf.requests
+            data["errors"] += buf.errors
+            data["latency_ms_sum"] += buf.latency_ms_sum
+            data["latency_ms_max"] = max(data.get("latency_ms_max", 0.0), buf.sketch.max)
+            sketch = data["sketch"]
+            for idx, n in buf.sketch.counts.items():
+                sketch[str(idx)] = sketch.get(str(idx), 0) + n
+            data["users"] = sorted(set(data["users"]) | buf.users)
+            cache.set(tkey, data, KEY_TTL_SECONDS)
+
+
+def flush_buffers() -> int:
+    """Descarrega o buffer local no armazenamento compartilhado.
+
+    Retorna a quantidade de pares (dia, tenant) enviados. Em caso de falha o
+    lote é descartado (telemetria é best-effort e nunca deve quebrar a request).
+    """
+    drained = _drain()
+    if not drained:
+        return 0
+    client = get_redis_client()
+    try:
+        if client is not None:
+            _flush_redis(client, drained)
+        else:
+            _flush_cache(drained)
+    except Exception:  # noqa: BLE001 - backend de cache indisponível
+        logger.warning("Falha ao descarregar telemetria de tenants (%s itens)", len(drained), exc_info=True)
+        return 0
+    return len(drained)
+
+
+def _flusher_loop() -> None:
+    while True:
+        time.sleep(max(_flush_interval(), 1.0))
+        try:
+            flush_buffers()
+        except Exception:  # noqa: BLE001 - a thread nunca pode morrer
+            logger.exception("Erro inesperado no flusher de telemetria")
+
+
+def _ensure_flusher() -> None:
+    with _lock:
+        thread = _state["flusher"]
+        if thread is not None and thread.is_alive():
+            return
+        thread = threading.Thread(target=_flusher_loop, name="tenant-telemetry-flusher", daemon=True)
+        _state["flusher"] = thread
+        thread.start()
+
+
+def _flush_at_exit() -> None:
+    try:
+        flush_buffers()
+    except Exception:  # noqa: BLE001 - interpretador encerrando
+        logger.debug("Flush de telemetria no encerramento falhou", exc_info=True)
+
+
+atexit.register(_flush_at_exit)
+
+
+# --- Leitura / rollup -----------------------------------------------------------
+def _decode(value: Any) -> str:
+    return value.decode() if isinstance(value, bytes) else str(value)
+
+
+def _read_redis(client: Any, day: str) -> dict[int, dict[str, Any]]:
+    tenant_ids = sorted(int(_decode(t)) for t in client.smembers(_day_key(day)))
+    if not tenant_ids:
+        return {}
+    pipe = client.pipeline(transaction=False)
+    pipe.zrange(_max_key(day), 0, -1, withscores=True)
+    for tenant_id in tenant_ids:
+        tkey = _tenant_key(day, tenant_id)
+        pipe.hgetall(tkey)
+        pipe.hgetall(f"{tkey}:sketch")
+        pipe.scard(f"{tkey}:users")
+    maxima_raw, *raw = pipe.execute()
+    maxima = {int(_decode(t)): float(v) for t, v in maxima_raw}
+    out: dict[int, dict[str, Any]] = {}
+    for i, tenant_id in enumerate(tenant_ids):
+        totals = {_decode(k): _decode(v) for k, v in raw[3 * i].items()}
+        latency_ms_sum = float(totals.get("latency_ms_sum", 0.0))
+        sketch = LatencySketch()
+        sketch.merge_counts(raw[3 * i + 1], total=latency_ms_sum, maximum=maxima.get(tenant_id, 0.0))
+        out[tenant_id] = {
+            "requests": int(totals.get("requests", 0)),
+            "errors": int(totals.get("errors", 0)),
+            "latency_ms_sum": latency_ms_sum,
+            "sketch": sketch,
+            "active_users": int(raw[3 * i + 2]),
+        }
+    return out
+
+
+def _read_cache(day: str) -> dict[int, dict[str, Any]]:
+    out: dict[int, dict[str, Any]] = {}
+    for tenant_id in cache.get(_day_key(day)) or ():
+        data = cache.get(_tenant_key(day, tenant_id))
+        if not data:
+            continue
+        sketch = LatencySketch()
+        sketch.merge_counts(data["sketch"], total=data["latency_ms_sum"], maximum=data.get("latency_ms_max", 0.0))
+        out[int(tenant_id)] = {
+            "requests": data["requests"],
+            "errors": data["errors"],
+            "latency_ms_sum": data["latency_ms_sum"],
+            "sketch": sketch,
+            "active_users": len(data["users"]),
+        }
+    return out
+
+
+def read_day(day: date) -> dict[int, dict[str, Any]]:
+    """Agregado consolidado (todos os workers já descarregados) por tenant no dia."""
+    client = get_redis_client()
+    key = day.isoformat()
+    return _read_redis(client, key) if client is not None else _read_cache(key)
+
+
+def rollup_daily(day: date | None = None) -> int:
+    """Consolida o dia em ``TenantMetrics`` (um upsert em lote para todos os tenants).
+
+    Idempotente: reexecutar para o mesmo dia sobrescreve com os totais acumulados,
+    permitindo rodar ao longo do dia e uma última vez após a virada.
+    """
+    tenant_metrics_model = apps.get_model("pandora_admin", "TenantMetrics")  # evita ciclo core <-> admin
+    day = day or timezone.localdate()
+    flush_buffers()
+    aggregated = read_day(day)
+    if not aggregated:
+        return 0
+    existing = set(Tenant.objects.filter(id__in=aggregated).values_list("id", flat=True))
+    rows = []
+    for tenant_id, data in aggregated.items():
+        if tenant_id not in existing:  # tenant removido após o registro
+            continue
+        requests = data["requests"]
+        quantis = data["sketch"].quantiles(_QUANTIS)
+        rows.append(
+            tenant_metrics_model(
+                tenant_id=tenant_id,
+                date=day,
+                api_requests=requests,
+                response_time_avg=round(data["latency_ms_sum"] / requests, 3) if requests else 0.0,
+                response_time_p50=round(quantis[0.5] or 0.0, 3),
+                response_time_p95=round(quantis[0.95] or 0.0, 3),
+                response_time_p99=round(quantis[0.99] or 0.0, 3),
+                error_rate=round(100.0 * data["errors"] / requests, 3) if requests else 0.0,
+                active_users=data["active_users"],
+            ),
+        )
+    if not rows:
+        return 0
+    tenant_metrics_model.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=["tenant", "date"],
+        update_fields=[
+            "api_requests",
+            "response_time_avg",
+            "response_time_p50",
+            "response_time_p95",
+            "response_time_p99",
+            "error_rate",
+            "active_users",
+            "updated_at",
+        ],
+    )
+    return len(rows)
+
+
+def rollup_recent() -> int:
+    """Consolida hoje e ontem (garante fechamento do dia anterior após a meia-noite)."""
+    today = timezone.localdate()
+    return rollup_daily(today - timedelta(days=1)) + rollup_daily(today)
@@ -2,19 +2,36 @@
 
 Este módulo fornece um sistema de métricas em memória para o wizard,
 com integração opcional com Prometheus.
+
+Latências (geral, por outcome e tempo até abandono) ficam em sketches
+mescláveis (``shared.metrics.sketch.LatencySketch``) em vez de deques ordenadas
+a cada snapshot. Os sketches são separados por hora e o snapshot mescla apenas as
+últimas ``WIZARD_LATENCY_WINDOW_HOURS`` horas (mais a hora corrente), de modo que
+os quantis — e o alerta de p95 — refletem a latência recente, não o histórico
+inteiro. Com Redis disponível, contadores, sketches e últimos erros são
+descarregados periodicamente (``WIZARD_METRICS_FLUSH_SECONDS``) como deltas
+(HINCRBY em pipeline, chaves horárias com TTL) e ``snapshot_metrics`` devolve a
+visão consolidada de todos os workers, com quantis calculados em O(buckets). Sem
+Redis o snapshot usa o estado local do processo. Sessões ativas/abandono
+continuam por processo.
 """
 
 from __future__ import annotations
 
 import contextlib
+import json
 import logging
 import threading
 import time
 from collections import deque
+from time import monotonic
 from typing import Any
 
 from django.conf import settings
 
+from shared.cache_utils import get_redis_client
+from shared.metrics.sketch import LatencySketch
+
 # Inicialização segura do Prometheus
 PROMETHEUS_ENABLED: bool
 try:
@@ -41,13 +58,35 @@ except ImportError:
 
 
 # Configurações
-_MAX_LAT_SAMPLES: int = getattr(settings, "WIZARD_MAX_LATENCIES", 200)
 _MAX_ERRORS: int = getattr(settings, "WIZARD_MAX_ERRORS", 25)
-_MAX_ABANDON_SAMPLES: int = getattr(
-    settings,
-    "WIZARD_MAX_ABANDON_LATENCIES",
-    200,
-)
+KEY_PREFIX = "wizard_metrics"
+_OUTCOMES = ("success", "duplicate", "exception")
+_SERIES = ("latency", *(f"latency:{o}" for o in _OUTCOMES), "abandon")
+_HOUR_SECONDS = 3600
+
+
+def _flush_interval() -> float:
+    try:
+        return float(getattr(settings, "WIZARD_METRICS_FLUSH_SECONDS", 10))
+    except (TypeError, ValueError):
+        return 10.0
+
+
+def _window_hours() -> int:
+    try:
+        return max(int(getattr(settings, "WIZARD_LATENCY_WINDOW_HOURS", 1)), 0)
+    except (TypeError, ValueError):
+        return 1
+
+
+def _current_hour() -> int:
+    return int(time.time() // _HOUR_SECONDS)
+
+
+def _window() -> range:
+    """Horas (epoch // 3600) mescladas no snapshot: as N anteriores e a corrente."""
+    hour = _current_hour()
+    return range(hour - _window_hours(), hour + 1)
 
 
 # Limiar de abandono será lido dinamicamente de settings a cada processamento
@@ -73,17 +112,16 @@ _counters: dict[str, int] = {
     "finish_subdomain_duplicate": 0,
     "finish_exception": 0,
 }
-_latencies: deque[float] = deque(maxlen=_MAX_LAT_SAMPLES)
-_latencies_by_outcome: dict[str, deque[float]] = {
-    "success": deque(maxlen=_MAX_LAT_SAMPLES),
-    "duplicate": deque(maxlen=_MAX_LAT_SAMPLES),
-    "exception": deque(maxlen=_MAX_LAT_SAMPLES),
-}
+# Sketches do processo por hora e deltas ainda não enviados ao Redis, por (hora, série)
+_sketches: dict[int, dict[str, LatencySketch]] = {}
+_pending_sketches: dict[tuple[int, str], LatencySketch] = {}
+_pending_counters: dict[str, int] = {}
+_pending_errors: list[dict[str, Any]] = []
+_flush_state: dict[str, float] = {"last_flush": monotonic()}
 _last_errors: deque[dict[str, Any]] = deque(maxlen=_MAX_ERRORS)
 _active_sessions: set[str] = set()
 _session_activity: dict[str, float] = {}
 _session_start: dict[str, float] = {}
-_abandon_durations: deque[float] = deque(maxlen=_MAX_ABANDON_SAMPLES)
 _last_finish_correlation_id: str | None = None
 
 # Métricas Prometheus
@@ -145,6 +183,7 @@ __all__ = [
     "get_last_finish_correlation_id",
     "set_last_finish_correlation_id",
     "reset_all_metrics",
+    "flush_metrics",
 ]
 
 logger = logging.getLogger(__name__)
@@ -154,8 +193,31 @@ def _inc(key: str) -> None:
     """Incrementa um contador interno e a métrica Prometheus correspondente."""
     with _lock:
         _counters[key] = _counters.get(key, 0) + 1
+        _pending_counters[key] = _pending_counters.get(key, 0) + 1
         if prom_counter := PROM_COUNTERS.get(key):
             prom_counter.inc()
+    _maybe_flush()
+
+
+def _observe(series: str, value: float) -> None:
+    """Registra ``value`` no sketch da hora corrente e no delta pendente (chamar sob lock)."""
+    hour = _current_hour()
+    if hour not in _sketches:
+        inicio = hour - _window_hours()
+        for old in [h for h in _sketches if h < inicio]:
+            del _sketches[old]  # fora da janela
+        _sketches[hour] = {name: LatencySketch() for name in _SERIES}
+    _sketches[hour][series].add(value)
+    _pending_sketches.setdefault((hour, series), LatencySketch()).add(value)
+
+
+def _local_window() -> dict[str, LatencySketch]:
+    """Sketches do processo mesclados na janela (chamar sob lock)."""
+    merged = {name: LatencySketch() for name in _SERIES}
+    for hour in _window():
+        for name, sk in _sketches.get(hour, {}).items():
+            merged[name].merge(sk)
+    return merged
 
 
 def inc_finish_success() -> None:
@@ -184,16 +246,17 @@ def record_finish_latency(seconds: float, outcome: str | None = None) -> None:
     if seconds < 0:
         return
 
-    outcome_key = outcome if outcome in _latencies_by_outcome else None
+    outcome_key = outcome if outcome in _OUTCOMES else None
 
     with _lock:
-        _latencies.append(seconds)
+        _observe("latency", seconds)
         PROM_HISTO.observe(seconds)
 
         if outcome_key:
-            _latencies_by_outcome[outcome_key].append(seconds)
+            _observe(f"latency:{outcome_key}", seconds)
             if prom_histo := PROM_HISTO_OUTCOME.get(outcome_key):
                 prom_histo.observe(seconds)
+    _maybe_flush()
 
     # Hook externo para sistemas de observabilidade
     if sink := getattr(settings, "WIZARD_LATENCY_SINK", None):
@@ -208,10 +271,10 @@ def record_finish_latency(seconds: float, outcome: str | None = None) -> None:
 
 def register_finish_error(kind: str, message: str | None = None) -> None:
     """Registra um erro ocorrido durante a finalização."""
+    error = {"ts": time.time(), "kind": kind, "msg": (message or "")[:300]}
     with _lock:
-        _last_errors.append(
-            {"ts": time.time(), "kind": kind, "msg": (message or "")[:300]},
-        )
+        _last_errors.append(error)
+        _pending_errors.append(error)
 
 
 def _update_session_gauge() -> None:
@@ -267,26 +330,104 @@ def set_last_finish_correlation_id(cid: str | None) -> None:
         globals()["_last_finish_correlation_id"] = cid
 
 
-def _compute_stats(series: deque[float] | list[float]) -> dict[str, float]:
-    """Calcula estatísticas básicas de uma série de números."""
-    if not series:
-        return {}
-    ordered = sorted(series)
-    n = len(ordered)
-    if n == 0:
-        return {}
-    p50 = ordered[int(0.5 * (n - 1))]
-    p90 = ordered[int(0.9 * (n - 1))]
-    p95 = ordered[int(0.95 * (n - 1))]
-    p99 = ordered[int(0.99 * (n - 1))]
-    return {
-        "count": n,
-        "p50": p50,
-        "p90": p90,
-        "p95": p95,
-        "p99": p99,
-        "max": ordered[-1],
-    }
+# --- Consolidação entre workers (Redis) -------------------------------------------
+def _key(name: str) -> str:
+    return f"{KEY_PREFIX}:{name}"
+
+
+def _hour_keys(hour: int) -> list[str]:
+    names = ["sketch_count", "sketch_sum", "sketch_max", *(f"sketch:{n}" for n in _SERIES)]
+    return [_key(f"{n}:{hour}") for n in names]
+
+
+def _decode(value: Any) -> str:  # noqa: ANN401
+    return value.decode() if isinstance(value, bytes) else str(value)
+
+
+def _maybe_flush() -> None:
+    with _lock:
+        due = monotonic() - _flush_state["last_flush"] >= _flush_interval()
+    if due:
+        flush_metrics()
+
+
+def _drain() -> tuple[dict[str, int], dict[tuple[int, str], LatencySketch], list[dict[str, Any]]]:
+    with _lock:
+        counters = dict(_pending_counters)
+        _pending_counters.clear()
+        sketches = {key: sk for key, sk in _pending_sketches.items() if sk.count}
+        _pending_sketches.clear()
+        errors = list(_pending_errors)
+        _pending_errors.clear()
+        _flush_state["last_flush"] = monotonic()
+    return counters, sketches, errors
+
+
+def flush_metrics() -> bool:
+    """Envia ao Redis os deltas locais (contadores, buckets dos sketches e erros).
+
+    Retorna ``False`` quando não há Redis (deltas descartados: o estado local
+    continua servindo o snapshot) ou quando o envio falha. As chaves horárias dos
+    sketches expiram uma hora depois de saírem da janela.
+    """
+    client = get_redis_client()
+    counters, sketches, errors = _drain()
+    if client is None:
+        return False
+    if not (counters or sketches or errors):
+        return True
+    try:
+        pipe = client.pipeline(transaction=False)
+        for name, n in counters.items():
+            pipe.hincrby(_key("counters"), name, n)
+        ttl = (_window_hours() + 2) * _HOUR_SECONDS
+        for (hour, name), sk in sketches.items():
+            for idx, n in sk.counts.items():
+                pipe.hincrby(_key(f"sketch:{name}:{hour}"), idx, n)
+            pipe.hincrby(_key(f"sketch_count:{hour}"), name, sk.count)
+            pipe.hincrbyfloat(_key(f"sketch_sum:{hour}"), name, sk.sum)
+            pipe.zadd(_key(f"sketch_max:{hour}"), {name: sk.max}, gt=True)
+        for hour in {hour for hour, _name in sketches}:
+            for key in _hour_keys(hour):
+                pipe.expire(key, ttl)
+        if errors:
+            pipe.lpush(_key("errors"), *(json.dumps(e) for e in errors))
+            pipe.ltrim(_key("errors"), 0, _MAX_ERRORS - 1)
+        pipe.execute()
+    except Exception:  # noqa: BLE001 - métricas são best-effort
+        logger.warning("Falha ao descarregar métricas do wizard no Redis", exc_info=True)
+        return False
+    return True
+
+
+def _read_cluster(client: Any) -> tuple[dict[str, int], dict[str, LatencySketch], list[dict[str, Any]]]:  # noqa: ANN401
+    """Estado consolidado de todos os workers (após o flush deste processo), sketches na janela."""
+    hours = list(_window())
+    pipe = client.pipeline(transaction=False)
+    pipe.hgetall(_key("counters"))
+    pipe.lrange(_key("errors"), 0, _MAX_ERRORS - 1)
+    for hour in hours:
+        for name in _SERIES:
+            pipe.hgetall(_key(f"sketch:{name}:{hour}"))
+        pipe.hgetall(_key(f"sketch_count:{hour}"))
+        pipe.hgetall(_key(f"sketch_sum:{hour}"))
+        pipe.zrange(_key(f"sketch_max:{hour}"), 0, -1, withscores=True)
+    raw_counters, raw_errors, *raw = pipe.execute()
+    counters = dict.fromkeys(_counters, 0)
+    counters.update({_decode(k): int(v) for k, v in raw_counters.items()})
+    sketches = {name: LatencySketch() for name in _SERIES}
+    step = len(_SERIES) + 3
+    for i in range(len(hours)):
+        *buckets, raw_count, raw_sum, raw_max = raw[i * step : (i + 1) * step]
+        counts = {_decode(k): int(v) for k, v in raw_count.items()}
+        sums = {_decode(k): float(v) for k, v in raw_sum.items()}
+        maxima = {_decode(k): float(v) for k, v in raw_max}
+        for name, bucket in zip(_SERIES, buckets, strict=True):
+            sketches[name].merge_counts(
+                bucket, count=counts.get(name, 0), total=sums.get(name, 0.0), maximum=maxima.get(name, 0.0)
+            )
+    errors = [json.loads(_decode(e)) for e in reversed(raw_errors)]
+    return counters, sketches, errors
 
 
 def _process_abandoned_sessions(now: float) -> int:
@@ -299,7 +440,7 @@ def _process_abandoned_sessions(now: float) -> int:
             abandoned_count += 1
             to_remove.append(sk)
             if start_ts := _session_start.pop(sk, None):
-                _abandon_durations.append(now - start_ts)
+                _observe("abandon", now - start_ts)
 
     for sk in to_remove:
         _session_activity.pop(sk, None)
@@ -322,36 +463,45 @@ def _check_latency_warning(stats: dict[str, float]) -> None:
 
 
 def snapshot_metrics() -> dict[str, Any]:
-    """Tira um snapshot das métricas atuais em memória sem deadlocks.
+    """Tira um snapshot das métricas sem deadlocks.
 
     Estratégias usadas:
     - RLock para reentrância segura
     - Leitura direta de variáveis protegidas dentro do lock quando já estamos na seção crítica
     - Escopo do lock apenas para leitura/atualização de estruturas internas; pós-processamento fora
+    - Com Redis: flush dos deltas locais e leitura do agregado de todos os workers
     """
     with _lock:
         now = time.time()
         abandoned = _process_abandoned_sessions(now)
 
-        lat_stats = _compute_stats(list(_latencies))
-        # Checagem de alerta não precisa segurar lock, mas é leve; manter aqui evita condição de corrida
-        _check_latency_warning(lat_stats)
-        lat_stats_outcomes = {k: _compute_stats(list(v)) for k, v in _latencies_by_outcome.items() if v}
-        abandon_time_stats = _compute_stats(list(_abandon_durations))
-        if _abandon_durations:
-            abandon_time_stats["avg"] = sum(_abandon_durations) / len(_abandon_durations)
-
         _update_session_gauge()
         if abandoned_sessions_gauge := PROM_GAUGES.get("abandoned_sessions"):
             abandoned_sessions_gauge.set(abandoned)
 
         # Capturas atômicas sob lock
         counters_copy = dict(_counters)
+        sketches = _local_window()
         last_cid = _last_finish_correlation_id  # acesso direto sob o mesmo lock (evita reentrância)
         active_count = len(_active_sessions)
         last_errors_copy = list(_last_errors)
 
-    # Montagem do snapshot fora do lock
+    client = get_redis_client()
+    if client is not None and flush_metrics():
+        try:
+            counters_copy, sketches, last_errors_copy = _read_cluster(client)
+        except Exception:  # noqa: BLE001 - cai para a visão local do processo
+            logger.warning("Falha ao ler métricas consolidadas do wizard", exc_info=True)
+
+    # Montagem do snapshot fora do lock (quantis em O(buckets))
+    lat_stats = sketches["latency"].summary()
+    _check_latency_warning(lat_stats)
+    lat_stats_outcomes = {o: sketches[f"latency:{o}"].summary() for o in _OUTCOMES if sketches[f"latency:{o}"].count}
+    abandon = sketches["abandon"]
+    abandon_time_stats = abandon.summary()
+    if abandon.count:
+        abandon_time_stats["avg"] = abandon.sum / abandon.count
+
     snapshot: dict[str, Any] = {
         "counters": counters_copy,
         "latency": lat_stats,
@@ -377,21 +527,21 @@ def snapshot_metrics() -> dict[str, Any]:
 
 
 def reset_all_metrics() -> None:
-    """Reseta todas as estruturas in-memory de métricas do wizard.
+    """Reseta todas as estruturas de métricas do wizard (locais e consolidadas no Redis).
 
     Uso principal: testes, troubleshooting ou comando de manutenção.
     """
     with _lock:
         for k in list(_counters.keys()):
             _counters[k] = 0
-        _latencies.clear()
-        for lst in _latencies_by_outcome.values():
-            lst.clear()
+        _pending_counters.clear()
+        _sketches.clear()
+        _pending_sketches.clear()
         _last_errors.clear()
+        _pending_errors.clear()
         _active_sessions.clear()
         _session_activity.clear()
         _session_start.clear()
-        _abandon_durations.clear()
 
         # Evitar reentrância chamando setter; zera diretamente sob o mesmo lock
         # e sem usar 'global' (evita aviso de lint PLW0603)
@@ -401,3 +551,12 @@ def reset_all_metrics() -> None:
         _update_session_gauge()
         if abandoned_sessions_gauge := PROM_GAUGES.get("abandoned_sessions"):
             abandoned_sessions_gauge.set(0)
+
+    client = get_redis_client()
+    if client is not None:
+        # Horas anteriores à janela já não são lidas e expiram pelo TTL
+        keys = [_key("counters"), _key("errors"), *(k for hour in _window() for k in _hour_keys(hour))]
+        try:
+            client.delete(*keys)
+        except Exception:  # noqa: BLE001 - métricas são best-effort
+            logger.warning("Falha ao limpar métricas do wizard no Redis", exc_info=True)
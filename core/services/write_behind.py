@@ -0,0 +1,217 @@
+"""Write-behind para escritas de alta frequência do caminho da request.
+
+Substitui o ``INSERT`` síncrono de ``AuditLog`` (``AuditLogMiddleware``) e o
+``UPDATE`` de ``UserProfile.last_activity`` (``UserActivityMiddleware``) por um
+buffer em memória do processo, descarregado em lote:
+
+* entradas de auditoria -> um ``bulk_create`` por flush;
+* last_activity -> um único ``UPDATE ... CASE`` por flush, com throttle por
+  usuário (``USER_ACTIVITY_RESOLUTION_SECONDS``) para ignorar polling/XHR.
+
+O flush ocorre quando o intervalo (``WRITE_BEHIND_FLUSH_SECONDS``) vence, quando
+o buffer atinge ``WRITE_BEHIND_MAX_BUFFER``, por uma thread daemon periódica e no
+encerramento do worker (``atexit``). Com intervalo <= 0 (ou em testes) o flush é
+imediato, preservando a semântica síncrona anterior.
+
+Observação: ``AuditLog.action_time`` é ``auto_now_add``; o horário gravado passa a
+ser o do flush (defasagem máxima = intervalo configurado).
+"""
+
+from __future__ import annotations
+
+import atexit
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Any
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections
+from django.db.models import Case, DateTimeField, Value, When
+
+from core.models import AuditLog, UserProfile
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    "enqueue_audit",
+    "flush",
+    "reset",
+    "stats",
+    "touch_last_activity",
+]
+
+_lock = threading.RLock()
+_audit_entries: list[dict[str, Any]] = []
+_pending_activity: dict[int, datetime] = {}
+_activity_written: dict[int, float] = {}
+_counters: dict[str, int] = {
+    "audit_buffered": 0,
+    "audit_flushed": 0,
+    "audit_dropped": 0,
+    "activity_buffered": 0,
+    "activity_throttled": 0,
+    "activity_flushed": 0,
+    "activity_dropped": 0,
+    "flushes": 0,
+}
+_state: dict[str, Any] = {"last_flush": time.monotonic(), "flusher": None}
+
+
+def _flush_interval() -> float:
+    if getattr(settings, "TESTING", False) and not getattr(settings, "WRITE_BEHIND_IN_TESTS", False):
+        return 0.0
+    try:
+        return float(getattr(settings, "WRITE_BEHIND_FLUSH_SECONDS", 5))
+    except (TypeError, ValueError):
+        return 5.0
+
+
+def _max_buffer() -> int:
+    return int(getattr(settings, "WRITE_BEHIND_MAX_BUFFER", 500))
+
+
+def _activity_resolution() -> float:
+    return float(getattr(settings, "USER_ACTIVITY_RESOLUTION_SECONDS", 60))
+
+
+# --- Enfileiramento -----------------------------------------------------------
+def enqueue_audit(**fields: Any) -> None:
+    """Enfileira uma entrada de ``AuditLog`` (mesmos kwargs de ``objects.create``)."""
+    with _lock:
+        cap = _max_buffer() * 10  # limite duro: protege memória se o BD estiver fora
+        if len(_audit_entries) >= cap:
+            _audit_entries.pop(0)
+            _counters["audit_dropped"] += 1
+        _audit_entries.append(fields)
+        _counters["audit_buffered"] += 1
+    _maybe_flush()
+
+
+def touch_last_activity(user_id: int, now: datetime) -> bool:
+    """Marca atividade do usuário; retorna ``False`` se descartado pelo throttle."""
+    mono = time.monotonic()
+    with _lock:
+        last = _activity_written.get(user_id)
+        if last is not None and mono - last < _activity_resolution():
+            _counters["activity_throttled"] += 1
+            return False
+        _activity_written[user_id] = mono
+        _pending_activity[user_id] = now
+        _counters["activity_buffered"] += 1
+    _maybe_flush()
+    return True
+
+
+def _maybe_flush() -> None:
+    interval = _flush_interval()
+    with _lock:
+        size = len(_audit_entries) + len(_pending_activity)
+        due = interval <= 0 or size >= _max_buffer() or time.monotonic() - _state["last_flush"] >= interval
+    if due:
+        flush()
+    elif interval > 0:
+        _ensure_flusher(interval)
+
+
+# --- Flush ----------------------------------------------------------------------
+def _write_audit(entries: list[dict[str, Any]]) -> None:
+    AuditLog.objects.bulk_create([AuditLog(**e) for e in entries], batch_size=500)
+
+
+def _write_activity(pending: dict[int, datetime]) -> None:
+    field = DateTimeField()
+    UserProfile.objects.filter(user_id__in=list(pending)).update(
+        last_activity=Case(
+            *(When(user_id=uid, then=Value(ts, output_field=field)) for uid, ts in pending.items()),
+            output_field=field,
+        ),
+    )
+
+
+def flush() -> dict[str, int]:
+    """Descarrega o buffer no banco; retorna quantos itens foram gravados."""
+    with _lock:
+        entries = list(_audit_entries)
+        pending = dict(_pending_activity)
+        _audit_entries.clear()
+        _pending_activity.clear()
+        _state["last_flush"] = time.monotonic()
+        # Entradas de throttle antigas não precisam ficar em memória
+        horizon = _state["last_flush"] - _activity_resolution()
+        for uid in [u for u, ts in _activity_written.items() if ts < horizon]:
+            _activity_written.pop(uid, None)
+    written = {"audit": 0, "activity": 0}
+    if entries:
+        try:
+            _write_audit(entries)
+            written["audit"] = len(entries)
+        except DatabaseError:
+            logger.warning("Falha no flush de audit log (%s entradas descartadas)", len(entries), exc_info=True)
+    if pending:
+        try:
+            _write_activity(pending)
+            written["activity"] = len(pending)
+        except DatabaseError:
+            logger.warning("Falha no flush de last_activity (%s usuários)", len(pending), exc_info=True)
+    with _lock:
+        _counters["audit_flushed"] += written["audit"]
+        _counters["audit_dropped"] += len(entries) - written["audit"]
+        _counters["activity_flushed"] += written["activity"]
+        _counters["activity_dropped"] += len(pending) - written["activity"]
+        if entries or pending:
+            _counters["flushes"] += 1
+    return written
+
+
+def _flusher_loop(interval: float) -> None:
+    while True:
+        time.sleep(interval)
+        try:
+            flush()
+        except Exception:  # noqa: BLE001 - a thread nunca pode morrer
+            logger.exception("Erro inesperado no flusher write-behind")
+        finally:
+            close_old_connections()
+
+
+def _ensure_flusher(interval: float) -> None:
+    with _lock:
+        thread = _state["flusher"]
+        if thread is not None and thread.is_alive():
+            return
+        thread = threading.Thread(target=_flusher_loop, args=(interval,), name="write-behind-flusher", daemon=True)
+        _state["flusher"] = thread
+        thread.start()
+
+
+def _flush_at_exit() -> None:
+    try:
+        flush()
+    except Exception:  # noqa: BLE001 - interpretador encerrando
+        logger.debug("Flush write-behind no encerramento falhou", exc_info=True)
+
+
+atexit.register(_flush_at_exit)
+
+
+# --- Observabilidade ------------------------------------------------------------
+def stats() -> dict[str, int]:
+    """Contadores acumulados + tamanho atual do buffer."""
+    with _lock:
+        data = dict(_counters)
+        data["audit_pending"] = len(_audit_entries)
+        data["activity_pending"] = len(_pending_activity)
+    return data
+
+
+def reset() -> None:
+    """Descarta buffer e zera contadores (testes)."""
+    with _lock:
+        _audit_entries.clear()
+        _pending_activity.clear()
+        _activity_written.clear()
+        for k in _counters:
+            _counters[k] = 0
+        _state["last_flush"] = time.monotonic()
@@ -0,0 +1,19 @@
+"""Tarefas Celery do app core (telemetria e manutenção periódica)."""
+
+from __future__ import annotations
+
+from celery import shared_task
+
+from core.services import tenant_telemetry
+
+
+@shared_task
+def flush_tenant_telemetry() -> int:
+    """Descarrega o buffer de telemetria do worker no Redis/cache."""
+    return tenant_telemetry.flush_buffers()
+
+
+@shared_task
+def rollup_tenant_telemetry() -> int:
+    """Consolida a telemetria de hoje/ontem em ``admin.TenantMetrics``."""
+    return tenant_telemetry.rollup_recent()
@@ -6,117 +6,86 @@ para ambientes sem template.
 
 from __future__ import annotations
 
+from functools import lru_cache
 from typing import TYPE_CHECKING, Any
 
 from django import template
 from django.conf import settings
+from django.core.cache import cache
 from django.template import TemplateDoesNotExist
 from django.template.loader import render_to_string
-from django.urls import NoReverseMatch, reverse
+from django.urls import NoReverseMatch, get_urlconf, reverse
 from django.utils.safestring import mark_safe
 
-from core.models import TenantUser
-from core.utils import get_current_tenant
-
-try:
-    from core.authorization import can_access_module
-except ImportError:  # caso arquivo ainda não carregado/migração inicial
-    can_access_module = None
+from core.services.access_context import get_access_context
 
 register = template.Library()
 
 
-def _can_view_module(
-    user: object,
-    tenant: object,
-    module_config: dict[str, object],
-    is_admin_of_tenant: bool,  # noqa: FBT001
-    can_access_module_fn: Callable[..., Any] | None,
-) -> bool:
-    """Retorna True se o usuário pode visualizar o módulo informado."""
-    if module_config.get("is_header"):
-        return True
-
-    module_name = module_config.get("module_name")
-    allowed = False
-
-    if getattr(settings, "FEATURE_UNIFIED_ACCESS", False) and can_access_module_fn:
-        decision = can_access_module_fn(user, tenant, module_name)
-        allowed = bool(getattr(decision, "allowed", False))
-    elif getattr(user, "is_superuser", False):
-        allowed = True
-    elif (module_config.get("tenant_admin_only") and not is_admin_of_tenant) or (not module_name or not tenant):
-        allowed = False
-    elif hasattr(tenant, "is_module_enabled"):
-        allowed = bool(tenant.is_module_enabled(module_name))
-    else:
-        allowed = False
-
-    return allowed
-
-
 @register.simple_tag(takes_context=True)
-def render_sidebar_menu(context: dict[str, Any]) -> str:  # noqa: C901
+def render_sidebar_menu(context: dict[str, Any]) -> str:
     """Renderiza o menu lateral dinamicamente.
 
-    Compatível com o design moderno e Bootstrap 5.
+    Compatível com o design moderno e Bootstrap 5. Visibilidade e vínculo vêm do
+    ``AccessContext`` da request; o HTML final é cacheado entre requests por
+    (usuário, tenant, versão de permissões, URL ativa). Decisões de módulo e
+    ``reverse`` das URLs só rodam quando o cache não tem o HTML.
     """
     request = context.get("request")
     if not request or not getattr(request.user, "is_authenticated", False):
         return ""
 
-    user = request.user
-
-    # Verificar tenant com tratamento de erro aprimorado
-    try:
-        tenant = get_current_tenant(request) if hasattr(request, "session") else None
-    except (AttributeError, KeyError):
-        tenant = None
-
-    # Verificar se é admin do tenant
-    is_admin_of_tenant = False
-    if tenant and not getattr(user, "is_superuser", False):
-        is_admin_of_tenant = TenantUser.objects.filter(
-            tenant=tenant,
-            user=user,
-            is_tenant_admin=True,
-        ).exists()
+    access = get_access_context(request)
 
     # Se usuário não tem tenant e não é superuser, provavelmente é usuário somente portal
-    if not tenant and not getattr(user, "is_superuser", False):
+    if not access.tenant and not access.is_superuser:
         return ""
 
-    # Processar módulos disponíveis
-    available_modules = [
-        m
-        for m in settings.PANDORA_MODULES
-        if isinstance(m, dict) and _can_view_module(user, tenant, m, is_admin_of_tenant, can_access_module)
-    ]
-
-    # Agrupar módulos por seções
-    menu_groups = _group_modules_by_sections(available_modules)
+    badge = access.saude_atendimentos_hoje
+    ttl = access.sidebar_ttl()
+    # Fora das URLs do menu nenhum item fica ativo: todas essas páginas compartilham o HTML
+    active_url = request.path if request.path in _menu_paths(get_urlconf() or settings.ROOT_URLCONF) else ""
+    cache_key = access.sidebar_cache_key(active_url, extra=badge) if ttl > 0 else None
+    if cache_key and (html := cache.get(cache_key)) is not None:
+        return mark_safe(html)  # noqa: S308 - HTML gerado pelo próprio template
 
-    # Processar URLs e estado ativo
+    # Agrupar módulos visíveis por seções e resolver URLs
+    menu_groups = _group_modules_by_sections(access.visible_menu_modules)
     processed_groups: list[dict[str, Any]] = []
     for group in menu_groups:
         if group["items"]:
-            processed_items: list[dict[str, Any]] = []
-            for item in group["items"]:
-                processed_item = _process_menu_item(item, request)
-                if processed_item:
-                    processed_items.append(processed_item)
-
+            processed_items = [_process_menu_item(item, request) for item in group["items"]]
+            processed_items = [item for item in processed_items if item]
             if processed_items:
                 processed_groups.append({"header": group["header"], "items": processed_items})
 
     # Usar template para renderizar ao invés de concatenação manual
-    menu_context = {"menu_groups": processed_groups, "request": request}
+    menu_context = {"menu_groups": processed_groups, "request": request, "saude_atendimentos_hoje": badge}
 
     try:
-        return render_to_string("core/sidebar_menu.html", menu_context, request=request)
+        html = render_to_string("core/sidebar_menu.html", menu_context, request=request)
     except TemplateDoesNotExist:
         # Fallback para o sistema antigo se o template não existir
-        return _render_menu_fallback(processed_groups)
+        html = _render_menu_fallback(processed_groups)
+    if cache_key:
+        cache.set(cache_key, str(html), ttl)
+    return html
+
+
+@lru_cache(maxsize=8)
+def _menu_paths(_urlconf: str) -> frozenset[str]:
+    """Caminhos de todos os itens de ``PANDORA_MODULES`` (``reverse`` uma vez por processo/urlconf)."""
+    paths = set()
+    for module in getattr(settings, "PANDORA_MODULES", []):
+        if not isinstance(module, dict):
+            continue
+        for entry in [module, *(module.get("children") or [])]:
+            if entry.get("url"):
+                try:
+                    paths.add(reverse(entry["url"]))
+                except NoReverseMatch:
+                    continue
+    return frozenset(paths)
 
 
 def _group_modules_by_sections(modules: list[dict[str, Any]]) -> list[dict[str, Any]]:
@@ -143,8 +112,6 @@ def _group_modules_by_sections(modules: list[dict[str, Any]]) -> list[dict[str,
 
 
 if TYPE_CHECKING:  # apenas para tipos
-    from collections.abc import Callable
-
     from django.http import HttpRequest
 
 
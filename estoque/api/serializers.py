@@ -252,10 +252,23 @@ class RegraReabastecimentoSerializer(serializers.ModelSerializer):
             "lead_time_dias",
             "estrategia",
             "ativo",
+            "demanda_diaria_prevista",
+            "estoque_seguranca",
+            "ponto_pedido",
+            "mape",
+            "forecast_em",
+            "criado_em",
+            "atualizado_em",
+        ]
+        read_only_fields = [
+            "demanda_diaria_prevista",
+            "estoque_seguranca",
+            "ponto_pedido",
+            "mape",
+            "forecast_em",
             "criado_em",
             "atualizado_em",
         ]
-        read_only_fields = ["criado_em", "atualizado_em"]
 
 
 class InventarioCiclicoSerializer(serializers.ModelSerializer):
@@ -214,6 +214,30 @@ class MovimentoEstoqueViewSet(viewsets.ReadOnlyModelViewSet):
         except (NegocioError, SaldoInsuficienteError) as e:
             return Response({"detail": str(e)}, status=400)
 
+    @action(detail=False, methods=["get"])
+    def disponibilidade_bom(self, request):
+        """Consigo produzir N unidades? ?produto_id_final=&deposito_id=&quantidade="""
+        from estoque.services.bom_explosao import disponibilidade
+
+        params = request.query_params
+        try:
+            resultado = disponibilidade(
+                int(params["produto_id_final"]), int(params["deposito_id"]), Decimal(params.get("quantidade", "1"))
+            )
+        except (KeyError, ValueError, ArithmeticError):
+            return Response({"detail": "Informe produto_id_final, deposito_id e quantidade válidos"}, status=400)
+        except NegocioError as e:
+            return Response({"detail": str(e)}, status=400)
+        return Response(
+            {
+                "produto_id": resultado.produto_id,
+                "quantidade": str(resultado.quantidade),
+                "possivel": resultado.possivel,
+                "maximo": resultado.maximo,
+                "faltas": {str(k): str(v) for k, v in resultado.faltas.items()},
+            }
+        )
+
     @action(detail=True, methods=["post"], permission_classes=[IsAuthenticated])
     def aprovar(self, request, pk=None):
         if not request.user.has_perm("estoque.pode_aprovar_movimento"):
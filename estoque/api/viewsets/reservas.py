@@ -191,23 +191,9 @@ class ReservaEstoqueViewSet(viewsets.ModelViewSet):
         if not request.user.is_staff:
             return Response({"detail": "Permissão insuficiente"}, status=status.HTTP_403_FORBIDDEN)
 
-        agora = timezone.now()
         tenant = getattr(request, "tenant", None)
-        reservas_vencidas = ReservaEstoque.objects.filter(
-            status="ATIVA",
-            expira_em__lt=agora,
-        )
-        if tenant:
-            reservas_vencidas = reservas_vencidas.filter(tenant=tenant)
-
-        total_expiradas = 0
-        for reserva in reservas_vencidas:
-            try:
-                ReservaService.expirar_reserva(reserva.id)
-                total_expiradas += 1
-            except Exception:
-                # Log erro mas continua processando
-                continue
+        resultado = ReservaService.processar_expiracoes_automaticas(tenant=tenant or None)
+        total_expiradas = resultado["total_processadas"]
 
         return Response({"detail": f"{total_expiradas} reservas expiradas com sucesso"})
 
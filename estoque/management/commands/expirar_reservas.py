@@ -1,18 +1,19 @@
 from django.core.management.base import BaseCommand
-from django.utils import timezone
 
-from estoque.models import ReservaEstoque
+from estoque.services.expiracao_reservas import expirar_vencidas
 
 
 class Command(BaseCommand):
-    help = "Expira reservas de estoque cujo expira_em passou."
+    help = "Expira reservas de estoque cujo expira_em passou (em lote, liberando o saldo reservado)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--bloco", type=int, default=None, help="Reservas por transação (default: settings)")
 
     def handle(self, *args, **options):
-        agora = timezone.now()
-        qs = ReservaEstoque.objects.filter(status="ATIVA", expira_em__isnull=False, expira_em__lt=agora)
-        count = 0
-        for r in qs.iterator():
-            r.status = "EXPIRADA"
-            r.save(update_fields=["status", "atualizado_em"])
-            count += 1
-        self.stdout.write(self.style.SUCCESS(f"Reservas expiradas: {count}"))
+        resultado = expirar_vencidas(bloco=options["bloco"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Reservas expiradas: {resultado.reservas} (saldos atualizados: {resultado.saldos}, "
+                f"blocos: {resultado.blocos})"
+            )
+        )
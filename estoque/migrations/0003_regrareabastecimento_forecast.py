@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("estoque", "0002_logauditoriaestoque_evidencias_ids_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="regrareabastecimento",
+            name="demanda_diaria_prevista",
+            field=models.DecimalField(blank=True, decimal_places=4, max_digits=14, null=True),
+        ),
+        migrations.AddField(
+            model_name="regrareabastecimento",
+            name="estoque_seguranca",
+            field=models.DecimalField(blank=True, decimal_places=4, max_digits=14, null=True),
+        ),
+        migrations.AddField(
+            model_name="regrareabastecimento",
+            name="forecast_em",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="regrareabastecimento",
+            name="mape",
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=9, null=True),
+        ),
+        migrations.AddField(
+            model_name="regrareabastecimento",
+            name="ponto_pedido",
+            field=models.DecimalField(blank=True, decimal_places=4, max_digits=14, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="regrareabastecimento",
+            index=models.Index(fields=["tenant", "estrategia", "ativo"], name="estoque_reg_tenant__13464f_idx"),
+        ),
+    ]
@@ -0,0 +1,16 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("estoque", "0003_regrareabastecimento_forecast"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="reservaestoque",
+            index=models.Index(fields=["status", "expira_em", "id"], name="estoque_res_status_590b3a_idx"),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("estoque", "0004_reservaestoque_status_expira_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="reservaestoque",
+            name="cancelada_em",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -177,11 +177,11 @@ class ReservaEstoque(models.Model):
     expira_em = models.DateTimeField(blank=True, null=True)
     criado_em = models.DateTimeField(auto_now_add=True)
     atualizado_em = models.DateTimeField(auto_now=True)
+    cancelada_em = models.DateTimeField(blank=True, null=True)  # cancelamento ou expiração
     # Campos voláteis (não persistidos) para compatibilidade
     motivo = None  # usado em logs antigos
     observacoes = None
     criado_por = None
-    cancelada_em = None
     consumida_em = None
 
     class Meta:
@@ -189,6 +189,7 @@ class ReservaEstoque(models.Model):
             models.Index(fields=["produto", "deposito"]),
             models.Index(fields=["status"]),
             models.Index(fields=["expira_em"]),
+            models.Index(fields=["status", "expira_em", "id"]),  # keyset da expiração em lote
         ]
 
     def __str__(self):
@@ -196,7 +197,7 @@ class ReservaEstoque(models.Model):
 
     def __init__(self, *args, **kwargs):
         # Consumir kwargs legados que não são campos persistidos
-        for legacy in ["motivo", "observacoes", "criado_por", "cancelada_em", "consumida_em"]:
+        for legacy in ["motivo", "observacoes", "criado_por", "consumida_em"]:
             if legacy in kwargs:
                 setattr(self, legacy, kwargs.pop(legacy))
         super().__init__(*args, **kwargs)
@@ -252,6 +253,12 @@ class RegraReabastecimento(models.Model):
     lead_time_dias = models.PositiveIntegerField(default=0)
     estrategia = models.CharField(max_length=20, choices=ESTRATEGIA_CHOICES, default="FIXO")
     ativo = models.BooleanField(default=True)
+    # Resultado da última execução do forecast (estratégia FORECAST; ver estoque.services.forecast)
+    demanda_diaria_prevista = models.DecimalField(max_digits=14, decimal_places=4, blank=True, null=True)
+    estoque_seguranca = models.DecimalField(max_digits=14, decimal_places=4, blank=True, null=True)
+    ponto_pedido = models.DecimalField(max_digits=14, decimal_places=4, blank=True, null=True)
+    mape = models.DecimalField(max_digits=9, decimal_places=2, blank=True, null=True)  # erro percentual médio (%)
+    forecast_em = models.DateTimeField(blank=True, null=True)
     criado_em = models.DateTimeField(auto_now_add=True)
     atualizado_em = models.DateTimeField(auto_now=True)
 
@@ -260,11 +267,19 @@ class RegraReabastecimento(models.Model):
         indexes = [
             models.Index(fields=["ativo"]),
             models.Index(fields=["produto", "deposito"]),
+            models.Index(fields=["tenant", "estrategia", "ativo"]),
         ]
 
     def __str__(self):
         return f"RegraReabast prod={self.produto_id} dep={self.deposito_id} min={self.estoque_min}"
 
+    @property
+    def limiar_reposicao(self):
+        """Nível que dispara o alerta: ponto de pedido do forecast ou ``estoque_min``."""
+        if self.estrategia == "FORECAST" and self.ponto_pedido is not None:
+            return self.ponto_pedido
+        return self.estoque_min
+
 
 class Lote(models.Model):
     produto = models.ForeignKey("produtos.Produto", on_delete=models.CASCADE, related_name="lotes")
@@ -0,0 +1,266 @@
+"""Explosão multinível de BOM e consumo em lote.
+
+``explodir`` lê a estrutura inteira abaixo de um produto com uma única CTE recursiva
+sobre ``ProdutoBOMItem`` (arestas ativas alcançáveis + detecção de ciclo pelo caminho
+percorrido) e agrega em ``Decimal`` a necessidade por unidade de cada item folha
+(componente sem BOM ativa), aplicando ``perda_perc`` em todos os níveis::
+
+    necessidade(folha) = soma_caminhos( produto( qtd_por_unidade * (1 + perda_perc/100) ) )
+
+O resultado por unidade fica em cache (``versao`` global incrementada a cada alteração
+de ``ProdutoBOMItem``) e alimenta:
+
+* ``disponibilidade`` — "consigo produzir N unidades?" com uma consulta de saldos;
+* ``consumir_explosao`` — trava os saldos das folhas com um único ``SELECT ... FOR
+  UPDATE`` ordenado por ``produto_id`` (ordem determinística: ordens de produção
+  concorrentes não se travam mutuamente), valida tudo antes de gravar, baixa as
+  quantidades com um ``bulk_update`` e grava os movimentos ``CONSUMO_BOM`` em
+  ``bulk_create``.
+"""
+
+from __future__ import annotations
+
+import contextlib
+from collections import defaultdict
+from dataclasses import dataclass, field
+from decimal import ROUND_FLOOR, Decimal
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils import timezone
+
+from estoque.models import Deposito, EstoqueSaldo, MovimentoEstoque
+from estoque.services.kpis import invalidar_kpis
+from estoque.signals import auditar_movimentos, movimento_registrado
+from produtos.models import Produto, ProdutoBOMItem
+from shared.exceptions import NegocioError, SaldoInsuficienteError
+
+__all__ = [
+    "MAX_NIVEIS",
+    "Disponibilidade",
+    "consumir_explosao",
+    "disponibilidade",
+    "explodir",
+    "invalidar_cache",
+]
+
+MAX_NIVEIS = 25
+_Q4 = Decimal("0.0001")
+_CHAVE_VERSAO = "estoque:bom:versao"
+_CACHE_TTL = 60 * 60 * 24
+
+
+@dataclass(frozen=True)
+class Disponibilidade:
+    produto_id: int
+    quantidade: Decimal
+    possivel: bool
+    maximo: int  # unidades inteiras produzíveis com o saldo disponível atual
+    faltas: dict[int, Decimal] = field(default_factory=dict)  # componente_id -> quantidade faltante
+
+
+def _sql_arestas() -> str:
+    tabela = connection.ops.quote_name(ProdutoBOMItem._meta.db_table)  # noqa: SLF001
+    # caminho = ",id1,id2,...,": aresta cujo componente já está no caminho é marcada como
+    # ciclo e não é expandida. LIKE precisa de %% por causa do paramstyle.
+    return f"""
+        WITH RECURSIVE arvore(produto_pai_id, componente_id, caminho, nivel, ciclo) AS (
+            SELECT b.produto_pai_id, b.componente_id,
+                   ',' || b.produto_pai_id || ',' || b.componente_id || ',',
+                   1,
+                   CASE WHEN b.componente_id = b.produto_pai_id THEN 1 ELSE 0 END
+              FROM {tabela} b
+             WHERE b.produto_pai_id = %s AND b.ativo = %s
+            UNION ALL
+            SELECT b.produto_pai_id, b.componente_id,
+                   a.caminho || b.componente_id || ',',
+                   a.nivel + 1,
+                   CASE WHEN a.caminho LIKE '%%,' || b.componente_id || ',%%' THEN 1 ELSE 0 END
+              FROM {tabela} b
+              JOIN arvore a ON b.produto_pai_id = a.componente_id
+             WHERE b.ativo = %s AND a.ciclo = 0 AND a.nivel < %s
+        )
+        SELECT DISTINCT b.produto_pai_id, b.componente_id, b.quantidade_por_unidade, b.perda_perc,
+               a.ciclo, a.nivel, a.caminho
+          FROM arvore a
+          JOIN {tabela} b ON b.produto_pai_id = a.produto_pai_id AND b.componente_id = a.componente_id
+    """
+
+
+def _arestas(produto_id: int) -> dict[int, list[tuple[int, Decimal]]]:
+    """Filhos diretos (com fator de perda) de todos os nós abaixo do produto — uma consulta."""
+    with connection.cursor() as cursor:
+        cursor.execute(_sql_arestas(), [produto_id, True, True, MAX_NIVEIS])
+        linhas = cursor.fetchall()
+    filhos: dict[int, dict[int, Decimal]] = defaultdict(dict)
+    for pai, componente, qtd, perda, ciclo, nivel, caminho in linhas:
+        if ciclo:
+            msg = f"Ciclo na estrutura BOM do produto {produto_id}: {caminho.strip(',')},{componente}"
+            raise NegocioError(msg)
+        if nivel >= MAX_NIVEIS:  # a CTE parou de expandir: folhas deste ramo seriam falsas
+            msg = f"Estrutura BOM do produto {produto_id} excede {MAX_NIVEIS} níveis"
+            raise NegocioError(msg)
+        fator = Decimal(str(qtd)) * (1 + Decimal(str(perda or 0)) / 100)
+        filhos[pai][componente] = fator
+    return {pai: list(comps.items()) for pai, comps in filhos.items()}
+
+
+def _agregar_folhas(produto_id: int, filhos: dict[int, list[tuple[int, Decimal]]]) -> dict[int, Decimal]:
+    """Necessidade por unidade de cada folha (memoização por subárvore)."""
+    memo: dict[int, dict[int, Decimal]] = {}
+
+    def visitar(no: int) -> dict[int, Decimal]:
+        if no in memo:
+            return memo[no]
+        total: dict[int, Decimal] = defaultdict(Decimal)
+        for componente, fator in filhos.get(no, []):
+            if componente in filhos:
+                for folha, qtd in visitar(componente).items():
+                    total[folha] += fator * qtd
+            else:
+                total[componente] += fator
+        memo[no] = dict(total)
+        return memo[no]
+
+    return visitar(produto_id)
+
+
+def _versao() -> int:
+    versao = cache.get(_CHAVE_VERSAO)
+    if versao is None:
+        cache.add(_CHAVE_VERSAO, 1, timeout=None)
+        versao = cache.get(_CHAVE_VERSAO, 1)
+    return versao
+
+
+def invalidar_cache() -> None:
+    """Qualquer alteração de BOM pode afetar todos os ancestrais: troca a versão global."""
+    try:
+        cache.incr(_CHAVE_VERSAO)
+    except ValueError:
+        cache.set(_CHAVE_VERSAO, 2, timeout=None)
+
+
+def explodir(produto: Produto | int, *, usar_cache: bool = True) -> dict[int, Decimal]:
+    """Necessidade por unidade do produto, por item folha (``{componente_id: qtd}``)."""
+    produto_id = getattr(produto, "pk", produto)
+    chave = f"estoque:bom:explosao:{_versao()}:{produto_id}"
+    if usar_cache:
+        em_cache = cache.get(chave)
+        if em_cache is not None:
+            return {int(k): Decimal(v) for k, v in em_cache.items()}
+    folhas = _agregar_folhas(produto_id, _arestas(produto_id))
+    cache.set(chave, {k: str(v) for k, v in folhas.items()}, _CACHE_TTL)
+    return folhas
+
+
+def _necessidades(produto_id: int, quantidade: Decimal) -> dict[int, Decimal]:
+    return {c: (q * quantidade).quantize(_Q4) for c, q in sorted(explodir(produto_id).items())}
+
+
+def disponibilidade(produto: Produto | int, deposito: Deposito | int, quantidade: Decimal) -> Disponibilidade:
+    """Verifica se há saldo disponível (quantidade - reservado) para produzir ``quantidade``."""
+    produto_id = getattr(produto, "pk", produto)
+    quantidade = Decimal(str(quantidade))
+    por_unidade = explodir(produto_id)
+    if not por_unidade:
+        raise NegocioError("Produto final não possui BOM definida.")
+    disponivel = {
+        pid: qtd - reservado
+        for pid, qtd, reservado in EstoqueSaldo.objects.filter(
+            deposito_id=getattr(deposito, "pk", deposito), produto_id__in=por_unidade
+        ).values_list("produto_id", "quantidade", "reservado")
+    }
+    faltas = {}
+    maximo = None
+    for componente, unidade in sorted(por_unidade.items()):
+        livre = max(disponivel.get(componente, Decimal(0)), Decimal(0))
+        necessario = (unidade * quantidade).quantize(_Q4)
+        if livre < necessario:
+            faltas[componente] = necessario - livre
+        if unidade > 0:
+            unidades = int((livre / unidade).to_integral_value(rounding=ROUND_FLOOR))
+            maximo = unidades if maximo is None else min(maximo, unidades)
+    return Disponibilidade(
+        produto_id=produto_id, quantidade=quantidade, possivel=not faltas, maximo=maximo or 0, faltas=faltas
+    )
+
+
+@transaction.atomic
+def consumir_explosao(  # noqa: PLR0913, PLR0917
+    produto_final,
+    deposito: Deposito,
+    quantidade_final: Decimal,
+    usuario,
+    origem_tipo=None,
+    origem_id=None,
+    aplicar=True,
+):
+    """Consome os itens folha da BOM multinível de ``produto_final`` (tudo ou nada)."""
+    if quantidade_final <= 0:
+        raise NegocioError("Quantidade final deve ser positiva.")
+    necessidades = _necessidades(produto_final.pk, quantidade_final)
+    if not necessidades:
+        raise NegocioError("Produto final não possui BOM definida.")
+    from estoque.services.valuation import consumir_fifo_e_atualizar, is_fifo  # noqa: PLC0415
+
+    # Garante as linhas de saldo (componentes sem saldo ainda) antes do lock único
+    existentes = set(
+        EstoqueSaldo.objects.filter(deposito=deposito, produto_id__in=necessidades).values_list("produto_id", flat=True)
+    )
+    faltantes = [pid for pid in necessidades if pid not in existentes]
+    if faltantes:
+        EstoqueSaldo.objects.bulk_create(
+            [EstoqueSaldo(produto_id=pid, deposito=deposito) for pid in faltantes], ignore_conflicts=True
+        )
+    saldos = list(
+        EstoqueSaldo.objects.select_for_update()
+        .filter(deposito=deposito, produto_id__in=necessidades)
+        .order_by("produto_id")
+    )
+    for saldo in saldos:  # valida tudo antes de alterar qualquer saldo
+        livre = saldo.quantidade - saldo.reservado
+        if livre < necessidades[saldo.produto_id]:
+            raise SaldoInsuficienteError(saldo.produto_id, deposito.id, necessidades[saldo.produto_id], livre)
+
+    componentes = Produto.objects.in_bulk(list(necessidades))
+    agora = timezone.now()
+    custos = {}
+    for saldo in saldos:
+        componente = componentes[saldo.produto_id]
+        qtd = necessidades[saldo.produto_id]
+        custos[saldo.produto_id] = saldo.custo_medio
+        if aplicar:
+            if is_fifo(componente):
+                with contextlib.suppress(Exception):
+                    custos[saldo.produto_id] = consumir_fifo_e_atualizar(componente, deposito, qtd)
+            saldo.quantidade -= qtd
+            saldo.atualizado_em = agora
+    if aplicar:
+        # Só quantidade/atualizado_em: custo_medio pode ter sido recalculado pelo FIFO acima
+        EstoqueSaldo.objects.bulk_update(saldos, ["quantidade", "atualizado_em"])
+
+    metadata = {"produto_final_id": produto_final.id, "qtd_final": str(quantidade_final)}
+    movimentos = MovimentoEstoque.objects.bulk_create(
+        [
+            MovimentoEstoque(
+                produto=componentes[pid],
+                deposito_origem=deposito,
+                tipo="CONSUMO_BOM",
+                quantidade=qtd,
+                custo_unitario_snapshot=custos[pid],
+                usuario_executante=usuario,
+                solicitante_tipo=origem_tipo,
+                solicitante_id=origem_id,
+                metadata=metadata,
+            )
+            for pid, qtd in necessidades.items()
+        ]
+    )
+    # bulk_create não dispara post_save: mesma trilha de auditoria (hash encadeado) e broadcast
+    auditar_movimentos(movimentos)
+    for mov in movimentos:
+        with contextlib.suppress(Exception):
+            movimento_registrado.send(sender=MovimentoEstoque, movimento=mov, acao="CONSUMO_BOM")
+    invalidar_kpis(getattr(produto_final, "tenant", None))
+    return movimentos
@@ -0,0 +1,223 @@
+"""Expiração de reservas de estoque em lote (baseada em conjuntos).
+
+``expirar_vencidas`` substitui o laço reserva a reserva de ``ReservaService.expirar_reserva``:
+
+1. percorre as reservas ATIVAS vencidas em blocos ordenados por ``(expira_em, id)``
+   (keyset, sem OFFSET), cada bloco em sua própria transação curta;
+2. marca o bloco como EXPIRADA (com ``cancelada_em``) em um único ``UPDATE``;
+3. soma as quantidades por (produto, depósito) e libera o ``reservado`` de cada
+   saldo com um ``UPDATE`` por par;
+4. grava os movimentos ``LIB_RESERVA`` em um ``bulk_create`` e os respectivos logs de
+   auditoria encadeados (``tipo_especial="RESERVA_EXPIRADA"``) em outro;
+5. após o commit, emite um broadcast por tenant com os IDs do bloco.
+
+Agendamento tipo *time wheel*: ``agendar_expiracao`` arredonda ``expira_em`` para o
+próximo slot de ``ESTOQUE_RESERVA_SLOT_SEGUNDOS`` e agenda uma única task Celery por
+slot (ETA = fim do slot), de modo que a expiração acontece perto do prazo sem
+varreduras periódicas completas. Só prazos dentro de ``ESTOQUE_RESERVA_HORIZONTE_SEGUNDOS``
+viram task na hora: ETAs longas ficariam dias como mensagem não confirmada no Redis e
+seriam reentregues a cada ``visibility_timeout``. A task periódica
+``expirar_reservas_vencidas`` expira o que ficou para trás (broker perdeu ou recusou a
+mensagem) e agenda, com ``agendar_proximos_slots``, os slots que entraram no horizonte.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import logging
+import math
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import UTC, datetime, timedelta
+from decimal import Decimal
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Q, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from estoque.models import EstoqueSaldo, MovimentoEstoque, ReservaEstoque
+from estoque.signals import auditar_movimentos
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    "ResultadoExpiracao",
+    "agendar_expiracao",
+    "agendar_proximos_slots",
+    "expirar_vencidas",
+    "slot_de",
+]
+
+_CHAVE_SLOT = "estoque:reservas:slot:{slot}"
+
+
+@dataclass
+class ResultadoExpiracao:
+    reservas: int = 0
+    saldos: int = 0
+    blocos: int = 0
+    ids: list[int] = field(default_factory=list)
+
+
+def _tamanho_bloco() -> int:
+    return int(getattr(settings, "ESTOQUE_RESERVA_EXPIRACAO_BLOCO", 500))
+
+
+def _slot_segundos() -> int:
+    return max(int(getattr(settings, "ESTOQUE_RESERVA_SLOT_SEGUNDOS", 60)), 1)
+
+
+def _horizonte_segundos() -> int:
+    return max(int(getattr(settings, "ESTOQUE_RESERVA_HORIZONTE_SEGUNDOS", 3600)), _slot_segundos())
+
+
+def _expirar_bloco(linhas: list[tuple], agora: datetime) -> tuple[list[tuple], int]:
+    """Expira um bloco já travado; retorna as linhas expiradas e o nº de saldos atualizados."""
+    if not linhas:
+        return [], 0
+    ReservaEstoque.objects.filter(id__in=[linha[0] for linha in linhas]).update(
+        status="EXPIRADA", cancelada_em=agora, atualizado_em=agora
+    )
+
+    deltas: dict[tuple[int, int], Decimal] = defaultdict(Decimal)
+    for _id, produto_id, deposito_id, _tenant_id, quantidade, _origem_tipo, _origem_id in linhas:
+        deltas[(produto_id, deposito_id)] += quantidade
+    for (produto_id, deposito_id), delta in deltas.items():
+        EstoqueSaldo.objects.filter(produto_id=produto_id, deposito_id=deposito_id).update(
+            reservado=Greatest(F("reservado") - delta, Value(Decimal(0))),
+            atualizado_em=agora,
+        )
+
+    movimentos = MovimentoEstoque.objects.bulk_create(
+        [
+            MovimentoEstoque(
+                produto_id=produto_id,
+                tenant_id=tenant_id,
+                deposito_origem_id=deposito_id,
+                tipo="LIB_RESERVA",
+                quantidade=quantidade,
+                motivo=f"Expiração automática da reserva #{reserva_id}",
+                solicitante_tipo="RESERVA",
+                solicitante_id=str(reserva_id),
+                metadata={"reserva_id": reserva_id, "origem_tipo": origem_tipo, "origem_id": origem_id},
+                aplicado_em=agora,
+            )
+            for reserva_id, produto_id, deposito_id, tenant_id, quantidade, origem_tipo, origem_id in linhas
+        ],
+        batch_size=500,
+    )
+    # bulk_create não dispara post_save: mantém a cadeia de hashes e o broadcast por movimento
+    auditar_movimentos(movimentos, tipo_especial="RESERVA_EXPIRADA")
+    return linhas, len(deltas)
+
+
+def expirar_vencidas(agora: datetime | None = None, *, tenant=None, bloco: int | None = None) -> ResultadoExpiracao:
+    """Expira todas as reservas ATIVAS com ``expira_em <= agora`` (opcionalmente de um tenant)."""
+    agora = agora or timezone.now()
+    bloco = bloco or _tamanho_bloco()
+    resultado = ResultadoExpiracao()
+    base = ReservaEstoque.objects.filter(status="ATIVA", expira_em__isnull=False, expira_em__lte=agora)
+    if tenant is not None:
+        base = base.filter(tenant=tenant)
+    cursor: tuple[datetime, int] | None = None
+    while True:
+        qs = base
+        if cursor is not None:
+            qs = qs.filter(Q(expira_em__gt=cursor[0]) | Q(expira_em=cursor[0], id__gt=cursor[1]))
+        with transaction.atomic():
+            chaves = list(
+                qs.select_for_update(skip_locked=True)
+                .order_by("expira_em", "id")
+                .values_list("id", "expira_em")[:bloco]
+            )
+            if not chaves:
+                break
+            cursor = chaves[-1][1], chaves[-1][0]
+            # Relê com status: consumo/cancelamento concorrente (sem lock no SQLite) vence
+            linhas = list(
+                ReservaEstoque.objects.filter(id__in=[c[0] for c in chaves], status="ATIVA")
+                .order_by("expira_em", "id")
+                .values_list("id", "produto_id", "deposito_id", "tenant_id", "quantidade", "origem_tipo", "origem_id")
+            )
+            expiradas, saldos = _expirar_bloco(linhas, agora)
+            if expiradas:
+                transaction.on_commit(lambda e=expiradas: _broadcast_bloco(e))
+        resultado.blocos += 1
+        resultado.reservas += len(expiradas)
+        resultado.saldos += saldos
+        resultado.ids.extend(linha[0] for linha in expiradas)
+        if len(chaves) < bloco:
+            break
+    if resultado.reservas:
+        from estoque.services.kpis import invalidar_kpis  # noqa: PLC0415 - evita ciclo de import
+
+        invalidar_kpis(tenant)
+    return resultado
+
+
+def _broadcast_bloco(linhas: list[tuple]) -> None:
+    por_tenant: dict[int | None, list[int]] = defaultdict(list)
+    for linha in linhas:
+        por_tenant[linha[3]].append(linha[0])
+    with contextlib.suppress(Exception):
+        layer = get_channel_layer()
+        for tenant_id, ids in por_tenant.items():
+            grupos = ["estoque_stream"] + ([f"estoque_tenant_{tenant_id}"] if tenant_id else [])
+            mensagem = {"type": "estoque_event", "data": {"event": "estoque.reservas_expiradas", "reserva_ids": ids}}
+            async_to_sync(_enviar)(layer, grupos, mensagem)
+
+
+async def _enviar(layer, grupos, mensagem):
+    for g in grupos:
+        await layer.group_send(g, mensagem)
+
+
+# --- Time wheel ---------------------------------------------------------------------
+def slot_de(expira_em: datetime) -> int:
+    """Fim (epoch) do slot que contém ``expira_em``."""
+    largura = _slot_segundos()
+    return math.ceil(expira_em.timestamp() / largura) * largura
+
+
+def agendar_expiracao(expira_em: datetime | None, *, agora: datetime | None = None) -> bool:
+    """Garante uma task por slot para o prazo; retorna True se agendou uma nova."""
+    if expira_em is None or getattr(settings, "CELERY_TASK_ALWAYS_EAGER", False):
+        return False  # eager executaria já (ETA ignorada); a varredura de segurança cobre
+    agora = agora or timezone.now()
+    if (expira_em - agora).total_seconds() > _horizonte_segundos():
+        return False  # fora do horizonte: agendar_proximos_slots agenda quando o prazo se aproximar
+    slot = slot_de(expira_em)
+    # TTL além do ETA: o slot não é reagendado enquanto sua task estiver pendente
+    chave = _CHAVE_SLOT.format(slot=slot)
+    if not cache.add(chave, 1, timeout=max(slot - int(agora.timestamp()), 0) + 3600):
+        return False
+    from estoque.tasks import expirar_reservas_slot  # noqa: PLC0415 - tasks importa este módulo
+
+    try:
+        expirar_reservas_slot.apply_async(args=[slot], eta=datetime.fromtimestamp(slot, tz=UTC))
+    except Exception:  # noqa: BLE001 - roda em on_commit: a reserva já foi gravada
+        # Libera o slot para a próxima reserva tentar de novo; até lá a varredura periódica cobre
+        cache.delete(chave)
+        logger.warning("Falha ao agendar expiração do slot %s; fica para a varredura periódica", slot, exc_info=True)
+        return False
+    return True
+
+
+def agendar_proximos_slots(agora: datetime | None = None) -> int:
+    """Agenda os slots das reservas ATIVAS que vencem dentro do horizonte; retorna quantos agendou."""
+    agora = agora or timezone.now()
+    prazos = (
+        ReservaEstoque.objects.filter(
+            status="ATIVA", expira_em__gt=agora, expira_em__lte=agora + timedelta(seconds=_horizonte_segundos())
+        )
+        .order_by()
+        .values_list("expira_em", flat=True)
+        .distinct()
+    )
+    por_slot = {slot_de(prazo): prazo for prazo in prazos.iterator()}
+    return sum(agendar_expiracao(prazo, agora=agora) for prazo in por_slot.values())
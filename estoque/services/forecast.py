@@ -0,0 +1,223 @@
+"""Forecast de demanda para a estratégia FORECAST de ``RegraReabastecimento``.
+
+Executado em lote por tenant (task ``estoque.tasks.atualizar_forecast_reabastecimento``):
+
+1. ``serie_demanda``: uma única consulta agrega as saídas (SAIDA, CONSUMO_BOM,
+   TRANSFER) por (produto, depósito de origem, dia) e monta uma matriz ``numpy``
+   regras x dias;
+2. ``holt_winters``: suavização exponencial com tendência e sazonalidade aditivas
+   (semanal por padrão), vetorizada — o laço percorre os dias, cada passo atualiza
+   todas as regras de uma vez;
+3. estoque de segurança ``z * sigma_erro * sqrt(lead_time)`` e ponto de pedido
+   ``demanda prevista no lead time + estoque de segurança``; o MAPE das previsões
+   um passo à frente (dias com demanda > 0) é gravado em cada regra;
+4. os saldos de todas as regras ativas do tenant são avaliados contra
+   ``limiar_reposicao`` e os alertas saem em um único broadcast.
+
+Parâmetros em settings: ``ESTOQUE_FORECAST_HISTORICO_DIAS``, ``ESTOQUE_FORECAST_SAZONALIDADE``,
+``ESTOQUE_FORECAST_ALPHA``/``BETA``/``GAMMA`` e ``ESTOQUE_FORECAST_NIVEL_SERVICO``.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from decimal import Decimal
+from statistics import NormalDist
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from estoque.models import EstoqueSaldo, MovimentoEstoque, RegraReabastecimento
+from estoque.services.reabastecimento import _broadcast, payload_alerta
+
+__all__ = [
+    "TIPOS_DEMANDA",
+    "Previsao",
+    "ResultadoForecast",
+    "executar_forecast",
+    "holt_winters",
+    "serie_demanda",
+]
+
+TIPOS_DEMANDA = ("SAIDA", "CONSUMO_BOM", "TRANSFER")
+_Q4 = Decimal("0.0001")
+_Q2 = Decimal("0.01")
+
+
+def _param(nome: str, default):
+    return type(default)(getattr(settings, nome, default))
+
+
+@dataclass(frozen=True)
+class Previsao:
+    """Saída vetorizada de ``holt_winters`` (um elemento por série)."""
+
+    ajustado: np.ndarray  # previsões um passo à frente (mesma forma da série)
+    futuro: np.ndarray  # regras x horizonte, truncado em zero
+    mape: np.ndarray  # % (nan quando não há dias com demanda)
+    sigma: np.ndarray  # desvio padrão do erro um passo à frente
+
+
+@dataclass(frozen=True)
+class ResultadoForecast:
+    tenant_id: int | None
+    regras: int
+    alertas: list[dict]
+    mape_medio: float | None
+
+
+def holt_winters(  # noqa: PLR0913
+    serie: np.ndarray,
+    *,
+    horizonte: int,
+    periodo: int = 7,
+    alpha: float = 0.3,
+    beta: float = 0.05,
+    gamma: float = 0.2,
+) -> Previsao:
+    """Holt-Winters aditivo sobre ``serie`` (regras x dias), todas as linhas de uma vez."""
+    serie = np.asarray(serie, dtype=np.float64)
+    n_series, n = serie.shape
+    if n < 2 * periodo:  # histórico curto: sem componente sazonal
+        periodo = 1
+    nivel = serie[:, :periodo].mean(axis=1)
+    tendencia = (serie[:, periodo : 2 * periodo].mean(axis=1) - nivel) / periodo if n >= 2 * periodo else 0 * nivel
+    sazonal = serie[:, :periodo] - nivel[:, None]
+    ajustado = np.empty_like(serie)
+    for t in range(n):
+        s = sazonal[:, t % periodo]
+        ajustado[:, t] = nivel + tendencia + s
+        novo_nivel = alpha * (serie[:, t] - s) + (1 - alpha) * (nivel + tendencia)
+        tendencia = beta * (novo_nivel - nivel) + (1 - beta) * tendencia
+        sazonal[:, t % periodo] = gamma * (serie[:, t] - novo_nivel) + (1 - gamma) * s
+        nivel = novo_nivel
+
+    passos = np.arange(1, horizonte + 1)
+    indices_sazonais = (n - 1 + passos) % periodo
+    futuro = np.maximum(nivel[:, None] + passos[None, :] * tendencia[:, None] + sazonal[:, indices_sazonais], 0.0)
+
+    # Métricas só a partir de uma estação após a primeira demanda de cada série
+    # (inicialização e produtos recém-lançados enviesam os primeiros passos)
+    primeira = np.where((serie > 0).any(axis=1), (serie > 0).argmax(axis=1), n)
+    valido = np.arange(n)[None, :] >= (primeira + periodo)[:, None]
+    erro = np.where(valido, serie - np.maximum(ajustado, 0.0), 0.0)
+    amostras = valido.sum(axis=1)
+    com_demanda = valido & (serie > 0)
+    dias = com_demanda.sum(axis=1)
+    soma_pct = np.where(com_demanda, np.abs(erro) / np.where(com_demanda, serie, 1.0), 0.0).sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        media_erro = np.where(amostras > 0, erro.sum(axis=1) / amostras, 0.0)
+        variancia = np.where(valido, (erro - media_erro[:, None]) ** 2, 0.0).sum(axis=1)
+        sigma = np.sqrt(np.where(amostras > 0, variancia / np.maximum(amostras, 1), 0.0))
+        mape = np.where(dias > 0, soma_pct / dias * 100, np.nan)
+    return Previsao(ajustado=ajustado, futuro=futuro, mape=mape, sigma=sigma)
+
+
+def serie_demanda(regras: list[RegraReabastecimento], *, dias: int, ate: datetime) -> np.ndarray:
+    """Matriz regras x ``dias`` com a demanda diária até ``ate`` (exclusive), em uma consulta."""
+    matriz = np.zeros((len(regras), dias), dtype=np.float64)
+    if not regras:
+        return matriz
+    linha = {(r.produto_id, r.deposito_id): i for i, r in enumerate(regras)}
+    inicio = ate - timedelta(days=dias)
+    primeiro_dia = timezone.localtime(inicio).date() if timezone.is_aware(inicio) else inicio.date()
+    agregados = (
+        MovimentoEstoque.objects.filter(
+            tipo__in=TIPOS_DEMANDA,
+            aplicado=True,
+            criado_em__gte=inicio,
+            criado_em__lt=ate,
+            produto_id__in={r.produto_id for r in regras},
+            deposito_origem_id__in={r.deposito_id for r in regras},
+        )
+        .annotate(dia=TruncDate("criado_em"))
+        .values_list("produto_id", "deposito_origem_id", "dia")
+        .annotate(total=Sum("quantidade"))
+        .order_by()
+    )
+    for produto_id, deposito_id, dia, total in agregados:
+        i = linha.get((produto_id, deposito_id))
+        coluna = (dia - primeiro_dia).days
+        if i is not None and 0 <= coluna < dias:
+            matriz[i, coluna] += float(total)
+    return matriz
+
+
+def _dec(valor: float, quantum: Decimal) -> Decimal:
+    return Decimal(repr(float(valor))).quantize(quantum)
+
+
+def _atualizar_regras(regras: list[RegraReabastecimento], agora: datetime) -> list[float]:
+    """Calcula forecast/segurança/ponto de pedido/MAPE e grava em ``bulk_update``."""
+    historico = _param("ESTOQUE_FORECAST_HISTORICO_DIAS", 112)
+    periodo = _param("ESTOQUE_FORECAST_SAZONALIDADE", 7)
+    z = NormalDist().inv_cdf(_param("ESTOQUE_FORECAST_NIVEL_SERVICO", 0.95))
+    lead = np.array([max(r.lead_time_dias, 1) for r in regras], dtype=np.int64)
+    horizonte = max(int(lead.max()), periodo)
+
+    serie = serie_demanda(regras, dias=historico, ate=agora)
+    previsao = holt_winters(
+        serie,
+        horizonte=horizonte,
+        periodo=periodo,
+        alpha=_param("ESTOQUE_FORECAST_ALPHA", 0.3),
+        beta=_param("ESTOQUE_FORECAST_BETA", 0.05),
+        gamma=_param("ESTOQUE_FORECAST_GAMMA", 0.2),
+    )
+    # Demanda acumulada no lead time de cada regra: soma prefixada + gather
+    acumulada = np.cumsum(previsao.futuro, axis=1)
+    demanda_lead = acumulada[np.arange(len(regras)), lead - 1]
+    seguranca = z * previsao.sigma * np.sqrt(lead)
+    ponto = demanda_lead + seguranca
+    diaria = previsao.futuro[:, :periodo].mean(axis=1)
+
+    for i, regra in enumerate(regras):
+        regra.demanda_diaria_prevista = _dec(diaria[i], _Q4)
+        regra.estoque_seguranca = _dec(seguranca[i], _Q4)
+        regra.ponto_pedido = _dec(ponto[i], _Q4)
+        regra.mape = None if np.isnan(previsao.mape[i]) else _dec(previsao.mape[i], _Q2)
+        regra.forecast_em = agora
+    RegraReabastecimento.objects.bulk_update(
+        regras,
+        ["demanda_diaria_prevista", "estoque_seguranca", "ponto_pedido", "mape", "forecast_em"],
+        batch_size=500,
+    )
+    return [float(m) for m in previsao.mape if not np.isnan(m)]
+
+
+def _avaliar_saldos(regras: list[RegraReabastecimento]) -> list[dict]:
+    """Compara saldo x ``limiar_reposicao`` de todas as regras (uma consulta de saldos)."""
+    saldos = {
+        (s.produto_id, s.deposito_id): s
+        for s in EstoqueSaldo.objects.filter(
+            produto_id__in={r.produto_id for r in regras}, deposito_id__in={r.deposito_id for r in regras}
+        )
+    }
+    alertas = []
+    for regra in regras:
+        saldo = saldos.get((regra.produto_id, regra.deposito_id))
+        quantidade = saldo.quantidade if saldo is not None else Decimal(0)
+        if quantidade < regra.limiar_reposicao:
+            alertas.append(payload_alerta(regra, quantidade, tenant_id=regra.tenant_id))
+    return alertas
+
+
+def executar_forecast(tenant_id: int | None, *, agora: datetime | None = None) -> ResultadoForecast:
+    """Atualiza o forecast das regras FORECAST do tenant e avalia todas as suas regras ativas."""
+    agora = agora or timezone.now()
+    regras = list(RegraReabastecimento.objects.filter(tenant_id=tenant_id, ativo=True).order_by("id"))
+    forecast = [r for r in regras if r.estrategia == "FORECAST"]
+    mapes = _atualizar_regras(forecast, agora) if forecast else []
+    alertas = _avaliar_saldos(regras) if regras else []
+    if alertas:
+        _broadcast({"event": "reabastecimento.alertas", "tenant_id": tenant_id, "itens": alertas})
+    return ResultadoForecast(
+        tenant_id=tenant_id,
+        regras=len(regras),
+        alertas=alertas,
+        mape_medio=round(sum(mapes) / len(mapes), 2) if mapes else None,
+    )
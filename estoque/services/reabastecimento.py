@@ -4,24 +4,33 @@ from channels.layers import get_channel_layer
 from estoque.models import EstoqueSaldo, RegraReabastecimento
 
 
+def payload_alerta(regra: RegraReabastecimento, quantidade, *, tenant_id=None):
+    """Alerta de reabastecimento (limiar = ponto de pedido do forecast ou estoque_min)."""
+    limiar = regra.limiar_reposicao
+    alvo = regra.estoque_max if regra.estoque_max is not None else limiar
+    sugerido = max(alvo - quantidade, regra.lote_economico or 0)
+    return {
+        "event": "reabastecimento.alerta",
+        "produto_id": regra.produto_id,
+        "deposito_id": regra.deposito_id,
+        "estrategia": regra.estrategia,
+        "quantidade_atual": str(quantidade),
+        "estoque_min": str(regra.estoque_min),
+        "ponto_pedido": str(limiar),
+        "quantidade_sugerida": str(sugerido),
+        "tenant_id": tenant_id,
+    }
+
+
 def avaliar_regras_para_saldo(saldo: EstoqueSaldo):
     try:
         regra = RegraReabastecimento.objects.filter(produto=saldo.produto, deposito=saldo.deposito, ativo=True).first()
         if not regra:
             return None
-        if regra.estrategia == "FORECAST":
-            # Placeholder simples: tratar estoque_min dinamicamente (futuro: modelo estatístico)
-            # Por enquanto reutiliza estoque_min configurado.
-            pass
-        if saldo.quantidade < regra.estoque_min:
-            payload = {
-                "event": "reabastecimento.alerta",
-                "produto_id": saldo.produto_id,
-                "deposito_id": saldo.deposito_id,
-                "quantidade_atual": str(saldo.quantidade),
-                "estoque_min": str(regra.estoque_min),
-                "tenant_id": saldo.tenant_id,
-            }
+        # FORECAST usa o ponto de pedido calculado em lote (estoque.services.forecast);
+        # sem forecast ainda executado, cai em estoque_min.
+        if saldo.quantidade < regra.limiar_reposicao:
+            payload = payload_alerta(regra, saldo.quantidade, tenant_id=saldo.tenant_id)
             _broadcast(payload)
             return payload
     except Exception:
@@ -29,6 +38,11 @@ def avaliar_regras_para_saldo(saldo: EstoqueSaldo):
     return None
 
 
+async def _enviar(layer, grupos, mensagem):
+    for g in grupos:
+        await layer.group_send(g, mensagem)
+
+
 def _broadcast(payload):
     try:
         layer = get_channel_layer()
@@ -36,7 +50,7 @@ def _broadcast(payload):
         tenant_id = payload.get("tenant_id")
         if tenant_id:
             grupos.append(f"estoque_tenant_{tenant_id}")
-        for g in grupos:
-            async_to_sync(layer.group_send)(g, {"type": "estoque_event", "data": payload})
+        # Uma única transição sync->async para todos os grupos
+        async_to_sync(_enviar)(layer, grupos, {"type": "estoque_event", "data": payload})
     except Exception:
         pass
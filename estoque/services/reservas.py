@@ -13,6 +13,7 @@ from django.db import transaction
 from django.utils import timezone
 
 from estoque.models import Deposito, EstoqueSaldo, LogAuditoriaEstoque, MovimentoEstoque, ReservaEstoque
+from estoque.services.expiracao_reservas import agendar_expiracao, expirar_vencidas
 from produtos.models import Produto
 
 User = get_user_model()
@@ -67,6 +68,9 @@ class ReservaService:
         saldo.reservado += quantidade
         saldo.save()
 
+        # Slot da time wheel que processará o vencimento (estoque.services.expiracao_reservas)
+        transaction.on_commit(lambda: agendar_expiracao(reserva.expira_em))
+
         # Log de auditoria simplificado (modelo moderno diferente do legado)
         with contextlib.suppress(Exception):
             LogAuditoriaEstoque.objects.create(
@@ -122,6 +126,28 @@ class ReservaService:
         cls._broadcast_evento({"event": "estoque.reserva_expirada", "reserva_id": reserva.id}, reserva.tenant)
         return reserva
 
+    @classmethod
+    def listar_reservas_expirando(cls, horas=24, tenant=None):
+        """
+        Lista reservas próximas do vencimento
+        """
+        agora = timezone.now()
+        limite = agora + timezone.timedelta(hours=horas)
+
+        return (
+            ReservaEstoque.objects.filter(status="ATIVA", expira_em__lte=limite, expira_em__gt=agora, tenant=tenant)
+            .select_related("produto", "deposito")
+            .order_by("expira_em", "id")
+        )
+
+    @classmethod
+    def processar_expiracoes_automaticas(cls, tenant=None):
+        """
+        Processa expiração automática de reservas vencidas (em lote, ver expiracao_reservas)
+        """
+        resultado = expirar_vencidas(tenant=tenant)
+        return {"total_processadas": resultado.reservas, "total_erros": 0, "erros": []}
+
     @classmethod
     def _broadcast_evento(cls, payload, tenant=None):
         try:
@@ -292,7 +318,7 @@ def criar_reserva(
         existente.agregar_quantidade(qtd)
         return existente
     expira = _tz.now() + _tz.timedelta(days=7)
-    return ReservaEstoque.objects.create(
+    reserva = ReservaEstoque.objects.create(
         produto_id=produto_id,
         deposito_id=deposito_id,
         quantidade=qtd,
@@ -303,6 +329,8 @@ def criar_reserva(
         motivo=motivo,
         criado_por=usuario,
     )
+    transaction.on_commit(lambda: agendar_expiracao(expira))
+    return reserva
 
 
 def liberar_reserva(reserva: ReservaEstoque, usuario=None, motivo="Liberação de reserva"):
@@ -311,54 +339,3 @@ def liberar_reserva(reserva: ReservaEstoque, usuario=None, motivo="Liberação d
     reserva.status = "CANCELADA"
     reserva.save(update_fields=["status", "atualizado_em"])
     return reserva
-
-    # Mantidos helpers antigos como funções soltas para compat
-
-    @classmethod
-    def listar_reservas_expirando(cls, horas=24, tenant=None):
-        """
-        Lista reservas próximas do vencimento
-        """
-        limite = timezone.now() + timezone.timedelta(hours=horas)
-
-        return (
-            ReservaEstoque.objects.filter(
-                status="ATIVA", expira_em__lte=limite, expira_em__gt=timezone.now(), tenant=tenant
-            )
-            .select_related("produto", "deposito", "criado_por")
-            .order_by("expira_em")
-        )
-
-    @classmethod
-    def processar_expiracoes_automaticas(cls, tenant=None):
-        """
-        Processa expiração automática de reservas vencidas
-        """
-        agora = timezone.now()
-        reservas_vencidas = ReservaEstoque.objects.filter(status="ATIVA", expira_em__lt=agora, tenant=tenant)
-
-        total_processadas = 0
-        erros = []
-
-        for reserva in reservas_vencidas:
-            try:
-                cls.expirar_reserva(reserva.id)
-                total_processadas += 1
-            except Exception as e:
-                erros.append({"reserva_id": reserva.id, "erro": str(e)})
-
-        return {"total_processadas": total_processadas, "total_erros": len(erros), "erros": erros}
-
-    @classmethod
-    def _broadcast_evento(cls, payload, tenant=None):
-        """Broadcast de eventos via WebSocket"""
-        try:
-            layer = get_channel_layer()
-            grupos = ["estoque_stream"]
-            if tenant:
-                grupos.append(f"estoque_tenant_{tenant.id}")
-
-            for grupo in grupos:
-                async_to_sync(layer.group_send)(grupo, {"type": "estoque_event", "data": payload})
-        except Exception:
-            pass
@@ -3,7 +3,7 @@ import uuid
 
 from asgiref.sync import async_to_sync
 from channels.layers import get_channel_layer
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import Signal, receiver
 from django.utils import timezone
 
@@ -79,17 +79,8 @@ def atualizar_anexos_count(sender, instance: PedidoSeparacaoAnexo, **kwargs):
 
 
 # ---------- Auditoria MovimentoEstoque ----------
-@receiver(post_save, sender=MovimentoEstoque)
-def auditar_movimento(sender, instance: MovimentoEstoque, created, **kwargs):
-    if not created:
-        return
-    previous = LogAuditoriaEstoque.objects.order_by("-id").first()
-
-    snapshot_antes = None
-    if instance.metadata and isinstance(instance.metadata, dict) and "snapshot_antes" in instance.metadata:
-        snapshot_antes = instance.metadata.get("snapshot_antes")
-
-    snapshot_depois = {
+def _snapshot_depois(instance: MovimentoEstoque, saldo: EstoqueSaldo | None) -> dict:
+    snapshot = {
         "produto_id": instance.produto_id,
         "tipo": instance.tipo,
         "quantidade": str(instance.quantidade),
@@ -103,27 +94,39 @@ def auditar_movimento(sender, instance: MovimentoEstoque, created, **kwargs):
         "valor_estimado": str(instance.valor_estimado),
         "criado_em": instance.criado_em.isoformat(),
     }
+    if saldo is not None:
+        snapshot["saldo_atual"] = str(saldo.quantidade)
+        snapshot["reservado_atual"] = str(saldo.reservado)
+    return snapshot
+
+
+def _deposito_auditado(instance: MovimentoEstoque):
+    if not instance.aplicado:
+        return None
+    return instance.deposito_origem_id or instance.deposito_destino_id
 
-    deposito_rel = instance.deposito_origem or instance.deposito_destino
-    if deposito_rel and instance.aplicado:
-        try:
-            saldo = EstoqueSaldo.objects.get(produto=instance.produto, deposito=deposito_rel)
-            snapshot_depois["saldo_atual"] = str(saldo.quantidade)
-            snapshot_depois["reservado_atual"] = str(saldo.reservado)
-        except EstoqueSaldo.DoesNotExist:
-            pass
-
-    base_string = (previous.hash_atual if previous else "") + repr(snapshot_depois)
-    hash_atual = hashlib.sha256(base_string.encode("utf-8")).hexdigest()
-    LogAuditoriaEstoque.objects.create(
+
+def _log_encadeado(
+    instance: MovimentoEstoque, hash_previo: str | None, saldo: EstoqueSaldo | None, tipo_especial: str | None = None
+):
+    snapshot_antes = None
+    if instance.metadata and isinstance(instance.metadata, dict) and "snapshot_antes" in instance.metadata:
+        snapshot_antes = instance.metadata.get("snapshot_antes")
+    snapshot_depois = _snapshot_depois(instance, saldo)
+    base_string = (hash_previo or "") + repr(snapshot_depois)
+    return LogAuditoriaEstoque(
         movimento=instance,
         snapshot_antes=snapshot_antes,
         snapshot_depois=snapshot_depois,
-        hash_previo=previous.hash_atual if previous else None,
-        hash_atual=hash_atual,
-        usuario=instance.usuario_executante,
-        tenant=instance.tenant,
+        hash_previo=hash_previo,
+        hash_atual=hashlib.sha256(base_string.encode("utf-8")).hexdigest(),
+        usuario_id=instance.usuario_executante_id,
+        tenant_id=instance.tenant_id,
+        tipo_especial=tipo_especial,
     )
+
+
+def _broadcast_movimento(instance: MovimentoEstoque):
     _broadcast_estoque(
         {
             "event": "movimento.criado",
@@ -138,6 +141,49 @@ def auditar_movimento(sender, instance: MovimentoEstoque, created, **kwargs):
     )
 
 
+@receiver(post_save, sender=MovimentoEstoque)
+def auditar_movimento(sender, instance: MovimentoEstoque, created, **kwargs):
+    if not created:
+        return
+    previous = LogAuditoriaEstoque.objects.order_by("-id").first()
+    saldo = None
+    deposito_id = _deposito_auditado(instance)
+    if deposito_id:
+        saldo = EstoqueSaldo.objects.filter(produto_id=instance.produto_id, deposito_id=deposito_id).first()
+    _log_encadeado(instance, previous.hash_atual if previous else None, saldo).save()
+    _broadcast_movimento(instance)
+
+
+def auditar_movimentos(
+    movimentos: list[MovimentoEstoque], *, tipo_especial: str | None = None
+) -> list[LogAuditoriaEstoque]:
+    """Auditoria dos movimentos gravados via ``bulk_create`` (que não dispara ``post_save``).
+
+    Mesmo resultado de ``auditar_movimento`` para cada movimento, na ordem da lista:
+    os hashes são encadeados em memória e os logs gravados em um único ``bulk_create``.
+    ``tipo_especial`` marca os logs do lote (ex.: ``RESERVA_EXPIRADA``).
+    """
+    if not movimentos:
+        return []
+    pares = {(m.produto_id, _deposito_auditado(m)) for m in movimentos if _deposito_auditado(m)}
+    saldos = {
+        (s.produto_id, s.deposito_id): s
+        for s in EstoqueSaldo.objects.filter(
+            produto_id__in={p for p, _ in pares}, deposito_id__in={d for _, d in pares}
+        )
+    }
+    previous = LogAuditoriaEstoque.objects.order_by("-id").values_list("hash_atual", flat=True).first()
+    logs = []
+    for mov in movimentos:
+        log = _log_encadeado(mov, previous, saldos.get((mov.produto_id, _deposito_auditado(mov))), tipo_especial)
+        logs.append(log)
+        previous = log.hash_atual
+    LogAuditoriaEstoque.objects.bulk_create(logs)
+    for mov in movimentos:
+        _broadcast_movimento(mov)
+    return logs
+
+
 @receiver(post_save, sender=PedidoSeparacao)
 def broadcast_pedido_status(sender, instance: PedidoSeparacao, created, **kwargs):
     payload_data = {
@@ -161,6 +207,15 @@ def broadcast_pedido_mensagem(sender, instance: PedidoSeparacaoMensagem, created
         )
 
 
+# ---------- Cache da explosão de BOM ----------
+@receiver(post_save, sender="produtos.ProdutoBOMItem")
+@receiver(post_delete, sender="produtos.ProdutoBOMItem")
+def invalidar_explosao_bom(sender, **kwargs):
+    from estoque.services.bom_explosao import invalidar_cache
+
+    invalidar_cache()
+
+
 def _envelope(event_name: str, data: dict):
     return {"event": event_name, "ts": timezone.now().isoformat(), "version": 1, "data": data}
 
@@ -0,0 +1,46 @@
+"""Tarefas Celery do app estoque."""
+
+from __future__ import annotations
+
+import logging
+
+from celery import shared_task
+
+from estoque.models import RegraReabastecimento
+from estoque.services.expiracao_reservas import agendar_proximos_slots, expirar_vencidas
+from estoque.services.forecast import executar_forecast
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def atualizar_forecast_reabastecimento(tenant_id=None) -> dict:
+    """Forecast + avaliação das regras ativas; sem ``tenant_id`` percorre todos os tenants com regras."""
+    if tenant_id is not None:
+        tenants = [tenant_id]
+    else:
+        tenants = list(
+            RegraReabastecimento.objects.filter(ativo=True).values_list("tenant_id", flat=True).distinct().order_by()
+        )
+    resumo = {}
+    for tid in tenants:
+        resultado = executar_forecast(tid)
+        resumo[str(tid)] = {"regras": resultado.regras, "alertas": len(resultado.alertas), "mape": resultado.mape_medio}
+        logger.info("Forecast reabastecimento tenant=%s: %s", tid, resumo[str(tid)])
+    return resumo
+
+
+@shared_task
+def expirar_reservas_slot(slot: int) -> int:
+    """Disparada no fim de um slot da time wheel: expira tudo o que venceu até agora."""
+    return expirar_vencidas().reservas
+
+
+@shared_task
+def expirar_reservas_vencidas() -> int:
+    """Rede de segurança para slots perdidos e agendamento dos slots do próximo horizonte."""
+    total = expirar_vencidas().reservas
+    if total:
+        logger.info("Reservas expiradas na varredura de segurança: %s", total)
+    agendar_proximos_slots()
+    return total
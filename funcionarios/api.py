@@ -15,6 +15,7 @@ from .serializers import (
     FeriasSerializer,
     FuncionarioSerializer,
 )
+from .services.folha import calcular_folha
 from .utils import (
     CalculadoraFerias,
     CalculadoraFGTS,
@@ -252,24 +253,23 @@ class BeneficioViewSet(viewsets.ModelViewSet):
         if funcionario_id:
             funcionarios = funcionarios.filter(id=funcionario_id)
 
+        # Cálculo em lote: salários vigentes em uma consulta + faixas vetorizadas.
+        # Sem competência: como get_salario_atual, vale a última vigência cadastrada
+        # (o teto na competência fica para o snapshot de gerar_snapshot).
+        nomes = dict(funcionarios.values_list("id", "nome_completo"))
         resultados = []
 
-        for funcionario in funcionarios:
-            salario = funcionario.get_salario_atual()
-
-            inss = CalculadoraINSS.calcular(salario)
-            fgts = CalculadoraFGTS.calcular(salario)
-            irrf = CalculadoraIRRF.calcular(salario, funcionario.numero_dependentes)
-
+        for linha in calcular_folha(None, funcionarios=funcionarios):
+            impostos = linha.como_calculadoras()
             resultados.append(
                 {
-                    "funcionario_id": funcionario.id,
-                    "funcionario_nome": funcionario.nome_completo,
-                    "salario_base": salario,
-                    "inss": inss,
-                    "fgts": fgts,
-                    "irrf": irrf,
-                    "salario_liquido": salario - inss["valor_desconto"] - irrf["valor_irrf"],
+                    "funcionario_id": linha.funcionario_id,
+                    "funcionario_nome": nomes.get(linha.funcionario_id),
+                    "salario_base": linha.salario_base,
+                    "inss": impostos["inss"],
+                    "fgts": impostos["fgts"],
+                    "irrf": impostos["irrf"],
+                    "salario_liquido": linha.salario_liquido,
                 }
             )
 
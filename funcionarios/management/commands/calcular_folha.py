@@ -5,7 +5,9 @@ from datetime import date
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 
+from core.models import Tenant
 from funcionarios.models import Beneficio, Funcionario
+from funcionarios.services.folha import gerar_snapshot, salarios_atuais
 from funcionarios.utils import CalculadoraFGTS, CalculadoraINSS, CalculadoraIRRF
 
 
@@ -21,6 +23,9 @@ class Command(BaseCommand):
         )
         parser.add_argument("--tenant-id", type=int, help="ID do tenant específico (opcional)")
         parser.add_argument("--dry-run", action="store_true", help="Executa sem salvar no banco (apenas simulação)")
+        parser.add_argument(
+            "--snapshot", action="store_true", help="Persiste o snapshot da competência (FolhaPagamento) por tenant"
+        )
 
     def handle(self, *args, **options):
         mes = options["mes"]
@@ -43,15 +48,26 @@ class Command(BaseCommand):
         total_funcionarios = funcionarios.count()
         self.stdout.write(f"Processando {total_funcionarios} funcionários...")
 
-        for funcionario in funcionarios:
-            self.processar_funcionario(funcionario, data_referencia, dry_run)
+        # Salário vigente de todos os funcionários em uma consulta (evita N+1 em get_salario_atual)
+        vigentes = salarios_atuais(funcionarios.values("id"))
+        for funcionario in funcionarios.select_related("tenant"):
+            salario = vigentes.get(funcionario.pk, funcionario.salario_base)
+            self.processar_funcionario(funcionario, data_referencia, dry_run, salario_atual=salario)
+
+        if options["snapshot"] and not dry_run:
+            for tenant in Tenant.objects.filter(pk__in=funcionarios.values("tenant_id")):
+                folha = gerar_snapshot(tenant, data_referencia)
+                self.stdout.write(
+                    f"Snapshot {tenant}: {folha.quantidade_funcionarios} funcionários, líquido R$ {folha.total_liquido}"
+                )
 
         self.stdout.write(self.style.SUCCESS(f"Processamento concluído para {total_funcionarios} funcionários"))
 
-    def processar_funcionario(self, funcionario, data_referencia, dry_run):
+    def processar_funcionario(self, funcionario, data_referencia, dry_run, salario_atual=None):
         """Processa cálculos para um funcionário específico"""
 
-        salario_atual = funcionario.get_salario_atual()
+        if salario_atual is None:
+            salario_atual = funcionario.get_salario_atual()
 
         self.stdout.write(f"Processando: {funcionario.nome_completo} - R$ {salario_atual}")
 
@@ -0,0 +1,69 @@
+# funcionarios/management/commands/folha_benchmark.py
+"""Benchmark: calculadoras Decimal por funcionário x motor vetorizado em lote.
+
+Uso:
+    python manage.py folha_benchmark --funcionarios 10000
+    python manage.py folha_benchmark --tenant-id 1   # inclui a folha real do tenant (consultas + cálculo)
+"""
+
+import random
+from decimal import Decimal
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Tenant
+from funcionarios.services.folha import calcular_folha, calcular_lote
+from funcionarios.utils import CalculadoraFGTS, CalculadoraINSS, CalculadoraIRRF
+
+
+class Command(BaseCommand):
+    help = "Compara o cálculo de folha por funcionário com o motor em lote e valida resultados idênticos"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--funcionarios", type=int, default=10_000, help="Quantidade de salários sintéticos")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--tenant-id", type=int, help="Mede também calcular_folha() para o tenant informado")
+
+    def handle(self, *args, **options):
+        rnd = random.Random(options["seed"])  # noqa: S311 - dados sintéticos
+        n = options["funcionarios"]
+        salarios = [Decimal(rnd.randint(100_000, 3_000_000)).scaleb(-2) for _ in range(n)]
+        dependentes = [rnd.randint(0, 4) for _ in range(n)]
+
+        inicio = perf_counter()
+        escalar = [
+            (CalculadoraINSS.calcular(s), CalculadoraFGTS.calcular(s), CalculadoraIRRF.calcular(s, d))
+            for s, d in zip(salarios, dependentes, strict=True)
+        ]
+        t_escalar = perf_counter() - inicio
+
+        inicio = perf_counter()
+        linhas = calcular_lote(salarios, dependentes)
+        t_lote = perf_counter() - inicio
+
+        divergentes = sum(
+            1
+            for (inss, fgts, irrf), linha in zip(escalar, linhas, strict=True)
+            if linha.como_calculadoras() != {"inss": inss, "fgts": fgts, "irrf": irrf}
+        )
+        self.stdout.write(f"Funcionários: {n}")
+        self.stdout.write(f"Calculadoras (por funcionário): {t_escalar * 1000:.1f} ms")
+        self.stdout.write(f"Lote vetorizado: {t_lote * 1000:.1f} ms ({t_escalar / max(t_lote, 1e-9):.1f}x)")
+        if divergentes:
+            msg = f"{divergentes} resultados divergentes entre lote e calculadoras"
+            raise CommandError(msg)
+        self.stdout.write(self.style.SUCCESS("Resultados idênticos"))
+
+        tenant_id = options.get("tenant_id")
+        if tenant_id:
+            try:
+                tenant = Tenant.objects.get(pk=tenant_id)
+            except Tenant.DoesNotExist as exc:
+                msg = f"Tenant {tenant_id} não encontrado"
+                raise CommandError(msg) from exc
+            inicio = perf_counter()
+            folha = calcular_folha(tenant)
+            self.stdout.write(
+                f"calcular_folha({tenant}): {len(folha)} funcionários em {(perf_counter() - inicio) * 1000:.1f} ms"
+            )
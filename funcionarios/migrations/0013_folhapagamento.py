@@ -0,0 +1,124 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("funcionarios", "0012_funcionario_motivo_demissao"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FolhaPagamento",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("created_at", models.DateTimeField(auto_now_add=True, verbose_name="Data de criação")),
+                ("updated_at", models.DateTimeField(auto_now=True, verbose_name="Data de atualização")),
+                (
+                    "competencia",
+                    models.DateField(help_text="Primeiro dia do mês de referência", verbose_name="Competência"),
+                ),
+                ("quantidade_funcionarios", models.PositiveIntegerField(default=0, verbose_name="Funcionários")),
+                (
+                    "total_bruto",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name="Total Bruto"),
+                ),
+                (
+                    "total_inss",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name="Total INSS"),
+                ),
+                (
+                    "total_irrf",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name="Total IRRF"),
+                ),
+                (
+                    "total_fgts",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name="Total FGTS"),
+                ),
+                (
+                    "total_liquido",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name="Total Líquido"),
+                ),
+                (
+                    "gerado_por",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Gerado Por",
+                    ),
+                ),
+                (
+                    "tenant",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="folhas_pagamento",
+                        to="core.tenant",
+                        verbose_name="Empresa",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "folha de pagamento",
+                "verbose_name_plural": "folhas de pagamento",
+                "ordering": ["-competencia"],
+                "unique_together": {("tenant", "competencia")},
+            },
+        ),
+        migrations.CreateModel(
+            name="FolhaPagamentoItem",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("salario_base", models.DecimalField(decimal_places=2, max_digits=10, verbose_name="Salário Base")),
+                ("numero_dependentes", models.PositiveIntegerField(default=0, verbose_name="Dependentes")),
+                ("inss", models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name="INSS")),
+                (
+                    "aliquota_inss",
+                    models.DecimalField(
+                        decimal_places=2, default=0, max_digits=5, verbose_name="Alíquota Efetiva INSS (%)"
+                    ),
+                ),
+                (
+                    "base_irrf",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name="Base IRRF"),
+                ),
+                ("irrf", models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name="IRRF")),
+                (
+                    "aliquota_irrf",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=5, verbose_name="Alíquota IRRF (%)"),
+                ),
+                ("fgts", models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name="FGTS")),
+                (
+                    "salario_liquido",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name="Salário Líquido"),
+                ),
+                (
+                    "folha",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="itens",
+                        to="funcionarios.folhapagamento",
+                        verbose_name="Folha",
+                    ),
+                ),
+                (
+                    "funcionario",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="itens_folha",
+                        to="funcionarios.funcionario",
+                        verbose_name="Funcionário",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "item da folha de pagamento",
+                "verbose_name_plural": "itens da folha de pagamento",
+                "ordering": ["funcionario__nome_completo"],
+                "unique_together": {("folha", "funcionario")},
+            },
+        ),
+    ]
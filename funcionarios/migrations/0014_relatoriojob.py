@@ -0,0 +1,90 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("funcionarios", "0013_folhapagamento"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RelatorioJob",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("created_at", models.DateTimeField(auto_now_add=True, verbose_name="Data de criação")),
+                ("updated_at", models.DateTimeField(auto_now=True, verbose_name="Data de atualização")),
+                (
+                    "tipo",
+                    models.CharField(
+                        choices=[
+                            ("PONTO", "Cartão de Ponto"),
+                            ("MAO_OBRA", "Custos de Mão de Obra"),
+                            ("FERIAS", "Férias Vencidas"),
+                        ],
+                        max_length=20,
+                        verbose_name="Tipo",
+                    ),
+                ),
+                ("parametros", models.JSONField(blank=True, default=dict, verbose_name="Parâmetros")),
+                ("chave", models.CharField(db_index=True, max_length=64, verbose_name="Chave de Deduplicação")),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("PENDENTE", "Pendente"),
+                            ("PROCESSANDO", "Processando"),
+                            ("CONCLUIDO", "Concluído"),
+                            ("ERRO", "Erro"),
+                            ("EXPIRADO", "Expirado"),
+                        ],
+                        default="PENDENTE",
+                        max_length=20,
+                        verbose_name="Status",
+                    ),
+                ),
+                ("total_secoes", models.PositiveIntegerField(default=0, verbose_name="Total de Seções")),
+                ("secoes_concluidas", models.PositiveIntegerField(default=0, verbose_name="Seções Concluídas")),
+                (
+                    "arquivo",
+                    models.FileField(blank=True, upload_to="funcionarios/relatorios/", verbose_name="Arquivo"),
+                ),
+                ("erro", models.TextField(blank=True, verbose_name="Erro")),
+                ("concluido_em", models.DateTimeField(blank=True, null=True, verbose_name="Concluído em")),
+                ("expira_em", models.DateTimeField(blank=True, null=True, verbose_name="Expira em")),
+                (
+                    "solicitado_por",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Solicitado Por",
+                    ),
+                ),
+                (
+                    "tenant",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="relatorio_jobs",
+                        to="core.tenant",
+                        verbose_name="Empresa",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "job de relatório",
+                "verbose_name_plural": "jobs de relatório",
+                "ordering": ["-created_at"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        condition=models.Q(("status__in", ["PENDENTE", "PROCESSANDO"])),
+                        fields=("tenant", "chave"),
+                        name="func_relatoriojob_ativo_unico",
+                    )
+                ],
+            },
+        ),
+    ]
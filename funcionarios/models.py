@@ -710,3 +710,126 @@ class HorarioTrabalho(TimestampedModel):
 # ============================================================================
 # INTEGRAÇÃO COM ESTOQUE - CONTROLE DE MATERIAIS
 # ============================================================================
+
+
+class FolhaPagamento(TimestampedModel):
+    """Snapshot consolidado da folha de um tenant em uma competência (mês).
+
+    Gerado em lote por ``funcionarios.services.folha.gerar_snapshot``; regerar a mesma
+    competência substitui os itens (idempotente).
+    """
+
+    tenant = models.ForeignKey(
+        Tenant, on_delete=models.CASCADE, related_name="folhas_pagamento", verbose_name=_("Empresa")
+    )
+    competencia = models.DateField(verbose_name=_("Competência"), help_text=_("Primeiro dia do mês de referência"))
+    quantidade_funcionarios = models.PositiveIntegerField(default=0, verbose_name=_("Funcionários"))
+    total_bruto = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name=_("Total Bruto"))
+    total_inss = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name=_("Total INSS"))
+    total_irrf = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name=_("Total IRRF"))
+    total_fgts = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name=_("Total FGTS"))
+    total_liquido = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name=_("Total Líquido"))
+    gerado_por = models.ForeignKey(
+        CustomUser, on_delete=models.SET_NULL, null=True, blank=True, verbose_name=_("Gerado Por")
+    )
+
+    class Meta:
+        verbose_name = _("folha de pagamento")
+        verbose_name_plural = _("folhas de pagamento")
+        ordering = ["-competencia"]
+        unique_together = ("tenant", "competencia")
+
+    def __str__(self):
+        return f"Folha {self.competencia.strftime('%m/%Y')} - {self.tenant}"
+
+
+class FolhaPagamentoItem(models.Model):
+    """Linha da folha: valores calculados para um funcionário na competência."""
+
+    folha = models.ForeignKey(FolhaPagamento, on_delete=models.CASCADE, related_name="itens", verbose_name=_("Folha"))
+    funcionario = models.ForeignKey(
+        Funcionario, on_delete=models.CASCADE, related_name="itens_folha", verbose_name=_("Funcionário")
+    )
+    salario_base = models.DecimalField(max_digits=10, decimal_places=2, verbose_name=_("Salário Base"))
+    numero_dependentes = models.PositiveIntegerField(default=0, verbose_name=_("Dependentes"))
+    inss = models.DecimalField(max_digits=10, decimal_places=2, default=0, verbose_name=_("INSS"))
+    aliquota_inss = models.DecimalField(
+        max_digits=5, decimal_places=2, default=0, verbose_name=_("Alíquota Efetiva INSS (%)")
+    )
+    base_irrf = models.DecimalField(max_digits=10, decimal_places=2, default=0, verbose_name=_("Base IRRF"))
+    irrf = models.DecimalField(max_digits=10, decimal_places=2, default=0, verbose_name=_("IRRF"))
+    aliquota_irrf = models.DecimalField(max_digits=5, decimal_places=2, default=0, verbose_name=_("Alíquota IRRF (%)"))
+    fgts = models.DecimalField(max_digits=10, decimal_places=2, default=0, verbose_name=_("FGTS"))
+    salario_liquido = models.DecimalField(max_digits=10, decimal_places=2, default=0, verbose_name=_("Salário Líquido"))
+
+    class Meta:
+        verbose_name = _("item da folha de pagamento")
+        verbose_name_plural = _("itens da folha de pagamento")
+        ordering = ["funcionario__nome_completo"]
+        unique_together = ("folha", "funcionario")
+
+    def __str__(self):
+        return f"{self.funcionario.nome_completo} - {self.folha.competencia.strftime('%m/%Y')}"
+
+
+class RelatorioJob(TimestampedModel):
+    """Geração de relatório PDF em background (``funcionarios.services.relatorios``).
+
+    Pedidos idênticos (mesmo tenant, tipo e parâmetros) enquanto o job está ativo ou o
+    arquivo ainda não expirou reaproveitam o mesmo registro (``chave``).
+    """
+
+    TIPO_CHOICES = [
+        ("PONTO", _("Cartão de Ponto")),
+        ("MAO_OBRA", _("Custos de Mão de Obra")),
+        ("FERIAS", _("Férias Vencidas")),
+    ]
+    STATUS_CHOICES = [
+        ("PENDENTE", _("Pendente")),
+        ("PROCESSANDO", _("Processando")),
+        ("CONCLUIDO", _("Concluído")),
+        ("ERRO", _("Erro")),
+        ("EXPIRADO", _("Expirado")),
+    ]
+    STATUS_ATIVOS = ("PENDENTE", "PROCESSANDO")
+
+    tenant = models.ForeignKey(
+        Tenant, on_delete=models.CASCADE, related_name="relatorio_jobs", verbose_name=_("Empresa")
+    )
+    tipo = models.CharField(max_length=20, choices=TIPO_CHOICES, verbose_name=_("Tipo"))
+    parametros = models.JSONField(default=dict, blank=True, verbose_name=_("Parâmetros"))
+    chave = models.CharField(max_length=64, db_index=True, verbose_name=_("Chave de Deduplicação"))
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="PENDENTE", verbose_name=_("Status"))
+    total_secoes = models.PositiveIntegerField(default=0, verbose_name=_("Total de Seções"))
+    secoes_concluidas = models.PositiveIntegerField(default=0, verbose_name=_("Seções Concluídas"))
+    arquivo = models.FileField(upload_to="funcionarios/relatorios/", blank=True, verbose_name=_("Arquivo"))
+    erro = models.TextField(blank=True, verbose_name=_("Erro"))
+    solicitado_por = models.ForeignKey(
+        CustomUser, on_delete=models.SET_NULL, null=True, blank=True, verbose_name=_("Solicitado Por")
+    )
+    concluido_em = models.DateTimeField(null=True, blank=True, verbose_name=_("Concluído em"))
+    expira_em = models.DateTimeField(null=True, blank=True, verbose_name=_("Expira em"))
+
+    class Meta:
+        verbose_name = _("job de relatório")
+        verbose_name_plural = _("jobs de relatório")
+        ordering = ["-created_at"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["tenant", "chave"],
+                condition=models.Q(status__in=["PENDENTE", "PROCESSANDO"]),
+                name="func_relatoriojob_ativo_unico",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} - {self.tenant} ({self.get_status_display()})"
+
+    @property
+    def progresso(self):
+        """Percentual de seções renderizadas (0-100)."""
+        if self.status == "CONCLUIDO":
+            return 100
+        if not self.total_secoes:
+            return 0
+        return int(self.secoes_concluidas * 100 / self.total_secoes)
@@ -11,7 +11,9 @@ from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
 from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
 
 from .models import CartaoPonto, Ferias, Funcionario
-from .utils import CalculadoraBancoHoras, CalculadoraMaoObra
+from .services.relatorios import dias_ponto
+from .services.relatorios_render import story_ponto
+from .utils import CalculadoraMaoObra
 
 
 class RelatorioFuncionarios:
@@ -125,81 +127,22 @@ class RelatorioPonto:
     def gerar_relatorio_ponto(funcionario, data_inicio, data_fim):
         """Gera relatório de ponto para um funcionário"""
 
-        registros = CartaoPonto.objects.filter(
-            funcionario=funcionario, data_hora_registro__date__range=[data_inicio, data_fim]
-        ).order_by("data_hora_registro")
+        registros = (
+            CartaoPonto.objects.filter(funcionario=funcionario, data_hora_registro__date__range=[data_inicio, data_fim])
+            .order_by("data_hora_registro")
+            .values("data_hora_registro", "tipo_registro", "ip_origem", "aprovado")
+        )
 
         buffer = BytesIO()
         doc = SimpleDocTemplate(buffer, pagesize=A4)
-        story = []
-
-        # Estilos
-        styles = getSampleStyleSheet()
-        title_style = ParagraphStyle("CustomTitle", parent=styles["Heading1"], fontSize=14, spaceAfter=20, alignment=1)
-
-        # Título
-        title = Paragraph(f"Relatório de Ponto - {funcionario.nome_completo}", title_style)
-        story.append(title)
-
-        # Período
-        periodo = Paragraph(
-            f"Período: {data_inicio.strftime('%d/%m/%Y')} a {data_fim.strftime('%d/%m/%Y')}", styles["Normal"]
+        # Mesmo layout das seções do pipeline em background (services.relatorios)
+        story = story_ponto(
+            {
+                "nome": funcionario.nome_completo,
+                "periodo": f"{data_inicio.strftime('%d/%m/%Y')} a {data_fim.strftime('%d/%m/%Y')}",
+                "dias": dias_ponto(registros.iterator()),
+            }
         )
-        story.append(periodo)
-        story.append(Spacer(1, 20))
-
-        # Agrupar registros por dia
-        registros_por_dia = {}
-        for registro in registros:
-            data = registro.data_hora_registro.date()
-            if data not in registros_por_dia:
-                registros_por_dia[data] = []
-            registros_por_dia[data].append(registro)
-
-        # Tabela por dia
-        for data, registros_dia in sorted(registros_por_dia.items()):
-            # Cabeçalho do dia
-            dia_header = Paragraph(f"<b>{data.strftime('%d/%m/%Y - %A')}</b>", styles["Heading3"])
-            story.append(dia_header)
-
-            # Tabela de registros do dia
-            data_table = [["Horário", "Tipo", "IP", "Aprovado"]]
-
-            for registro in registros_dia:
-                data_table.append(
-                    [
-                        registro.data_hora_registro.strftime("%H:%M:%S"),
-                        registro.get_tipo_registro_display(),
-                        registro.ip_origem or "-",
-                        "Sim" if registro.aprovado else "Não",
-                    ]
-                )
-
-            table = Table(data_table)
-            table.setStyle(
-                TableStyle(
-                    [
-                        ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
-                        ("ALIGN", (0, 0), (-1, -1), "CENTER"),
-                        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-                        ("FONTSIZE", (0, 0), (-1, -1), 10),
-                        ("GRID", (0, 0), (-1, -1), 1, colors.black),
-                    ]
-                )
-            )
-
-            story.append(table)
-
-            # Calcular horas do dia
-            registros_dict = [
-                {"data_hora_registro": r.data_hora_registro, "tipo_registro": r.tipo_registro} for r in registros_dia
-            ]
-
-            horas = CalculadoraBancoHoras.calcular_horas_trabalhadas(registros_dict)
-
-            resumo_dia = f"Horas trabalhadas: {horas['total_horas']:.2f}h | Extras: {horas['horas_extras']:.2f}h"
-            story.append(Paragraph(resumo_dia, styles["Normal"]))
-            story.append(Spacer(1, 15))
 
         doc.build(story)
         buffer.seek(0)
@@ -0,0 +1,272 @@
+# funcionarios/services/folha.py
+"""Motor de folha de pagamento em lote.
+
+Substitui o cálculo funcionário a funcionário (``get_salario_atual`` + calculadoras
+``Decimal`` de ``funcionarios.utils``) por:
+
+1. ``salarios_atuais``: uma única consulta com ``ROW_NUMBER() OVER (PARTITION BY
+   funcionario ORDER BY data_vigencia DESC)`` para o salário vigente de todos os
+   funcionários do tenant;
+2. ``calcular_lote``: aplica as faixas progressivas de INSS/IRRF e o FGTS a vetores
+   ``numpy`` de salários em centavos, em um único passe por faixa.
+
+A aritmética é inteira (centavos x alíquota em milésimos) com arredondamento
+HALF_UP no final, reproduzindo exatamente os resultados de ``CalculadoraINSS``,
+``CalculadoraIRRF`` e ``CalculadoraFGTS`` — as faixas são lidas dessas classes.
+``gerar_snapshot`` persiste a folha da competência em ``FolhaPagamento``.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass
+from datetime import date
+from decimal import ROUND_HALF_UP, Decimal
+
+import numpy as np
+from dateutil.relativedelta import relativedelta
+from django.db import transaction
+from django.db.models import F, QuerySet, Window
+from django.db.models.functions import RowNumber
+
+from funcionarios.models import FolhaPagamento, FolhaPagamentoItem, Funcionario, SalarioHistorico
+from funcionarios.utils import CalculadoraFGTS, CalculadoraINSS, CalculadoraIRRF
+
+__all__ = [
+    "LinhaFolha",
+    "calcular_folha",
+    "calcular_lote",
+    "gerar_snapshot",
+    "salarios_atuais",
+]
+
+
+def _centavos(valor: Decimal) -> int:
+    return int((Decimal(valor) * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def _milesimos(aliquota: Decimal) -> int:
+    milesimos = aliquota * 1000
+    if milesimos != milesimos.to_integral_value():  # pragma: no cover - tabela fora do padrão
+        msg = f"Alíquota {aliquota} não representável em milésimos"
+        raise ValueError(msg)
+    return int(milesimos)
+
+
+# Tabelas em inteiros, derivadas das calculadoras (fonte única das faixas)
+_INSS_FAIXAS = [
+    (_centavos(f["min"]), _centavos(f["max"]), _milesimos(f["aliquota"])) for f in CalculadoraINSS.FAIXAS_INSS
+]
+_INSS_TETO = _centavos(CalculadoraINSS.TETO_INSS)
+_IRRF_MAX = np.array([_centavos(f["max"]) for f in CalculadoraIRRF.FAIXAS_IRRF], dtype=np.int64)
+_IRRF_ALIQ = np.array([_milesimos(f["aliquota"]) for f in CalculadoraIRRF.FAIXAS_IRRF], dtype=np.int64)
+_IRRF_DEDUCAO = np.array([_centavos(f["deducao"]) for f in CalculadoraIRRF.FAIXAS_IRRF], dtype=np.int64)
+_IRRF_DEPENDENTE = _centavos(CalculadoraIRRF.DEDUCAO_DEPENDENTE)
+_FGTS_ALIQ = _milesimos(CalculadoraFGTS.ALIQUOTA_FGTS)
+
+
+def _arredonda_milesimos(valor: np.ndarray) -> np.ndarray:
+    """Unidades de 1/1000 centavo (>= 0) -> centavos com HALF_UP."""
+    return (valor + 500) // 1000
+
+
+def _dec(centavos: int) -> Decimal:
+    return Decimal(centavos).scaleb(-2)
+
+
+@dataclass(frozen=True)
+class LinhaFolha:
+    """Resultado da folha para um funcionário (valores em reais)."""
+
+    funcionario_id: int | None
+    salario_base: Decimal
+    numero_dependentes: int
+    inss: Decimal
+    aliquota_inss: Decimal
+    base_inss: Decimal
+    base_irrf: Decimal
+    deducoes_irrf: Decimal
+    irrf: Decimal
+    aliquota_irrf: Decimal
+    fgts: Decimal
+    salario_liquido: Decimal
+
+    def como_calculadoras(self) -> dict[str, dict[str, Decimal]]:
+        """Mesmo formato dos dicts de ``CalculadoraINSS/IRRF/FGTS.calcular``."""
+        positivo = self.salario_base > 0
+        return {
+            "inss": {
+                "valor_desconto": self.inss,
+                "aliquota_efetiva": self.aliquota_inss,
+                "base_calculo": self.base_inss,
+            },
+            "fgts": {
+                "valor_fgts": self.fgts,
+                "aliquota": CalculadoraFGTS.ALIQUOTA_FGTS * 100 if positivo else Decimal("0.00"),
+                "base_calculo": self.salario_base if positivo else Decimal("0.00"),
+            },
+            "irrf": {
+                "valor_irrf": self.irrf,
+                "aliquota": self.aliquota_irrf,
+                "base_calculo": self.base_irrf,
+                "deducoes_totais": self.deducoes_irrf,
+            },
+        }
+
+
+def calcular_lote(
+    salarios: Sequence[Decimal],
+    dependentes: Sequence[int] | None = None,
+    funcionario_ids: Sequence[int | None] | None = None,
+) -> list[LinhaFolha]:
+    """Calcula INSS, IRRF, FGTS e líquido para vetores de salários/dependentes."""
+    n = len(salarios)
+    if n == 0:
+        return []
+    s = np.fromiter((_centavos(v) for v in salarios), dtype=np.int64, count=n)
+    dep = np.zeros(n, dtype=np.int64) if dependentes is None else np.asarray(dependentes, dtype=np.int64)
+    positivo = s > 0
+
+    # INSS progressivo: soma por faixa em unidades de 1/1000 centavo (exato)
+    base_inss = np.where(positivo, np.minimum(s, _INSS_TETO), 0)
+    acumulado = np.zeros(n, dtype=np.int64)
+    for minimo, maximo, aliquota in _INSS_FAIXAS:
+        valor_faixa = np.minimum(base_inss, maximo) - minimo
+        acumulado += np.where((base_inss > minimo) & (valor_faixa > 0), valor_faixa, 0) * aliquota
+    inss = _arredonda_milesimos(acumulado)
+    # alíquota efetiva (%) com 2 casas: HALF_UP(10 * acumulado / base) centésimos de ponto
+    base_segura = np.where(base_inss > 0, base_inss, 1)
+    aliq_inss = np.where(base_inss > 0, (20 * acumulado + base_segura) // (2 * base_segura), 0)
+
+    # IRRF: faixa única (alíquota - dedução) sobre a base após INSS e dependentes
+    deducoes = inss + dep * _IRRF_DEPENDENTE
+    base_irrf = s - deducoes
+    tributavel = positivo & (base_irrf > 0)
+    faixa = np.minimum(np.searchsorted(_IRRF_MAX, base_irrf, side="left"), len(_IRRF_MAX) - 1)
+    bruto_irrf = base_irrf * _IRRF_ALIQ[faixa] - _IRRF_DEDUCAO[faixa] * 1000
+    irrf = np.where(tributavel, _arredonda_milesimos(np.maximum(bruto_irrf, 0)), 0)
+    aliq_irrf = np.where(tributavel, _IRRF_ALIQ[faixa], 0)
+
+    fgts = np.where(positivo, _arredonda_milesimos(s * _FGTS_ALIQ), 0)
+    liquido = s - inss - irrf
+
+    ids = funcionario_ids if funcionario_ids is not None else [None] * n
+    zero = Decimal("0.00")
+    # ``tolist`` converte para int nativo de uma vez (indexar escalares numpy é lento)
+    colunas = zip(
+        ids,
+        positivo.tolist(),
+        s.tolist(),
+        dep.tolist(),
+        inss.tolist(),
+        aliq_inss.tolist(),
+        base_inss.tolist(),
+        base_irrf.tolist(),
+        deducoes.tolist(),
+        irrf.tolist(),
+        aliq_irrf.tolist(),
+        fgts.tolist(),
+        liquido.tolist(),
+        strict=True,
+    )
+    return [
+        LinhaFolha(
+            funcionario_id=pk,
+            salario_base=_dec(sal),
+            numero_dependentes=n_dep,
+            inss=_dec(v_inss),
+            aliquota_inss=_dec(a_inss),
+            base_inss=_dec(b_inss),
+            base_irrf=_dec(b_irrf) if pos else zero,
+            deducoes_irrf=_dec(ded) if pos else zero,
+            irrf=_dec(v_irrf),
+            aliquota_irrf=Decimal(a_irrf) / 10,
+            fgts=_dec(v_fgts),
+            salario_liquido=_dec(liq),
+        )
+        for pk, pos, sal, n_dep, v_inss, a_inss, b_inss, b_irrf, ded, v_irrf, a_irrf, v_fgts, liq in colunas
+    ]
+
+
+def salarios_atuais(funcionario_ids: Iterable[int] | QuerySet, *, ate: date | None = None) -> dict[int, Decimal]:
+    """Salário vigente (último ``SalarioHistorico``) por funcionário em uma consulta.
+
+    Funcionários sem histórico não aparecem no resultado (usar ``salario_base``).
+    ``ate`` limita às vigências até a data (folha de competências passadas).
+    """
+    ids = funcionario_ids if isinstance(funcionario_ids, QuerySet) else list(funcionario_ids)
+    qs = SalarioHistorico.objects.filter(funcionario_id__in=ids)
+    if ate is not None:
+        qs = qs.filter(data_vigencia__lte=ate)
+    qs = (
+        qs.annotate(
+            posicao=Window(
+                RowNumber(),
+                partition_by=[F("funcionario_id")],
+                order_by=[F("data_vigencia").desc(), F("id").desc()],
+            ),
+        )
+        .filter(posicao=1)
+        .values_list("funcionario_id", "valor_salario")
+    )
+    return dict(qs)
+
+
+def _fim_competencia(competencia: date) -> date:
+    return competencia.replace(day=1) + relativedelta(months=1, days=-1)
+
+
+def calcular_folha(
+    tenant: object,
+    competencia: date | None = None,
+    funcionarios: QuerySet | None = None,
+) -> list[LinhaFolha]:
+    """Folha dos funcionários ativos do tenant (2 consultas, cálculo vetorizado)."""
+    qs = funcionarios if funcionarios is not None else Funcionario.objects.filter(tenant=tenant, ativo=True)
+    rows = list(qs.order_by("id").values_list("id", "salario_base", "numero_dependentes"))
+    if not rows:
+        return []
+    ate = _fim_competencia(competencia) if competencia else None
+    vigentes = salarios_atuais(qs.values("id"), ate=ate)  # subconsulta: evita IN com milhares de ids
+    return calcular_lote(
+        [vigentes.get(pk, salario_base or Decimal("0.00")) for pk, salario_base, _ in rows],
+        [dependentes or 0 for _, _, dependentes in rows],
+        [pk for pk, _, _ in rows],
+    )
+
+
+def gerar_snapshot(tenant: object, competencia: date, usuario: object = None) -> FolhaPagamento:
+    """Calcula e persiste a folha da competência (substitui snapshot anterior)."""
+    competencia = competencia.replace(day=1)
+    linhas = calcular_folha(tenant, competencia)
+    with transaction.atomic():
+        folha, _ = FolhaPagamento.objects.select_for_update().get_or_create(tenant=tenant, competencia=competencia)
+        folha.itens.all().delete()
+        FolhaPagamentoItem.objects.bulk_create(
+            [
+                FolhaPagamentoItem(
+                    folha=folha,
+                    funcionario_id=linha.funcionario_id,
+                    salario_base=linha.salario_base,
+                    numero_dependentes=linha.numero_dependentes,
+                    inss=linha.inss,
+                    aliquota_inss=linha.aliquota_inss,
+                    base_irrf=linha.base_irrf,
+                    irrf=linha.irrf,
+                    aliquota_irrf=linha.aliquota_irrf,
+                    fgts=linha.fgts,
+                    salario_liquido=linha.salario_liquido,
+                )
+                for linha in linhas
+            ],
+            batch_size=1000,
+        )
+        folha.quantidade_funcionarios = len(linhas)
+        folha.total_bruto = sum((linha.salario_base for linha in linhas), Decimal("0.00"))
+        folha.total_inss = sum((linha.inss for linha in linhas), Decimal("0.00"))
+        folha.total_irrf = sum((linha.irrf for linha in linhas), Decimal("0.00"))
+        folha.total_fgts = sum((linha.fgts for linha in linhas), Decimal("0.00"))
+        folha.total_liquido = sum((linha.salario_liquido for linha in linhas), Decimal("0.00"))
+        folha.gerado_por = usuario if getattr(usuario, "is_authenticated", False) else None
+        folha.save()
+    return folha
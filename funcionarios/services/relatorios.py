@@ -0,0 +1,393 @@
+# funcionarios/services/relatorios.py
+"""Pipeline de relatórios PDF em background para funcionários.
+
+Fluxo:
+
+1. ``solicitar_relatorio`` cria (ou reaproveita) um ``RelatorioJob`` e enfileira a
+   task Celery ``funcionarios.tasks.gerar_relatorio_job``. Pedidos idênticos
+   (tenant + tipo + parâmetros) retornam o job ativo ou o arquivo ainda válido.
+2. ``executar_relatorio`` lê os dados em streaming (``iterator()``, uma consulta por
+   relatório), monta payloads simples por seção (um funcionário no ponto, blocos
+   de linhas nos relatórios tabulares) e os renderiza em um pool de processos do
+   ``billiard`` (``relatorios_render``), gravando um PDF por seção em disco. O
+   progresso é persistido em ``secoes_concluidas``.
+3. As seções são mescladas (``pypdf``) no arquivo final, disponível por um link
+   assinado que expira (``link_download`` / ``job_por_token``).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import math
+import os
+import tempfile
+from collections import deque
+from collections.abc import Iterator
+from datetime import date, timedelta
+from itertools import groupby
+from operator import itemgetter
+from time import monotonic
+
+from billiard import get_context
+from dateutil.relativedelta import relativedelta
+from django.conf import settings
+from django.core import signing
+from django.core.files import File
+from django.db import IntegrityError, transaction
+from django.db.models import Max, Q
+from django.urls import reverse
+from django.utils import timezone
+from pypdf import PdfWriter
+
+from funcionarios.models import CartaoPonto, Funcionario, RelatorioJob
+from funcionarios.services.folha import salarios_atuais
+from funcionarios.services.relatorios_render import renderizar_secao
+from funcionarios.utils import CalculadoraBancoHoras, CalculadoraMaoObra
+
+__all__ = [
+    "chave_relatorio",
+    "dias_ponto",
+    "executar_relatorio",
+    "expirar_relatorios",
+    "job_por_token",
+    "link_download",
+    "solicitar_relatorio",
+]
+
+logger = logging.getLogger(__name__)
+
+_SALT = "funcionarios.relatorios.download"
+LINHAS_POR_SECAO = 40
+_PROGRESSO_INTERVALO = 0.5  # segundos entre atualizações de progresso no banco
+
+
+def _ttl() -> timedelta:
+    return timedelta(hours=getattr(settings, "FUNCIONARIOS_RELATORIOS_TTL_HORAS", 24))
+
+
+def _workers() -> int:
+    return int(getattr(settings, "FUNCIONARIOS_RELATORIOS_WORKERS", 0) or os.cpu_count() or 1)
+
+
+def _moeda(valor) -> str:
+    return f"R$ {valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+# ---------------------------------------------------------------------------
+# Solicitação / deduplicação
+# ---------------------------------------------------------------------------
+
+
+def chave_relatorio(tenant_id: int, tipo: str, parametros: dict) -> str:
+    """Hash estável de (tenant, tipo, parâmetros) usado para deduplicar pedidos."""
+    bruto = json.dumps({"tenant": tenant_id, "tipo": tipo, "parametros": parametros}, sort_keys=True, default=str)
+    return hashlib.sha256(bruto.encode()).hexdigest()
+
+
+def solicitar_relatorio(tenant, tipo: str, parametros: dict | None = None, usuario=None) -> tuple[RelatorioJob, bool]:
+    """Retorna ``(job, criado)``; reaproveita job ativo ou concluído e não expirado."""
+    if tipo not in _COLETORES:
+        msg = f"Tipo de relatório inválido: {tipo}"
+        raise ValueError(msg)
+    parametros = parametros or {}
+    chave = chave_relatorio(tenant.pk, tipo, parametros)
+    vigentes = Q(status__in=RelatorioJob.STATUS_ATIVOS) | Q(status="CONCLUIDO", expira_em__gt=timezone.now())
+    existente = RelatorioJob.objects.filter(vigentes, tenant=tenant, chave=chave).order_by("-created_at").first()
+    if existente:
+        return existente, False
+    try:
+        with transaction.atomic():
+            job = RelatorioJob.objects.create(
+                tenant=tenant,
+                tipo=tipo,
+                parametros=parametros,
+                chave=chave,
+                solicitado_por=usuario if getattr(usuario, "is_authenticated", False) else None,
+            )
+    except IntegrityError:
+        # Corrida: outro request criou o job ativo entre a consulta e o insert
+        return RelatorioJob.objects.get(tenant=tenant, chave=chave, status__in=RelatorioJob.STATUS_ATIVOS), False
+
+    from funcionarios.tasks import gerar_relatorio_job  # noqa: PLC0415 - tasks importa este módulo
+
+    transaction.on_commit(lambda: gerar_relatorio_job.delay(job.pk))
+    return job, True
+
+
+# ---------------------------------------------------------------------------
+# Coleta de dados (processo principal) -> payloads por seção
+# ---------------------------------------------------------------------------
+
+
+def dias_ponto(registros) -> list[dict]:
+    """Agrupa registros de ponto (ordenados por horário) por dia, com horas calculadas."""
+    display = dict(CartaoPonto.TIPO_REGISTRO_CHOICES)
+    dias = []
+    for dia, grupo in groupby(registros, key=lambda r: timezone.localtime(r["data_hora_registro"]).date()):
+        itens = list(grupo)
+        horas = CalculadoraBancoHoras.calcular_horas_trabalhadas(itens)
+        dias.append(
+            {
+                "titulo": dia.strftime("%d/%m/%Y - %A"),
+                "linhas": [
+                    [
+                        timezone.localtime(r["data_hora_registro"]).strftime("%H:%M:%S"),
+                        display.get(r["tipo_registro"], r["tipo_registro"]),
+                        r["ip_origem"] or "-",
+                        "Sim" if r["aprovado"] else "Não",
+                    ]
+                    for r in itens
+                ],
+                "total_horas": horas["total_horas"],
+                "horas_extras": horas["horas_extras"],
+            },
+        )
+    return dias
+
+
+def _secoes_ponto(job: RelatorioJob) -> tuple[int, Iterator[dict]]:
+    inicio = date.fromisoformat(job.parametros["data_inicio"])
+    fim = date.fromisoformat(job.parametros["data_fim"])
+    funcionarios = Funcionario.objects.filter(tenant=job.tenant, ativo=True)
+    if job.parametros.get("funcionario_ids"):
+        funcionarios = funcionarios.filter(pk__in=job.parametros["funcionario_ids"])
+    ordem = ("funcionario__nome_completo", "funcionario_id", "data_hora_registro")
+    registros = (
+        CartaoPonto.objects.filter(funcionario__in=funcionarios, data_hora_registro__date__range=[inicio, fim])
+        .order_by(*ordem)
+        .values("funcionario_id", "data_hora_registro", "tipo_registro", "ip_origem", "aprovado")
+    )
+    periodo = f"{inicio.strftime('%d/%m/%Y')} a {fim.strftime('%d/%m/%Y')}"
+
+    def gerar():
+        # merge-join: funcionários e registros seguem a mesma ordenação (nome, id)
+        grupos = groupby(registros.iterator(chunk_size=2000), key=itemgetter("funcionario_id"))
+        atual = next(grupos, None)
+        for pk, nome in funcionarios.order_by("nome_completo", "id").values_list("id", "nome_completo").iterator():
+            dias = []
+            if atual is not None and atual[0] == pk:
+                dias = dias_ponto(atual[1])
+                atual = next(grupos, None)
+            yield {"nome": nome, "periodo": periodo, "dias": dias}
+
+    return funcionarios.count(), gerar()
+
+
+def _blocos(base: dict, linhas: Iterator[list], total_linhas: int, rodape) -> tuple[int, Iterator[dict]]:
+    """Divide linhas em seções de ``LINHAS_POR_SECAO``; título na primeira, rodapé na última.
+
+    ``base`` traz ``titulo``, ``cabecalho`` e ``estilo``; ``rodape`` é chamado só depois
+    de todas as linhas consumidas (totais acumulados durante o streaming).
+    """
+    total = max(1, math.ceil(total_linhas / LINHAS_POR_SECAO))
+    subtitulo = f"Data: {timezone.localdate().strftime('%d/%m/%Y')}"
+
+    def gerar():
+        for indice in range(total):
+            ultima = indice == total - 1
+            # a última seção absorve linhas criadas após o count()
+            bloco = (
+                list(linhas) if ultima else [linha for _, linha in zip(range(LINHAS_POR_SECAO), linhas, strict=False)]
+            )
+            payload = {"cabecalho": base["cabecalho"], "linhas": bloco, "estilo": base["estilo"]}
+            if indice == 0:
+                payload.update(titulo=base["titulo"], subtitulo=subtitulo)
+            if ultima:
+                payload["rodape"] = rodape()
+            yield payload
+
+    return total, gerar()
+
+
+def _secoes_mao_obra(job: RelatorioJob) -> tuple[int, Iterator[dict]]:
+    funcionarios = Funcionario.objects.filter(tenant=job.tenant)
+    if not job.parametros.get("incluir_inativos"):
+        funcionarios = funcionarios.filter(ativo=True)
+    vigentes = salarios_atuais(funcionarios.values("id"))
+    acumulado = {"funcionarios": 0, "custo": 0}
+
+    def linhas():
+        for pk, nome, salario_base in funcionarios.values_list("id", "nome_completo", "salario_base").iterator():
+            custos = CalculadoraMaoObra.calcular_custo_total(None, salario_base=vigentes.get(pk, salario_base))
+            acumulado["funcionarios"] += 1
+            acumulado["custo"] += custos["custo_total_mensal"]
+            yield [
+                nome,
+                _moeda(custos["salario_base"]),
+                _moeda(custos["custo_total_mensal"]),
+                _moeda(custos["custo_hora"]),
+            ]
+
+    def rodape():
+        resumo = (
+            f"<b>Resumo:</b><br/>Total de Funcionários: {acumulado['funcionarios']}<br/>"
+            f"Custo Total Mensal: {_moeda(acumulado['custo'])}<br/>"
+            f"Custo Total Anual: {_moeda(acumulado['custo'] * 12)}"
+        )
+        return [resumo]
+
+    base = {
+        "titulo": f"Relatório de Custos de Mão de Obra - {job.tenant.name}",
+        "cabecalho": ["Funcionário", "Salário Base", "Custo Total/Mês", "Custo/Hora"],
+        "estilo": "padrao",
+    }
+    return _blocos(base, linhas(), funcionarios.count(), rodape)
+
+
+def _secoes_ferias(job: RelatorioJob) -> tuple[int, Iterator[dict]]:
+    hoje = timezone.localdate()
+    limite = hoje - relativedelta(months=12)
+    # Última férias concluída por funcionário em uma consulta (antes: 1 por funcionário)
+    vencidos = (
+        Funcionario.objects.filter(tenant=job.tenant, ativo=True)
+        .annotate(ultimo_fim=Max("ferias__periodo_aquisitivo_fim", filter=Q(ferias__status="CONCLUIDA")))
+        .filter(
+            Q(ultimo_fim__isnull=True, data_admissao__lte=limite) | Q(ultimo_fim__isnull=False, ultimo_fim__lt=limite),
+        )
+        .order_by("nome_completo", "id")
+    )
+
+    def linhas():
+        for nome, ultimo_fim, admissao in vencidos.values_list(
+            "nome_completo", "ultimo_fim", "data_admissao"
+        ).iterator():
+            periodo = ultimo_fim + timedelta(days=1) if ultimo_fim else admissao
+            yield [nome, periodo.strftime("%d/%m/%Y"), f"{(hoje - periodo).days} dias"]
+
+    total = vencidos.count()
+    alerta = "<b>ATENÇÃO:</b> Funcionários com férias vencidas podem gerar passivos trabalhistas!"
+    vazio = "✓ Nenhum funcionário com férias vencidas encontrado."
+    base = {
+        "titulo": f"Relatório de Férias Vencidas - {job.tenant.name}",
+        "cabecalho": ["Funcionário", "Período Vencido", "Dias em Atraso"],
+        "estilo": "alerta",
+    }
+    return _blocos(base, linhas(), total, lambda: [alerta if total else vazio])
+
+
+_COLETORES = {"PONTO": _secoes_ponto, "MAO_OBRA": _secoes_mao_obra, "FERIAS": _secoes_ferias}
+
+
+# ---------------------------------------------------------------------------
+# Execução (task Celery)
+# ---------------------------------------------------------------------------
+
+
+class _Progresso:
+    """Persiste ``secoes_concluidas`` com throttle (evita um UPDATE por seção)."""
+
+    def __init__(self, job_id: int):
+        self.job_id = job_id
+        self.concluidas = 0
+        self._ultimo = 0.0
+
+    def avancar(self, final: bool = False) -> None:
+        if not final:
+            self.concluidas += 1
+        agora = monotonic()
+        if final or agora - self._ultimo >= _PROGRESSO_INTERVALO:
+            RelatorioJob.objects.filter(pk=self.job_id).update(secoes_concluidas=self.concluidas)
+            self._ultimo = agora
+
+
+def _renderizar(job: RelatorioJob, secoes: Iterator[dict], pasta: str, workers: int) -> list[str]:
+    progresso = _Progresso(job.pk)
+    caminhos = []
+    if workers <= 1:
+        for indice, payload in enumerate(secoes):
+            caminhos.append(renderizar_secao(job.tipo, payload, os.path.join(pasta, f"secao_{indice:06d}.pdf")))
+            progresso.avancar()
+        progresso.avancar(final=True)
+        return caminhos
+
+    # Pool do billiard (o mesmo do Celery): o worker prefork é daemônico e o
+    # multiprocessing recusa filhos de processo daemônico. "spawn": os filhos não
+    # herdam conexões de banco/threads do worker
+    with get_context("spawn").Pool(processes=workers) as pool:
+        pendentes = deque()
+        for indice, payload in enumerate(secoes):
+            destino = os.path.join(pasta, f"secao_{indice:06d}.pdf")
+            caminhos.append(destino)
+            pendentes.append(pool.apply_async(renderizar_secao, (job.tipo, payload, destino)))
+            if len(pendentes) >= workers * 4:  # limita payloads em memória
+                pendentes.popleft().get()
+                progresso.avancar()
+        while pendentes:
+            pendentes.popleft().get()
+            progresso.avancar()
+    progresso.avancar(final=True)
+    return caminhos
+
+
+def _mesclar(caminhos: list[str], destino: str) -> None:
+    writer = PdfWriter()
+    for caminho in caminhos:
+        writer.append(caminho)
+    with open(destino, "wb") as saida:
+        writer.write(saida)
+    writer.close()
+
+
+def executar_relatorio(job_id: int, *, workers: int | None = None) -> RelatorioJob:
+    """Gera o PDF do job; idempotente para reentregas (jobs já finalizados são ignorados)."""
+    job = RelatorioJob.objects.select_related("tenant").get(pk=job_id)
+    if job.status not in RelatorioJob.STATUS_ATIVOS:
+        return job
+    RelatorioJob.objects.filter(pk=job.pk).update(status="PROCESSANDO", secoes_concluidas=0)
+    try:
+        total, secoes = _COLETORES[job.tipo](job)
+        RelatorioJob.objects.filter(pk=job.pk).update(total_secoes=total)
+        with tempfile.TemporaryDirectory(prefix="relatorio_") as pasta:
+            caminhos = _renderizar(job, secoes, pasta, workers if workers is not None else _workers())
+            final = os.path.join(pasta, "relatorio.pdf")
+            _mesclar(caminhos, final)
+            nome = f"{job.tipo.lower()}_{job.tenant_id}_{timezone.now():%Y%m%d%H%M%S}.pdf"
+            with open(final, "rb") as fh:
+                job.arquivo.save(nome, File(fh), save=False)
+    except Exception as exc:
+        logger.exception("Falha ao gerar relatório %s", job.pk)
+        RelatorioJob.objects.filter(pk=job.pk).update(status="ERRO", erro=str(exc)[:2000])
+        job.refresh_from_db()
+        return job
+    agora = timezone.now()
+    job.status = "CONCLUIDO"
+    job.total_secoes = total
+    job.secoes_concluidas = len(caminhos)
+    job.concluido_em = agora
+    job.expira_em = agora + _ttl()
+    job.save(update_fields=["arquivo", "status", "total_secoes", "secoes_concluidas", "concluido_em", "expira_em"])
+    return job
+
+
+# ---------------------------------------------------------------------------
+# Download com expiração
+# ---------------------------------------------------------------------------
+
+
+def link_download(job: RelatorioJob) -> str | None:
+    """URL assinada do PDF (``None`` se o job não está concluído ou expirou)."""
+    if job.status != "CONCLUIDO" or not job.expira_em or job.expira_em <= timezone.now():
+        return None
+    token = signing.dumps(job.pk, salt=_SALT)
+    return reverse("funcionarios:relatorio_download", args=[token])
+
+
+def job_por_token(token: str) -> RelatorioJob:
+    """Resolve o token do link; levanta ``signing.BadSignature`` ou ``RelatorioJob.DoesNotExist``."""
+    pk = signing.loads(token, salt=_SALT, max_age=_ttl())
+    return RelatorioJob.objects.get(pk=pk, status="CONCLUIDO", expira_em__gt=timezone.now())
+
+
+def expirar_relatorios(agora=None) -> int:
+    """Remove arquivos de jobs expirados e marca-os como ``EXPIRADO``."""
+    agora = agora or timezone.now()
+    expirados = 0
+    for job in RelatorioJob.objects.filter(status="CONCLUIDO", expira_em__lte=agora).iterator():
+        if job.arquivo:
+            job.arquivo.delete(save=False)
+        job.status = "EXPIRADO"
+        job.save(update_fields=["arquivo", "status"])
+        expirados += 1
+    return expirados
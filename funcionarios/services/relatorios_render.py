@@ -0,0 +1,106 @@
+# funcionarios/services/relatorios_render.py
+"""Renderização de seções de relatório PDF (executada nos processos do pool).
+
+Este módulo não importa modelos nem configura o Django: recebe payloads simples
+(dicts/listas de strings e números) montados pelo processo principal em
+``funcionarios.services.relatorios`` e grava um PDF por seção no disco.
+"""
+
+from __future__ import annotations
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+__all__ = ["renderizar_secao", "story_ponto", "story_tabela"]
+
+_ESTILOS_TABELA = {
+    "padrao": [
+        ("BACKGROUND", (0, 0), (-1, 0), colors.grey),
+        ("TEXTCOLOR", (0, 0), (-1, 0), colors.whitesmoke),
+        ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+        ("FONTSIZE", (0, 0), (-1, 0), 10),
+        ("BOTTOMPADDING", (0, 0), (-1, 0), 12),
+        ("BACKGROUND", (0, 1), (-1, -1), colors.beige),
+        ("GRID", (0, 0), (-1, -1), 1, colors.black),
+    ],
+    "alerta": [
+        ("BACKGROUND", (0, 0), (-1, 0), colors.red),
+        ("TEXTCOLOR", (0, 0), (-1, 0), colors.whitesmoke),
+        ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+        ("FONTSIZE", (0, 0), (-1, 0), 12),
+        ("BOTTOMPADDING", (0, 0), (-1, 0), 12),
+        ("BACKGROUND", (0, 1), (-1, -1), colors.lightpink),
+        ("GRID", (0, 0), (-1, -1), 1, colors.black),
+    ],
+    "ponto": [
+        ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
+        ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+        ("FONTSIZE", (0, 0), (-1, -1), 10),
+        ("GRID", (0, 0), (-1, -1), 1, colors.black),
+    ],
+}
+
+
+def _titulo(styles, texto: str, font_size: int = 16, space_after: int = 30) -> Paragraph:
+    estilo = ParagraphStyle(
+        "CustomTitle", parent=styles["Heading1"], fontSize=font_size, spaceAfter=space_after, alignment=1
+    )
+    return Paragraph(texto, estilo)
+
+
+def story_ponto(payload: dict) -> list:
+    """Seção de cartão de ponto de um funcionário.
+
+    ``payload``: ``nome``, ``periodo`` e ``dias`` (cada dia com ``titulo``, ``linhas``
+    [horário, tipo, IP, aprovado], ``total_horas`` e ``horas_extras``).
+    """
+    styles = getSampleStyleSheet()
+    story = [
+        _titulo(styles, f"Relatório de Ponto - {payload['nome']}", font_size=14, space_after=20),
+        Paragraph(f"Período: {payload['periodo']}", styles["Normal"]),
+        Spacer(1, 20),
+    ]
+    for dia in payload["dias"]:
+        story.append(Paragraph(f"<b>{dia['titulo']}</b>", styles["Heading3"]))
+        table = Table([["Horário", "Tipo", "IP", "Aprovado"], *dia["linhas"]])
+        table.setStyle(TableStyle(_ESTILOS_TABELA["ponto"]))
+        story.append(table)
+        resumo = f"Horas trabalhadas: {dia['total_horas']:.2f}h | Extras: {dia['horas_extras']:.2f}h"
+        story.append(Paragraph(resumo, styles["Normal"]))
+        story.append(Spacer(1, 15))
+    return story
+
+
+def story_tabela(payload: dict) -> list:
+    """Bloco tabular (mão de obra, férias): título opcional, linhas e rodapé opcional."""
+    styles = getSampleStyleSheet()
+    story = []
+    if payload.get("titulo"):
+        story += [
+            _titulo(styles, payload["titulo"]),
+            Spacer(1, 12),
+            Paragraph(payload.get("subtitulo", ""), styles["Normal"]),
+            Spacer(1, 20),
+        ]
+    if payload["linhas"]:
+        table = Table([payload["cabecalho"], *payload["linhas"]], repeatRows=1)
+        table.setStyle(TableStyle(_ESTILOS_TABELA[payload.get("estilo", "padrao")]))
+        story.append(table)
+    for paragrafo in payload.get("rodape", []):
+        story += [Spacer(1, 20), Paragraph(paragrafo, styles["Normal"])]
+    return story
+
+
+_STORIES = {"PONTO": story_ponto, "MAO_OBRA": story_tabela, "FERIAS": story_tabela}
+
+
+def renderizar_secao(tipo: str, payload: dict, destino: str) -> str:
+    """Gera o PDF de uma seção em ``destino`` e devolve o caminho."""
+    doc = SimpleDocTemplate(destino, pagesize=A4)
+    doc.build(_STORIES[tipo](payload))
+    return destino
@@ -0,0 +1,28 @@
+"""
+Tasks Celery do módulo de funcionários (relatórios PDF em background).
+"""
+
+import logging
+
+from celery import shared_task
+
+from .services.relatorios import executar_relatorio, expirar_relatorios
+
+logger = logging.getLogger(__name__)
+
+
+# Relatórios grandes (milhares de seções) excedem o limite global de 5 minutos
+@shared_task(bind=True, time_limit=60 * 30, soft_time_limit=60 * 25)
+def gerar_relatorio_job(self, job_id):
+    """Renderiza as seções do relatório em pool de processos e mescla o PDF final."""
+    job = executar_relatorio(job_id)
+    return {"job_id": job.pk, "status": job.status}
+
+
+@shared_task
+def limpar_relatorios_expirados():
+    """Remove arquivos de relatórios cujo link de download expirou."""
+    total = expirar_relatorios()
+    if total:
+        logger.info("Relatórios expirados removidos: %s", total)
+    return total
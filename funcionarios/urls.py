@@ -80,6 +80,10 @@ urlpatterns = [
     path("beneficios/", views.BeneficioListView.as_view(), name="beneficio_list"),
     path("<int:funcionario_pk>/beneficios/", views.BeneficioListView.as_view(), name="funcionario_beneficios"),
     path("<int:funcionario_pk>/beneficios/adicionar/", views.BeneficioCreateView.as_view(), name="beneficio_create"),
+    # Relatórios PDF em background
+    path("relatorios/<str:tipo>/solicitar/", views.relatorio_solicitar, name="relatorio_solicitar"),
+    path("relatorios/job/<int:pk>/", views.relatorio_status, name="relatorio_status"),
+    path("relatorios/download/<str:token>/", views.relatorio_download, name="relatorio_download"),
     # URLs AJAX
     path("ajax/search/", views.funcionario_search_ajax, name="funcionario_search_ajax"),
     path("api/", include(router.urls)),
@@ -366,18 +366,22 @@ class CalculadoraMaoObra:
     """Calculadora para custos de mão de obra"""
 
     @classmethod
-    def calcular_custo_total(cls, funcionario, incluir_encargos: bool = True) -> dict[str, Decimal]:
+    def calcular_custo_total(
+        cls, funcionario, incluir_encargos: bool = True, salario_base: Decimal | None = None
+    ) -> dict[str, Decimal]:
         """
         Calcula o custo total da mão de obra de um funcionário
 
         Args:
             funcionario: Instância do modelo Funcionario
             incluir_encargos: Se deve incluir encargos sociais
+            salario_base: Salário já carregado em lote (evita consulta ao histórico)
 
         Returns:
             Dict com breakdown dos custos
         """
-        salario_base = funcionario.get_salario_atual()
+        if salario_base is None:
+            salario_base = funcionario.get_salario_atual()
 
         if salario_base <= 0:
             return {
@@ -436,14 +440,19 @@ class CalculadoraMaoObra:
         Returns:
             Dict com custos do projeto
         """
+        from funcionarios.services.folha import salarios_atuais  # noqa: PLC0415 - services importa utils
+
         custo_total = Decimal("0.00")
         detalhes = []
+        # Salários vigentes de todos os funcionários em uma consulta (antes: 1 por funcionário)
+        vigentes = salarios_atuais({item["funcionario"].pk for item in funcionarios_horas})
 
         for item in funcionarios_horas:
             funcionario = item["funcionario"]
             horas = Decimal(str(item["horas"]))
 
-            custos = cls.calcular_custo_total(funcionario)
+            salario = vigentes.get(funcionario.pk, funcionario.salario_base)
+            custos = cls.calcular_custo_total(funcionario, salario_base=salario)
             custo_funcionario = custos["custo_hora"] * horas
             custo_total += custo_funcionario
 
@@ -4,16 +4,19 @@ from datetime import datetime, timedelta
 
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.core import signing
 from django.db import transaction
 from django.db.models import Count
-from django.http import JsonResponse
+from django.http import FileResponse, Http404, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse, reverse_lazy
+from django.utils.dateparse import parse_date
 from django.utils.translation import gettext_lazy as _
-from django.views.decorators.http import require_POST
+from django.views.decorators.http import require_GET, require_POST
 from django.views.generic import CreateView, DeleteView, DetailView, ListView, UpdateView
 
 from core.mixins import PageTitleMixin, TenantRequiredMixin
+from core.services import search_index
 from core.utils import get_current_tenant
 from shared.mixins.ui_permissions import UIPermissionsMixin
 from shared.services.ui_permissions import build_ui_permissions
@@ -37,7 +40,9 @@ from .models import (
     Folga,
     Funcionario,
     FuncionarioRemuneracaoRegra,
+    RelatorioJob,
 )
+from .services import relatorios
 
 
 @login_required
@@ -160,11 +165,7 @@ class FuncionarioListView(UIPermissionsMixin, FuncionarioMixin, PageTitleMixin,
         ativo = self.request.GET.get("ativo")  # usa ainda o parâmetro mas deriva de data_demissao
 
         if search:
-            queryset = (
-                queryset.filter(nome_completo__icontains=search)
-                | queryset.filter(cpf__icontains=search)
-                | queryset.filter(cargo__icontains=search)
-            )
+            queryset = search_index.filter_queryset(queryset, search)
 
         if departamento:
             queryset = queryset.filter(departamento_id=departamento)
@@ -735,7 +736,10 @@ def funcionario_search_ajax(request):
     term = request.GET.get("term", "")
     tenant = get_current_tenant(request)
 
-    funcionarios = Funcionario.objects.filter(tenant=tenant, nome_completo__icontains=term, ativo=True)[:10]
+    ativos = Funcionario.objects.filter(tenant=tenant, ativo=True)
+    ids = search_index.search_ids(Funcionario, term, tenant=tenant, limit=10, within=ativos)
+    por_id = ativos.in_bulk(ids)
+    funcionarios = [por_id[pk] for pk in ids if pk in por_id]
 
     results = [{"id": f.id, "text": f.nome_completo, "cpf": f.cpf, "cargo": f.cargo} for f in funcionarios]
 
@@ -766,3 +770,70 @@ def relatorio_ponto_funcionario(request, funcionario_pk):
     }
 
     return render(request, "funcionarios/relatorio_ponto.html", context)
+
+
+# ===================== RELATÓRIOS PDF EM BACKGROUND =====================
+
+
+def _relatorio_job_json(job):
+    return {
+        "id": job.pk,
+        "tipo": job.tipo,
+        "status": job.status,
+        "progresso": job.progresso,
+        "total_secoes": job.total_secoes,
+        "secoes_concluidas": job.secoes_concluidas,
+        "erro": job.erro or None,
+        "status_url": reverse("funcionarios:relatorio_status", args=[job.pk]),
+        "download_url": relatorios.link_download(job),
+        "expira_em": job.expira_em.isoformat() if job.expira_em else None,
+    }
+
+
+@login_required
+@require_POST
+def relatorio_solicitar(request, tipo):
+    """Enfileira (ou reaproveita) a geração de um relatório PDF; responde 202 com o job."""
+    tenant = get_current_tenant(request)
+    if not tenant:
+        return JsonResponse({"error": "Tenant não selecionado"}, status=400)
+    tipo = tipo.upper()
+    parametros = {}
+    if tipo == "PONTO":
+        data_inicio = parse_date(request.POST.get("data_inicio") or "")
+        data_fim = parse_date(request.POST.get("data_fim") or "")
+        if not data_inicio or not data_fim or data_inicio > data_fim:
+            return JsonResponse({"error": "Período inválido"}, status=400)
+        parametros = {"data_inicio": data_inicio.isoformat(), "data_fim": data_fim.isoformat()}
+        funcionario_ids = sorted({int(pk) for pk in request.POST.getlist("funcionario") if pk.isdigit()})
+        if funcionario_ids:
+            parametros["funcionario_ids"] = funcionario_ids
+    elif tipo == "MAO_OBRA":
+        parametros = {"incluir_inativos": request.POST.get("incluir_inativos") in ("1", "true", "on")}
+    try:
+        job, criado = relatorios.solicitar_relatorio(tenant, tipo, parametros, usuario=request.user)
+    except ValueError:
+        return JsonResponse({"error": "Tipo de relatório inválido"}, status=400)
+    return JsonResponse({**_relatorio_job_json(job), "novo": criado}, status=202)
+
+
+@login_required
+@require_GET
+def relatorio_status(request, pk):
+    """Progresso do job (para polling) e link de download quando concluído."""
+    job = get_object_or_404(RelatorioJob, pk=pk, tenant=get_current_tenant(request))
+    return JsonResponse(_relatorio_job_json(job))
+
+
+@login_required
+@require_GET
+def relatorio_download(request, token):
+    """Entrega o PDF via link assinado; links expirados ou de outro tenant retornam 404."""
+    try:
+        job = relatorios.job_por_token(token)
+    except (signing.BadSignature, RelatorioJob.DoesNotExist) as exc:
+        raise Http404(_("Link de relatório inválido ou expirado.")) from exc
+    tenant = get_current_tenant(request)
+    if not tenant or job.tenant_id != tenant.pk:
+        raise Http404(_("Link de relatório inválido ou expirado."))
+    return FileResponse(job.arquivo.open("rb"), as_attachment=True, filename=job.arquivo.name.rsplit("/", 1)[-1])
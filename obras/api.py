@@ -1,3 +1,9 @@
+import csv
+from dataclasses import asdict
+
+from django.db.models import Count, Q
+from django.http import HttpResponse
+from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
@@ -6,8 +12,11 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 
 from core.permissions import AdvancedPermissionManager
+from shared.exceptions import NegocioError
+from shared.mixins.row_access import TenantScopedViewSetMixin
 
-from .models import Obra
+from .models import DependenciaTarefa, Obra, TarefaCronograma
+from .services import cronograma, custos
 
 
 class ObraSerializer(serializers.ModelSerializer):
@@ -18,10 +27,66 @@ class ObraSerializer(serializers.ModelSerializer):
     class Meta:
         model = Obra
         fields = "__all__"
-        read_only_fields = ("created_at", "updated_at")
+        read_only_fields = ("tenant",)
+
+    def validate_cliente(self, cliente):
+        view = self.context.get("view")
+        tenant = view.get_tenant() if hasattr(view, "get_tenant") else None
+        if cliente is not None and tenant is not None and cliente.tenant_id != tenant.pk:
+            raise serializers.ValidationError("Cliente não pertence à empresa atual.")
+        return cliente
+
+
+class TarefaCronogramaSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = TarefaCronograma
+        fields = [
+            "id",
+            "nome",
+            "duracao_dias",
+            "inicio_minimo",
+            "percentual_concluido",
+            "inicio_cedo",
+            "fim_cedo",
+            "inicio_tarde",
+            "fim_tarde",
+            "folga_total",
+            "critica",
+        ]
+        read_only_fields = fields
+
+
+class TarefaAlteracaoSerializer(serializers.Serializer):
+    """Edição (com ``id``) ou criação (sem ``id``) de tarefa do cronograma."""
+
+    id = serializers.IntegerField(required=False)
+    nome = serializers.CharField(max_length=200, required=False)
+    duracao_dias = serializers.IntegerField(min_value=0, required=False)
+    inicio_minimo = serializers.DateField(required=False, allow_null=True)
+    percentual_concluido = serializers.IntegerField(min_value=0, max_value=100, required=False)
+
+    def validate(self, attrs):
+        if not attrs.get("id") and not attrs.get("nome"):
+            raise serializers.ValidationError("Informe 'nome' para criar uma tarefa.")
+        return attrs
+
+
+class DependenciaAlteracaoSerializer(serializers.Serializer):
+    predecessora = serializers.IntegerField()
+    sucessora = serializers.IntegerField()
+    tipo = serializers.ChoiceField(choices=DependenciaTarefa.TIPO_CHOICES, default="FS")
+    lag = serializers.IntegerField(default=0)
+
+
+class CronogramaAlteracaoSerializer(serializers.Serializer):
+    tarefas = TarefaAlteracaoSerializer(many=True, required=False)
+    dependencias = DependenciaAlteracaoSerializer(many=True, required=False)
+    remover_dependencias = serializers.ListField(
+        child=serializers.ListField(child=serializers.IntegerField(), min_length=2, max_length=2), required=False
+    )
 
 
-class ObraViewSet(viewsets.ModelViewSet):
+class ObraViewSet(TenantScopedViewSetMixin, viewsets.ModelViewSet):
     """
     API para gerenciamento de obras
 
@@ -34,21 +99,14 @@ class ObraViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ["nome", "cliente", "status", "data_inicio", "data_previsao_termino"]
-    search_fields = ["nome", "descricao", "endereco"]
-    ordering_fields = ["nome", "data_inicio", "data_previsao_termino", "created_at"]
+    search_fields = ["nome", "endereco", "cidade"]
+    ordering_fields = ["nome", "data_inicio", "data_previsao_termino", "valor_contrato"]
 
     def get_queryset(self):
         """
-        Filtra as obras com base nas permissões do usuário
+        Filtra as obras pelo tenant atual e pelas permissões por linha do usuário
         """
-        user = self.request.user
-
-        # Se o usuário for superusuário, retorna todas as obras
-        if user.is_superuser:
-            return Obra.objects.all()
-
-        # Caso contrário, retorna apenas as obras que o usuário tem permissão para ver
-        return AdvancedPermissionManager.get_objects_for_user_with_permission(user, Obra, "view_obra")
+        return super().get_queryset()
 
     @swagger_auto_schema(
         operation_description="Exporta dados de obras em formato CSV", responses={200: "Arquivo CSV gerado com sucesso"}
@@ -56,12 +114,16 @@ class ObraViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=["get"])
     def export_csv(self, request):
         """
-        Exporta dados de obras em formato CSV
+        Exporta dados de obras em formato CSV (somente as visíveis ao usuário)
         """
-        # Implementação da exportação CSV
-        # (código de exportação seria implementado aqui)
-
-        return Response({"message": "Exportação CSV iniciada. O arquivo será enviado por email."})
+        response = HttpResponse(content_type="text/csv")
+        response["Content-Disposition"] = 'attachment; filename="obras.csv"'
+        writer = csv.writer(response)
+        colunas = ["id", "nome", "tipo_obra", "cliente_id", "cidade", "estado", "status", "progresso"]
+        colunas += ["data_inicio", "data_previsao_termino", "data_termino", "valor_contrato"]
+        writer.writerow(colunas)
+        writer.writerows(self.filter_queryset(self.get_queryset()).values_list(*colunas).iterator(chunk_size=2000))
+        return response
 
     @swagger_auto_schema(
         operation_description="Exporta dados de obras em formato Excel",
@@ -98,13 +160,17 @@ class ObraViewSet(viewsets.ModelViewSet):
         """
         Obtém estatísticas de obras
         """
-        # Cálculo de estatísticas
-        total_obras = Obra.objects.count()
-        obras_em_andamento = Obra.objects.filter(status="em_andamento").count()
-        obras_concluidas = Obra.objects.filter(status="concluida").count()
-        obras_planejadas = Obra.objects.filter(status="planejada").count()
-
-        # Mais estatísticas seriam calculadas aqui
+        # Uma única agregação condicional sobre o queryset já escopado (tenant + linha)
+        totais = self.get_queryset().aggregate(
+            total=Count("id"),
+            em_andamento=Count("id", filter=Q(status="em_andamento")),
+            concluidas=Count("id", filter=Q(status="concluida")),
+            planejadas=Count("id", filter=Q(status="planejamento")),
+        )
+        total_obras = totais["total"]
+        obras_em_andamento = totais["em_andamento"]
+        obras_concluidas = totais["concluidas"]
+        obras_planejadas = totais["planejadas"]
 
         return Response(
             {
@@ -117,42 +183,73 @@ class ObraViewSet(viewsets.ModelViewSet):
         )
 
     @swagger_auto_schema(
-        operation_description="Gerencia cronograma da obra",
-        request_body=openapi.Schema(
-            type=openapi.TYPE_OBJECT,
-            properties={
-                "etapas": openapi.Schema(
-                    type=openapi.TYPE_ARRAY,
-                    items=openapi.Schema(
-                        type=openapi.TYPE_OBJECT,
-                        properties={
-                            "nome": openapi.Schema(type=openapi.TYPE_STRING),
-                            "data_inicio": openapi.Schema(type=openapi.TYPE_STRING, format="date"),
-                            "data_fim": openapi.Schema(type=openapi.TYPE_STRING, format="date"),
-                            "percentual_concluido": openapi.Schema(type=openapi.TYPE_NUMBER),
-                        },
-                    ),
-                )
-            },
-        ),
-        responses={200: "Cronograma atualizado com sucesso"},
+        operation_description="Orçado x realizado, burn rate e margem da obra (acumulados do razão de custos)",
+        manual_parameters=[
+            openapi.Parameter("meses", openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description="Meses do burn rate")
+        ],
+        responses={200: "Resumo de custos obtido com sucesso"},
+    )
+    @action(detail=True, methods=["get"])
+    def custos(self, request, pk=None):
+        """
+        Resumo de custos da obra
+        """
+        obra = self.get_object()
+        try:
+            meses = max(int(request.query_params.get("meses", 3)), 1)
+        except ValueError:
+            return Response({"error": "Parâmetro 'meses' inválido"}, status=400)
+        return Response(asdict(custos.resumo(obra, meses_burn=meses)))
+
+    @swagger_auto_schema(
+        method="get",
+        operation_description="Cronograma da obra (CPM); ?nivelamento=1 retorna a prévia do nivelamento de recursos",
+        manual_parameters=[openapi.Parameter("nivelamento", openapi.IN_QUERY, type=openapi.TYPE_BOOLEAN)],
+        responses={200: "Cronograma obtido com sucesso"},
+    )
+    @swagger_auto_schema(
+        method="post",
+        operation_description="Aplica edições de tarefas/dependências e recalcula apenas o subgrafo afetado",
+        request_body=CronogramaAlteracaoSerializer,
+        responses={200: "Cronograma atualizado com sucesso", 400: "Dados inválidos ou ciclo de dependências"},
     )
     @action(detail=True, methods=["get", "post"])
     def cronograma(self, request, pk=None):
         """
         Gerencia o cronograma da obra
         """
-        self.get_object()
+        obra = self.get_object()
 
         if request.method == "GET":
-            # Retorna o cronograma atual
-            # (código para obter cronograma seria implementado aqui)
-            return Response({"message": "Cronograma obtido com sucesso", "cronograma": {}})
-
-        elif request.method == "POST":
-            # Atualiza o cronograma
-            # (código para atualizar cronograma seria implementado aqui)
-            return Response({"message": "Cronograma atualizado com sucesso"})
+            if request.query_params.get("nivelamento") in ("1", "true"):
+                return Response({"nivelamento": asdict(cronograma.nivelar(obra))})
+            if obra.tarefas.filter(inicio_cedo__isnull=True).exists():
+                cronograma.recalcular(obra)  # tarefas criadas fora da API
+            tarefas = obra.tarefas.order_by("inicio_cedo", "id")
+            dependencias = DependenciaTarefa.objects.filter(sucessora__obra=obra).values(
+                "predecessora", "sucessora", "tipo", "lag"
+            )
+            return Response(
+                {
+                    "message": "Cronograma obtido com sucesso",
+                    "cronograma": {
+                        "tarefas": TarefaCronogramaSerializer(tarefas, many=True).data,
+                        "dependencias": list(dependencias),
+                        "termino": max((t.fim_cedo for t in tarefas), default=None),
+                        "caminho_critico": [t.id for t in tarefas if t.critica],
+                    },
+                }
+            )
+
+        serializer = CronogramaAlteracaoSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            resultado = cronograma.aplicar_alteracoes(obra, **serializer.validated_data)
+        except cronograma.CicloDependencias as exc:
+            return Response({"error": str(exc), "ciclo": exc.ciclo}, status=400)
+        except NegocioError as exc:
+            return Response({"error": str(exc)}, status=400)
+        return Response({"message": "Cronograma atualizado com sucesso", **asdict(resultado)})
 
     @swagger_auto_schema(operation_description="Finaliza uma obra", responses={200: "Obra finalizada com sucesso"})
     @action(detail=True, methods=["post"])
@@ -166,8 +263,12 @@ class ObraViewSet(viewsets.ModelViewSet):
         if not AdvancedPermissionManager.check_user_permission(request.user, "close_obra", obra):
             return Response({"error": "Você não tem permissão para finalizar esta obra"}, status=403)
 
-        # Lógica para finalizar a obra
-        # (código para finalizar obra seria implementado aqui)
+        if obra.status in ("concluida", "cancelada"):
+            return Response({"error": "A obra já está encerrada"}, status=400)
+        obra.status = "concluida"
+        obra.progresso = 100
+        obra.data_termino = timezone.localdate()
+        obra.save(update_fields=["status", "progresso", "data_termino"])
 
         return Response({"message": "Obra finalizada com sucesso"})
 
@@ -185,7 +286,13 @@ class ObraViewSet(viewsets.ModelViewSet):
         if not AdvancedPermissionManager.check_user_permission(request.user, "reopen_obra", obra):
             return Response({"error": "Você não tem permissão para reabrir esta obra"}, status=403)
 
-        # Lógica para reabrir a obra
-        # (código para reabrir obra seria implementado aqui)
+        if obra.status != "concluida":
+            return Response({"error": "Apenas obras finalizadas podem ser reabertas"}, status=400)
+        obra.status = "em_andamento"
+        obra.data_termino = None
+        obra.save(update_fields=["status", "data_termino"])
+        if obra.tarefas.exists():
+            # Progresso volta a refletir as tarefas do cronograma
+            cronograma.atualizar_progresso(obra)
 
         return Response({"message": "Obra reaberta com sucesso"})
@@ -6,3 +6,6 @@ class ObrasConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "obras"
     verbose_name = "Obras"  # O verbose_name do AppConfig pode ser plural
+
+    def ready(self):
+        from . import signals  # noqa: F401, PLC0415 força registro dos handlers
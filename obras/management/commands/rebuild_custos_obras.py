@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from obras.services.custos import reconstruir
+
+
+class Command(BaseCommand):
+    help = "Reconstrói o razão e os acumulados mensais de custos das obras a partir dos dados brutos"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--obra", type=int, action="append", dest="obras", help="Restringe a obra(s) (repetível)")
+        parser.add_argument("--check", action="store_true", help="Apenas confere; não regrava")
+
+    def handle(self, *args, **options):
+        divergencias = reconstruir(options["obras"], corrigir=not options["check"])
+        for d in divergencias:
+            self.stdout.write(
+                f"obra={d.obra_id} {d.categoria} {d.competencia:%Y-%m}: esperado={d.esperado} registrado={d.registrado}"
+            )
+        acao = "encontradas" if options["check"] else "corrigidas"
+        estilo = self.style.WARNING if divergencias and options["check"] else self.style.SUCCESS
+        self.stdout.write(estilo(f"Divergências {acao}: {len(divergencias)}"))
@@ -0,0 +1,97 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("obras", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CustoObraMensal",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                (
+                    "categoria",
+                    models.CharField(
+                        choices=[
+                            ("MAO_OBRA", "Mão de Obra"),
+                            ("MATERIAL", "Material (consumo de estoque)"),
+                            ("COMPRA", "Compras"),
+                        ],
+                        max_length=20,
+                        verbose_name="Categoria",
+                    ),
+                ),
+                ("competencia", models.DateField(verbose_name="Competência")),
+                ("valor", models.DecimalField(decimal_places=2, default=0, max_digits=15, verbose_name="Valor")),
+                ("lancamentos", models.IntegerField(default=0, verbose_name="Lançamentos")),
+                ("atualizado_em", models.DateTimeField(auto_now=True, verbose_name="Atualizado em")),
+                (
+                    "obra",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="custos_mensais",
+                        to="obras.obra",
+                        verbose_name="Obra",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Custo Mensal da Obra",
+                "verbose_name_plural": "Custos Mensais das Obras",
+                "ordering": ["obra", "competencia", "categoria"],
+                "constraints": [
+                    models.UniqueConstraint(fields=("obra", "categoria", "competencia"), name="obras_custo_mensal_uniq")
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="LancamentoCusto",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                (
+                    "categoria",
+                    models.CharField(
+                        choices=[
+                            ("MAO_OBRA", "Mão de Obra"),
+                            ("MATERIAL", "Material (consumo de estoque)"),
+                            ("COMPRA", "Compras"),
+                        ],
+                        max_length=20,
+                        verbose_name="Categoria",
+                    ),
+                ),
+                (
+                    "competencia",
+                    models.DateField(help_text="Primeiro dia do mês do custo.", verbose_name="Competência"),
+                ),
+                ("valor", models.DecimalField(decimal_places=2, max_digits=15, verbose_name="Valor")),
+                ("origem_tipo", models.CharField(max_length=50, verbose_name="Tipo de Origem")),
+                ("origem_id", models.PositiveBigIntegerField(verbose_name="ID de Origem")),
+                ("atualizado_em", models.DateTimeField(auto_now=True, verbose_name="Atualizado em")),
+                (
+                    "obra",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="lancamentos_custo",
+                        to="obras.obra",
+                        verbose_name="Obra",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Lançamento de Custo",
+                "verbose_name_plural": "Lançamentos de Custo",
+                "indexes": [
+                    models.Index(fields=["obra", "categoria", "competencia"], name="obras_lanca_obra_id_5cb846_idx")
+                ],
+                "constraints": [
+                    models.UniqueConstraint(fields=("origem_tipo", "origem_id"), name="obras_lancamento_origem_uniq")
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,209 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:31
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("obras", "0002_custos_obra"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CalendarioObra",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                (
+                    "dias_uteis",
+                    models.CharField(
+                        default="12345",
+                        help_text="Dias da semana trabalhados (ISO: 1=segunda ... 7=domingo). Ex.: 123456",
+                        max_length=7,
+                        verbose_name="Dias Úteis",
+                    ),
+                ),
+                (
+                    "feriados",
+                    models.JSONField(
+                        blank=True,
+                        default=list,
+                        help_text='Datas sem trabalho. Ex.: ["2026-12-25"]',
+                        verbose_name="Feriados",
+                    ),
+                ),
+                (
+                    "obra",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="calendario",
+                        to="obras.obra",
+                        verbose_name="Obra",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Calendário da Obra",
+                "verbose_name_plural": "Calendários das Obras",
+            },
+        ),
+        migrations.CreateModel(
+            name="RecursoObra",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("nome", models.CharField(max_length=100, verbose_name="Nome")),
+                (
+                    "capacidade_diaria",
+                    models.DecimalField(
+                        decimal_places=2, default=1, max_digits=8, verbose_name="Capacidade Diária (unidades)"
+                    ),
+                ),
+                (
+                    "obra",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="recursos",
+                        to="obras.obra",
+                        verbose_name="Obra",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Recurso da Obra",
+                "verbose_name_plural": "Recursos da Obra",
+                "ordering": ["nome"],
+            },
+        ),
+        migrations.CreateModel(
+            name="TarefaCronograma",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("nome", models.CharField(max_length=200, verbose_name="Nome")),
+                (
+                    "duracao_dias",
+                    models.PositiveIntegerField(
+                        default=1, help_text="0 para marcos.", verbose_name="Duração (dias úteis)"
+                    ),
+                ),
+                ("inicio_minimo", models.DateField(blank=True, null=True, verbose_name="Não iniciar antes de")),
+                (
+                    "percentual_concluido",
+                    models.PositiveSmallIntegerField(
+                        default=0,
+                        validators=[
+                            django.core.validators.MinValueValidator(0),
+                            django.core.validators.MaxValueValidator(100),
+                        ],
+                        verbose_name="Concluído (%)",
+                    ),
+                ),
+                ("inicio_cedo", models.DateField(blank=True, editable=False, null=True, verbose_name="Início Cedo")),
+                ("fim_cedo", models.DateField(blank=True, editable=False, null=True, verbose_name="Término Cedo")),
+                ("inicio_tarde", models.DateField(blank=True, editable=False, null=True, verbose_name="Início Tarde")),
+                ("fim_tarde", models.DateField(blank=True, editable=False, null=True, verbose_name="Término Tarde")),
+                (
+                    "folga_total",
+                    models.IntegerField(blank=True, editable=False, null=True, verbose_name="Folga Total (dias úteis)"),
+                ),
+                ("critica", models.BooleanField(default=False, editable=False, verbose_name="Caminho Crítico")),
+                ("atualizado_em", models.DateTimeField(auto_now=True, verbose_name="Atualizado em")),
+                (
+                    "obra",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="tarefas",
+                        to="obras.obra",
+                        verbose_name="Obra",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Tarefa do Cronograma",
+                "verbose_name_plural": "Tarefas do Cronograma",
+                "ordering": ["obra", "inicio_cedo", "id"],
+            },
+        ),
+        migrations.CreateModel(
+            name="DependenciaTarefa",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                (
+                    "tipo",
+                    models.CharField(
+                        choices=[("FS", "Término-Início"), ("SS", "Início-Início"), ("FF", "Término-Término")],
+                        default="FS",
+                        max_length=2,
+                        verbose_name="Tipo",
+                    ),
+                ),
+                ("lag", models.IntegerField(default=0, verbose_name="Defasagem (dias úteis)")),
+                (
+                    "predecessora",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="dependencias_sucessoras",
+                        to="obras.tarefacronograma",
+                        verbose_name="Predecessora",
+                    ),
+                ),
+                (
+                    "sucessora",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="dependencias_predecessoras",
+                        to="obras.tarefacronograma",
+                        verbose_name="Sucessora",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Dependência de Tarefa",
+                "verbose_name_plural": "Dependências de Tarefas",
+            },
+        ),
+        migrations.CreateModel(
+            name="AlocacaoRecurso",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                (
+                    "unidades",
+                    models.DecimalField(decimal_places=2, default=1, max_digits=8, verbose_name="Unidades por Dia"),
+                ),
+                (
+                    "recurso",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="alocacoes",
+                        to="obras.recursoobra",
+                        verbose_name="Recurso",
+                    ),
+                ),
+                (
+                    "tarefa",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="alocacoes",
+                        to="obras.tarefacronograma",
+                        verbose_name="Tarefa",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Alocação de Recurso",
+                "verbose_name_plural": "Alocações de Recursos",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="tarefacronograma",
+            index=models.Index(fields=["obra", "critica"], name="obras_taref_obra_id_42eac8_idx"),
+        ),
+        migrations.AddConstraint(
+            model_name="dependenciatarefa",
+            constraint=models.UniqueConstraint(fields=("predecessora", "sucessora"), name="obras_dependencia_uniq"),
+        ),
+        migrations.AddConstraint(
+            model_name="alocacaorecurso",
+            constraint=models.UniqueConstraint(fields=("tarefa", "recurso"), name="obras_alocacao_uniq"),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def preencher_tenant(apps, schema_editor):
+    """Obra herda o tenant do cliente; sem cliente, só é atribuída se houver um único tenant."""
+    Obra = apps.get_model("obras", "Obra")
+    Cliente = apps.get_model("clientes", "Cliente")
+    Tenant = apps.get_model("core", "Tenant")
+    Obra.objects.filter(tenant__isnull=True, cliente__isnull=False).update(
+        tenant=Subquery(Cliente.objects.filter(pk=OuterRef("cliente_id")).values("tenant_id")[:1])
+    )
+    tenants = list(Tenant.objects.values_list("pk", flat=True)[:2])
+    if len(tenants) == 1:
+        Obra.objects.filter(tenant__isnull=True).update(tenant_id=tenants[0])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("clientes", "0002_initial"),
+        ("core", "0010_searchdocument"),
+        ("obras", "0003_cronograma_cpm"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="obra",
+            name="tenant",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="obras",
+                to="core.tenant",
+                verbose_name="Empresa",
+            ),
+        ),
+        migrations.RunPython(preencher_tenant, migrations.RunPython.noop),
+    ]
@@ -15,6 +15,16 @@ def get_documento_upload_path(instance, filename):
 
 
 class Obra(models.Model):
+    # --- Empresa (tenant) dona da obra; base do escopo por linha das APIs ---
+    tenant = models.ForeignKey(
+        "core.Tenant",
+        on_delete=models.CASCADE,
+        related_name="obras",
+        verbose_name="Empresa",
+        null=True,
+        blank=True,
+    )
+
     # --- Identificação e Tipo ---
     nome = models.CharField(max_length=200, verbose_name="Nome da Obra")
     TIPO_OBRA_CHOICES = [
@@ -250,3 +260,177 @@ class DocumentoObra(models.Model):
 
     def __str__(self):
         return self.descricao
+
+
+class LancamentoCusto(models.Model):
+    """Razão de custos da obra: estado atual do custo de cada documento de origem.
+
+    Mantido pelos sinais de obras.signals (obras.services.custos); cada alteração no
+    documento de origem move a diferença para os acumulados de ``CustoObraMensal``.
+    """
+
+    CATEGORIA_CHOICES = [
+        ("MAO_OBRA", "Mão de Obra"),
+        ("MATERIAL", "Material (consumo de estoque)"),
+        ("COMPRA", "Compras"),
+    ]
+    obra = models.ForeignKey(Obra, on_delete=models.CASCADE, related_name="lancamentos_custo", verbose_name="Obra")
+    categoria = models.CharField(max_length=20, choices=CATEGORIA_CHOICES, verbose_name="Categoria")
+    competencia = models.DateField(verbose_name="Competência", help_text="Primeiro dia do mês do custo.")
+    valor = models.DecimalField(max_digits=15, decimal_places=2, verbose_name="Valor")
+    origem_tipo = models.CharField(max_length=50, verbose_name="Tipo de Origem")
+    origem_id = models.PositiveBigIntegerField(verbose_name="ID de Origem")
+    atualizado_em = models.DateTimeField(auto_now=True, verbose_name="Atualizado em")
+
+    class Meta:
+        verbose_name = "Lançamento de Custo"
+        verbose_name_plural = "Lançamentos de Custo"
+        constraints = [
+            models.UniqueConstraint(fields=["origem_tipo", "origem_id"], name="obras_lancamento_origem_uniq"),
+        ]
+        indexes = [models.Index(fields=["obra", "categoria", "competencia"])]
+
+    def __str__(self):
+        return f"{self.origem_tipo}#{self.origem_id} - {self.categoria} {self.valor}"
+
+
+class CustoObraMensal(models.Model):
+    """Acumulado incremental de custo por obra, categoria e mês (lido pelos painéis)."""
+
+    obra = models.ForeignKey(Obra, on_delete=models.CASCADE, related_name="custos_mensais", verbose_name="Obra")
+    categoria = models.CharField(max_length=20, choices=LancamentoCusto.CATEGORIA_CHOICES, verbose_name="Categoria")
+    competencia = models.DateField(verbose_name="Competência")
+    valor = models.DecimalField(max_digits=15, decimal_places=2, default=0, verbose_name="Valor")
+    lancamentos = models.IntegerField(default=0, verbose_name="Lançamentos")
+    atualizado_em = models.DateTimeField(auto_now=True, verbose_name="Atualizado em")
+
+    class Meta:
+        verbose_name = "Custo Mensal da Obra"
+        verbose_name_plural = "Custos Mensais das Obras"
+        ordering = ["obra", "competencia", "categoria"]
+        constraints = [
+            models.UniqueConstraint(fields=["obra", "categoria", "competencia"], name="obras_custo_mensal_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.obra_id} {self.categoria} {self.competencia:%m/%Y}: {self.valor}"
+
+
+class CalendarioObra(models.Model):
+    """Calendário de trabalho da obra usado pelo cronograma (dias úteis e feriados)."""
+
+    obra = models.OneToOneField(Obra, on_delete=models.CASCADE, related_name="calendario", verbose_name="Obra")
+    dias_uteis = models.CharField(
+        max_length=7,
+        default="12345",
+        verbose_name="Dias Úteis",
+        help_text="Dias da semana trabalhados (ISO: 1=segunda ... 7=domingo). Ex.: 123456",
+    )
+    feriados = models.JSONField(
+        default=list, blank=True, verbose_name="Feriados", help_text='Datas sem trabalho. Ex.: ["2026-12-25"]'
+    )
+
+    class Meta:
+        verbose_name = "Calendário da Obra"
+        verbose_name_plural = "Calendários das Obras"
+
+    def __str__(self):
+        return f"Calendário - {self.obra}"
+
+
+class TarefaCronograma(models.Model):
+    """Tarefa do cronograma da obra.
+
+    As datas cedo/tarde, a folga e o indicador de caminho crítico são calculados por
+    obras.services.cronograma (CPM) e não devem ser editados manualmente.
+    """
+
+    obra = models.ForeignKey(Obra, on_delete=models.CASCADE, related_name="tarefas", verbose_name="Obra")
+    nome = models.CharField(max_length=200, verbose_name="Nome")
+    duracao_dias = models.PositiveIntegerField(
+        default=1, verbose_name="Duração (dias úteis)", help_text="0 para marcos."
+    )
+    inicio_minimo = models.DateField(null=True, blank=True, verbose_name="Não iniciar antes de")
+    percentual_concluido = models.PositiveSmallIntegerField(
+        default=0, validators=[MinValueValidator(0), MaxValueValidator(100)], verbose_name="Concluído (%)"
+    )
+    inicio_cedo = models.DateField(null=True, blank=True, editable=False, verbose_name="Início Cedo")
+    fim_cedo = models.DateField(null=True, blank=True, editable=False, verbose_name="Término Cedo")
+    inicio_tarde = models.DateField(null=True, blank=True, editable=False, verbose_name="Início Tarde")
+    fim_tarde = models.DateField(null=True, blank=True, editable=False, verbose_name="Término Tarde")
+    folga_total = models.IntegerField(null=True, blank=True, editable=False, verbose_name="Folga Total (dias úteis)")
+    critica = models.BooleanField(default=False, editable=False, verbose_name="Caminho Crítico")
+    atualizado_em = models.DateTimeField(auto_now=True, verbose_name="Atualizado em")
+
+    class Meta:
+        verbose_name = "Tarefa do Cronograma"
+        verbose_name_plural = "Tarefas do Cronograma"
+        ordering = ["obra", "inicio_cedo", "id"]
+        indexes = [models.Index(fields=["obra", "critica"])]
+
+    def __str__(self):
+        return self.nome
+
+
+class DependenciaTarefa(models.Model):
+    """Vínculo entre tarefas do cronograma, com defasagem (lag) em dias úteis (pode ser negativa)."""
+
+    TIPO_CHOICES = [
+        ("FS", "Término-Início"),
+        ("SS", "Início-Início"),
+        ("FF", "Término-Término"),
+    ]
+    predecessora = models.ForeignKey(
+        TarefaCronograma, on_delete=models.CASCADE, related_name="dependencias_sucessoras", verbose_name="Predecessora"
+    )
+    sucessora = models.ForeignKey(
+        TarefaCronograma, on_delete=models.CASCADE, related_name="dependencias_predecessoras", verbose_name="Sucessora"
+    )
+    tipo = models.CharField(max_length=2, choices=TIPO_CHOICES, default="FS", verbose_name="Tipo")
+    lag = models.IntegerField(default=0, verbose_name="Defasagem (dias úteis)")
+
+    class Meta:
+        verbose_name = "Dependência de Tarefa"
+        verbose_name_plural = "Dependências de Tarefas"
+        constraints = [
+            models.UniqueConstraint(fields=["predecessora", "sucessora"], name="obras_dependencia_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.predecessora_id} -{self.tipo}({self.lag:+d})-> {self.sucessora_id}"
+
+
+class RecursoObra(models.Model):
+    """Recurso (equipe, equipamento) alocável às tarefas do cronograma."""
+
+    obra = models.ForeignKey(Obra, on_delete=models.CASCADE, related_name="recursos", verbose_name="Obra")
+    nome = models.CharField(max_length=100, verbose_name="Nome")
+    capacidade_diaria = models.DecimalField(
+        max_digits=8, decimal_places=2, default=1, verbose_name="Capacidade Diária (unidades)"
+    )
+
+    class Meta:
+        verbose_name = "Recurso da Obra"
+        verbose_name_plural = "Recursos da Obra"
+        ordering = ["nome"]
+
+    def __str__(self):
+        return self.nome
+
+
+class AlocacaoRecurso(models.Model):
+    tarefa = models.ForeignKey(
+        TarefaCronograma, on_delete=models.CASCADE, related_name="alocacoes", verbose_name="Tarefa"
+    )
+    recurso = models.ForeignKey(RecursoObra, on_delete=models.CASCADE, related_name="alocacoes", verbose_name="Recurso")
+    unidades = models.DecimalField(max_digits=8, decimal_places=2, default=1, verbose_name="Unidades por Dia")
+
+    class Meta:
+        verbose_name = "Alocação de Recurso"
+        verbose_name_plural = "Alocações de Recursos"
+        constraints = [
+            models.UniqueConstraint(fields=["tarefa", "recurso"], name="obras_alocacao_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.recurso} em {self.tarefa} ({self.unidades})"
@@ -0,0 +1 @@
+"""Serviços do app obras."""
@@ -0,0 +1,544 @@
+"""Cronograma da obra: caminho crítico (CPM) incremental e nivelamento de recursos.
+
+O cálculo acontece em memória sobre ``Rede``, com tempos em índices de dia útil
+contados a partir do início da obra (``LinhaDoTempo`` converte para datas usando o
+``CalendarioObra``; sem calendário vale segunda a sexta). Vínculos::
+
+    FS: ES(s) >= EF(p) + lag      SS: ES(s) >= ES(p) + lag      FF: EF(s) >= EF(p) + lag
+
+``Rede.calcular`` faz as passadas completas (ordenação topológica de Kahn, que também
+detecta ciclos). ``Rede.atualizar`` recebe só as tarefas alteradas e propaga a passada
+para frente pelos sucessores (heap em ordem topológica, parando onde ES/EF não mudam)
+e a passada para trás pelos predecessores; a passada para trás só é completa quando o
+término do projeto muda. ``recalcular`` carrega a rede da obra em duas consultas,
+reconstrói os índices a partir das datas gravadas e regrava (um UPDATE parametrizado
+em ``executemany``) apenas as tarefas cujo resultado mudou.
+
+``nivelar`` é uma prévia (nada é gravado): geração serial do cronograma em ordem de
+prioridade (início cedo, folga), atrasando cada tarefa até que nenhum recurso alocado
+exceda a capacidade diária.
+"""
+
+from __future__ import annotations
+
+import heapq
+from bisect import bisect_left
+from collections import defaultdict, deque
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import F, Q, Sum
+
+from obras.models import AlocacaoRecurso, CalendarioObra, DependenciaTarefa, Obra, RecursoObra, TarefaCronograma
+from shared.exceptions import NegocioError
+
+__all__ = [
+    "CicloDependencias",
+    "LinhaDoTempo",
+    "Nivelamento",
+    "Rede",
+    "ResultadoCronograma",
+    "TarefaNivelada",
+    "aplicar_alteracoes",
+    "atualizar_progresso",
+    "carregar",
+    "nivelar",
+    "recalcular",
+]
+
+_CAMPOS_CPM = ["inicio_cedo", "fim_cedo", "inicio_tarde", "fim_tarde", "folga_total", "critica"]
+_CAMPOS_EDITAVEIS = ("nome", "duracao_dias", "inicio_minimo", "percentual_concluido")
+
+
+class CicloDependencias(NegocioError):
+    def __init__(self, ciclo: list[int]):
+        self.ciclo = ciclo
+        super().__init__("Ciclo de dependências no cronograma: " + " -> ".join(map(str, ciclo)))
+
+
+class LinhaDoTempo:
+    """Converte entre datas e índices de dia útil (0 = primeiro dia útil a partir de ``inicio``)."""
+
+    def __init__(self, inicio: date, dias_uteis: str = "12345", feriados: Iterable = ()):
+        self._dias = {int(d) for d in dias_uteis if d in "1234567"}
+        if not self._dias:
+            raise NegocioError("Calendário da obra sem dias úteis.")
+        self._feriados = {f if isinstance(f, date) else date.fromisoformat(str(f)) for f in feriados}
+        self._datas: list[date] = []  # índices >= 0
+        self._anteriores: list[date] = []  # índices -1, -2, ...
+        self._inicio = inicio
+        self._proxima = inicio
+        self._anterior = inicio - timedelta(days=1)
+
+    def _util(self, dia: date) -> bool:
+        return dia.isoweekday() in self._dias and dia not in self._feriados
+
+    def _avancar(self) -> None:
+        while True:
+            dia, self._proxima = self._proxima, self._proxima + timedelta(days=1)
+            if self._util(dia):
+                self._datas.append(dia)
+                return
+
+    def _recuar(self) -> None:
+        while True:
+            dia, self._anterior = self._anterior, self._anterior - timedelta(days=1)
+            if self._util(dia):
+                self._anteriores.append(dia)
+                return
+
+    def data(self, indice: int) -> date:
+        if indice < 0:
+            while len(self._anteriores) < -indice:
+                self._recuar()
+            return self._anteriores[-indice - 1]
+        while len(self._datas) <= indice:
+            self._avancar()
+        return self._datas[indice]
+
+    def indice(self, dia: date) -> int:
+        """Índice do primeiro dia útil em ``dia`` ou depois (negativo antes do início)."""
+        if dia < self._inicio:
+            while not self._anteriores or self._anteriores[-1] > dia:
+                self._recuar()
+            # decrescente: só o último pode ser < dia
+            return -(len(self._anteriores) - (self._anteriores[-1] < dia))
+        while not self._datas or self._datas[-1] < dia:
+            self._avancar()
+        return bisect_left(self._datas, dia)
+
+
+@dataclass
+class Rede:
+    """Grafo de tarefas com os tempos CPM (índices de dia útil, término exclusivo)."""
+
+    duracao: dict[int, int] = field(default_factory=dict)
+    minimo: dict[int, int] = field(default_factory=dict)
+    sucessoras: dict[int, list[tuple[int, str, int]]] = field(default_factory=lambda: defaultdict(list))
+    predecessoras: dict[int, list[tuple[int, str, int]]] = field(default_factory=lambda: defaultdict(list))
+    es: dict[int, int] = field(default_factory=dict)
+    ef: dict[int, int] = field(default_factory=dict)
+    ls: dict[int, int] = field(default_factory=dict)
+    lf: dict[int, int] = field(default_factory=dict)
+    ordem: dict[int, int] = field(default_factory=dict)
+    fim: int = 0
+
+    def adicionar_tarefa(self, tarefa: int, duracao: int, minimo: int = 0) -> None:
+        self.duracao[tarefa] = duracao
+        self.minimo[tarefa] = minimo
+
+    def ligar(self, predecessora: int, sucessora: int, tipo: str = "FS", lag: int = 0) -> None:
+        self.desligar(predecessora, sucessora)
+        self.sucessoras[predecessora].append((sucessora, tipo, lag))
+        self.predecessoras[sucessora].append((predecessora, tipo, lag))
+
+    def desligar(self, predecessora: int, sucessora: int) -> None:
+        self.sucessoras[predecessora] = [v for v in self.sucessoras.get(predecessora, ()) if v[0] != sucessora]
+        self.predecessoras[sucessora] = [v for v in self.predecessoras.get(sucessora, ()) if v[0] != predecessora]
+
+    def folga(self, tarefa: int) -> int:
+        return self.ls[tarefa] - self.es[tarefa]
+
+    # --- Ordenação / ciclos -------------------------------------------------------------
+    def ordenar(self) -> list[int]:
+        """Ordem topológica (Kahn); levanta ``CicloDependencias`` com um ciclo encontrado."""
+        grau = {n: len(self.predecessoras.get(n, ())) for n in self.duracao}
+        fila = deque(sorted(n for n, g in grau.items() if g == 0))
+        ordem = []
+        while fila:
+            n = fila.popleft()
+            ordem.append(n)
+            for s, _tipo, _lag in self.sucessoras.get(n, ()):
+                grau[s] -= 1
+                if grau[s] == 0:
+                    fila.append(s)
+        if len(ordem) < len(self.duracao):
+            raise CicloDependencias(self._ciclo(set(self.duracao) - set(ordem)))
+        self.ordem = {n: i for i, n in enumerate(ordem)}
+        return ordem
+
+    def _ciclo(self, restantes: set[int]) -> list[int]:
+        # Todo nó restante tem predecessora restante: seguindo-as, algum nó se repete
+        n, posicao, caminho = min(restantes), {}, []
+        while n not in posicao:
+            posicao[n] = len(caminho)
+            caminho.append(n)
+            n = min(p for p, _tipo, _lag in self.predecessoras[n] if p in restantes)
+        ciclo = caminho[posicao[n] :]
+        return [*reversed(ciclo), ciclo[-1]]
+
+    # --- Passadas ---------------------------------------------------------------------
+    def _inicio_cedo(self, n: int, es: dict[int, int], ef: dict[int, int]) -> int:
+        inicio = self.minimo.get(n, 0)
+        duracao = self.duracao[n]
+        for p, tipo, lag in self.predecessoras.get(n, ()):
+            if tipo == "FS":
+                limite = ef[p] + lag
+            elif tipo == "SS":
+                limite = es[p] + lag
+            else:  # FF
+                limite = ef[p] + lag - duracao
+            inicio = max(inicio, limite)
+        return inicio
+
+    def _termino_tarde(self, n: int) -> int:
+        termino = self.fim
+        duracao = self.duracao[n]
+        for s, tipo, lag in self.sucessoras.get(n, ()):
+            if tipo == "FS":
+                limite = self.ls[s] - lag
+            elif tipo == "SS":
+                limite = self.ls[s] - lag + duracao
+            else:  # FF
+                limite = self.lf[s] - lag
+            termino = min(termino, limite)
+        return termino
+
+    def _para_tras(self, ordem: Iterable[int], mudou: set[int]) -> None:
+        for n in ordem:
+            lf = self._termino_tarde(n)
+            if self.lf.get(n) != lf or self.ls.get(n) != lf - self.duracao[n]:
+                self.lf[n], self.ls[n] = lf, lf - self.duracao[n]
+                mudou.add(n)
+
+    def calcular(self) -> set[int]:
+        """Passadas completas; retorna as tarefas cujo resultado mudou."""
+        ordem = self.ordenar()
+        mudou: set[int] = set()
+        for n in ordem:
+            es = self._inicio_cedo(n, self.es, self.ef)
+            if self.es.get(n) != es or self.ef.get(n) != es + self.duracao[n]:
+                self.es[n], self.ef[n] = es, es + self.duracao[n]
+                mudou.add(n)
+        self.fim = max(self.ef.values(), default=0)
+        self._para_tras(reversed(ordem), mudou)
+        return mudou
+
+    def atualizar(self, alteradas: Iterable[int], *, estrutura: bool = False) -> set[int]:
+        """Recalcula só o subgrafo afetado por ``alteradas`` (duração/restrição/vínculos).
+
+        Para vínculos incluídos/removidos informe as duas pontas e ``estrutura=True``
+        (a ordem topológica é refeita, detectando ciclos).
+        """
+        if estrutura or len(self.ordem) != len(self.duracao):
+            self.ordenar()
+        if any(n not in self.es or n not in self.ls for n in self.duracao):
+            return self.calcular()
+        sementes = {n for n in alteradas if n in self.duracao}
+        mudou: set[int] = set()
+        # Semente que terminava o projeto pode ter alterado o término de forma ambígua
+        termina_projeto = any(self.ef[n] >= self.fim for n in sementes)
+        self._propagar(sementes, mudou, para_frente=True)
+        fim = max(self.ef.values(), default=0)
+        if fim != self.fim or termina_projeto:
+            self.fim = fim
+            self._para_tras(sorted(self.duracao, key=self.ordem.__getitem__, reverse=True), mudou)
+        else:
+            self._propagar(sementes, mudou, para_frente=False)
+        return mudou
+
+    def _propagar(self, sementes: set[int], mudou: set[int], *, para_frente: bool) -> None:
+        """Reavalia as sementes e segue pelos vizinhos apenas onde o resultado mudou.
+
+        A heap em ordem topológica (invertida na passada para trás) garante que cada
+        tarefa só é reavaliada depois de todas as tarefas das quais depende.
+        """
+        sinal = 1 if para_frente else -1
+        vizinhos = self.sucessoras if para_frente else self.predecessoras
+        fila = [(sinal * self.ordem[n], n) for n in sementes]
+        heapq.heapify(fila)
+        enfileiradas = set(sementes)
+        while fila:
+            _pos, n = heapq.heappop(fila)
+            if para_frente:
+                inicio = self._inicio_cedo(n, self.es, self.ef)
+                novo, atual = (inicio, inicio + self.duracao[n]), (self.es[n], self.ef[n])
+            else:
+                termino = self._termino_tarde(n)
+                novo, atual = (termino - self.duracao[n], termino), (self.ls[n], self.lf[n])
+            if novo != atual:
+                if para_frente:
+                    self.es[n], self.ef[n] = novo
+                else:
+                    self.ls[n], self.lf[n] = novo
+                mudou.add(n)
+            elif n not in sementes:
+                continue
+            for v, _tipo, _lag in vizinhos.get(n, ()):
+                if v not in enfileiradas:
+                    enfileiradas.add(v)
+                    heapq.heappush(fila, (sinal * self.ordem[v], v))
+
+    # --- Nivelamento ------------------------------------------------------------------
+    def nivelar(
+        self, alocacoes: dict[int, list[tuple[int, Decimal]]], capacidades: dict[int, Decimal]
+    ) -> tuple[dict[int, int], dict[int, int], set[int]]:
+        """Geração serial respeitando vínculos e capacidade diária; requer ``calcular`` antes.
+
+        Retorna início/término nivelados e as tarefas que sozinhas excedem a capacidade
+        de algum recurso (agendadas em dias sem outro uso desse recurso).
+        """
+        uso: dict[int, dict[int, Decimal]] = defaultdict(lambda: defaultdict(Decimal))
+        faltam = {n: len(self.predecessoras.get(n, ())) for n in self.duracao}
+        prontas = [(self.es[n], self.folga(n), n) for n, g in faltam.items() if g == 0]
+        heapq.heapify(prontas)
+        es: dict[int, int] = {}
+        ef: dict[int, int] = {}
+        superalocadas: set[int] = set()
+        while prontas:
+            *_prioridade, n = heapq.heappop(prontas)
+            duracao = self.duracao[n]
+            inicio = self._inicio_cedo(n, es, ef)
+            pedidos = alocacoes.get(n, ()) if duracao else ()
+            for recurso, unidades in pedidos:
+                if unidades > capacidades.get(recurso, Decimal(0)):
+                    superalocadas.add(n)
+            while pedidos:
+                conflito = None
+                for recurso, unidades in pedidos:
+                    capacidade = capacidades.get(recurso, Decimal(0))
+                    dias = uso[recurso]
+                    for dia in range(inicio + duracao - 1, inicio - 1, -1):
+                        usado = dias[dia]
+                        if usado + unidades > capacidade and (usado or unidades <= capacidade):
+                            conflito = dia if conflito is None else max(conflito, dia)
+                            break
+                if conflito is None:
+                    break
+                inicio = conflito + 1
+            for recurso, unidades in pedidos:
+                for dia in range(inicio, inicio + duracao):
+                    uso[recurso][dia] += unidades
+            es[n], ef[n] = inicio, inicio + duracao
+            for s, _tipo, _lag in self.sucessoras.get(n, ()):
+                faltam[s] -= 1
+                if faltam[s] == 0:
+                    heapq.heappush(prontas, (self.es[s], self.folga(s), s))
+        return es, ef, superalocadas
+
+
+@dataclass
+class ResultadoCronograma:
+    tarefas: int
+    atualizadas: int
+    termino: date | None
+    caminho_critico: list[int]
+
+
+@dataclass(frozen=True)
+class TarefaNivelada:
+    id: int
+    inicio: date
+    fim: date
+    atraso_dias: int  # dias úteis em relação ao início cedo do CPM
+    superalocada: bool
+
+
+@dataclass
+class Nivelamento:
+    tarefas: list[TarefaNivelada]
+    termino_cpm: date | None
+    termino_nivelado: date | None
+
+
+def _linha_do_tempo(obra: Obra) -> LinhaDoTempo:
+    dias, feriados = CalendarioObra.objects.filter(obra=obra).values_list("dias_uteis", "feriados").first() or (
+        "12345",
+        [],
+    )
+    return LinhaDoTempo(obra.data_inicio, dias, feriados)
+
+
+def _termino(linha: LinhaDoTempo, inicio: int, fim: int) -> date:
+    return linha.data(max(fim - 1, inicio))  # término exclusivo; marcos terminam no início
+
+
+def carregar(obra: Obra) -> tuple[Rede, LinhaDoTempo, dict[int, tuple]]:
+    """Rede da obra com os tempos reconstruídos das datas gravadas (tarefas + vínculos: 2 consultas)."""
+    linha = _linha_do_tempo(obra)
+    rede = Rede()
+    gravados: dict[int, tuple] = {}
+    tarefas = (
+        TarefaCronograma.objects.filter(obra=obra)
+        .order_by()
+        .values_list("id", "duracao_dias", "inicio_minimo", *_CAMPOS_CPM)
+    )
+    for pk, duracao, inicio_minimo, *cpm in tarefas:
+        rede.adicionar_tarefa(pk, duracao, max(linha.indice(inicio_minimo), 0) if inicio_minimo else 0)
+        gravados[pk] = tuple(cpm)
+        inicio_cedo, fim_cedo, inicio_tarde, fim_tarde, _folga, _critica = cpm
+        if None not in (inicio_cedo, fim_cedo, inicio_tarde, fim_tarde):
+            # Términos vêm das datas gravadas (a duração pode já ter sido alterada);
+            # início == término é ambíguo só entre marco e 1 dia
+            rede.es[pk] = linha.indice(inicio_cedo)
+            rede.ef[pk] = linha.indice(fim_cedo) + 1 if fim_cedo > inicio_cedo else rede.es[pk] + min(duracao, 1)
+            rede.ls[pk] = linha.indice(inicio_tarde)
+            rede.lf[pk] = linha.indice(fim_tarde) + 1 if fim_tarde > inicio_tarde else rede.ls[pk] + min(duracao, 1)
+    vinculos = DependenciaTarefa.objects.filter(sucessora__obra=obra).values_list(
+        "predecessora_id", "sucessora_id", "tipo", "lag"
+    )
+    for predecessora, sucessora, tipo, lag in vinculos:
+        rede.ligar(predecessora, sucessora, tipo, lag)
+    rede.fim = max(rede.ef.values(), default=0)
+    return rede, linha, gravados
+
+
+def _gravar_cpm(linhas: list[tuple]) -> None:
+    """Grava os resultados com um UPDATE parametrizado em ``executemany``.
+
+    ``bulk_update`` monta um CASE por coluna e por linha, o que domina o tempo quando o
+    término do projeto muda e milhares de tarefas precisam ser regravadas.
+    """
+    if not linhas:
+        return
+    meta = TarefaCronograma._meta  # noqa: SLF001
+    campos = [meta.get_field(nome) for nome in _CAMPOS_CPM]
+    atribuicoes = ", ".join(f"{connection.ops.quote_name(c.column)} = %s" for c in campos)
+    tabela, pk = connection.ops.quote_name(meta.db_table), connection.ops.quote_name(meta.pk.column)
+    sql = f"UPDATE {tabela} SET {atribuicoes} WHERE {pk} = %s"  # noqa: S608
+    parametros = [
+        [c.get_db_prep_value(v, connection) for c, v in zip(campos, linha, strict=False)] + [linha[-1]]
+        for linha in linhas
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, parametros)
+
+
+def recalcular(obra: Obra, alteradas: Iterable[int] | None = None, *, estrutura: bool = False) -> ResultadoCronograma:
+    """Atualiza o CPM da obra; sem ``alteradas`` (ou após mudar calendário/início da obra) é completo."""
+    rede, linha, gravados = carregar(obra)
+    mudou = rede.calcular() if alteradas is None else rede.atualizar(alteradas, estrutura=estrutura)
+    gravar = []
+    for n in mudou:
+        folga = rede.folga(n)
+        valores = (
+            linha.data(rede.es[n]),
+            _termino(linha, rede.es[n], rede.ef[n]),
+            linha.data(rede.ls[n]),
+            _termino(linha, rede.ls[n], rede.lf[n]),
+            folga,
+            folga <= 0,
+        )
+        if valores != gravados[n]:
+            gravar.append((*valores, n))
+    _gravar_cpm(gravar)
+    return ResultadoCronograma(
+        tarefas=len(rede.duracao),
+        atualizadas=len(gravar),
+        termino=_termino(linha, 0, rede.fim) if rede.duracao else None,
+        caminho_critico=sorted((n for n in rede.duracao if rede.folga(n) <= 0), key=rede.ordem.__getitem__),
+    )
+
+
+def atualizar_progresso(obra: Obra) -> None:
+    """Progresso da obra = média do % concluído das tarefas ponderada pela duração."""
+    totais = TarefaCronograma.objects.filter(obra=obra).aggregate(
+        peso=Sum("duracao_dias"), feito=Sum(F("duracao_dias") * F("percentual_concluido"))
+    )
+    if totais["peso"]:
+        Obra.objects.filter(pk=obra.pk).update(progresso=round(totais["feito"] / totais["peso"]))
+
+
+def _aplicar_tarefas(obra: Obra, tarefas: list[dict]) -> tuple[set[int], bool, bool]:
+    """Grava edições/criações; retorna (tarefas que afetam o CPM, houve criação, mudou progresso)."""
+    existentes = TarefaCronograma.objects.filter(obra=obra).in_bulk([t["id"] for t in tarefas if t.get("id")])
+    alteradas: set[int] = set()
+    editadas, novas, progresso = [], [], False
+    for dados in tarefas:
+        campos = {k: dados[k] for k in _CAMPOS_EDITAVEIS if k in dados}
+        if not dados.get("id"):
+            novas.append(TarefaCronograma(obra=obra, **campos))
+            continue
+        tarefa = existentes.get(dados["id"])
+        if tarefa is None:
+            raise NegocioError(f"Tarefa {dados['id']} não pertence à obra.")
+        if any(getattr(tarefa, k) != campos[k] for k in ("duracao_dias", "inicio_minimo") if k in campos):
+            alteradas.add(tarefa.pk)
+        progresso |= "percentual_concluido" in campos or "duracao_dias" in campos
+        for nome, valor in campos.items():
+            setattr(tarefa, nome, valor)
+        editadas.append(tarefa)
+    if editadas:
+        TarefaCronograma.objects.bulk_update(editadas, list(_CAMPOS_EDITAVEIS))
+    if novas:
+        TarefaCronograma.objects.bulk_create(novas)
+        alteradas.update(t.pk for t in novas)
+    return alteradas, bool(novas), progresso or bool(novas)
+
+
+def _aplicar_dependencias(obra: Obra, dependencias: list[dict], remover: list[tuple[int, int]]) -> set[int]:
+    """Inclui/atualiza/remove vínculos; retorna as pontas envolvidas."""
+    pontas = {p for par in remover for p in par} | {d[k] for d in dependencias for k in ("predecessora", "sucessora")}
+    if not pontas:
+        return pontas
+    da_obra = set(TarefaCronograma.objects.filter(obra=obra, pk__in=pontas).values_list("pk", flat=True))
+    if pontas - da_obra:
+        raise NegocioError(f"Tarefas fora da obra: {sorted(pontas - da_obra)}")
+    if remover:
+        filtro = Q()
+        for predecessora, sucessora in remover:
+            filtro |= Q(predecessora_id=predecessora, sucessora_id=sucessora)
+        DependenciaTarefa.objects.filter(filtro).delete()
+    for dados in dependencias:
+        if dados["predecessora"] == dados["sucessora"]:
+            raise CicloDependencias([dados["predecessora"], dados["sucessora"]])
+        DependenciaTarefa.objects.update_or_create(
+            predecessora_id=dados["predecessora"],
+            sucessora_id=dados["sucessora"],
+            defaults={"tipo": dados.get("tipo", "FS"), "lag": dados.get("lag", 0)},
+        )
+    return pontas
+
+
+@transaction.atomic
+def aplicar_alteracoes(
+    obra: Obra,
+    *,
+    tarefas: Iterable[dict] = (),
+    dependencias: Iterable[dict] = (),
+    remover_dependencias: Iterable[tuple[int, int]] = (),
+) -> ResultadoCronograma:
+    """Aplica um lote de edições (dados já validados) e recalcula só o que foi afetado.
+
+    ``tarefas`` com ``id`` alteram tarefas existentes; sem ``id`` criam novas. Um ciclo
+    de dependências levanta ``CicloDependencias`` e desfaz todo o lote.
+    """
+    dependencias = list(dependencias)
+    remover_dependencias = [tuple(par) for par in remover_dependencias]
+    alteradas, criou, progresso = _aplicar_tarefas(obra, list(tarefas))
+    alteradas |= _aplicar_dependencias(obra, dependencias, remover_dependencias)
+    estrutura = criou or bool(dependencias or remover_dependencias)
+    resultado = recalcular(obra, alteradas, estrutura=estrutura)
+    if progresso:
+        atualizar_progresso(obra)
+    return resultado
+
+
+def nivelar(obra: Obra) -> Nivelamento:
+    """Prévia do nivelamento de recursos da obra (não grava nada)."""
+    rede, linha, _gravados = carregar(obra)
+    rede.calcular()
+    capacidades = dict(RecursoObra.objects.filter(obra=obra).values_list("id", "capacidade_diaria"))
+    alocacoes: dict[int, list[tuple[int, Decimal]]] = defaultdict(list)
+    for tarefa, recurso, unidades in AlocacaoRecurso.objects.filter(tarefa__obra=obra).values_list(
+        "tarefa_id", "recurso_id", "unidades"
+    ):
+        alocacoes[tarefa].append((recurso, unidades))
+    es, ef, superalocadas = rede.nivelar(alocacoes, capacidades)
+    return Nivelamento(
+        tarefas=[
+            TarefaNivelada(
+                id=n,
+                inicio=linha.data(es[n]),
+                fim=_termino(linha, es[n], ef[n]),
+                atraso_dias=es[n] - rede.es[n],
+                superalocada=n in superalocadas,
+            )
+            for n in sorted(es, key=lambda n: (es[n], n))
+        ],
+        termino_cpm=_termino(linha, 0, rede.fim) if rede.duracao else None,
+        termino_nivelado=_termino(linha, 0, max(ef.values())) if ef else None,
+    )
@@ -0,0 +1,332 @@
+"""Razão de custos por obra (job costing) com acumulados mensais incrementais.
+
+Fontes de custo (``FONTES``), cada uma com uma função que calcula o custo atual de
+documentos a partir das linhas brutas — a mesma usada no caminho incremental e na
+reconstrução completa:
+
+* ``mao_obra.MaoObra``: ``horas_trabalhadas * valor_hora`` no mês de ``data``;
+* ``compras.Compra``: ``valor_total`` no mês de ``data_pedido`` (canceladas não contam);
+* ``estoque.MovimentoEstoque``: consumo aplicado (``TIPOS_CONSUMO``) saindo de um
+  depósito vinculado à obra, ``quantidade * custo_unitario_snapshot``.
+
+``sincronizar`` (chamado pelos sinais de ``obras.signals``) recalcula os documentos
+alterados, grava o estado atual em ``LancamentoCusto`` (um por documento) e move só a
+diferença para ``CustoObraMensal`` (obra x categoria x mês) com ``UPDATE ... SET valor =
+valor + delta``. ``resumo`` monta orçado x realizado, burn rate e margem lendo apenas os
+acumulados; ``reconstruir`` (comando ``rebuild_custos_obras``) confere os acumulados
+contra os dados brutos e, opcionalmente, os regrava.
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from collections.abc import Callable, Iterable, Sequence
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import transaction
+from django.db.models import F, Q, QuerySet
+from django.utils import timezone
+
+from obras.models import CustoObraMensal, LancamentoCusto, Obra
+
+__all__ = [
+    "FONTES",
+    "TIPOS_CONSUMO",
+    "Custo",
+    "Divergencia",
+    "ResumoCustos",
+    "reconstruir",
+    "resumo",
+    "sincronizar",
+]
+
+TIPOS_CONSUMO = ("SAIDA", "CONSUMO_BOM", "PERDA", "DESCARTE", "VENCIMENTO", "AJUSTE_NEG")
+_Q2 = Decimal("0.01")
+
+
+@dataclass(frozen=True)
+class Custo:
+    obra_id: int
+    categoria: str
+    competencia: date
+    valor: Decimal
+
+    @property
+    def balde(self) -> tuple[int, str, date]:
+        return self.obra_id, self.categoria, self.competencia
+
+
+@dataclass(frozen=True)
+class Divergencia:
+    obra_id: int
+    categoria: str
+    competencia: date
+    esperado: Decimal
+    registrado: Decimal
+
+
+@dataclass
+class ResumoCustos:
+    obra_id: int
+    orcamento: Decimal
+    contrato: Decimal
+    realizado: Decimal
+    por_categoria: dict[str, Decimal]
+    por_mes: list[dict]
+    burn_rate_mensal: Decimal
+    saldo_orcamento: Decimal
+    percentual_orcamento: Decimal | None
+    margem: Decimal
+    margem_percentual: Decimal | None
+    meses_restantes: Decimal | None = None
+    extras: dict = field(default_factory=dict)
+
+
+def _mes(valor: date | datetime) -> date:
+    if isinstance(valor, datetime):
+        valor = timezone.localtime(valor).date() if timezone.is_aware(valor) else valor.date()
+    return valor.replace(day=1)
+
+
+def _q(valor) -> Decimal:
+    return Decimal(valor or 0).quantize(_Q2, rounding=ROUND_HALF_UP)
+
+
+# --- Fontes ---------------------------------------------------------------------------
+def _mao_obra(obra_ids: Sequence[int] | None, ids: Sequence[int] | None) -> Iterable[tuple[int, Custo]]:
+    from mao_obra.models import MaoObra  # noqa: PLC0415 - mao_obra importa obras.models
+
+    qs = MaoObra.objects.all()
+    if obra_ids is not None:
+        qs = qs.filter(obra_id__in=obra_ids)
+    if ids is not None:
+        qs = qs.filter(id__in=ids)
+    for pk, obra_id, dia, horas, valor_hora in qs.values_list(
+        "id", "obra_id", "data", "horas_trabalhadas", "valor_hora"
+    ).order_by():
+        yield pk, Custo(obra_id, "MAO_OBRA", _mes(dia), _q(horas * valor_hora))
+
+
+def _compras(obra_ids: Sequence[int] | None, ids: Sequence[int] | None) -> Iterable[tuple[int, Custo]]:
+    from compras.models import Compra  # noqa: PLC0415 - compras importa obras.models
+
+    qs = Compra.objects.exclude(status="cancelado")
+    if obra_ids is not None:
+        qs = qs.filter(obra_id__in=obra_ids)
+    if ids is not None:
+        qs = qs.filter(id__in=ids)
+    for pk, obra_id, dia, valor in qs.values_list("id", "obra_id", "data_pedido", "valor_total").order_by():
+        yield pk, Custo(obra_id, "COMPRA", _mes(dia), _q(valor))
+
+
+def _materiais(obra_ids: Sequence[int] | None, ids: Sequence[int] | None) -> Iterable[tuple[int, Custo]]:
+    from estoque.models import MovimentoEstoque  # noqa: PLC0415 - estoque referencia obras
+
+    qs = MovimentoEstoque.objects.filter(tipo__in=TIPOS_CONSUMO, aplicado=True, deposito_origem__obra__isnull=False)
+    if obra_ids is not None:
+        qs = qs.filter(deposito_origem__obra_id__in=obra_ids)
+    if ids is not None:
+        qs = qs.filter(id__in=ids)
+    for pk, obra_id, criado_em, aplicado_em, quantidade, custo in qs.values_list(
+        "id", "deposito_origem__obra_id", "criado_em", "aplicado_em", "quantidade", "custo_unitario_snapshot"
+    ).order_by():
+        yield pk, Custo(obra_id, "MATERIAL", _mes(aplicado_em or criado_em), _q(quantidade * custo))
+
+
+_Linhas = Callable[[Sequence[int] | None, Sequence[int] | None], Iterable[tuple[int, Custo]]]
+FONTES: dict[str, _Linhas] = {
+    "mao_obra.MaoObra": _mao_obra,
+    "compras.Compra": _compras,
+    "estoque.MovimentoEstoque": _materiais,
+}
+
+
+# --- Caminho incremental ----------------------------------------------------------------
+def _aplicar_deltas(deltas: dict[tuple[int, str, date], list]) -> None:
+    """Move as diferenças para os acumulados: cria baldes faltantes e soma com F()."""
+    deltas = {b: d for b, d in deltas.items() if d[0] or d[1]}
+    if not deltas:
+        return
+    CustoObraMensal.objects.bulk_create(
+        [CustoObraMensal(obra_id=o, categoria=c, competencia=m) for o, c, m in deltas],
+        ignore_conflicts=True,
+    )
+    agora = timezone.now()
+    for (obra_id, categoria, competencia), (valor, n) in sorted(deltas.items()):
+        CustoObraMensal.objects.filter(obra_id=obra_id, categoria=categoria, competencia=competencia).update(
+            valor=F("valor") + valor, lancamentos=F("lancamentos") + n, atualizado_em=agora
+        )
+
+
+@transaction.atomic
+def sincronizar(origem_tipo: str, ids: Iterable[int]) -> int:
+    """Atualiza razão e acumulados para os documentos ``ids`` da fonte; retorna nº de alterados."""
+    ids = sorted(set(ids))
+    if not ids:
+        return 0
+    atuais = {
+        lanc.origem_id: lanc
+        for lanc in LancamentoCusto.objects.select_for_update().filter(origem_tipo=origem_tipo, origem_id__in=ids)
+    }
+    novos = dict(FONTES[origem_tipo](None, ids))
+    deltas: dict[tuple[int, str, date], list] = defaultdict(lambda: [Decimal(0), 0])
+    criar, atualizar, remover = [], [], []
+    for pk in ids:
+        atual, novo = atuais.get(pk), novos.get(pk)
+        if atual is not None:
+            if novo is not None and (atual.obra_id, atual.categoria, atual.competencia, atual.valor) == (
+                *novo.balde,
+                novo.valor,
+            ):
+                continue
+            balde = deltas[(atual.obra_id, atual.categoria, atual.competencia)]
+            balde[0] -= atual.valor
+            balde[1] -= 1
+        if novo is None:
+            if atual is not None:
+                remover.append(atual.pk)
+            continue
+        balde = deltas[novo.balde]
+        balde[0] += novo.valor
+        balde[1] += 1
+        if atual is None:
+            criar.append(LancamentoCusto(origem_tipo=origem_tipo, origem_id=pk, **_campos(novo)))
+        else:
+            for nome, valor in _campos(novo).items():
+                setattr(atual, nome, valor)
+            atualizar.append(atual)
+    if remover:
+        LancamentoCusto.objects.filter(pk__in=remover).delete()
+    if criar:
+        LancamentoCusto.objects.bulk_create(criar)
+    if atualizar:
+        LancamentoCusto.objects.bulk_update(
+            atualizar, ["obra_id", "categoria", "competencia", "valor", "atualizado_em"]
+        )
+    _aplicar_deltas(deltas)
+    return len(criar) + len(atualizar) + len(remover)
+
+
+def _campos(custo: Custo) -> dict:
+    return {
+        "obra_id": custo.obra_id,
+        "categoria": custo.categoria,
+        "competencia": custo.competencia,
+        "valor": custo.valor,
+        "atualizado_em": timezone.now(),
+    }
+
+
+# --- Leitura ----------------------------------------------------------------------------
+def _meses_atras(mes: date, n: int) -> date:
+    total = mes.year * 12 + mes.month - 1 - n
+    return date(total // 12, total % 12 + 1, 1)
+
+
+def resumo(obra: Obra, *, meses_burn: int = 3, hoje: date | None = None) -> ResumoCustos:
+    """Orçado x realizado, burn rate (média dos últimos ``meses_burn`` meses) e margem — uma consulta."""
+    hoje = hoje or timezone.localdate()
+    por_categoria: dict[str, Decimal] = defaultdict(Decimal)
+    por_mes: dict[date, dict[str, Decimal]] = defaultdict(lambda: defaultdict(Decimal))
+    for categoria, competencia, valor in CustoObraMensal.objects.filter(obra=obra).values_list(
+        "categoria", "competencia", "valor"
+    ):
+        por_categoria[categoria] += valor
+        por_mes[competencia][categoria] += valor
+    realizado = sum(por_categoria.values(), Decimal(0))
+    mes_atual = hoje.replace(day=1)
+    janela = [_meses_atras(mes_atual, i) for i in range(meses_burn)]
+    burn = _q(sum((sum(por_mes[m].values(), Decimal(0)) for m in janela if m in por_mes), Decimal(0)) / meses_burn)
+    orcamento = _q(obra.valor_total)
+    contrato = _q(obra.valor_contrato)
+    saldo = orcamento - realizado
+    return ResumoCustos(
+        obra_id=obra.pk,
+        orcamento=orcamento,
+        contrato=contrato,
+        realizado=realizado,
+        por_categoria=dict(por_categoria),
+        por_mes=[
+            {"competencia": m, "total": sum(v.values(), Decimal(0)), "por_categoria": dict(v)}
+            for m, v in sorted(por_mes.items())
+        ],
+        burn_rate_mensal=burn,
+        saldo_orcamento=saldo,
+        percentual_orcamento=_q(realizado / orcamento * 100) if orcamento else None,
+        margem=contrato - realizado,
+        margem_percentual=_q((contrato - realizado) / contrato * 100) if contrato else None,
+        meses_restantes=_q(saldo / burn) if burn > 0 and saldo > 0 else None,
+    )
+
+
+# --- Reconstrução -----------------------------------------------------------------------
+def _razao_das_origens(chaves: Iterable[tuple[str, int]]) -> QuerySet:
+    """Lançamentos dos documentos ``(origem_tipo, origem_id)``, onde quer que estejam lançados."""
+    por_tipo: dict[str, list[int]] = defaultdict(list)
+    for origem_tipo, pk in chaves:
+        por_tipo[origem_tipo].append(pk)
+    filtro = Q(pk__in=[])
+    for origem_tipo, ids in por_tipo.items():
+        filtro |= Q(origem_tipo=origem_tipo, origem_id__in=ids)
+    return LancamentoCusto.objects.filter(filtro)
+
+
+def reconstruir(obra_ids: Sequence[int] | None = None, *, corrigir: bool = True) -> list[Divergencia]:
+    """Recalcula tudo a partir dos dados brutos e compara com os acumulados.
+
+    Com ``corrigir`` regrava razão e acumulados das obras envolvidas (em uma transação).
+    Documentos que trocaram de obra sem passar pelos sinais ainda têm lançamento na obra
+    antiga: ela entra na reconstrução, senão o lançamento e o acumulado antigos ficariam.
+    """
+    esperados: dict[tuple[str, int], Custo] = {}
+    for origem_tipo, linhas in FONTES.items():
+        for pk, custo in linhas(obra_ids, None):
+            esperados[(origem_tipo, pk)] = custo
+    if obra_ids is not None:
+        antigas = set(
+            _razao_das_origens(esperados).exclude(obra_id__in=obra_ids).values_list("obra_id", flat=True).distinct()
+        )
+        if antigas:
+            return reconstruir([*obra_ids, *sorted(antigas)], corrigir=corrigir)
+    baldes: dict[tuple[int, str, date], list] = defaultdict(lambda: [Decimal(0), 0])
+    for custo in esperados.values():
+        baldes[custo.balde][0] += custo.valor
+        baldes[custo.balde][1] += 1
+
+    acumulados = CustoObraMensal.objects.all()
+    if obra_ids is not None:
+        acumulados = acumulados.filter(obra_id__in=obra_ids)
+    registrados = {
+        (o, c, m): v for o, c, m, v in acumulados.values_list("obra_id", "categoria", "competencia", "valor")
+    }
+    divergencias = [
+        Divergencia(
+            *balde,
+            esperado=baldes[balde][0] if balde in baldes else Decimal(0),
+            registrado=registrados.get(balde, Decimal(0)),
+        )
+        for balde in sorted(set(baldes) | set(registrados))
+        if (baldes[balde][0] if balde in baldes else Decimal(0)) != registrados.get(balde, Decimal(0))
+    ]
+    if corrigir:
+        with transaction.atomic():
+            razao = LancamentoCusto.objects.all()
+            if obra_ids is not None:
+                razao = razao.filter(Q(obra_id__in=obra_ids) | Q(pk__in=_razao_das_origens(esperados).values("pk")))
+            razao.delete()
+            acumulados.delete()
+            LancamentoCusto.objects.bulk_create(
+                [LancamentoCusto(origem_tipo=t, origem_id=pk, **_campos(c)) for (t, pk), c in esperados.items()],
+                batch_size=1000,
+                ignore_conflicts=True,
+            )
+            CustoObraMensal.objects.bulk_create(
+                [
+                    CustoObraMensal(obra_id=o, categoria=c, competencia=m, valor=v, lancamentos=n)
+                    for (o, c, m), (v, n) in baldes.items()
+                ],
+                batch_size=1000,
+            )
+    return divergencias
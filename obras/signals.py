@@ -0,0 +1,79 @@
+"""Alimenta o razão de custos (``obras.services.custos``) a partir das fontes de custo.
+
+Também recalcula o cronograma (``obras.services.cronograma``) quando o calendário ou o
+início da obra mudam.
+"""
+
+import logging
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from estoque.signals import movimento_registrado
+
+from .models import CalendarioObra, Obra
+from .services import cronograma, custos
+
+logger = logging.getLogger(__name__)
+
+
+def _sincronizar(origem_tipo: str, pk) -> None:
+    # Falha no razão não deve impedir a gravação do documento: ``rebuild_custos_obras`` corrige
+    try:
+        custos.sincronizar(origem_tipo, [pk])
+    except Exception:
+        logger.exception("Falha ao atualizar custos da obra para %s #%s", origem_tipo, pk)
+
+
+@receiver(post_save, sender="mao_obra.MaoObra")
+@receiver(post_delete, sender="mao_obra.MaoObra")
+@receiver(post_save, sender="compras.Compra")
+@receiver(post_delete, sender="compras.Compra")
+@receiver(post_save, sender="estoque.MovimentoEstoque")
+@receiver(post_delete, sender="estoque.MovimentoEstoque")
+def custo_documento_alterado(sender, instance, **kwargs):
+    _sincronizar(sender._meta.label, instance.pk)  # noqa: SLF001
+
+
+@receiver(movimento_registrado)
+def custo_movimento_registrado(sender, movimento, **kwargs):
+    # Caminhos em lote (bulk_create/aprovação) não disparam post_save; o upsert é idempotente
+    _sincronizar("estoque.MovimentoEstoque", movimento.pk)
+
+
+# ---------- Cronograma ----------
+def _recalcular_cronograma(obra: Obra) -> None:
+    # Datas do CPM dependem do calendário e do início da obra: recálculo completo
+    try:
+        cronograma.recalcular(obra)
+    except Exception:
+        logger.exception("Falha ao recalcular o cronograma da obra #%s", obra.pk)
+
+
+@receiver(post_save, sender=CalendarioObra)
+@receiver(post_delete, sender=CalendarioObra)
+def calendario_alterado(sender, instance, **kwargs):
+    if kwargs.get("raw") or isinstance(kwargs.get("origin"), Obra):
+        return  # fixture ou exclusão em cascata da própria obra
+    obra = Obra.objects.filter(pk=instance.obra_id).first()
+    if obra is not None:
+        _recalcular_cronograma(obra)
+
+
+@receiver(pre_save, sender=Obra)
+def obra_guardar_inicio(sender, instance, **kwargs):
+    if instance.pk and not kwargs.get("raw"):
+        anterior = Obra.objects.filter(pk=instance.pk).values_list("data_inicio", flat=True).first()
+        instance.__dict__["_data_inicio_anterior"] = anterior
+
+
+@receiver(post_save, sender=Obra)
+def obra_inicio_alterado(sender, instance, created, **kwargs):
+    anterior = instance.__dict__.pop("_data_inicio_anterior", None)
+    if created or kwargs.get("raw") or anterior is None:
+        return
+    update_fields = kwargs.get("update_fields")
+    if update_fields is not None and "data_inicio" not in update_fields:
+        return
+    if anterior != instance.data_inicio:
+        _recalcular_cronograma(instance)
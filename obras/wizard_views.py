@@ -327,6 +327,8 @@ class ObraWizardView(TenantCreationWizardView):
             with transaction.atomic():
                 editing = self.get_editing_tenant()
                 obra = editing or Obra()
+                if obra.tenant_id is None:
+                    obra.tenant = get_current_tenant(self.request)
                 # Step 1
                 for field in ("nome", "tipo_obra", "cno", "data_inicio", "data_previsao_termino", "valor_contrato"):
                     if field in step1:
@@ -334,7 +336,8 @@ class ObraWizardView(TenantCreationWizardView):
                 # Cliente pode vir como PK serializada
                 if "cliente" in step1 and step1.get("cliente"):
                     try:
-                        obra.cliente = Cliente.objects.get(pk=step1.get("cliente"))
+                        clientes_qs = Cliente.objects.filter(tenant=obra.tenant) if obra.tenant_id else Cliente.objects
+                        obra.cliente = clientes_qs.get(pk=step1.get("cliente"))
                     except Exception:
                         obra.cliente = None
                 # Step 2 -> mapeia para campos simples do modelo Obra
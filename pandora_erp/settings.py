@@ -150,6 +150,10 @@ MIDDLEWARE = [
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    # Rate limit por prefixo de URL (RATE_LIMIT_RULES; inerte com a lista vazia)
+    "core.middleware_rate_limit.RateLimitMiddleware",
+    # Revogação de sessões por tenant (época em cache; uma leitura por request)
+    "user_management.middleware_session_revocation.SessionRevocationMiddleware",
     # Enforcement 2FA (após autenticação, antes de tenant / módulo)
     "user_management.middleware_twofa.TwoFAMiddleware",
     "core.middleware_session_inactivity.SessionInactivityMiddleware",
@@ -341,6 +345,82 @@ LOGIN_URL = "core:login"
 LOGIN_REDIRECT_URL = "dashboard"
 LOGOUT_REDIRECT_URL = "core:login"
 
+# Telemetria de requisições por tenant (core.services.tenant_telemetry): buffer por
+# processo descarregado no Redis/cache a cada N segundos e consolidado em TenantMetrics.
+TENANT_TELEMETRY_ENABLED = os.environ.get("TENANT_TELEMETRY_ENABLED", "True") == "True"
+TENANT_TELEMETRY_FLUSH_SECONDS = int(os.environ.get("TENANT_TELEMETRY_FLUSH_SECONDS", "60"))
+
+# Write-behind (core.services.write_behind) para AuditLog e UserProfile.last_activity:
+# flush em lote a cada N segundos ou ao atingir o tamanho máximo do buffer.
+WRITE_BEHIND_FLUSH_SECONDS = float(os.environ.get("WRITE_BEHIND_FLUSH_SECONDS", "5"))
+WRITE_BEHIND_MAX_BUFFER = int(os.environ.get("WRITE_BEHIND_MAX_BUFFER", "500"))
+# Resolução do last_activity: no máximo uma atualização por usuário a cada N segundos.
+USER_ACTIVITY_RESOLUTION_SECONDS = int(os.environ.get("USER_ACTIVITY_RESOLUTION_SECONDS", "60"))
+
+# Pipeline de login (user_management.services.login_pipeline): sessão, log LOGIN, broadcast
+# e aquecimento de permissões processados em lote a cada N segundos ou ao encher o buffer.
+LOGIN_PIPELINE_FLUSH_SECONDS = float(os.environ.get("LOGIN_PIPELINE_FLUSH_SECONDS", "2"))
+LOGIN_PIPELINE_MAX_BUFFER = int(os.environ.get("LOGIN_PIPELINE_MAX_BUFFER", "200"))
+# Métricas agregadas dos dashboards de usuários/2FA (user_management.services.user_metrics):
+# TTL do cache por tenant (invalidado por signals; é só o teto de defasagem).
+USER_METRICS_CACHE_SECONDS = int(os.environ.get("USER_METRICS_CACHE_SECONDS", "300"))
+
+# Forecast de reabastecimento (estoque.services.forecast): Holt-Winters sobre N dias de
+# saídas, sazonalidade em dias e nível de serviço do estoque de segurança.
+ESTOQUE_FORECAST_HISTORICO_DIAS = int(os.environ.get("ESTOQUE_FORECAST_HISTORICO_DIAS", "112"))
+ESTOQUE_FORECAST_SAZONALIDADE = int(os.environ.get("ESTOQUE_FORECAST_SAZONALIDADE", "7"))
+ESTOQUE_FORECAST_ALPHA = float(os.environ.get("ESTOQUE_FORECAST_ALPHA", "0.3"))
+ESTOQUE_FORECAST_BETA = float(os.environ.get("ESTOQUE_FORECAST_BETA", "0.05"))
+ESTOQUE_FORECAST_GAMMA = float(os.environ.get("ESTOQUE_FORECAST_GAMMA", "0.2"))
+ESTOQUE_FORECAST_NIVEL_SERVICO = float(os.environ.get("ESTOQUE_FORECAST_NIVEL_SERVICO", "0.95"))
+
+# Expiração de reservas (estoque.services.expiracao_reservas): reservas por transação,
+# largura do slot da time wheel (uma task agendada por slot, no fim do slot) e horizonte
+# de agendamento (prazos além dele são agendados pela varredura horária; manter >= o
+# intervalo da varredura e <= o visibility_timeout do Redis, 1 h por padrão).
+ESTOQUE_RESERVA_EXPIRACAO_BLOCO = int(os.environ.get("ESTOQUE_RESERVA_EXPIRACAO_BLOCO", "500"))
+ESTOQUE_RESERVA_SLOT_SEGUNDOS = int(os.environ.get("ESTOQUE_RESERVA_SLOT_SEGUNDOS", "60"))
+ESTOQUE_RESERVA_HORIZONTE_SEGUNDOS = int(os.environ.get("ESTOQUE_RESERVA_HORIZONTE_SEGUNDOS", "3600"))
+
+# Lembretes da agenda (agenda.services.lembretes): lembretes vencidos por transação.
+AGENDA_LEMBRETES_BLOCO = int(os.environ.get("AGENDA_LEMBRETES_BLOCO", "500"))
+
+# Digest diário da agenda (agenda.services.digest): destinatários por bloco (reivindicação
+# no ledger + envio pela mesma conexão SMTP).
+AGENDA_DIGEST_LOTE = int(os.environ.get("AGENDA_DIGEST_LOTE", "50"))
+
+# Feed de calendário da agenda (agenda.services.calendario): validade dos sync_tokens
+# (e retenção dos marcadores de exclusão), recuo da marca d'água e TTL do cache do ICS.
+AGENDA_SYNC_RETENCAO_DIAS = int(os.environ.get("AGENDA_SYNC_RETENCAO_DIAS", "30"))
+AGENDA_SYNC_MARGEM_SEGUNDOS = int(os.environ.get("AGENDA_SYNC_MARGEM_SEGUNDOS", "5"))
+AGENDA_ICS_CACHE_SEGUNDOS = int(os.environ.get("AGENDA_ICS_CACHE_SEGUNDOS", "900"))
+
+# Métricas do wizard de tenant (core.services.wizard_metrics): deltas de contadores e
+# sketches de latência enviados ao Redis a cada N segundos (visão consolidada dos workers).
+WIZARD_METRICS_FLUSH_SECONDS = float(os.environ.get("WIZARD_METRICS_FLUSH_SECONDS", "10"))
+# Janela dos quantis de latência (e do alerta de p95): horas anteriores mescladas à corrente.
+WIZARD_LATENCY_WINDOW_HOURS = int(os.environ.get("WIZARD_LATENCY_WINDOW_HOURS", "1"))
+
+# Relatórios PDF de funcionários (funcionarios.services.relatorios): processos do pool de
+# renderização (0 = os.cpu_count()) e validade do link de download.
+FUNCIONARIOS_RELATORIOS_WORKERS = int(os.environ.get("FUNCIONARIOS_RELATORIOS_WORKERS", "0"))
+FUNCIONARIOS_RELATORIOS_TTL_HORAS = int(os.environ.get("FUNCIONARIOS_RELATORIOS_TTL_HORAS", "24"))
+
+# Motor de análise do ai_auditor (ai_auditor.analyzers.engine): processos do pool de
+# parsing (0 = os.cpu_count()) e módulos que registram checks (ast_checks.registrar).
+AI_AUDITOR_WORKERS = int(os.environ.get("AI_AUDITOR_WORKERS", "0"))
+AI_AUDITOR_CHECK_MODULES = ["ai_auditor.analyzers.ast_checks"]
+AI_AUDITOR_CHECKS_DESATIVADOS = []
+AI_AUDITOR_COMPLEXIDADE_MAXIMA = 15
+
+# Rate limiting compartilhado entre workers (shared.rate_limit): regras por prefixo de
+# URL aplicadas pelo core.middleware_rate_limit.RateLimitMiddleware, ex.:
+# [{"prefix": "/api/", "limit": 300, "window": 60, "key": "user_or_ip", "mode": "sliding"}]
+RATE_LIMIT_RULES = []
+
+# Cache do HTML do menu lateral (core.services.access_context); 0 desativa.
+SIDEBAR_CACHE_SECONDS = int(os.environ.get("SIDEBAR_CACHE_SECONDS", "300"))
+
 # Para habilitar expiração lógica de sessões por inatividade, adicionar
 # 'core.middleware_session_inactivity.SessionInactivityMiddleware' ao MIDDLEWARE (após autenticação).
 
@@ -713,6 +793,23 @@ PRONTUARIOS_IMAGE_MAX_WIDTH = 1920
 PRONTUARIOS_IMAGE_MAX_HEIGHT = 1080
 PRONTUARIOS_IMAGE_QUALITY = 85
 
+# Pipeline de derivados de mídia (prontuarios.media_pipeline): jobs simultâneos por
+# processo (0 = CPUs disponíveis - 1) e binários do ffmpeg/ffprobe.
+PRONTUARIOS_MEDIA_WORKERS = int(os.environ.get("PRONTUARIOS_MEDIA_WORKERS", "0"))
+# Fotos de um mesmo tenant processadas ao mesmo tempo somando todos os workers
+# (semáforo no cache compartilhado; 0 = sem limite).
+PRONTUARIOS_MEDIA_SLOTS_POR_TENANT = int(os.environ.get("PRONTUARIOS_MEDIA_SLOTS_POR_TENANT", "2"))
+PRONTUARIOS_FFMPEG_BIN = os.environ.get("PRONTUARIOS_FFMPEG_BIN", "ffmpeg")
+PRONTUARIOS_FFPROBE_BIN = os.environ.get("PRONTUARIOS_FFPROBE_BIN", "ffprobe")
+
+# Varredura de mídia órfã (prontuarios.media_sweeper): sem APLICAR as execuções
+# apenas geram o relatório (dry-run); órfãos ficam QUARENTENA_DIAS em quarentena.
+PRONTUARIOS_VARREDURA_APLICAR = os.environ.get("PRONTUARIOS_VARREDURA_APLICAR", "False") == "True"
+PRONTUARIOS_VARREDURA_PREFIXOS = ["prontuarios"]
+PRONTUARIOS_VARREDURA_IDADE_MINIMA_DIAS = 7
+PRONTUARIOS_VARREDURA_QUARENTENA_DIAS = int(os.environ.get("PRONTUARIOS_VARREDURA_QUARENTENA_DIAS", "30"))
+PRONTUARIOS_VARREDURA_MAX_SEGUNDOS = int(os.environ.get("PRONTUARIOS_VARREDURA_MAX_SEGUNDOS", "3600"))
+
 # Configurações de backup automático
 PRONTUARIOS_BACKUP_RETENTION_DAYS = 90
 PRONTUARIOS_AUTO_BACKUP_ENABLED = True
@@ -810,6 +907,8 @@ CELERY_TASK_DEFAULT_QUEUE = "default"
 
 # Roteamento (pode ser expandido quando houver filas específicas de mídia)
 CELERY_TASK_ROUTES = {
+    "funcionarios.tasks.gerar_relatorio_job": {"queue": "relatorios"},
+    "ai_auditor.tasks.executar_auditoria_codigo": {"queue": "relatorios"},
     "prontuarios.tasks.gerar_thumbnail_foto": {"queue": "media"},
     "prontuarios.tasks.gerar_variacao_webp": {"queue": "media"},
     "prontuarios.tasks.processar_imagens_lote": {"queue": "media"},
@@ -817,6 +916,7 @@ CELERY_TASK_ROUTES = {
     "prontuarios.tasks.validar_video": {"queue": "video"},
     "prontuarios.tasks.transcodificar_video": {"queue": "video"},
     "prontuarios.tasks.reprocessar_derivados_foto": {"queue": "media"},
+    "prontuarios.tasks.processar_derivados_midia": {"queue": "media"},
 }
 
 # Agendamentos periódicos (Celery Beat)
@@ -834,6 +934,46 @@ CELERY_BEAT_SCHEDULE = {
         "task": "agendamentos.tasks.marcar_no_show_agendamentos",
         "schedule": timedelta(minutes=30),
     },
+    # Telemetria por tenant: descarrega o buffer do worker no Redis antes do rollup
+    "core-flush-telemetria-tenants": {
+        "task": "core.tasks.flush_tenant_telemetry",
+        "schedule": timedelta(seconds=TENANT_TELEMETRY_FLUSH_SECONDS),
+    },
+    # Telemetria por tenant -> admin.TenantMetrics (upsert idempotente hoje/ontem)
+    "core-rollup-telemetria-tenants": {
+        "task": "core.tasks.rollup_tenant_telemetry",
+        "schedule": timedelta(minutes=15),
+    },
+    # Forecast de reabastecimento (todas as regras de cada tenant, um broadcast por execução)
+    "estoque-forecast-reabastecimento": {
+        "task": "estoque.tasks.atualizar_forecast_reabastecimento",
+        "schedule": timedelta(hours=24),
+    },
+    # Reservas vencidas cujo slot da time wheel se perdeu + slots da próxima hora
+    "estoque-expirar-reservas-vencidas": {
+        "task": "estoque.tasks.expirar_reservas_vencidas",
+        "schedule": timedelta(hours=1),
+    },
+    # Lembretes da agenda: consulta de intervalo em fire_at (índice parcial)
+    "agenda-despachar-lembretes": {
+        "task": "agenda.tasks.despachar_lembretes_vencidos",
+        "schedule": timedelta(minutes=1),
+    },
+    # Digest diário da agenda: cada tenant é enviado quando sua hora local chega
+    "agenda-digest-diario": {
+        "task": "agenda.tasks.enviar_digest_diario",
+        "schedule": timedelta(hours=1),
+    },
+    # Marcadores de exclusão da agenda além da validade dos sync_tokens
+    "agenda-expurgar-removidos": {
+        "task": "agenda.tasks.expurgar_eventos_removidos",
+        "schedule": timedelta(days=1),
+    },
+    # Relatórios PDF de funcionários: remove arquivos com link expirado
+    "funcionarios-limpar-relatorios-expirados": {
+        "task": "funcionarios.tasks.limpar_relatorios_expirados",
+        "schedule": timedelta(hours=1),
+    },
     # Backup automático diário (condicional via flag)
     "backup-automatico-diario": {
         "task": "prontuarios.tasks.executar_backup_automatico_tenants",
@@ -854,6 +994,10 @@ CELERY_BEAT_SCHEDULE = {
                 "task": "user_management.tasks.limpar_logs_antigos_periodico",
                 "schedule": timedelta(hours=24),
             },
+            "user_mgmt-snapshot-metricas": {
+                "task": "user_management.tasks.registrar_snapshot_metricas_diario",
+                "schedule": timedelta(hours=24),
+            },
         }
         if os.environ.get("ENABLE_USER_MGMT_MAINTENANCE", "True") == "True"
         else {}
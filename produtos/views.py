@@ -21,6 +21,7 @@ from django.views.generic import CreateView, DeleteView, DetailView, ListView, U
 
 # Importações do sistema
 from core.mixins import TenantRequiredMixin
+from core.services import search_index
 from core.utils import get_current_tenant
 from shared.mixins.ui_permissions import UIPermissionsMixin
 from shared.services.ui_permissions import build_ui_permissions
@@ -182,12 +183,7 @@ class ProdutoListView(UIPermissionsMixin, ProdutoMixin, ListView):
         # Busca por nome ou código
         busca = self.request.GET.get("busca")
         if busca:
-            queryset = queryset.filter(
-                Q(nome__icontains=busca)
-                | Q(codigo__icontains=busca)
-                | Q(codigo_barras__icontains=busca)
-                | Q(descricao__icontains=busca)
-            )
+            queryset = search_index.filter_queryset(queryset, busca)
 
         # Filtro por categoria
         categoria = self.request.GET.get("categoria")
@@ -685,9 +681,10 @@ def produtos_search_ajax(request):
     """Busca de produtos via AJAX para autocomplete"""
     term = request.GET.get("term", "")
 
-    produtos = Produto.objects.filter(
-        Q(nome__icontains=term) | Q(codigo__icontains=term) | Q(codigo_barras__icontains=term)
-    ).filter(ativo=True)[:10]
+    # Ranking (prefixo/similaridade) vem do índice; inativos saem antes do limite
+    ids = search_index.search_ids(Produto, term, limit=10, within=Produto.objects.filter(ativo=True))
+    por_id = Produto.objects.in_bulk(ids)
+    produtos = [por_id[pk] for pk in ids if pk in por_id]
 
     results = []
     for produto in produtos:
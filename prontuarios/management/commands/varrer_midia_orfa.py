@@ -0,0 +1,32 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from prontuarios.media_sweeper import varrer_midia_orfa
+
+
+class Command(BaseCommand):
+    help = (
+        "Varre MEDIA_ROOT em busca de mídia órfã (sem referência em colunas de arquivo). "
+        "Por padrão segue PRONTUARIOS_VARREDURA_APLICAR; retoma execuções interrompidas pelo checkpoint."
+    )
+
+    def add_arguments(self, parser):
+        modo = parser.add_mutually_exclusive_group()
+        modo.add_argument("--dry-run", action="store_true", help="Apenas gera o relatório, sem mover arquivos")
+        modo.add_argument("--aplicar", action="store_true", help="Move órfãos para a quarentena e purga lotes vencidos")
+        parser.add_argument("--max-segundos", type=float, help="Limite de tempo da execução (0 = sem limite)")
+        parser.add_argument("--reiniciar", action="store_true", help="Ignora o checkpoint e começa do início")
+
+    def handle(self, *args, **options):
+        aplicar = True if options["aplicar"] else (False if options["dry_run"] else None)
+        relatorio = varrer_midia_orfa(
+            aplicar=aplicar,
+            max_segundos=options.get("max_segundos"),
+            reiniciar=options["reiniciar"],
+        )
+        self.stdout.write(json.dumps(relatorio, ensure_ascii=False, indent=2))
+        if relatorio["status"] == "parcial":
+            self.stdout.write(self.style.WARNING("Execução parcial: rode novamente para retomar do checkpoint."))
+        else:
+            self.stdout.write(self.style.SUCCESS("Varredura concluída."))
@@ -0,0 +1,586 @@
+"""Pipeline de derivados de mídia para ``FotoEvolucao``.
+
+Substitui as tasks independentes (thumbnail, webp, poster, validação e
+transcodificação), que reliam o arquivo original cada uma, por um único
+processamento por foto:
+
+- cada fonte é lida uma vez: a imagem é decodificada uma vez em memória e o vídeo
+  é copiado uma vez para um arquivo local (o hash SHA-256 é calculado na mesma
+  leitura);
+- os derivados formam um DAG (``probe`` -> ``poster``/``h264``/``webm``;
+  ``thumbnail`` e ``webp`` direto da imagem) executado em um ``FairSharePool``
+  com limite de concorrência baseado nas CPUs disponíveis e divisão justa entre
+  tenants — dentro do processo;
+- entre processos/máquinas, ``slot_tenant`` limita quantas fotos de um mesmo
+  tenant são processadas ao mesmo tempo (semáforo no cache compartilhado, Redis
+  em produção); a task devolve à fila o job do tenant que estourou o limite;
+- as saídas são gravadas em caminhos derivados do tenant e do hash do conteúdo
+  (``prontuarios/derivados/<tenant>/<hash>/...``): reenvio do mesmo arquivo no
+  tenant reaproveita os derivados existentes sem processar de novo. Como um derivado
+  pode ser usado por várias fotos, nenhuma foto o apaga (``remover_arquivo``); o que
+  deixa de ser referenciado sai pela varredura de mídia órfã (``media_sweeper``).
+
+Os binários ``ffmpeg``/``ffprobe`` vêm de ``PRONTUARIOS_FFMPEG_BIN`` /
+``PRONTUARIOS_FFPROBE_BIN`` (testes usam scripts falsos).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import math
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from collections import Counter, OrderedDict, deque
+from collections.abc import Callable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor
+from concurrent.futures import wait as aguardar_futuros
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import File
+from django.core.files.storage import default_storage
+from PIL import Image
+
+from shared.cache_utils import get_int, incr_atomic
+
+from .models import FotoEvolucao
+
+__all__ = [
+    "DERIVADOS",
+    "FairSharePool",
+    "caminho_derivado",
+    "get_pool",
+    "processar_foto",
+    "remover_arquivo",
+    "slot_tenant",
+    "workers_padrao",
+]
+
+logger = logging.getLogger(__name__)
+
+THUMB_SIZE = (600, 600)
+PREFIXO_DERIVADOS = "prontuarios/derivados"
+_CHUNK = 1024 * 1024
+_BREAKER_KEY = "prontuarios:transcode_failures"
+_BREAKER_LIMITE = 5
+_BREAKER_TTL = 3600
+_SLOTS_KEY = "prontuarios:midia:slots:{tenant}"
+
+
+# ---------------------------------------------------------------------------
+# Pool com limite por CPU e fair share por tenant
+# ---------------------------------------------------------------------------
+
+
+def workers_padrao() -> int:
+    """CPUs utilizáveis pelo processo (respeita affinity/cgroups) menos uma, mínimo 1."""
+    configurado = int(getattr(settings, "PRONTUARIOS_MEDIA_WORKERS", 0) or 0)
+    if configurado > 0:
+        return configurado
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # pragma: no cover - plataformas sem sched_getaffinity
+        cpus = os.cpu_count() or 1
+    return max(1, cpus - 1)
+
+
+class FairSharePool:
+    """Executor com fila por tenant despachada em round-robin.
+
+    No máximo ``max_workers`` jobs rodam ao mesmo tempo; cada tenant com trabalho
+    pendente ou em execução tem direito a ``ceil(max_workers / tenants_ativos)``
+    slots, então um lote grande de um tenant não atrasa os demais. Quando só um
+    tenant tem trabalho ele usa todos os slots.
+
+    O estado é do processo: a justiça entre workers Celery vem de ``slot_tenant``.
+    """
+
+    def __init__(self, max_workers: int | None = None):
+        self.max_workers = max_workers or workers_padrao()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="media")
+        self._lock = threading.Lock()
+        self._filas: OrderedDict[object, deque] = OrderedDict()
+        self._ativos: Counter = Counter()
+        self._em_execucao = 0
+
+    def submit(self, tenant_id: object, fn: Callable, *args) -> Future:
+        futuro: Future = Future()
+        with self._lock:
+            self._filas.setdefault(tenant_id, deque()).append((futuro, fn, args))
+            self._despachar()
+        return futuro
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
+
+    def _limite_por_tenant(self) -> int:
+        tenants = set(self._filas) | {t for t, n in self._ativos.items() if n}
+        return max(1, math.ceil(self.max_workers / max(1, len(tenants))))
+
+    def _despachar(self) -> None:
+        """Ocupa slots livres (chamado com ``_lock``)."""
+        while self._em_execucao < self.max_workers and self._filas:
+            limite = self._limite_por_tenant()
+            tenant = next((t for t in self._filas if self._ativos[t] < limite), None)
+            if tenant is None:
+                return
+            fila = self._filas.pop(tenant)
+            futuro, fn, args = fila.popleft()
+            if fila:
+                self._filas[tenant] = fila  # volta ao fim da rodada
+            if not futuro.set_running_or_notify_cancel():
+                continue
+            self._ativos[tenant] += 1
+            self._em_execucao += 1
+            self._executor.submit(self._executar, tenant, futuro, fn, args)
+
+    def _executar(self, tenant, futuro: Future, fn: Callable, args: tuple) -> None:
+        try:
+            futuro.set_result(fn(*args))
+        except BaseException as exc:  # noqa: BLE001 - repassado ao Future
+            futuro.set_exception(exc)
+        finally:
+            with self._lock:
+                self._ativos[tenant] -= 1
+                if not self._ativos[tenant]:
+                    del self._ativos[tenant]
+                self._em_execucao -= 1
+                self._despachar()
+
+
+_pool: FairSharePool | None = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> FairSharePool:
+    """Pool compartilhado do processo (worker Celery)."""
+    global _pool  # noqa: PLW0603 - singleton por processo
+    with _pool_lock:
+        if _pool is None:
+            _pool = FairSharePool()
+        return _pool
+
+
+def _slots_por_tenant() -> int:
+    return int(getattr(settings, "PRONTUARIOS_MEDIA_SLOTS_POR_TENANT", 0) or 0)
+
+
+def _slot_ttl() -> int:
+    # Rede de segurança para worker morto sem liberar: o contador expira após o hard limit
+    return int(getattr(settings, "CELERY_TASK_TIME_LIMIT", 300) or 300) + 60
+
+
+@contextmanager
+def slot_tenant(tenant_id) -> Iterator[bool]:
+    """Semáforo por tenant compartilhado entre processos (via cache).
+
+    Produz ``True`` se o tenant ainda tem slot livre (``PRONTUARIOS_MEDIA_SLOTS_POR_TENANT``
+    fotos simultâneas somando todos os workers; 0 = sem limite). O slot é liberado na saída
+    mesmo quando negado.
+    """
+    limite = _slots_por_tenant()
+    if limite <= 0 or tenant_id is None:
+        yield True
+        return
+    chave = _SLOTS_KEY.format(tenant=tenant_id)
+    em_uso = incr_atomic(chave, 1, _slot_ttl())
+    try:
+        yield em_uso <= limite
+    finally:
+        try:
+            if cache.decr(chave) < 0:
+                cache.delete(chave)  # contador expirou com slots ocupados
+        except ValueError:
+            pass  # chave expirou durante o processamento
+
+
+# ---------------------------------------------------------------------------
+# Derivados (executados nas threads do pool; sem acesso ao banco)
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class _Fontes:
+    pasta: str
+    imagem: Image.Image | None = None
+    hash_imagem: str | None = None
+    video: str | None = None
+    hash_video: str | None = None
+    video_tamanho: int = 0
+    resultados: dict = field(default_factory=dict)
+
+
+def _ffmpeg() -> str | None:
+    return shutil.which(getattr(settings, "PRONTUARIOS_FFMPEG_BIN", "ffmpeg"))
+
+
+def _ffprobe() -> str | None:
+    return shutil.which(getattr(settings, "PRONTUARIOS_FFPROBE_BIN", "ffprobe"))
+
+
+def _threads_ffmpeg() -> str:
+    # divide as CPUs entre os slots do pool para não haver oversubscription
+    return str(max(1, (os.cpu_count() or 1) // workers_padrao()))
+
+
+def _thumbnail(fontes: _Fontes) -> str:
+    img = fontes.imagem.copy()
+    img.thumbnail(THUMB_SIZE)
+    destino = os.path.join(fontes.pasta, "thumb.jpg")
+    img.convert("RGB").save(destino, format="JPEG", quality=80)
+    return destino
+
+
+def _webp(fontes: _Fontes) -> str:
+    destino = os.path.join(fontes.pasta, "imagem.webp")
+    fontes.imagem.save(destino, format="WEBP", quality=80, method=6)
+    return destino
+
+
+def _probe(fontes: _Fontes) -> dict | None:
+    binario = _ffprobe()
+    if not binario:
+        return None
+    cmd = [binario, "-v", "quiet", "-print_format", "json", "-show_streams", "-select_streams", "v:0", fontes.video]
+    try:
+        return json.loads(subprocess.check_output(cmd).decode("utf-8", "ignore"))  # noqa: S603 - binário configurado
+    except Exception:  # noqa: BLE001 - metadados são opcionais
+        return None
+
+
+def _executar_ffmpeg(args: list[str], destino: str) -> str:
+    cmd = [_ffmpeg(), "-y", *args, "-threads", _threads_ffmpeg(), destino]
+    subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)  # noqa: S603
+    if not os.path.exists(destino):
+        msg = f"ffmpeg não gerou {os.path.basename(destino)}"
+        raise RuntimeError(msg)
+    return destino
+
+
+def _poster(fontes: _Fontes) -> str:
+    destino = os.path.join(fontes.pasta, "poster.jpg")
+    return _executar_ffmpeg(["-i", fontes.video, "-ss", "00:00:01.000", "-vframes", "1"], destino)
+
+
+_PERFIS = {
+    "h264": (["-c:v", "libx264", "-preset", "veryfast", "-crf", "28", "-c:a", "aac", "-b:a", "96k"], "mp4"),
+    "webm": (["-c:v", "libvpx-vp9", "-b:v", "0", "-crf", "35", "-c:a", "libopus", "-b:a", "64k"], "webm"),
+}
+
+
+def _transcode(perfil: str) -> Callable[[_Fontes], str]:
+    args, ext = _PERFIS[perfil]
+
+    def executar(fontes: _Fontes) -> str:
+        return _executar_ffmpeg(["-i", fontes.video, *args], os.path.join(fontes.pasta, f"{perfil}.{ext}"))
+
+    return executar
+
+
+@dataclass(frozen=True)
+class Derivado:
+    nome: str
+    fonte: str  # "imagem" | "video"
+    arquivo: str | None  # nome da saída sob o hash da fonte (None = não persiste)
+    executar: Callable[[_Fontes], object]
+    depende: tuple[str, ...] = ()
+
+
+DERIVADOS: dict[str, Derivado] = {
+    d.nome: d
+    for d in (
+        Derivado("thumbnail", "imagem", "thumb_600.jpg", _thumbnail),
+        Derivado("webp", "imagem", "imagem_q80.webp", _webp),
+        Derivado("probe", "video", None, _probe),
+        Derivado("poster", "video", "poster.jpg", _poster, ("probe",)),
+        Derivado("h264", "video", "h264.mp4", _transcode("h264"), ("probe",)),
+        Derivado("webm", "video", "webm.webm", _transcode("webm"), ("probe",)),
+    )
+}
+
+
+def caminho_derivado(tenant_id, hash_fonte: str, derivado: str) -> str:
+    """Caminho no storage (chaveado pelo tenant e pelo hash do conteúdo) da saída do derivado."""
+    return f"{PREFIXO_DERIVADOS}/{tenant_id or 0}/{hash_fonte[:2]}/{hash_fonte}/{DERIVADOS[derivado].arquivo}"
+
+
+def remover_arquivo(arquivo) -> None:
+    """Esvazia o campo; derivados ficam no storage (o mesmo caminho pode servir a outras fotos)."""
+    if not arquivo:
+        return
+    if not arquivo.name.startswith(f"{PREFIXO_DERIVADOS}/"):
+        arquivo.delete(save=False)
+        return
+    arquivo.name = None  # como FieldFile.delete, sem apagar o arquivo
+    setattr(arquivo.instance, arquivo.field.attname, None)
+
+
+def _executar_dag(pool: FairSharePool, tenant_id, nos: list[str], fontes: _Fontes) -> dict[str, BaseException]:
+    """Executa os nós respeitando dependências; nós cujo pré-requisito falhou são pulados."""
+    falhas: dict[str, BaseException] = {}
+    pendentes = {n: set(DERIVADOS[n].depende) & set(nos) for n in nos}
+    rodando: dict[Future, str] = {}
+    while pendentes or rodando:
+        for nome in [n for n, deps in pendentes.items() if not deps]:
+            del pendentes[nome]
+            rodando[pool.submit(tenant_id, DERIVADOS[nome].executar, fontes)] = nome
+        if not rodando:  # dependências de nós que falharam
+            break
+        feitos, _ = aguardar_futuros(list(rodando), return_when=FIRST_COMPLETED)
+        for futuro in feitos:
+            nome = rodando.pop(futuro)
+            exc = futuro.exception()
+            if exc is not None:
+                falhas[nome] = exc
+                for dependente in [n for n, deps in pendentes.items() if nome in deps]:
+                    del pendentes[dependente]
+                continue
+            fontes.resultados[nome] = futuro.result()
+            if nome == "probe" and not _probe_aprovado(fontes):
+                for dependente in [n for n, deps in pendentes.items() if nome in deps]:
+                    del pendentes[dependente]
+            for deps in pendentes.values():
+                deps.discard(nome)
+    return falhas
+
+
+# ---------------------------------------------------------------------------
+# Validação / circuit breaker de transcodificação
+# ---------------------------------------------------------------------------
+
+LIMITES_VIDEO = {"max_duracao_seg": 60, "max_width": 1920, "max_height": 1080}
+
+
+def _metadados_video(meta: dict | None) -> dict | None:
+    streams = (meta or {}).get("streams") or []
+    if not streams:
+        return None
+    s = streams[0]
+    return {
+        "duracao": float(s.get("duration") or meta.get("format", {}).get("duration", 0) or 0),
+        "width": int(s.get("width") or 0),
+        "height": int(s.get("height") or 0),
+    }
+
+
+def _probe_aprovado(fontes: _Fontes) -> bool:
+    dados = _metadados_video(fontes.resultados.get("probe"))
+    if dados is None:  # sem ffprobe/metadados: não bloqueia derivados (comportamento anterior)
+        return True
+    return (
+        dados["duracao"] <= LIMITES_VIDEO["max_duracao_seg"]
+        and dados["width"] <= LIMITES_VIDEO["max_width"]
+        and dados["height"] <= LIMITES_VIDEO["max_height"]
+    )
+
+
+def _breaker_aberto() -> bool:
+    return get_int(_BREAKER_KEY, 0) >= _BREAKER_LIMITE
+
+
+# ---------------------------------------------------------------------------
+# Orquestração (processo da task)
+# ---------------------------------------------------------------------------
+
+
+def _ler_imagem(foto: FotoEvolucao, fontes: _Fontes) -> None:
+    foto.imagem.open("rb")
+    try:
+        dados = foto.imagem.read()
+    finally:
+        foto.imagem.close()
+    fontes.hash_imagem = hashlib.sha256(dados).hexdigest()
+    img = Image.open(BytesIO(dados))
+    img.load()
+    fontes.imagem = img
+
+
+def _ler_video(foto: FotoEvolucao, fontes: _Fontes) -> None:
+    digest = hashlib.sha256()
+    ext = os.path.splitext(foto.video.name)[1] or ".mp4"
+    fontes.video = os.path.join(fontes.pasta, f"fonte{ext}")
+    foto.video.open("rb")
+    try:
+        with open(fontes.video, "wb") as destino:
+            for bloco in foto.video.chunks(_CHUNK):
+                digest.update(bloco)
+                destino.write(bloco)
+                fontes.video_tamanho += len(bloco)
+    finally:
+        foto.video.close()
+    fontes.hash_video = digest.hexdigest()
+
+
+def _planejar(foto: FotoEvolucao, forcar: bool) -> list[str]:
+    nos = []
+    if foto.imagem:
+        if forcar or not foto.imagem_thumbnail:
+            nos.append("thumbnail")
+        if forcar or not foto.imagem_webp:
+            nos.append("webp")
+    if foto.video:
+        meta = foto.video_meta or {}
+        if forcar or not foto.video_poster:
+            nos.append("poster")
+        # vídeo já substituído pela versão transcodificada não é transcodificado de novo
+        if forcar or not meta.get("transcodificacao"):
+            nos += ["h264", "webm"]
+        if forcar or "validacao" not in meta:
+            nos.append("probe")
+    return nos
+
+
+@dataclass
+class _Execucao:
+    """Estado de um processamento: o que rodar, o que persistir e o resumo devolvido."""
+
+    foto: FotoEvolucao
+    fontes: _Fontes
+    nos: list[str]
+    meta: dict
+    campos: dict = field(default_factory=dict)
+    resumo: dict = field(default_factory=lambda: {"ok": True, "gerados": [], "reaproveitados": [], "falhas": {}})
+
+    def caminho(self, nome: str) -> str:
+        fonte = self.fontes.hash_imagem if DERIVADOS[nome].fonte == "imagem" else self.fontes.hash_video
+        return caminho_derivado(self.foto.tenant_id, fonte, nome)
+
+
+def _filtrar_indisponiveis(nos: list[str], resumo: dict) -> list[str]:
+    video = {"poster", "h264", "webm"}
+    if video & set(nos) and not _ffmpeg():
+        resumo["motivo_video"] = "ffmpeg_indisponivel"
+        return [n for n in nos if n not in video]
+    if {"h264", "webm"} & set(nos) and _breaker_aberto():
+        resumo["motivo_video"] = "circuit_breaker"
+        return [n for n in nos if n not in {"h264", "webm"}]
+    return nos
+
+
+def _gravar_saidas(execucao: _Execucao) -> None:
+    """Grava no storage (caminho por hash) as saídas geradas; registra caminhos reaproveitados."""
+    fontes, resumo = execucao.fontes, execucao.resumo
+    for nome in execucao.nos:
+        if not DERIVADOS[nome].arquivo:
+            continue
+        caminho = execucao.caminho(nome)
+        if nome in fontes.resultados:
+            with open(fontes.resultados[nome], "rb") as fh:
+                caminho = default_storage.save(caminho, File(fh))
+            resumo["gerados"].append(nome)
+        elif nome not in resumo["reaproveitados"]:
+            continue
+        fontes.resultados[f"{nome}:caminho"] = caminho
+
+
+def processar_foto(foto_id: int, *, forcar: bool = False, pool: FairSharePool | None = None) -> dict:
+    """Gera os derivados pendentes da foto e persiste os campos em um único UPDATE.
+
+    Retorna ``{"ok", "gerados", "reaproveitados", "falhas", ...}``.
+    """
+    foto = FotoEvolucao.objects.get(pk=foto_id)
+    resumo = {"ok": True, "gerados": [], "reaproveitados": [], "falhas": {}}
+    nos = _filtrar_indisponiveis(_planejar(foto, forcar), resumo)
+    if not nos:
+        return resumo
+
+    with tempfile.TemporaryDirectory(prefix="midia_") as pasta:
+        execucao = _Execucao(foto, _Fontes(pasta=pasta), nos, dict(foto.video_meta or {}), resumo=resumo)
+        fontes = execucao.fontes
+        if any(DERIVADOS[n].fonte == "imagem" for n in nos):
+            _ler_imagem(foto, fontes)
+            if not foto.hash_arquivo:
+                execucao.campos["hash_arquivo"] = fontes.hash_imagem
+        if any(DERIVADOS[n].fonte == "video" for n in nos):
+            _ler_video(foto, fontes)
+
+        # Reaproveitamento por hash: derivado já existente no storage não é reprocessado
+        executar = []
+        for nome in nos:
+            if DERIVADOS[nome].arquivo and default_storage.exists(execucao.caminho(nome)):
+                resumo["reaproveitados"].append(nome)
+            else:
+                executar.append(nome)
+        if executar:
+            falhas = _executar_dag(pool or get_pool(), foto.tenant_id, executar, fontes)
+            resumo["falhas"] = {nome: str(exc) for nome, exc in falhas.items()}
+
+        _gravar_saidas(execucao)
+        _aplicar_imagem(execucao)
+        _aplicar_video(execucao)
+
+    if execucao.meta != (foto.video_meta or {}):
+        execucao.campos["video_meta"] = execucao.meta
+    if execucao.campos:
+        # UPDATE direto: save() dispararia o pipeline novamente
+        FotoEvolucao.objects.filter(pk=foto.pk).update(**execucao.campos)
+    resumo["ok"] = not resumo["falhas"]
+    return resumo
+
+
+def _aplicar_imagem(execucao: _Execucao) -> None:
+    resultados = execucao.fontes.resultados
+    if "thumbnail:caminho" in resultados:
+        execucao.campos["imagem_thumbnail"] = resultados["thumbnail:caminho"]
+    if "webp:caminho" in resultados:
+        execucao.campos["imagem_webp"] = resultados["webp:caminho"]
+
+
+def _aplicar_video(execucao: _Execucao) -> None:
+    foto, fontes, meta, campos, resumo = (
+        execucao.foto,
+        execucao.fontes,
+        execucao.meta,
+        execucao.campos,
+        execucao.resumo,
+    )
+    if "probe" in execucao.nos:
+        dados = _metadados_video(fontes.resultados.get("probe"))
+        if dados is not None:
+            meta.update(dados)
+            meta["validacao"] = "aprovado" if _probe_aprovado(fontes) else "reprovado"
+        if meta.get("validacao") == "reprovado":
+            # Política: remove vídeo e poster que excedem os limites
+            remover_arquivo(foto.video)
+            remover_arquivo(foto.video_poster)
+            campos.update(video="", video_poster="")
+            resumo["motivo_video"] = "limites_excedidos"
+            return
+    if "poster:caminho" in fontes.resultados:
+        campos["video_poster"] = fontes.resultados["poster:caminho"]
+
+    transcodes = [n for n in ("h264", "webm") if n in execucao.nos]
+    if not transcodes:
+        return
+    if any(n in resumo["falhas"] for n in transcodes):
+        incr_atomic(_BREAKER_KEY, 1, _BREAKER_TTL)
+        return
+    # Substitui o original apenas por saída significativamente menor (>= 15%)
+    melhor = None
+    for nome in transcodes:
+        caminho = fontes.resultados.get(f"{nome}:caminho")
+        if not caminho:
+            continue
+        tamanho = default_storage.size(caminho)
+        if tamanho < fontes.video_tamanho * 0.85 and (melhor is None or tamanho < melhor[2]):
+            melhor = (nome, caminho, tamanho)
+    cache.set(_BREAKER_KEY, 0, _BREAKER_TTL)  # sucesso zera o breaker
+    if melhor is None:
+        meta["transcodificacao"] = {"perfil": "mantido", "original_size": fontes.video_tamanho}
+        return
+    nome, caminho, tamanho = melhor
+    campos["video"] = caminho
+    meta["transcodificacao"] = {
+        "perfil": nome,
+        "original_size": fontes.video_tamanho,
+        "novo_size": tamanho,
+        "hash_origem": fontes.hash_video,
+    }
@@ -0,0 +1,409 @@
+"""Varredura de mídia órfã em ``MEDIA_ROOT`` (substitui o ``exists()`` por arquivo).
+
+Fluxo de uma execução (``varrer_midia_orfa``):
+
+1. **Índice de referências**: todas as colunas ``FileField``/``ImageField`` dos
+   modelos instalados são lidas em blocos (``values_list(...).iterator``) e os
+   caminhos entram em um filtro de Bloom. O filtro não tem falsos negativos: um
+   arquivo "ausente" no filtro certamente não é referenciado; um falso positivo
+   apenas mantém o arquivo (lado seguro).
+2. **Varredura do storage**: os prefixos configurados são percorridos em ordem
+   determinística (diretórios e arquivos ordenados). Arquivos fora do filtro e mais
+   antigos que a idade mínima são candidatos; antes de qualquer movimentação os
+   candidatos são reconferidos em lote com ``__in`` (protege contra referências
+   criadas depois da montagem do índice).
+3. **Exclusão em duas fases**: candidatos vão para a quarentena
+   (``.quarentena_midia/<AAAAMMDD>/<caminho>``); só na execução em que o lote
+   ultrapassa ``PRONTUARIOS_VARREDURA_QUARENTENA_DIAS`` os arquivos são conferidos
+   de novo e removidos — os que voltaram a ser referenciados são restaurados.
+
+Cada execução grava um relatório (``.varredura_midia/relatorios/<id>.json`` e a
+lista de candidatos em ``<id>-candidatos.jsonl``) e, enquanto não termina, um
+checkpoint com o último diretório processado: uma execução interrompida (limite de
+tempo, deploy, falha) é retomada do ponto em que parou. Sem
+``PRONTUARIOS_VARREDURA_APLICAR`` a execução é apenas *dry-run* (nada é movido).
+"""
+
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import json
+import logging
+import math
+import os
+import shutil
+import time
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connection, models
+from django.utils import timezone
+
+__all__ = [
+    "BloomFilter",
+    "campos_arquivo",
+    "indexar_referencias",
+    "referenciados",
+    "varrer_midia_orfa",
+]
+
+logger = logging.getLogger(__name__)
+
+DIRETORIO_ESTADO = ".varredura_midia"
+DIRETORIO_QUARENTENA = ".quarentena_midia"
+TAMANHO_BLOCO = 5000
+TAMANHO_LOTE_CONFERENCIA = 500
+INTERVALO_CHECKPOINT = 2.0  # segundos entre gravações do checkpoint
+
+
+class BloomFilter:
+    """Filtro de Bloom simples (``bytearray`` + hash duplo blake2b)."""
+
+    def __init__(self, capacidade: int, taxa_falsos: float = 1e-4):
+        capacidade = max(capacidade, 1)
+        self.bits = max(1024, math.ceil(-capacidade * math.log(taxa_falsos) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.bits / capacidade * math.log(2)))
+        self._dados = bytearray((self.bits + 7) // 8)
+
+    def _posicoes(self, valor: str) -> Iterator[int]:
+        digest = hashlib.blake2b(valor.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.bits
+
+    def add(self, valor: str) -> None:
+        for pos in self._posicoes(valor):
+            self._dados[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, valor: str) -> bool:
+        return all(self._dados[pos >> 3] & (1 << (pos & 7)) for pos in self._posicoes(valor))
+
+
+def campos_arquivo() -> list[tuple[type[models.Model], str]]:
+    """``(modelo, coluna)`` de todos os ``FileField`` concretos com tabela no banco."""
+    tabelas = set(connection.introspection.table_names())
+    campos = []
+    for model in apps.get_models():
+        meta = model._meta
+        if meta.proxy or not meta.managed or meta.db_table not in tabelas:
+            continue
+        campos.extend((model, f.attname) for f in meta.concrete_fields if isinstance(f, models.FileField))
+    return campos
+
+
+def _com_valor(model: type[models.Model], coluna: str) -> models.QuerySet:
+    # _base_manager: managers padrão podem esconder linhas (soft delete) que ainda apontam para arquivos
+    return model._base_manager.exclude(**{f"{coluna}__isnull": True}).exclude(**{coluna: ""})
+
+
+def indexar_referencias(campos: list | None = None, chunk_size: int = TAMANHO_BLOCO) -> tuple[BloomFilter, int]:
+    """Monta o filtro de Bloom com todos os caminhos referenciados no banco."""
+    campos = campos_arquivo() if campos is None else campos
+    total = sum(_com_valor(model, coluna).count() for model, coluna in campos)
+    bloom = BloomFilter(total)
+    for model, coluna in campos:
+        for caminho in _com_valor(model, coluna).values_list(coluna, flat=True).iterator(chunk_size=chunk_size):
+            bloom.add(caminho)
+    return bloom, total
+
+
+def referenciados(caminhos: Iterable[str], campos: list | None = None) -> set[str]:
+    """Conferência exata: subconjunto de ``caminhos`` presente em alguma coluna de arquivo."""
+    caminhos = list(caminhos)
+    campos = campos_arquivo() if campos is None else campos
+    encontrados: set[str] = set()
+    for inicio in range(0, len(caminhos), TAMANHO_LOTE_CONFERENCIA):
+        lote = caminhos[inicio : inicio + TAMANHO_LOTE_CONFERENCIA]
+        for model, coluna in campos:
+            encontrados.update(model._base_manager.filter(**{f"{coluna}__in": lote}).values_list(coluna, flat=True))
+    return encontrados
+
+
+def _partes(relativo: str) -> tuple[str, ...]:
+    return tuple(p for p in relativo.split("/") if p)
+
+
+def _percorrer(raiz: str, relativo: str, checkpoint: tuple[str, ...]) -> Iterator[tuple[str, list[os.DirEntry]]]:
+    """Pré-ordem com filhos ordenados: ``(diretório relativo, arquivos)``.
+
+    A ordem é a lexicográfica das partes do caminho, então tudo que é ``<=`` ao
+    checkpoint já foi processado; ancestrais do checkpoint só são atravessados.
+    """
+    try:
+        with os.scandir(os.path.join(raiz, relativo)) as it:
+            entradas = sorted((e for e in it if not e.name.startswith(".")), key=lambda e: e.name)
+    except FileNotFoundError:
+        return
+    partes = _partes(relativo)
+    if partes > checkpoint:
+        yield relativo, [e for e in entradas if e.is_file(follow_symlinks=False)]
+    for entrada in entradas:
+        if not entrada.is_dir(follow_symlinks=False):
+            continue
+        filho = (*partes, entrada.name)
+        if filho > checkpoint or checkpoint[: len(filho)] == filho:
+            yield from _percorrer(raiz, f"{relativo}/{entrada.name}", checkpoint)
+
+
+@dataclass
+class _Execucao:
+    raiz: str
+    id: str
+    aplicar: bool
+    limite_mtime: float
+    iniciado_em: str
+    totais: dict = field(
+        default_factory=lambda: dict.fromkeys(
+            (
+                "arquivos",
+                "referenciados",
+                "recentes",
+                "orfaos",
+                "bytes_orfaos",
+                "quarentenados",
+                "purgaveis",
+                "purgados",
+                "restaurados",
+            ),
+            0,
+        )
+    )
+    prefixo: str = ""
+    diretorio: str = ""
+    purga_concluida: bool = False
+    referencias: int = 0
+    campos: list = field(default_factory=list)
+
+    @property
+    def estado(self) -> str:
+        return os.path.join(self.raiz, DIRETORIO_ESTADO)
+
+    @property
+    def arquivo_checkpoint(self) -> str:
+        return os.path.join(self.estado, "checkpoint.json")
+
+    @property
+    def arquivo_candidatos(self) -> str:
+        return os.path.join(self.estado, "relatorios", f"{self.id}-candidatos.jsonl")
+
+    def gravar_checkpoint(self) -> None:
+        dados = {
+            "id": self.id,
+            "aplicar": self.aplicar,
+            "iniciado_em": self.iniciado_em,
+            "limite_mtime": self.limite_mtime,
+            "prefixo": self.prefixo,
+            "diretorio": self.diretorio,
+            "purga_concluida": self.purga_concluida,
+            "totais": self.totais,
+        }
+        _gravar_json(self.arquivo_checkpoint, dados)
+
+    def relatorio(self, status: str) -> dict:
+        return {
+            "id": self.id,
+            "modo": "aplicar" if self.aplicar else "dry-run",
+            "status": status,
+            "iniciado_em": self.iniciado_em,
+            "atualizado_em": timezone.now().isoformat(),
+            "referencias_indexadas": self.referencias,
+            "retomar_de": {"prefixo": self.prefixo, "diretorio": self.diretorio} if status == "parcial" else None,
+            "totais": dict(self.totais),
+            "candidatos": os.path.relpath(self.arquivo_candidatos, self.raiz),
+        }
+
+
+def _gravar_json(destino: str, dados: dict) -> None:
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    temporario = f"{destino}.tmp"
+    with open(temporario, "w", encoding="utf-8") as fh:
+        json.dump(dados, fh, ensure_ascii=False, indent=2)
+    os.replace(temporario, destino)
+
+
+def _carregar_checkpoint(raiz: str) -> dict | None:
+    try:
+        with open(os.path.join(raiz, DIRETORIO_ESTADO, "checkpoint.json"), encoding="utf-8") as fh:
+            return json.load(fh)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def _mover(origem: str, destino: str) -> None:
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    shutil.move(origem, destino)
+
+
+def _purgar_quarentena(execucao: _Execucao, corte: datetime) -> None:
+    """Fase 2: remove (ou restaura) lotes da quarentena mais antigos que ``corte``."""
+    base = os.path.join(execucao.raiz, DIRETORIO_QUARENTENA)
+    if not os.path.isdir(base):
+        return
+    for lote in sorted(os.listdir(base)):
+        try:
+            data_lote = datetime.strptime(lote, "%Y%m%d").date()
+        except ValueError:
+            continue
+        if data_lote > corte.date():
+            break
+        raiz_lote = os.path.join(base, lote)
+        arquivos = [
+            os.path.relpath(os.path.join(pasta, nome), raiz_lote).replace(os.sep, "/")
+            for pasta, _dirs, nomes in os.walk(raiz_lote)
+            for nome in nomes
+        ]
+        execucao.totais["purgaveis"] += len(arquivos)
+        if not execucao.aplicar:
+            continue
+        ainda_usados = referenciados(arquivos, execucao.campos)
+        for relativo in arquivos:
+            origem = os.path.join(raiz_lote, relativo)
+            original = os.path.join(execucao.raiz, relativo)
+            if relativo in ainda_usados and not os.path.exists(original):
+                _mover(origem, original)
+                execucao.totais["restaurados"] += 1
+                logger.warning("Arquivo em quarentena voltou a ser referenciado e foi restaurado: %s", relativo)
+            else:
+                os.remove(origem)
+                execucao.totais["purgados"] += 1
+        shutil.rmtree(raiz_lote, ignore_errors=True)
+
+
+def _processar_diretorio(
+    execucao: _Execucao, bloom: BloomFilter, relativo: str, arquivos: list[os.DirEntry], candidatos_fh
+) -> None:
+    """Fase 1 para um diretório: classifica os arquivos e coloca órfãos em quarentena."""
+    suspeitos: dict[str, os.stat_result] = {}
+    for entrada in arquivos:
+        caminho = f"{relativo}/{entrada.name}"
+        execucao.totais["arquivos"] += 1
+        if caminho in bloom:
+            execucao.totais["referenciados"] += 1
+            continue
+        info = entrada.stat(follow_symlinks=False)
+        if info.st_mtime >= execucao.limite_mtime:
+            execucao.totais["recentes"] += 1
+            continue
+        suspeitos[caminho] = info
+    if not suspeitos:
+        return
+    # Referências criadas após a montagem do índice (ex.: derivado reaproveitado por hash)
+    usados = referenciados(suspeitos, execucao.campos)
+    execucao.totais["referenciados"] += len(usados)
+    lote = timezone.localdate().strftime("%Y%m%d")
+    for caminho, info in suspeitos.items():
+        if caminho in usados:
+            continue
+        execucao.totais["orfaos"] += 1
+        execucao.totais["bytes_orfaos"] += info.st_size
+        candidatos_fh.write(
+            json.dumps({"caminho": caminho, "bytes": info.st_size, "mtime": int(info.st_mtime)}, ensure_ascii=False)
+            + "\n"
+        )
+        if execucao.aplicar:
+            _mover(
+                os.path.join(execucao.raiz, caminho),
+                os.path.join(execucao.raiz, DIRETORIO_QUARENTENA, lote, caminho),
+            )
+            execucao.totais["quarentenados"] += 1
+
+
+def _abrir_execucao(raiz: str, aplicar: bool, idade_minima_dias: int, reiniciar: bool) -> _Execucao:
+    anterior = None if reiniciar else _carregar_checkpoint(raiz)
+    if anterior:
+        logger.info("Retomando varredura de mídia %s a partir de %s", anterior["id"], anterior["diretorio"] or "-")
+        return _Execucao(
+            raiz=raiz,
+            id=anterior["id"],
+            aplicar=anterior["aplicar"],
+            limite_mtime=anterior["limite_mtime"],
+            iniciado_em=anterior["iniciado_em"],
+            totais=anterior["totais"],
+            prefixo=anterior["prefixo"],
+            diretorio=anterior["diretorio"],
+            purga_concluida=anterior["purga_concluida"],
+        )
+    agora = timezone.now()
+    return _Execucao(
+        raiz=raiz,
+        id=agora.strftime("%Y%m%dT%H%M%S"),
+        aplicar=aplicar,
+        limite_mtime=(agora - timedelta(days=idade_minima_dias)).timestamp(),
+        iniciado_em=agora.isoformat(),
+    )
+
+
+def _varrer(execucao: _Execucao, bloom: BloomFilter, max_segundos: float) -> bool:
+    """Fase 1 sobre os prefixos; ``False`` se o limite de tempo interrompeu a varredura."""
+    inicio = ultimo_checkpoint = time.monotonic()
+    os.makedirs(os.path.dirname(execucao.arquivo_candidatos), exist_ok=True)
+    with open(execucao.arquivo_candidatos, "a", encoding="utf-8") as candidatos_fh:
+        for prefixo in sorted(settings.PRONTUARIOS_VARREDURA_PREFIXOS):
+            if prefixo < execucao.prefixo:
+                continue
+            checkpoint = _partes(execucao.diretorio) if prefixo == execucao.prefixo else ()
+            execucao.prefixo = prefixo
+            for relativo, arquivos in _percorrer(execucao.raiz, prefixo, checkpoint):
+                _processar_diretorio(execucao, bloom, relativo, arquivos, candidatos_fh)
+                execucao.diretorio = relativo
+                agora = time.monotonic()
+                interromper = bool(max_segundos) and agora - inicio >= max_segundos
+                if interromper or agora - ultimo_checkpoint >= INTERVALO_CHECKPOINT:
+                    candidatos_fh.flush()
+                    execucao.gravar_checkpoint()
+                    ultimo_checkpoint = agora
+                if interromper:
+                    return False
+            execucao.diretorio = ""
+    return True
+
+
+def varrer_midia_orfa(
+    *,
+    aplicar: bool | None = None,
+    idade_minima_dias: int | None = None,
+    quarentena_dias: int | None = None,
+    max_segundos: float | None = None,
+    reiniciar: bool = False,
+) -> dict:
+    """Executa (ou retoma) a varredura e devolve o relatório gravado.
+
+    Parâmetros omitidos vêm de ``PRONTUARIOS_VARREDURA_*``. O relatório tem
+    ``status`` ``"concluido"`` ou ``"parcial"`` (limite de tempo atingido; a próxima
+    chamada retoma do checkpoint, mantendo o modo e a idade de corte originais).
+    """
+    aplicar = settings.PRONTUARIOS_VARREDURA_APLICAR if aplicar is None else aplicar
+    if idade_minima_dias is None:
+        idade_minima_dias = settings.PRONTUARIOS_VARREDURA_IDADE_MINIMA_DIAS
+    if quarentena_dias is None:
+        quarentena_dias = settings.PRONTUARIOS_VARREDURA_QUARENTENA_DIAS
+    if max_segundos is None:
+        max_segundos = settings.PRONTUARIOS_VARREDURA_MAX_SEGUNDOS
+
+    execucao = _abrir_execucao(str(settings.MEDIA_ROOT), aplicar, idade_minima_dias, reiniciar)
+    execucao.campos = campos_arquivo()
+    destino = os.path.join(execucao.estado, "relatorios", f"{execucao.id}.json")
+
+    if not execucao.purga_concluida:
+        _purgar_quarentena(execucao, timezone.now() - timedelta(days=quarentena_dias))
+        execucao.purga_concluida = True
+        execucao.gravar_checkpoint()
+
+    bloom, execucao.referencias = indexar_referencias(execucao.campos)
+    if not _varrer(execucao, bloom, max_segundos):
+        relatorio = execucao.relatorio("parcial")
+        _gravar_json(destino, relatorio)
+        logger.info("Varredura de mídia %s interrompida pelo limite de tempo", execucao.id)
+        return relatorio
+
+    relatorio = execucao.relatorio("concluido")
+    _gravar_json(destino, relatorio)
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(execucao.arquivo_checkpoint)
+    logger.info("Varredura de mídia %s concluída: %s", execucao.id, execucao.totais)
+    return relatorio
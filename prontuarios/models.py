@@ -345,27 +345,13 @@ class FotoEvolucao(TimestampedModel):
             with contextlib.suppress(Exception):
                 self.mime_type = getattr(self.video.file, "content_type", None)
         super().save(*args, **kwargs)
-        # Disparar geração assíncrona de derivados (thumbnail, webp, poster)
+        # Disparar geração assíncrona de derivados: um único job lê cada fonte uma vez e
+        # gera thumbnail, webp, poster, validação e transcodificação (media_pipeline)
         if self.imagem or self.video:
             try:
-                from .tasks import (
-                    extrair_video_poster,
-                    gerar_thumbnail_foto,
-                    gerar_variacao_webp,
-                    transcodificar_video,
-                    validar_video,
-                )
-
-                if self.imagem:
-                    gerar_thumbnail_foto.delay(self.id)
-                    gerar_variacao_webp.delay(self.id)
-                if self.video:
-                    # Validação sempre primeiro
-                    validar_video.delay(self.id)
-                    if not self.video_poster:
-                        extrair_video_poster.delay(self.id)
-                    # Tentativa de transcodificação h264 (pode ser fila futura)
-                    transcodificar_video.apply_async([self.id, "h264"], countdown=10)
+                from .tasks import processar_derivados_midia
+
+                processar_derivados_midia.delay(self.id)
             except Exception:
                 pass
 
@@ -8,15 +8,19 @@ import contextlib
 import json
 import logging
 import os
+import random
 from datetime import datetime, timedelta
 
 from celery import shared_task
+from celery.exceptions import Retry
 from django.conf import settings
 from django.core.mail import send_mail
 from django.template.loader import render_to_string
 from django.utils import timezone
 from prometheus_client import Counter, Gauge, Summary
 
+from .media_pipeline import processar_foto, remover_arquivo, slot_tenant
+from .media_sweeper import varrer_midia_orfa
 from .models import Atendimento, FotoEvolucao
 
 # Métricas
@@ -185,10 +189,9 @@ def validar_video(self, foto_id, max_duracao_seg=60, max_width=1920, max_height=
         meta_obj = foto.video_meta or {}
         meta_obj.update({"duracao": dur, "width": w, "height": h})
         if dur > max_duracao_seg or w > max_width or h > max_height:
-            # Política: apagar vídeo e poster se excede limites
-            foto.video.delete(save=False)
-            if foto.video_poster:
-                foto.video_poster.delete(save=False)
+            # Política: apagar vídeo e poster se excede limites (derivados compartilhados ficam)
+            remover_arquivo(foto.video)
+            remover_arquivo(foto.video_poster)
             meta_obj["validacao"] = "reprovado"
             foto.video_meta = meta_obj
             foto.save(update_fields=["video", "video_poster", "video_meta"])
@@ -313,6 +316,44 @@ def transcodificar_video(self, foto_id, target="h264"):  # target: h264|webm
         INFLIGHT.labels("transcodificar_video").dec()
 
 
+@shared_task(bind=True, acks_late=True)
+def processar_derivados_midia(self, foto_id, forcar=False):
+    """Gera todos os derivados da foto/vídeo lendo cada fonte uma única vez.
+
+    DAG de derivados executado no pool com fair share por tenant; saídas chaveadas
+    pelo hash do conteúdo (reenvio do mesmo arquivo não reprocessa). Tenant acima de
+    ``PRONTUARIOS_MEDIA_SLOTS_POR_TENANT`` fotos simultâneas (todos os workers) é
+    reagendado.
+    """
+    from time import perf_counter  # noqa: PLC0415
+
+    start = perf_counter()
+    INFLIGHT.labels("processar_derivados_midia").inc()
+    tenant_id = FotoEvolucao.objects.filter(pk=foto_id).values_list("tenant_id", flat=True).first()
+    try:
+        with slot_tenant(tenant_id) as liberado:
+            if not liberado:
+                # Tenant no limite em todos os workers: volta à fila e cede a vez aos demais
+                raise self.retry(countdown=random.uniform(2, 6), max_retries=None)  # noqa: S311
+            resultado = processar_foto(foto_id, forcar=forcar)
+        for perfil in ("h264", "webm"):
+            if perfil in resultado["gerados"]:
+                VIDEO_TRANSCODE.labels(perfil).inc()
+        (TASK_SUCCESS if resultado["ok"] else TASK_FAILURE).labels("processar_derivados_midia").inc()
+        return resultado
+    except Retry:
+        raise
+    except FotoEvolucao.DoesNotExist:
+        return {"ok": False, "motivo": "foto_inexistente"}
+    except Exception as e:
+        logger.error(f"Erro processar derivados foto {foto_id}: {e}")
+        TASK_FAILURE.labels("processar_derivados_midia").inc()
+        return {"ok": False, "erro": str(e)}
+    finally:
+        EXECUTION_TIME.labels("processar_derivados_midia").observe(perf_counter() - start)
+        INFLIGHT.labels("processar_derivados_midia").dec()
+
+
 @shared_task(bind=True)
 def reprocessar_derivados_foto(self, foto_id, forcar=False):
     """Reprocessa derivados (thumbnail, webp, poster) sob demanda."""
@@ -321,13 +362,8 @@ def reprocessar_derivados_foto(self, foto_id, forcar=False):
     start = perf_counter()
     INFLIGHT.labels("reprocessar_derivados_foto").inc()
     try:
-        foto = FotoEvolucao.objects.get(id=foto_id)
-        if forcar or not foto.imagem_thumbnail:
-            gerar_thumbnail_foto.apply_async([foto_id])
-        if forcar or not foto.imagem_webp:
-            gerar_variacao_webp.apply_async([foto_id])
-        if foto.video and (forcar or not foto.video_poster):
-            extrair_video_poster.apply_async([foto_id])
+        FotoEvolucao.objects.only("id").get(id=foto_id)
+        processar_derivados_midia.apply_async([foto_id, forcar])
         TASK_SUCCESS.labels("reprocessar_derivados_foto").inc()
         return {"ok": True}
     except Exception as e:
@@ -407,9 +443,10 @@ def enviar_relatorio_mensal(tenant_id, email_destino=None):
         raise
 
 
+@shared_task
 def limpar_arquivos_temporarios():
     """
-    Remove arquivos temporários e backups antigos.
+    Remove backups antigos e varre a mídia órfã (ver ``prontuarios.media_sweeper``).
     """
     try:
         # Remover backups com mais de 90 dias
@@ -428,24 +465,11 @@ def limpar_arquivos_temporarios():
                         os.remove(filepath)
                         logger.info(f"Backup removido: {filename}")
 
-        # Remover fotos de evolução órfãs (sem registro no banco)
-        fotos_dir = os.path.join(settings.MEDIA_ROOT, "prontuarios", "evolucao")
-        if os.path.exists(fotos_dir):
-            for root, _dirs, files in os.walk(fotos_dir):
-                for file in files:
-                    filepath = os.path.join(root, file)
-                    # Verificar se existe registro no banco
-                    relativo = os.path.relpath(filepath, settings.MEDIA_ROOT)
-                    if not FotoEvolucao.objects.filter(imagem=relativo).exists():
-                        # Verificar se o arquivo tem mais de 7 dias
-                        data_modificacao = datetime.fromtimestamp(os.path.getmtime(filepath))
-                        data_modificacao = timezone.make_aware(data_modificacao)
-
-                        if data_modificacao < timezone.now() - timedelta(days=7):
-                            os.remove(filepath)
-                            logger.info(f"Foto órfã removida: {relativo}")
+        # Mídia órfã: índice das colunas de arquivo + quarentena (retoma do checkpoint)
+        relatorio = varrer_midia_orfa()
 
         logger.info("Limpeza de arquivos temporários concluída")
+        return relatorio
 
     except Exception as e:
         logger.error(f"Erro na limpeza de arquivos temporários: {str(e)}")
@@ -54,10 +54,7 @@ class RegraCobrancaForm(BasePandoraForm):
             "formula_personalizada": forms.Textarea(
                 attrs={
                     "rows": 2,
-                    "placeholder": _("Ex: (Q * {vb}) + ({ta} / 100 * Q * {vb})").format(
-                        vb=RegraCobranca._meta.get_field("valor_base").verbose_name,
-                        ta=RegraCobranca._meta.get_field("taxa_adicional").verbose_name,
-                    ),
+                    "placeholder": _("Ex: (Q * valor_base) + (Q // 10 * taxa_adicional)"),
                 }
             ),
         }
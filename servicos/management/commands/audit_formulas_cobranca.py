@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+
+from servicos.models import RegraCobranca
+from servicos.services import formulas
+
+
+class Command(BaseCommand):
+    help = (
+        "Lista regras de cobrança com fórmula recusada pela linguagem de fórmulas (aceitas pelo antigo eval) "
+        "e, com --corrigir, aplica as reescritas de resultado idêntico."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--corrigir", action="store_true", help="Grava as reescritas sugeridas (as demais seguem listadas)"
+        )
+
+    def handle(self, *args, **options):
+        corrigir = options["corrigir"]
+        regras = (
+            RegraCobranca.objects.filter(tipo_calculo="personalizado")
+            .exclude(formula_personalizada__isnull=True)
+            .exclude(formula_personalizada__exact="")
+            .order_by("pk")
+        )
+        recusadas = corrigidas = 0
+        self.stdout.write(self.style.MIGRATE_HEADING("== Fórmulas recusadas =="))
+        for regra in regras.iterator():
+            try:
+                formulas.compilar(regra.formula_personalizada)
+            except formulas.FormulaInvalida as exc:
+                motivo = "; ".join(exc.messages)
+            else:
+                continue
+            recusadas += 1
+            self.stdout.write(f"#{regra.pk} {regra.nome}: {regra.formula_personalizada}")
+            self.stdout.write(f"  motivo: {motivo}")
+            nova = formulas.reescrever_legado(regra.formula_personalizada)
+            if nova is None:
+                self.stdout.write(
+                    self.style.WARNING("  sem reescrita automática: revisar (até lá o valor é valor_base * Q)")
+                )
+                continue
+            self.stdout.write(f"  reescrita: {nova}")
+            if corrigir:
+                regra.formula_personalizada = nova
+                regra.save(update_fields=["formula_personalizada"])
+                corrigidas += 1
+        self.stdout.write(f"Recusadas: {recusadas}; corrigidas: {corrigidas}")
+        self.stdout.write(self.style.SUCCESS("Auditoria concluída."))
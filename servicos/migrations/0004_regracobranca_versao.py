@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("servicos", "0003_migrate_procedimentos_to_servicos"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="regracobranca",
+            name="versao",
+            field=models.PositiveIntegerField(default=1, editable=False, verbose_name="Versão"),
+        ),
+        migrations.AlterField(
+            model_name="regracobranca",
+            name="formula_personalizada",
+            field=models.TextField(
+                blank=True,
+                help_text="Usar 'Q' para quantidade. Variáveis: Q, valor_base, taxa_adicional, valor_minimo, incremento; funções: min, max, abs, round; condicional: A if Q > 10 else B. Ex: (Q * valor_base) + (Q // 10 * taxa_adicional)",
+                null=True,
+                verbose_name="Fórmula Personalizada",
+            ),
+        ),
+    ]
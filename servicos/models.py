@@ -4,6 +4,7 @@ import os
 import uuid
 from decimal import Decimal
 
+from django.core.exceptions import ValidationError
 from django.db import models
 from django.urls import reverse
 from django.utils import timezone
@@ -15,6 +16,7 @@ from core.models import Tenant
 
 # Importações necessárias e corretas
 from fornecedores.models import Fornecedor
+from servicos.services import formulas
 
 
 def servico_imagem_path(instance, filename):
@@ -91,9 +93,15 @@ class RegraCobranca(models.Model):
         blank=True,
         null=True,
         verbose_name=_("Fórmula Personalizada"),
-        help_text=_("Usar 'Q' para quantidade. Ex: (Q * valor_base) + (Q // 10 * taxa_adicional)"),
+        help_text=_(
+            "Usar 'Q' para quantidade. Variáveis: Q, valor_base, taxa_adicional, valor_minimo, incremento; "
+            "funções: min, max, abs, round; condicional: A if Q > 10 else B. "
+            "Ex: (Q * valor_base) + (Q // 10 * taxa_adicional)"
+        ),
     )
     ativo = models.BooleanField(default=True, verbose_name=_("Ativo"))
+    # Incrementada a cada gravação; chave do cache da fórmula compilada (servicos.services.formulas)
+    versao = models.PositiveIntegerField(default=1, editable=False, verbose_name=_("Versão"))
 
     class Meta:
         verbose_name = _("Regra de Cobrança")
@@ -103,38 +111,26 @@ class RegraCobranca(models.Model):
     def __str__(self):
         return f"{self.nome} ({self.get_tipo_calculo_display()})"
 
-    def calcular_valor(self, quantidade=1):
-        if not isinstance(quantidade, (int, float, Decimal)):
+    def clean(self):
+        super().clean()
+        if self.tipo_calculo == "personalizado" and self.formula_personalizada:
             try:
-                quantidade = Decimal(str(quantidade).replace(",", "."))
-            except (ValueError, TypeError):
-                quantidade = Decimal("1")
+                formulas.compilar(self.formula_personalizada)
+            except formulas.FormulaInvalida as exc:
+                raise ValidationError({"formula_personalizada": exc.messages}) from exc
 
-        quantidade = Decimal(quantidade)
-        valor_calculado = self.valor_base * quantidade
+    def save(self, *args, **kwargs):
+        if self.tipo_calculo == "personalizado" and self.formula_personalizada:
+            formulas.compilar(self.formula_personalizada)  # fórmula inválida não é gravada
+        if self.pk is not None:
+            self.versao = (self.versao or 0) + 1
+            update_fields = kwargs.get("update_fields")
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "versao"}
+        super().save(*args, **kwargs)
 
-        if self.tipo_calculo == "fixo":
-            valor_calculado = self.valor_base
-        elif self.tipo_calculo == "personalizado" and self.formula_personalizada:
-            try:
-                valor_calculado = eval(
-                    self.formula_personalizada,
-                    {
-                        "Q": quantidade,
-                        "valor_base": self.valor_base,
-                        "taxa_adicional": self.taxa_adicional or Decimal("0"),
-                    },
-                )
-            except Exception:
-                valor_calculado = self.valor_base * quantidade
-
-        if self.taxa_adicional and self.taxa_adicional > 0:
-            valor_calculado += valor_calculado * (self.taxa_adicional / Decimal("100"))
-
-        if self.valor_minimo and valor_calculado < self.valor_minimo:
-            valor_calculado = self.valor_minimo
-
-        return round(valor_calculado, 2)
+    def calcular_valor(self, quantidade=1):
+        return formulas.precificar(self, quantidade)
 
 
 class Servico(models.Model):
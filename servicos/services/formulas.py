@@ -0,0 +1,361 @@
+"""Linguagem de fórmulas de ``RegraCobranca`` (substitui o ``eval`` de texto livre).
+
+A fórmula é lida com ``ast.parse(mode="eval")`` e só é aceita se usar os nós da lista
+branca abaixo: aritmética (``+ - * / // % **``), sinais, comparações e ``and/or/not``
+apenas dentro de condicionais (``a if cond else b``), as variáveis de ``VARIAVEIS`` e
+as funções ``min``, ``max``, ``abs`` e ``round``. Literais numéricos viram ``Decimal``.
+
+A árvore validada é compilada uma única vez em uma composição de closures (nada é
+reavaliado como texto); ``compilar`` fica em cache LRU pelo texto e ``formula_da_regra``
+por ``(pk, versao, texto)`` da regra. ``precificar_lote`` calcula milhares de pares
+(regra, quantidade) com uma consulta para as regras e memoização dos pares repetidos,
+com o mesmo resultado ``Decimal`` de ``RegraCobranca.calcular_valor``.
+
+Fórmulas que o antigo ``eval`` aceitava e esta linguagem recusa (builtins como ``int()``
+ou ``pow()``, comparações usadas como número) continuam gravadas nas regras antigas e,
+até serem corrigidas, caem no cálculo ``valor_base * Q``. ``reescrever_legado`` converte
+as construções com equivalente exato; o comando ``audit_formulas_cobranca`` lista as
+regras afetadas e aplica essas reescritas.
+"""
+
+from __future__ import annotations
+
+import ast
+import operator
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache
+
+from django.core.exceptions import ValidationError
+
+__all__ = [
+    "FUNCOES",
+    "VARIAVEIS",
+    "Formula",
+    "FormulaInvalida",
+    "compilar",
+    "formula_da_regra",
+    "normalizar_quantidade",
+    "precificar",
+    "precificar_lote",
+    "reescrever_legado",
+]
+
+VARIAVEIS = ("Q", "valor_base", "taxa_adicional", "valor_minimo", "incremento")
+FUNCOES: dict[str, tuple[Callable, int, int]] = {  # nome -> (função, mín. args, máx. args)
+    "min": (min, 2, 8),
+    "max": (max, 2, 8),
+    "abs": (abs, 1, 1),
+    "round": (round, 1, 2),
+}
+MAX_CARACTERES = 500
+MAX_NOS = 200
+MAX_EXPOENTE = 10
+
+_BINARIOS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: operator.pow,
+}
+_COMPARACOES = {
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+}
+
+Ambiente = dict[str, Decimal]
+_Fn = Callable[[Ambiente], object]
+
+
+class FormulaInvalida(ValidationError):
+    """Fórmula fora da linguagem permitida."""
+
+
+@dataclass(frozen=True)
+class Formula:
+    texto: str
+    avaliar: Callable[[Ambiente], Decimal]
+    variaveis: frozenset[str]
+
+
+def _erro(msg: str) -> FormulaInvalida:
+    return FormulaInvalida(msg, code="formula_invalida")
+
+
+def _numero(no: ast.expr) -> tuple[_Fn, str]:
+    fn, tipo = _compilar_no(no)
+    if tipo != "num":
+        raise _erro("Comparações só podem ser usadas como condição (ex.: A if Q > 10 else B).")
+    return fn, tipo
+
+
+def _condicao(no: ast.expr) -> _Fn:
+    fn, tipo = _compilar_no(no)
+    if tipo != "bool":
+        raise _erro("A condição deve ser uma comparação (ex.: Q > 10).")
+    return fn
+
+
+def _compilar_no(no: ast.expr) -> tuple[_Fn, str]:  # noqa: C901, PLR0911, PLR0912, PLR0915
+    """Devolve (closure, tipo) com tipo em {"num", "bool"}."""
+    if isinstance(no, ast.Constant):
+        if isinstance(no.value, bool) or not isinstance(no.value, int | float):
+            raise _erro(f"Literal não permitido: {no.value!r}.")
+        valor = Decimal(str(no.value))
+        return (lambda _amb: valor), "num"
+    if isinstance(no, ast.Name):
+        if no.id not in VARIAVEIS:
+            raise _erro(f"Variável desconhecida: {no.id}. Use {', '.join(VARIAVEIS)}.")
+        nome = no.id
+        return (lambda amb: amb[nome]), "num"
+    if isinstance(no, ast.BinOp):
+        op = _BINARIOS.get(type(no.op))
+        if op is None:
+            raise _erro("Operador não permitido.")
+        if isinstance(no.op, ast.Pow):
+            expoente = no.right
+            if isinstance(expoente, ast.UnaryOp) and isinstance(expoente.op, ast.USub | ast.UAdd):
+                expoente = expoente.operand
+            if not (isinstance(expoente, ast.Constant) and isinstance(expoente.value, int | float)):
+                raise _erro("O expoente de ** deve ser um número literal.")
+            if abs(expoente.value) > MAX_EXPOENTE:
+                raise _erro(f"Expoente maior que {MAX_EXPOENTE}.")
+        esq, _ = _numero(no.left)
+        dir_, _ = _numero(no.right)
+        return (lambda amb: op(esq(amb), dir_(amb))), "num"
+    if isinstance(no, ast.UnaryOp):
+        if isinstance(no.op, ast.Not):
+            cond = _condicao(no.operand)
+            return (lambda amb: not cond(amb)), "bool"
+        if not isinstance(no.op, ast.USub | ast.UAdd):
+            raise _erro("Operador não permitido.")
+        operando, _ = _numero(no.operand)
+        if isinstance(no.op, ast.USub):
+            return (lambda amb: -operando(amb)), "num"
+        return (lambda amb: +operando(amb)), "num"
+    if isinstance(no, ast.Compare):
+        termos = [_numero(t)[0] for t in (no.left, *no.comparators)]
+        ops = []
+        for op_no in no.ops:
+            op = _COMPARACOES.get(type(op_no))
+            if op is None:
+                raise _erro("Comparação não permitida.")
+            ops.append(op)
+
+        def comparar(amb):
+            valores = [t(amb) for t in termos]
+            return all(op(a, b) for op, a, b in zip(ops, valores, valores[1:], strict=False))
+
+        return comparar, "bool"
+    if isinstance(no, ast.BoolOp):
+        conds = [_condicao(v) for v in no.values]
+        if isinstance(no.op, ast.And):
+            return (lambda amb: all(c(amb) for c in conds)), "bool"
+        return (lambda amb: any(c(amb) for c in conds)), "bool"
+    if isinstance(no, ast.IfExp):
+        cond = _condicao(no.test)
+        sim, _ = _numero(no.body)
+        nao, _ = _numero(no.orelse)
+        return (lambda amb: sim(amb) if cond(amb) else nao(amb)), "num"
+    if isinstance(no, ast.Call):
+        if not isinstance(no.func, ast.Name) or no.func.id not in FUNCOES or no.keywords:
+            raise _erro(f"Funções permitidas: {', '.join(FUNCOES)}.")
+        fn, minimo, maximo = FUNCOES[no.func.id]
+        if not minimo <= len(no.args) <= maximo:
+            raise _erro(f"{no.func.id}() recebe de {minimo} a {maximo} argumentos.")
+        args = [_numero(a)[0] for a in no.args]
+        if fn is round and len(args) == 2:  # noqa: PLR2004
+            casas = no.args[1]
+            if not (isinstance(casas, ast.Constant) and isinstance(casas.value, int)):
+                raise _erro("round(x, n): n deve ser um inteiro literal.")
+            n = int(casas.value)
+            valor = args[0]
+            return (lambda amb: round(valor(amb), n)), "num"
+        return (lambda amb: fn(*(a(amb) for a in args))), "num"
+    raise _erro(f"Construção não permitida na fórmula: {type(no).__name__}.")
+
+
+@lru_cache(maxsize=1024)
+def compilar(texto: str) -> Formula:
+    """Valida e compila a fórmula (cache pelo texto). Levanta ``FormulaInvalida``."""
+    texto = (texto or "").strip()
+    if not texto:
+        raise _erro("Fórmula vazia.")
+    if len(texto) > MAX_CARACTERES:
+        raise _erro(f"Fórmula com mais de {MAX_CARACTERES} caracteres.")
+    try:
+        arvore = ast.parse(texto, mode="eval")
+    except SyntaxError as exc:
+        raise _erro(f"Sintaxe inválida: {exc.msg}.") from exc
+    nos = list(ast.walk(arvore))
+    if len(nos) > MAX_NOS:
+        raise _erro("Fórmula complexa demais.")
+    fn, _tipo = _numero(arvore.body)
+    usadas = frozenset(n.id for n in nos if isinstance(n, ast.Name) and n.id in VARIAVEIS)
+    return Formula(texto=texto, avaliar=fn, variaveis=usadas)
+
+
+def _booleano(no: ast.expr) -> bool:
+    if isinstance(no, ast.Compare) or (isinstance(no, ast.UnaryOp) and isinstance(no.op, ast.Not)):
+        return True
+    if isinstance(no, ast.BoolOp):
+        return all(_booleano(v) for v in no.values)
+    return isinstance(no, ast.Constant) and isinstance(no.value, bool)
+
+
+class _ReescritaLegado(ast.NodeTransformer):
+    """``pow(a, b)`` -> ``a ** b``; booleano em posição numérica -> ``(1 if cond else 0)``."""
+
+    def numero(self, no: ast.expr) -> ast.expr:
+        no = self.visit(no)
+        if not _booleano(no):
+            return no
+        if isinstance(no, ast.Constant):
+            return ast.Constant(int(no.value))
+        return ast.IfExp(test=no, body=ast.Constant(1), orelse=ast.Constant(0))
+
+    def visit_BinOp(self, no: ast.BinOp) -> ast.expr:
+        no.left, no.right = self.numero(no.left), self.numero(no.right)
+        return no
+
+    def visit_UnaryOp(self, no: ast.UnaryOp) -> ast.expr:
+        no.operand = self.visit(no.operand) if isinstance(no.op, ast.Not) else self.numero(no.operand)
+        return no
+
+    def visit_Compare(self, no: ast.Compare) -> ast.expr:
+        no.left = self.numero(no.left)
+        no.comparators = [self.numero(c) for c in no.comparators]
+        return no
+
+    def visit_IfExp(self, no: ast.IfExp) -> ast.expr:
+        no.test = self.visit(no.test)
+        no.body, no.orelse = self.numero(no.body), self.numero(no.orelse)
+        return no
+
+    def visit_Call(self, no: ast.Call) -> ast.expr:
+        no.args = [self.numero(a) for a in no.args]
+        if isinstance(no.func, ast.Name) and no.func.id == "pow" and len(no.args) == 2 and not no.keywords:  # noqa: PLR2004
+            return ast.BinOp(left=no.args[0], op=ast.Pow(), right=no.args[1])
+        return no
+
+
+def reescrever_legado(texto: str) -> str | None:
+    """Reescreve uma fórmula recusada em uma equivalente aceita, quando há equivalente exato.
+
+    Cobre ``pow(a, b)`` (vira ``a ** b``) e comparações usadas como número, que o
+    ``eval`` tratava como 1/0 (``(Q > 10) * 5`` vira ``(1 if Q > 10 else 0) * 5``).
+    Devolve ``None`` se a fórmula já é válida ou se a reescrita ainda for recusada
+    (ex.: ``int()``, cujo truncamento não tem equivalente exato).
+    """
+    try:
+        compilar(texto)
+    except FormulaInvalida:
+        pass
+    else:
+        return None
+    try:
+        arvore = ast.parse((texto or "").strip(), mode="eval")
+    except SyntaxError:
+        return None
+    arvore.body = _ReescritaLegado().numero(arvore.body)
+    nova = ast.unparse(ast.fix_missing_locations(arvore))
+    try:
+        compilar(nova)
+    except FormulaInvalida:
+        return None
+    return nova
+
+
+@lru_cache(maxsize=2048)
+def _formula_versionada(_pk: int, _versao: int, texto: str) -> Formula | None:
+    try:
+        return compilar(texto)
+    except FormulaInvalida:
+        return None
+
+
+def formula_da_regra(regra) -> Formula | None:
+    """Fórmula compilada da regra, em cache por ``(pk, versao, texto)``; None se inválida."""
+    texto = regra.formula_personalizada or ""
+    if regra.pk is None:
+        try:
+            return compilar(texto)
+        except FormulaInvalida:
+            return None
+    return _formula_versionada(regra.pk, regra.versao, texto)
+
+
+def normalizar_quantidade(quantidade) -> Decimal:
+    if not isinstance(quantidade, int | float | Decimal):
+        try:
+            quantidade = Decimal(str(quantidade).replace(",", "."))
+        except (ValueError, TypeError, InvalidOperation):
+            quantidade = Decimal("1")
+    return Decimal(quantidade)
+
+
+def precificar(regra, quantidade=1) -> Decimal:
+    """Valor da regra para ``quantidade`` (semântica de ``RegraCobranca.calcular_valor``)."""
+    quantidade = normalizar_quantidade(quantidade)
+    valor_base = regra.valor_base
+    taxa = regra.taxa_adicional
+    valor = valor_base * quantidade
+
+    if regra.tipo_calculo == "fixo":
+        valor = valor_base
+    elif regra.tipo_calculo == "personalizado" and regra.formula_personalizada:
+        formula = formula_da_regra(regra)
+        if formula is not None:
+            try:
+                valor = formula.avaliar(
+                    {
+                        "Q": quantidade,
+                        "valor_base": valor_base,
+                        "taxa_adicional": taxa or Decimal("0"),
+                        "valor_minimo": regra.valor_minimo or Decimal("0"),
+                        "incremento": regra.incremento,
+                    }
+                )
+            except (ArithmeticError, TypeError, ValueError):
+                valor = valor_base * quantidade
+
+    if taxa and taxa > 0:
+        valor += valor * (taxa / Decimal("100"))
+
+    if regra.valor_minimo and valor < regra.valor_minimo:
+        valor = regra.valor_minimo
+
+    return round(valor, 2)
+
+
+def precificar_lote(pares: Iterable[tuple[object, object]]) -> list[Decimal]:
+    """Preço de cada par ``(regra ou pk, quantidade)``, na ordem recebida.
+
+    Regras passadas por pk são carregadas em uma única consulta; pares repetidos
+    (mesma regra e quantidade) são calculados uma vez.
+    """
+    from servicos.models import RegraCobranca  # noqa: PLC0415 - models importa este módulo
+
+    pares = [(r, normalizar_quantidade(q)) for r, q in pares]
+    pks = {r for r, _q in pares if not isinstance(r, RegraCobranca)}
+    carregadas = RegraCobranca.objects.in_bulk(pks) if pks else {}
+    faltando = pks - carregadas.keys()
+    if faltando:
+        raise RegraCobranca.DoesNotExist(f"Regras de cobrança inexistentes: {sorted(faltando)}")
+    memo: dict[tuple[int, Decimal], Decimal] = {}
+    resultado = []
+    for referencia, quantidade in pares:
+        regra = referencia if isinstance(referencia, RegraCobranca) else carregadas[referencia]
+        chave = (id(regra), quantidade)
+        if chave not in memo:
+            memo[chave] = precificar(regra, quantidade)
+        resultado.append(memo[chave])
+    return resultado
@@ -5,6 +5,7 @@ from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 
 # servicos/views.py (VERSÃO COMPLETA E CORRIGIDA)
+from django.core.exceptions import ValidationError
 from django.db import transaction
 from django.db.models import Avg, Q
 from django.http import FileResponse, Http404, JsonResponse
@@ -698,6 +699,10 @@ def regra_cobranca_quick_create(request):
     regra = RegraCobranca(**kwargs)
     if tenant and any(f.name == "tenant" for f in RegraCobranca._meta.get_fields()):
         regra.tenant = tenant
+    try:
+        regra.clean()
+    except ValidationError as exc:
+        return JsonResponse({"success": False, "error": " ".join(exc.messages)}, status=400)
     regra.save()
     return JsonResponse({"success": True, "id": regra.pk, "nome": regra.nome})
 
@@ -1,11 +1,13 @@
 """Utils de cache resilientes.
 
-Inclui get_int e incr_atomic com fallback a lock in-memory simples.
+Inclui get_int e incr_atomic (incremento atômico entre workers quando o backend
+suporta ``add``/``incr``, com fallback a lock in-memory simples).
 """
 
 from __future__ import annotations
 
 import threading
+from typing import Any
 
 from django.core.cache import cache
 
@@ -21,11 +23,38 @@ def get_int(key: str, default: int = 0) -> int:
 
 
 def incr_atomic(key: str, delta: int = 1, ttl: int | None = None) -> int:
-    """Incrementa contador inteiro de forma resiliente.
-    Se backend tiver add/incr atômico aproveita, senão lock local.
+    """Incrementa contador inteiro de forma atômica e resiliente.
+
+    Usa ``cache.add`` (cria a chave com TTL apenas se ausente) seguido de
+    ``cache.incr`` — atômico entre processos em Redis/Memcached e protegido pelo
+    lock interno no LocMem. O TTL conta a partir da criação do contador (janela
+    fixa). Backends sem ``incr`` (ou chave expirada entre as duas chamadas) caem
+    no get/set sob lock local, atômico apenas dentro do processo.
     """
-    # Django cache não padroniza incr para todos backends; fallback manual.
+    try:
+        cache.add(key, 0, ttl)
+        return int(cache.incr(key, delta))
+    except ValueError:
+        pass  # chave sumiu entre add/incr ou backend sem incr (DummyCache)
     with _local_lock:
         current = get_int(key, 0) + delta
         cache.set(key, current, ttl)
         return current
+
+
+def get_redis_client() -> Any | None:
+    """Cliente Redis cru do backend de cache (django-redis) ou ``None``.
+
+    Permite usar estruturas nativas (HINCRBY, SADD, pipelines) quando o cache
+    é Redis, mantendo fallback para a API genérica do Django em LocMem/testes.
+    """
+    try:
+        client = getattr(cache, "client", None)  # django-redis
+        if client is not None and hasattr(client, "get_client"):
+            return client.get_client(write=True)
+        native = getattr(cache, "_cache", None)  # django.core.cache.backends.redis
+        if native is not None and hasattr(native, "get_client"):
+            return native.get_client(None, write=True)
+    except Exception:  # pragma: no cover - backend indisponível
+        return None
+    return None
@@ -0,0 +1,175 @@
+"""Sketch de latência mesclável (estilo DDSketch) com buckets logarítmicos esparsos.
+
+Cada valor positivo cai no bucket ``ceil(log_gamma(v))``; o erro relativo dos
+quantis fica limitado a ``relative_accuracy``. Como o estado é apenas um mapa
+``bucket -> contagem``, sketches de processos diferentes são combinados somando
+as contagens (útil para consolidar workers via Redis/cache) e os quantis são
+calculados em O(buckets), sem ordenar amostras.
+"""
+
+from __future__ import annotations
+
+import math
+from collections.abc import Iterable, Mapping
+
+DEFAULT_RELATIVE_ACCURACY = 0.02
+# Valores abaixo disso (ex.: 0 ou ruído de relógio) são agrupados no bucket "zero".
+MIN_TRACKED_VALUE = 1e-6
+ZERO_BUCKET = -(10**9)
+
+
+class LatencySketch:
+    """Histograma logarítmico mesclável para quantis aproximados."""
+
+    __slots__ = ("_log_gamma", "count", "counts", "gamma", "max", "relative_accuracy", "sum")
+
+    def __init__(self, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY) -> None:
+        """Cria sketch vazio com a precisão relativa informada (0 < acc < 1)."""
+        if not 0 < relative_accuracy < 1:
+            msg = "relative_accuracy deve estar entre 0 e 1"
+            raise ValueError(msg)
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.counts: dict[int, int] = {}
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    # --- Registro ------------------------------------------------------------
+    def bucket_for(self, value: float) -> int:
+        """Índice do bucket que contém ``value``."""
+        if value < MIN_TRACKED_VALUE:
+            return ZERO_BUCKET
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def bucket_value(self, index: int) -> float:
+        """Valor representativo do bucket (ponto médio relativo)."""
+        if index == ZERO_BUCKET:
+            return 0.0
+        return 2 * self.gamma**index / (self.gamma + 1)
+
+    def add(self, value: float, weight: int = 1) -> None:
+        """Registra ``value`` (valores negativos são ignorados)."""
+        if value < 0 or weight <= 0:
+            return
+        idx = self.bucket_for(value)
+        self.counts[idx] = self.counts.get(idx, 0) + weight
+        self.count += weight
+        self.sum += value * weight
+        self.max = max(self.max, value)
+
+    def extend(self, values: Iterable[float]) -> None:
+        """Registra vários valores."""
+        for v in values:
+            self.add(v)
+
+    # --- Mescla / serialização ------------------------------------------------
+    def merge(self, other: LatencySketch) -> None:
+        """Soma outro sketch (mesma precisão) a este."""
+        if other.gamma != self.gamma:
+            msg = "Sketches com precisões diferentes não podem ser mesclados"
+            raise ValueError(msg)
+        self.merge_counts(other.counts, count=other.count, total=other.sum, maximum=other.max)
+
+    def merge_counts(
+        self,
+        counts: Mapping[int | str | bytes, int | str | bytes],
+        *,
+        count: int | None = None,
+        total: float = 0.0,
+        maximum: float = 0.0,
+    ) -> None:
+        """Mescla contagens cruas (ex.: lidas de um hash Redis com chaves/valores em bytes)."""
+        added = 0
+        for raw_idx, raw_n in counts.items():
+            idx, n = int(raw_idx), int(raw_n)
+            if n <= 0:
+                continue
+            self.counts[idx] = self.counts.get(idx, 0) + n
+            added += n
+        self.count += added if count is None else count
+        self.sum += total
+        self.max = max(self.max, maximum)
+
+    def to_dict(self) -> dict[str, object]:
+        """Representação serializável (JSON) do sketch."""
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "counts": {str(k): v for k, v in self.counts.items()},
+            "count": self.count,
+            "sum": self.sum,
+            "max": self.max,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, object]) -> LatencySketch:
+        """Reconstrói sketch a partir de :meth:`to_dict`."""
+        sketch = cls(float(data.get("relative_accuracy", DEFAULT_RELATIVE_ACCURACY)))  # type: ignore[arg-type]
+        sketch.merge_counts(
+            data.get("counts") or {},  # type: ignore[arg-type]
+            count=int(data.get("count", 0)),  # type: ignore[call-overload]
+            total=float(data.get("sum", 0.0)),  # type: ignore[arg-type]
+            maximum=float(data.get("max", 0.0)),  # type: ignore[arg-type]
+        )
+        return sketch
+
+    def copy(self) -> LatencySketch:
+        """Cópia independente (snapshot fora do lock)."""
+        clone = LatencySketch(self.relative_accuracy)
+        clone.merge(self)
+        return clone
+
+    def clear(self) -> None:
+        """Zera o sketch."""
+        self.counts.clear()
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    # --- Consulta ----------------------------------------------------------------
+    def __len__(self) -> int:
+        """Número de valores registrados."""
+        return self.count
+
+    def quantile(self, q: float) -> float | None:
+        """Quantil aproximado ``q`` (0..1) ou ``None`` se vazio."""
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        for idx in sorted(self.counts):
+            seen += self.counts[idx]
+            if seen > rank:
+                return min(self.bucket_value(idx), self.max)
+        return self.max
+
+    def quantiles(self, qs: Iterable[float]) -> dict[float, float | None]:
+        """Vários quantis com uma única varredura ordenada dos buckets."""
+        wanted = sorted(set(qs))
+        out: dict[float, float | None] = dict.fromkeys(wanted)
+        if self.count == 0:
+            return out
+        ordered = sorted(self.counts.items())
+        pos, seen = 0, 0
+        for q in wanted:
+            rank = q * (self.count - 1)
+            while pos < len(ordered) and seen + ordered[pos][1] <= rank:
+                seen += ordered[pos][1]
+                pos += 1
+            out[q] = self.max if pos >= len(ordered) else min(self.bucket_value(ordered[pos][0]), self.max)
+        return out
+
+    def summary(self) -> dict[str, float]:
+        """Resumo no formato usado pelos snapshots (count/p50/p90/p95/p99/max)."""
+        if self.count == 0:
+            return {}
+        qs = self.quantiles((0.5, 0.9, 0.95, 0.99))
+        return {
+            "count": self.count,
+            "p50": qs[0.5] or 0.0,
+            "p90": qs[0.9] or 0.0,
+            "p95": qs[0.95] or 0.0,
+            "p99": qs[0.99] or 0.0,
+            "max": self.max,
+        }
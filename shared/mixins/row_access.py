@@ -0,0 +1,36 @@
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.permissions import SAFE_METHODS
+
+from core.services.row_access import scope_queryset
+from core.utils import get_current_tenant
+
+
+class TenantScopedViewSetMixin:
+    """Escopo por linha/tenant para ViewSets DRF (``core.services.row_access``).
+
+    ``get_queryset`` aplica o predicado compilado para a ação corrente, então listagem,
+    ``get_object`` (retrieve/update/destroy e ações de detalhe), exportações e agregações
+    que partem de ``self.get_queryset()`` nunca enxergam linhas de outro tenant.
+    Métodos seguros usam a ação ``view``; os demais ``change`` (``destroy`` -> ``delete``).
+    """
+
+    row_access_actions: dict[str, str] = {"destroy": "delete"}
+
+    def get_tenant(self):
+        if not hasattr(self, "_row_access_tenant"):
+            self._row_access_tenant = get_current_tenant(self.request)
+        return self._row_access_tenant
+
+    def get_row_action(self) -> str:
+        if self.action in self.row_access_actions:
+            return self.row_access_actions[self.action]
+        return "view" if self.request.method in SAFE_METHODS else "change"
+
+    def get_queryset(self):
+        return scope_queryset(super().get_queryset(), self.request.user, self.get_tenant(), self.get_row_action())
+
+    def perform_create(self, serializer):
+        tenant = self.get_tenant()
+        if tenant is None:
+            raise PermissionDenied("Selecione uma empresa (tenant) antes de criar registros.")
+        serializer.save(tenant=tenant)
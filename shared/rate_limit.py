@@ -0,0 +1,482 @@
+"""Rate limiting e contadores compartilhados entre workers.
+
+Três modos, todos com decisão atômica no backend (nenhum get/set separado):
+
+- ``fixed``: janela fixa iniciada no primeiro hit (``INCRBY`` + ``PEXPIRE``).
+- ``sliding``: janela deslizante aproximada por dois contadores alinhados
+  (``anterior * peso + atual``), com memória O(1) por identidade.
+- ``token_bucket``: balde de ``limit`` fichas reabastecido a ``limit / window``
+  fichas por segundo; permite rajadas curtas mantendo a taxa média.
+
+Backends:
+
+- ``RedisBackend``: scripts Lua executados no Redis — atômicos entre todos os
+  workers/hosts. Usado automaticamente quando o cache é Redis
+  (``shared.cache_utils.get_redis_client``). As chaves cruas são montadas com
+  ``cache.make_key`` (``KEY_PREFIX`` e versão do cache), as mesmas da API do
+  cache: ``cache.delete("2fa:rl:<user>:<ip>")`` zera o limite nos dois backends.
+- ``CacheBackend``: API do cache do Django. ``fixed``/``sliding`` usam
+  ``add``/``incr`` (atômicos em Redis/Memcached/LocMem; o hit que estoura o
+  limite é desfeito com ``decr``). ``token_bucket`` precisa de leitura e escrita
+  conjuntas e, sem Redis, só é atômico dentro do processo (lock local).
+
+Falhas do backend são registradas e liberam a requisição (fail-open), como nos
+limites de 2FA. Para views há o decorator ``rate_limit``; para prefixos de URL, o
+``core.middleware_rate_limit.RateLimitMiddleware``.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import logging
+import math
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from functools import wraps
+from typing import Any, Protocol
+
+from django.core.cache import cache
+from django.http import HttpRequest, HttpResponse, JsonResponse
+
+from shared.cache_utils import get_int, get_redis_client
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    "FIXED",
+    "MODES",
+    "RATE_LIMIT_MESSAGE",
+    "SLIDING",
+    "TOKEN_BUCKET",
+    "CacheBackend",
+    "RateLimitResult",
+    "RateLimiter",
+    "RedisBackend",
+    "hit",
+    "rate_limit",
+    "request_identity",
+    "too_many_requests",
+]
+
+FIXED = "fixed"
+SLIDING = "sliding"
+TOKEN_BUCKET = "token_bucket"
+MODES = (FIXED, SLIDING, TOKEN_BUCKET)
+
+RATE_LIMIT_MESSAGE = "Muitas requisições. Tente novamente em alguns segundos."
+
+# KEYS[1] = janela atual, KEYS[2] = janela anterior (opcional, modo sliding)
+# ARGV = limit, cost, peso da janela anterior, ttl (ms)
+_WINDOW_LUA = """
+local limit = tonumber(ARGV[1])
+local cost = tonumber(ARGV[2])
+local weight = tonumber(ARGV[3])
+local prev = 0
+if #KEYS > 1 then
+  prev = tonumber(redis.call('GET', KEYS[2]) or '0')
+end
+local curr = tonumber(redis.call('GET', KEYS[1]) or '0')
+if math.floor(prev * weight) + curr + cost > limit then
+  return {0, curr, prev, redis.call('PTTL', KEYS[1])}
+end
+curr = redis.call('INCRBY', KEYS[1], cost)
+if redis.call('PTTL', KEYS[1]) < 0 then
+  redis.call('PEXPIRE', KEYS[1], ARGV[4])
+end
+return {1, curr, prev, redis.call('PTTL', KEYS[1])}
+"""
+
+# KEYS[1] = hash do balde (tokens, ts)
+# ARGV = capacidade, fichas por ms, agora (ms), cost, ttl (ms)
+_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1])
+local ts = tonumber(state[2])
+if tokens == nil or ts == nil then
+  tokens = capacity
+  ts = now
+end
+if now > ts then
+  tokens = math.min(capacity, tokens + (now - ts) * rate)
+  ts = now
+end
+local allowed = 0
+if tokens >= cost then
+  tokens = tokens - cost
+  allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(ts))
+redis.call('PEXPIRE', KEYS[1], ARGV[5])
+return {allowed, tostring(tokens)}
+"""
+
+
+@dataclass(frozen=True)
+class RateLimitResult:
+    """Decisão de um hit: ``retry_after`` em segundos (0 quando liberado)."""
+
+    allowed: bool
+    limit: int
+    remaining: int
+    retry_after: float = 0.0
+
+    def headers(self) -> dict[str, str]:
+        """Cabeçalhos HTTP padrão (``X-RateLimit-*`` e ``Retry-After``)."""
+        out = {"X-RateLimit-Limit": str(self.limit), "X-RateLimit-Remaining": str(self.remaining)}
+        if not self.allowed:
+            out["Retry-After"] = str(max(1, math.ceil(self.retry_after)))
+        return out
+
+
+class Backend(Protocol):
+    """Operações atômicas usadas pelo ``RateLimiter``."""
+
+    def window_hit(  # noqa: PLR0913, PLR0917
+        self,
+        key: str,
+        prev_key: str | None,
+        limit: int,
+        weight: float,
+        cost: int,
+        ttl: float,
+    ) -> tuple[bool, int, int, float | None]:
+        """Consome ``cost`` se ``floor(prev*weight) + atual + cost <= limit``.
+
+        Retorna (liberado, atual, anterior, ttl restante em s ou ``None``).
+        """
+        ...
+
+    def bucket_take(  # noqa: PLR0913, PLR0917
+        self,
+        key: str,
+        capacity: int,
+        rate: float,
+        now: float,
+        cost: int,
+        ttl: float,
+    ) -> tuple[bool, float]:
+        """Retira ``cost`` fichas se houver; retorna (liberado, fichas restantes)."""
+        ...
+
+    def delete(self, *keys: str) -> None:
+        """Remove o estado das chaves informadas."""
+        ...
+
+
+class RedisBackend:
+    """Backend Redis: cada decisão é um único script Lua (atômico no servidor)."""
+
+    def __init__(self, client: Any, make_key: Callable[[str], str] | None = None) -> None:  # noqa: ANN401
+        """Usa o cliente ``redis.Redis`` informado; chaves via ``make_key`` (padrão ``cache.make_key``)."""
+        self.client = client
+        self.make_key = make_key or cache.make_key
+        self._window = client.register_script(_WINDOW_LUA)
+        self._bucket = client.register_script(_BUCKET_LUA)
+
+    def _k(self, key: str) -> str:
+        return self.make_key(key)
+
+    def window_hit(  # noqa: PLR0913, PLR0917
+        self,
+        key: str,
+        prev_key: str | None,
+        limit: int,
+        weight: float,
+        cost: int,
+        ttl: float,
+    ) -> tuple[bool, int, int, float | None]:
+        """Ver ``Backend.window_hit``."""
+        keys = [self._k(key)] if prev_key is None else [self._k(key), self._k(prev_key)]
+        allowed, curr, prev, pttl = self._window(keys=keys, args=[limit, cost, repr(weight), max(1, int(ttl * 1000))])
+        return bool(allowed), int(curr), int(prev), (int(pttl) / 1000 if int(pttl) > 0 else None)
+
+    def bucket_take(  # noqa: PLR0913, PLR0917
+        self,
+        key: str,
+        capacity: int,
+        rate: float,
+        now: float,
+        cost: int,
+        ttl: float,
+    ) -> tuple[bool, float]:
+        """Ver ``Backend.bucket_take``."""
+        allowed, tokens = self._bucket(
+            keys=[self._k(key)],
+            args=[capacity, repr(rate / 1000), repr(now * 1000), cost, max(1, int(ttl * 1000))],
+        )
+        return bool(allowed), float(tokens)
+
+    def delete(self, *keys: str) -> None:
+        """Ver ``Backend.delete``."""
+        if keys:
+            self.client.delete(*(self._k(k) for k in keys))
+
+
+class CacheBackend:
+    """Backend sobre o cache do Django (ver docstring do módulo para garantias)."""
+
+    _bucket_lock = threading.Lock()
+
+    def window_hit(  # noqa: PLR0913, PLR0917
+        self,
+        key: str,
+        prev_key: str | None,
+        limit: int,
+        weight: float,
+        cost: int,
+        ttl: float,
+    ) -> tuple[bool, int, int, float | None]:
+        """Ver ``Backend.window_hit``.
+
+        Incrementa antes de decidir: cada hit concorrente recebe um valor
+        distinto do ``incr``, logo no máximo ``limit - floor(anterior*peso)``
+        hits são liberados por janela mesmo com vários workers.
+        """
+        prev = get_int(prev_key, 0) if prev_key else 0
+        used_prev = math.floor(prev * weight)
+        timeout = max(1, math.ceil(ttl))
+        if used_prev + cost > limit:
+            return False, get_int(key, 0), prev, self._ttl(key)
+        cache.add(key, 0, timeout)
+        try:
+            curr = int(cache.incr(key, cost))
+        except ValueError:  # expirou entre add/incr
+            cache.add(key, 0, timeout)
+            curr = int(cache.incr(key, cost))
+        if used_prev + curr > limit:
+            with contextlib.suppress(ValueError):  # expirou: nada a desfazer
+                cache.decr(key, cost)
+            return False, curr - cost, prev, self._ttl(key)
+        return True, curr, prev, self._ttl(key)
+
+    @staticmethod
+    def _ttl(key: str) -> float | None:
+        ttl_fn = getattr(cache, "ttl", None)  # django-redis
+        if ttl_fn is None:
+            return None
+        try:
+            value = ttl_fn(key)
+        except Exception:  # noqa: BLE001 - TTL é apenas informativo
+            return None
+        return float(value) if value and value > 0 else None
+
+    def bucket_take(  # noqa: PLR0913, PLR0917
+        self,
+        key: str,
+        capacity: int,
+        rate: float,
+        now: float,
+        cost: int,
+        ttl: float,
+    ) -> tuple[bool, float]:
+        """Ver ``Backend.bucket_take`` (atômico apenas dentro do processo)."""
+        with self._bucket_lock:
+            state = cache.get(key)
+            tokens, ts = (float(capacity), now) if not state else (float(state[0]), float(state[1]))
+            if now > ts:
+                tokens = min(float(capacity), tokens + (now - ts) * rate)
+                ts = now
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            cache.set(key, (tokens, ts), max(1, math.ceil(ttl)))
+        return allowed, tokens
+
+    def delete(self, *keys: str) -> None:
+        """Ver ``Backend.delete``."""
+        if keys:
+            cache.delete_many(list(keys))
+
+
+def default_backend() -> Backend:
+    """Redis quando o cache é Redis; senão o cache do Django."""
+    client = get_redis_client()
+    if client is not None:
+        return RedisBackend(client)
+    return CacheBackend()
+
+
+class RateLimiter:
+    """Limite de ``limit`` hits por ``window`` segundos para cada identidade.
+
+    ``scope`` separa limites distintos (ex.: ``"2fa:rl"``); a chave final é
+    ``"<scope>:<identidade>"``. Sem ``backend`` explícito, o backend é resolvido
+    a cada hit (``default_backend``).
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        limit: int,
+        window: float,
+        *,
+        mode: str = SLIDING,
+        scope: str = "default",
+        backend: Backend | None = None,
+        clock: Callable[[], float] = time.time,
+        fail_open: bool = True,
+    ) -> None:
+        """Valida parâmetros; ``clock`` é injetável para testes."""
+        if mode not in MODES:
+            msg = f"Modo de rate limit inválido: {mode!r} (use {', '.join(MODES)})"
+            raise ValueError(msg)
+        if limit < 1 or window <= 0:
+            msg = "limit deve ser >= 1 e window > 0"
+            raise ValueError(msg)
+        self.limit = int(limit)
+        self.window = float(window)
+        self.mode = mode
+        self.scope = scope
+        self.backend = backend
+        self.clock = clock
+        self.fail_open = fail_open
+
+    def key(self, identity: str) -> str:
+        """Chave base da identidade neste escopo."""
+        return f"{self.scope}:{identity}"
+
+    def _window_keys(self, identity: str, now: float) -> tuple[str, str, float]:
+        idx = math.floor(now / self.window)
+        elapsed = now / self.window - idx
+        base = self.key(identity)
+        return f"{base}:{idx}", f"{base}:{idx - 1}", 1.0 - elapsed
+
+    def hit(self, identity: str, cost: int = 1) -> RateLimitResult:
+        """Registra ``cost`` hits para ``identity`` e decide atomicamente."""
+        if cost > self.limit:
+            msg = "cost maior que o limite nunca seria liberado"
+            raise ValueError(msg)
+        backend = self.backend or default_backend()
+        try:
+            if self.mode == TOKEN_BUCKET:
+                return self._hit_bucket(backend, identity, cost)
+            return self._hit_window(backend, identity, cost)
+        except Exception:
+            if not self.fail_open:
+                raise
+            logger.warning("Falha no backend de rate limit (%s); liberando", self.scope, exc_info=True)
+            return RateLimitResult(allowed=True, limit=self.limit, remaining=self.limit)
+
+    def _hit_window(self, backend: Backend, identity: str, cost: int) -> RateLimitResult:
+        if self.mode == FIXED:
+            allowed, curr, _, ttl = backend.window_hit(self.key(identity), None, self.limit, 0.0, cost, self.window)
+            retry = 0.0 if allowed else (ttl if ttl is not None else self.window)
+            return RateLimitResult(allowed, self.limit, max(0, self.limit - curr), retry)
+        now = self.clock()
+        key, prev_key, weight = self._window_keys(identity, now)
+        allowed, curr, prev, _ = backend.window_hit(key, prev_key, self.limit, weight, cost, 2 * self.window)
+        used = math.floor(prev * weight) + curr
+        if allowed:
+            return RateLimitResult(True, self.limit, max(0, self.limit - used), 0.0)
+        return RateLimitResult(
+            False, self.limit, max(0, self.limit - used), self._sliding_retry(curr, prev, weight, cost)
+        )
+
+    def _sliding_retry(self, curr: int, prev: int, weight: float, cost: int) -> float:
+        """Tempo estimado até ``floor(prev*peso) + curr + cost`` caber no limite."""
+        if curr + cost <= self.limit and prev > 0:
+            target = (self.limit - curr - cost) / prev
+            return max(0.0, (weight - target) * self.window)
+        # A janela atual precisa virar "anterior" e perder peso suficiente
+        wait = weight * self.window
+        if curr > 0:
+            wait += max(0.0, 1.0 - (self.limit - cost) / curr) * self.window
+        return wait
+
+    def _hit_bucket(self, backend: Backend, identity: str, cost: int) -> RateLimitResult:
+        rate = self.limit / self.window
+        allowed, tokens = backend.bucket_take(self.key(identity), self.limit, rate, self.clock(), cost, 2 * self.window)
+        retry = 0.0 if allowed else (cost - tokens) / rate
+        return RateLimitResult(allowed, self.limit, max(0, math.floor(tokens)), retry)
+
+    def reset(self, identity: str) -> None:
+        """Zera o estado da identidade (todas as chaves do modo atual)."""
+        backend = self.backend or default_backend()
+        if self.mode == SLIDING:
+            key, prev_key, _ = self._window_keys(identity, self.clock())
+            backend.delete(key, prev_key)
+        else:
+            backend.delete(self.key(identity))
+
+
+def hit(  # noqa: PLR0913
+    scope: str, identity: str, limit: int, window: float, *, mode: str = SLIDING, cost: int = 1
+) -> RateLimitResult:
+    """Atalho funcional: ``RateLimiter(limit, window, mode=mode, scope=scope).hit(identity)``."""
+    return RateLimiter(limit, window, mode=mode, scope=scope).hit(identity, cost)
+
+
+# --- Integração HTTP ------------------------------------------------------------
+KeyFunc = Callable[[HttpRequest], "str | None"]
+
+
+def request_identity(request: HttpRequest, key: str | KeyFunc = "ip") -> str | None:
+    """Identidade do request para o limite.
+
+    ``"ip"`` usa ``REMOTE_ADDR`` (X-Forwarded-For é controlado pelo cliente e
+    permitiria burlar o limite), ``"user"`` o pk do usuário autenticado,
+    ``"user_or_ip"`` o usuário quando autenticado e o IP caso contrário; um
+    callable recebe o request. ``None`` significa "não limitar".
+    """
+    if callable(key):
+        return key(request)
+    ip = request.META.get("REMOTE_ADDR") or None
+    user = getattr(request, "user", None)
+    user_id = user.pk if user is not None and getattr(user, "is_authenticated", False) else None
+    if key == "ip":
+        return f"ip:{ip}" if ip else None
+    if key == "user":
+        return f"user:{user_id}" if user_id is not None else None
+    if key == "user_or_ip":
+        if user_id is not None:
+            return f"user:{user_id}"
+        return f"ip:{ip}" if ip else None
+    msg = f"Chave de rate limit desconhecida: {key!r}"
+    raise ValueError(msg)
+
+
+def too_many_requests(result: RateLimitResult, message: str = RATE_LIMIT_MESSAGE) -> HttpResponse:
+    """Resposta 429 padrão com ``Retry-After`` e ``X-RateLimit-*``."""
+    response = JsonResponse({"detail": message}, status=429)
+    for name, value in result.headers().items():
+        response[name] = value
+    return response
+
+
+def rate_limit(  # noqa: PLR0913
+    limit: int,
+    window: float,
+    *,
+    key: str | KeyFunc = "ip",
+    mode: str = SLIDING,
+    scope: str | None = None,
+    methods: tuple[str, ...] | None = None,
+) -> Callable[[Callable[..., HttpResponse]], Callable[..., HttpResponse]]:
+    """Decorator para views-função (em CBVs usar ``method_decorator``).
+
+    Requests fora de ``methods`` (quando informado) ou sem identidade passam
+    direto; o resultado do hit fica em ``request.rate_limit``.
+    """
+
+    def decorator(view: Callable[..., HttpResponse]) -> Callable[..., HttpResponse]:
+        limiter = RateLimiter(limit, window, mode=mode, scope=scope or f"view:{view.__module__}.{view.__qualname__}")
+
+        @wraps(view)
+        def _wrapped(request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:  # noqa: ANN401
+            if methods is None or request.method in methods:
+                identity = request_identity(request, key)
+                if identity is not None:
+                    result = limiter.hit(identity)
+                    request.rate_limit = result  # type: ignore[attr-defined]
+                    if not result.allowed:
+                        return too_many_requests(result)
+            return view(request, *args, **kwargs)
+
+        return _wrapped
+
+    return decorator
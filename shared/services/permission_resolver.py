@@ -225,6 +225,14 @@ class PermissionResolver:
             cache.set(version_key, version, self.CACHE_TTL)
         return version
 
+    def get_cache_version(self, user_id: int, tenant_id: int) -> str:
+        """Versão composta (era global + versão user/tenant) para caches derivados.
+
+        Muda sempre que as permissões do par são invalidadas; consumidores (ex.: menu
+        lateral) podem incluí-la na chave para invalidar junto com o resolver.
+        """
+        return f"{self._get_global_era()}.{self._get_version(user_id, tenant_id)}"
+
     def _get_global_era(self) -> int:
         try:
             era = cache.get(self._global_era_key)
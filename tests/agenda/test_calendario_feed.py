@@ -0,0 +1,122 @@
+"""Feed de calendário: janela com select_related, ETag/304, sync_token incremental e ICS com RRULE."""
+
+import json
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from agenda import views
+from agenda.models import Evento, EventoRemovido
+from agenda.services import calendario
+from core.models import Tenant
+
+pytestmark = pytest.mark.django_db
+
+SP = ZoneInfo("America/Sao_Paulo")
+
+
+@pytest.fixture
+def cenario():
+    cache.clear()
+    tenant = Tenant.objects.create(name="Calendário", slug="calendario", status="active")
+    user = get_user_model().objects.create_user("cal_user", password="x", first_name="Ana", last_name="Lima")
+    base = datetime(2026, 5, 4, 9, tzinfo=SP)
+    eventos = [
+        Evento.objects.create(tenant=tenant, titulo=f"E{i}", data_inicio=base + timedelta(days=i), responsavel=user)
+        for i in range(5)
+    ]
+    antigo = Evento.objects.create(tenant=tenant, titulo="Antigo", data_inicio=base - timedelta(days=400))
+    return tenant, user, base, eventos, antigo
+
+
+def _get(view, user, tenant, **params):
+    headers = params.pop("headers", {})
+    request = RequestFactory().get("/agenda/api/eventos/", params, headers=headers)
+    request.user = user
+    request.session = {"tenant_id": tenant.id}
+    return view(request)
+
+
+def test_janela_padrao_e_sem_n_mais_1(cenario):
+    tenant, user, base, eventos, antigo = cenario
+    periodo = calendario.janela(agora=base)
+    with CaptureQueriesContext(connection) as ctx:
+        dados = calendario.serializar(calendario.eventos_da_janela(tenant.id, periodo))
+    assert len(ctx.captured_queries) == 1
+    assert [d["id"] for d in dados] == [e.id for e in eventos]  # histórico antigo fora da janela padrão
+    assert dados[0]["extendedProps"]["responsavel"] == "Ana Lima"
+    assert antigo.id not in {d["id"] for d in dados}
+
+
+def test_etag_devolve_304_ate_haver_alteracao(cenario):
+    tenant, user, base, eventos, _ = cenario
+    params = {"start": base.date().isoformat(), "end": (base + timedelta(days=7)).date().isoformat()}
+    primeira = _get(views.api_eventos, user, tenant, **params)
+    etag = primeira["ETag"]
+    assert _get(views.api_eventos, user, tenant, headers={"If-None-Match": etag}, **params).status_code == 304
+
+    eventos[0].titulo = "Alterado"
+    eventos[0].save()
+    assert _get(views.api_eventos, user, tenant, headers={"If-None-Match": etag}, **params).status_code == 200
+
+
+def test_sync_token_traz_so_alteracoes_e_remocoes(cenario, settings):
+    tenant, user, _base, eventos, _ = cenario
+    settings.AGENDA_SYNC_MARGEM_SEGUNDOS = 0
+    inicial = _get(views.api_eventos, user, tenant, sync_token="")
+    token = json.loads(inicial.content)["sync_token"]
+    eventos[1].titulo = "Remarcado"
+    eventos[1].save()
+    removido_id = eventos[2].id
+    eventos[2].delete()
+    eventos[3].participantes.add(user)
+
+    delta = json.loads(_get(views.api_eventos, user, tenant, sync_token=token).content)
+    assert {e["id"] for e in delta["events"]} == {eventos[1].id, eventos[3].id}
+    assert delta["deleted"] == [removido_id]
+    assert _get(views.api_eventos, user, tenant, sync_token=token + "x").status_code == 410
+
+
+def test_ics_com_rrule_em_cache_por_usuario_e_janela(cenario):
+    tenant, user, base, eventos, _ = cenario
+    Evento.objects.create(
+        tenant=tenant,
+        titulo="Daily; equipe",
+        data_inicio=base - timedelta(days=60),
+        regra_recorrencia="FREQ=DAILY;BYDAY=MO,TU,WE,TH,FR",
+        responsavel=user,
+    )
+    periodo = calendario.janela(agora=base)
+    conteudo, etag = calendario.exportar_ics(tenant.id, user, periodo)
+    assert conteudo.startswith("BEGIN:VCALENDAR\r\n")
+    assert "RRULE:FREQ=DAILY;BYDAY=MO,TU,WE,TH,FR\r\n" in conteudo
+    assert r"SUMMARY:Daily\; equipe" in conteudo
+    assert conteudo.count("BEGIN:VEVENT") == 6
+
+    with CaptureQueriesContext(connection) as ctx:
+        assert calendario.exportar_ics(tenant.id, user, periodo) == (conteudo, etag)
+    assert len(ctx.captured_queries) == 2  # só as agregações da impressão; o ICS veio do cache
+
+    resposta = _get(views.exportar_eventos_ics, user, tenant)
+    assert resposta["Content-Type"].startswith("text/calendar")
+
+
+@pytest.mark.django_db(transaction=True)
+def test_excluir_tenant_com_eventos_nao_cria_marcador():
+    tenant = Tenant.objects.create(name="Removível", slug="removivel", status="active")
+    evento = Evento.objects.create(tenant=tenant, titulo="E", data_inicio=datetime(2026, 5, 4, 9, tzinfo=SP))
+    outro = Evento.objects.create(tenant=tenant, titulo="F", data_inicio=datetime(2026, 5, 5, 9, tzinfo=SP))
+    outro_id = outro.pk
+    outro.delete()  # exclusão direta continua gerando marcador
+    assert EventoRemovido.objects.filter(tenant=tenant, evento_id=outro_id).exists()
+
+    tenant.delete()
+
+    assert not Evento.objects.filter(pk=evento.pk).exists()
+    assert not EventoRemovido.objects.filter(tenant_id=tenant.pk).exists()
@@ -0,0 +1,74 @@
+"""Digest diário: agrupamento em uma consulta, fuso do tenant, envio em blocos e retomada sem duplicar."""
+
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from agenda.models import AgendaConfiguracao, DigestEnvio, Evento
+from agenda.services.digest import agenda_por_usuario, enviar_digests
+from core.models import Tenant
+
+pytestmark = pytest.mark.django_db
+
+MANAUS = ZoneInfo("America/Manaus")
+
+
+@pytest.fixture
+def cenario(settings):
+    settings.AGENDA_DIGEST_LOTE = 2
+    tenant = Tenant.objects.create(name="Digest", slug="digest", timezone="America/Manaus")
+    AgendaConfiguracao.objects.update_or_create(
+        tenant=tenant, defaults={"digest_email_habilitado": True, "digest_email_hora": 8}
+    )
+    user_model = get_user_model()
+    usuarios = [user_model.objects.create_user(f"digest_{i}", email=f"d{i}@ex.com", password="x") for i in range(4)]
+    dia = datetime(2026, 3, 10, tzinfo=MANAUS)
+    cedo = Evento.objects.create(tenant=tenant, titulo="Cedo", data_inicio=dia.replace(hour=9), responsavel=usuarios[0])
+    tarde = Evento.objects.create(
+        tenant=tenant, titulo="Tarde", data_inicio=dia.replace(hour=15), responsavel=usuarios[1]
+    )
+    tarde.participantes.add(usuarios[0], usuarios[1], usuarios[2], usuarios[3])
+    # 23h30 local = dia seguinte em UTC: ainda pertence ao dia local
+    Evento.objects.create(
+        tenant=tenant, titulo="Noite", data_inicio=dia.replace(hour=23, minute=30), responsavel=usuarios[2]
+    )
+    Evento.objects.create(
+        tenant=tenant, titulo="Amanhã", data_inicio=dia + timedelta(days=1, hours=9), responsavel=usuarios[3]
+    )
+    return tenant, usuarios, dia, cedo, tarde
+
+
+def test_agenda_por_usuario_uma_consulta_no_dia_local(cenario):
+    tenant, (u0, u1, u2, u3), dia, _cedo, _tarde = cenario
+    with CaptureQueriesContext(connection) as ctx:
+        agenda = agenda_por_usuario(tenant.id, dia.date(), MANAUS)
+    assert len(ctx.captured_queries) == 1
+    titulos = {uid: [ev["titulo"] for ev in evs] for uid, evs in agenda.items()}
+    assert titulos == {u0.id: ["Cedo", "Tarde"], u1.id: ["Tarde"], u2.id: ["Tarde", "Noite"], u3.id: ["Tarde"]}
+
+
+def test_envio_respeita_hora_local_e_retoma_sem_duplicar(cenario):
+    tenant, usuarios, dia, _cedo, _tarde = cenario
+    antes_das_8 = dia.replace(hour=7, minute=59)
+    assert enviar_digests(antes_das_8).tenants == 0
+
+    # Execução anterior "morreu" depois de enviar ao primeiro usuário
+    DigestEnvio.objects.create(tenant=tenant, usuario=usuarios[0], data_referencia=dia.date(), enviado_em=dia)
+    resultado = enviar_digests(dia.replace(hour=8, minute=5))
+
+    assert (resultado.enviados, resultado.pulados) == (3, 1)
+    assert sorted(m.to[0] for m in mail.outbox) == ["d1@ex.com", "d2@ex.com", "d3@ex.com"]
+    corpo = next(m.body for m in mail.outbox if m.to == ["d2@ex.com"])
+    assert corpo == "- Tarde às 15:00\n- Noite às 23:30"  # horários no fuso do tenant
+    assert DigestEnvio.objects.filter(data_referencia=dia.date(), enviado_em__isnull=False).count() == 4
+
+    mail.outbox.clear()
+    assert enviar_digests(dia.replace(hour=10)).tenants == 0  # tenant concluído no dia
+    AgendaConfiguracao.objects.filter(tenant=tenant).update(digest_concluido_em=None)
+    assert enviar_digests(dia.replace(hour=10)).enviados == 0  # ledger impede reenvio
+    assert mail.outbox == []
@@ -0,0 +1,106 @@
+"""Agendador de lembretes: fire_at pré-calculado, sincronia no reagendamento e ledger idempotente."""
+
+from datetime import timedelta
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from agenda.models import Evento, EventoLembrete, LembreteDisparo
+from agenda.services.lembretes import despachar_lembretes
+from core.models import Tenant
+from notifications.models import Notification
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def cenario():
+    tenant = Tenant.objects.create(name="Agenda", slug="agenda-lembretes")
+    user_model = get_user_model()
+    usuarios = [user_model.objects.create_user(f"lembrete_{i}", password="x") for i in range(3)]
+    agora = timezone.now().replace(microsecond=0)
+    return tenant, usuarios, agora
+
+
+def _evento(tenant, titulo, inicio, status="agendado", participantes=()):
+    evento = Evento.objects.create(tenant=tenant, titulo=titulo, data_inicio=inicio)
+    evento.participantes.add(*participantes)
+    if status != evento.status:
+        Evento.objects.filter(pk=evento.pk).update(status=status)
+    return evento
+
+
+def test_fire_at_calculado_e_sincronizado_no_reagendamento(cenario):
+    tenant, (u1, u2, _), agora = cenario
+    evento = _evento(tenant, "Reunião", agora + timedelta(hours=2))
+    l15 = EventoLembrete.objects.create(evento=evento, usuario=u1, minutos_antes=15)
+    l60 = EventoLembrete.objects.create(evento=evento, usuario=u2, minutos_antes=60)
+    assert l15.fire_at == evento.data_inicio - timedelta(minutes=15)
+
+    EventoLembrete.objects.filter(pk=l60.pk).update(disparado_em=agora)
+    evento = Evento.objects.get(pk=evento.pk)
+    evento.data_inicio += timedelta(days=1)
+    evento.save()
+
+    l15.refresh_from_db()
+    l60.refresh_from_db()
+    assert l15.fire_at == evento.data_inicio - timedelta(minutes=15)
+    assert (l60.fire_at, l60.disparado_em) == (evento.data_inicio - timedelta(minutes=60), None)
+
+
+def test_despacho_so_de_vencidos_em_lote(cenario):
+    tenant, usuarios, agora = cenario
+    proximo = _evento(tenant, "Próximo", agora + timedelta(minutes=10), participantes=usuarios)
+    distante = _evento(tenant, "Distante", agora + timedelta(days=3), participantes=usuarios)
+    cancelado = _evento(tenant, "Cancelado", agora + timedelta(minutes=10), status="cancelado", participantes=usuarios)
+    for u in usuarios:
+        EventoLembrete.objects.create(evento=proximo, usuario=u, minutos_antes=15)
+        EventoLembrete.objects.create(evento=distante, usuario=u, minutos_antes=15)
+    EventoLembrete.objects.create(evento=cancelado, usuario=usuarios[0], minutos_antes=15)
+
+    with CaptureQueriesContext(connection) as ctx:
+        resultado = despachar_lembretes(agora, bloco=2)
+
+    assert (resultado.notificados, resultado.ignorados, resultado.blocos) == (3, 1, 2)
+    inserts = [q for q in ctx.captured_queries if q["sql"].startswith('INSERT INTO "notifications_notification"')]
+    assert len(inserts) == resultado.blocos  # bulk_create por bloco, não por lembrete
+    notificacoes = Notification.objects.filter(evento_origem="lembrete_evento")
+    assert {n.usuario_destinatario_id for n in notificacoes} == {u.id for u in usuarios}
+    assert all(n.titulo == "Lembrete: Próximo em 10 min" for n in notificacoes)
+    assert LembreteDisparo.objects.filter(ignorado=True, lembrete__evento=cancelado).count() == 1
+    assert not EventoLembrete.objects.filter(evento=distante).exclude(disparado_em=None).exists()
+
+
+def test_despacho_idempotente_e_reagendamento_gera_novo_disparo(cenario):
+    tenant, (u1, _, _), agora = cenario
+    evento = _evento(tenant, "Consulta", agora + timedelta(minutes=5), participantes=[u1])
+    lembrete = EventoLembrete.objects.create(evento=evento, usuario=u1, minutos_antes=15)
+
+    assert despachar_lembretes(agora).notificados == 1
+    EventoLembrete.objects.filter(pk=lembrete.pk).update(disparado_em=None)  # reexecução após falha
+    assert despachar_lembretes(agora).notificados == 0
+
+    evento.data_inicio = agora + timedelta(minutes=10)
+    evento.save()
+    assert despachar_lembretes(agora).notificados == 1
+    assert LembreteDisparo.objects.filter(lembrete=lembrete).count() == 2
+    assert Notification.objects.filter(usuario_destinatario=u1, evento_origem="lembrete_evento").count() == 2
+
+
+def test_despacho_so_para_responsavel_e_participantes(cenario):
+    tenant, (responsavel, participante, removido), agora = cenario
+    evento = _evento(tenant, "Equipe", agora + timedelta(minutes=10), participantes=[participante, removido])
+    Evento.objects.filter(pk=evento.pk).update(responsavel=responsavel)
+    for u in (responsavel, participante, removido):
+        EventoLembrete.objects.create(evento=evento, usuario=u, minutos_antes=15)
+    evento.participantes.remove(removido)
+
+    resultado = despachar_lembretes(agora)
+
+    assert (resultado.notificados, resultado.ignorados) == (2, 1)
+    notificados = Notification.objects.filter(evento_origem="lembrete_evento")
+    assert {n.usuario_destinatario_id for n in notificados} == {responsavel.id, participante.id}
+    assert LembreteDisparo.objects.get(lembrete__usuario=removido).ignorado
@@ -0,0 +1 @@
+"""Testes do módulo ai_auditor."""
@@ -0,0 +1,145 @@
+"""Motor de análise AST: checks plugáveis, cache por conteúdo, pool e gravação em lote."""
+
+import multiprocessing
+import textwrap
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.test import Client
+from django.urls import reverse
+
+from ai_auditor import tasks
+from ai_auditor.analyzers import ast_checks, engine
+from ai_auditor.models import AuditSession, CodeIssue, FileAnalysisCache
+from ai_auditor.views import ChatAPIView, _enfileirar_auditoria
+from core.models import Tenant, TenantUser
+
+User = get_user_model()
+
+FONTE = textwrap.dedent(
+    """
+    import os
+    from typing import TYPE_CHECKING
+
+    from clientes.models import Cliente
+
+    if TYPE_CHECKING:
+        from core.models import Tenant
+
+
+    def listar(tenant: "Tenant"):
+        for cliente in Cliente.objects.filter(tenant=tenant):
+            print(cliente.contato.email)
+        for cliente in Cliente.objects.filter(tenant=tenant).select_related("contato")[:50]:
+            print(cliente.contato.email)
+        for pk in [1, 2]:
+            Pedido.objects.get(pk=pk)
+        todos = Cliente.objects.all()
+        do_tenant = Cliente.objects.all().filter(tenant=tenant)
+        usuarios = User.objects.all()
+        return todos, do_tenant, usuarios
+    """
+)
+
+
+def _por_check(achados):
+    resultado = {}
+    for achado in achados:
+        resultado.setdefault(achado["check"], []).append(achado)
+    return resultado
+
+
+def test_checks_ast_detectam_padroes():
+    achados = _por_check(
+        ast_checks.analisar_fonte("app/views.py", FONTE, opcoes={"modelos_globais": ["User"], "complexidade_maxima": 1})
+    )
+
+    assert [a["line_number"] for a in achados["loop_queryset_sem_limite"]] == [12]
+    n_mais_1 = {a["line_number"]: a["severity"] for a in achados["consulta_n_mais_1"]}
+    assert n_mais_1 == {13: "medium", 17: "high"}  # 2º loop usa select_related
+    assert [a["line_number"] for a in achados["all_sem_tenant"]] == [18]  # filtrado e global ignorados
+    assert [a["title"] for a in achados["import_nao_utilizado"]] == ["Import não utilizado: os"]
+    assert achados["complexidade_ciclomatica"][0]["title"].startswith("Função 'listar'")
+
+
+def test_check_plugavel_e_desativacao():
+    @ast_checks.registrar("teste_print")
+    def teste_print(ctx):
+        return [ctx.achado(ctx.arvore.body[0], issue_type="quality", severity="low", title="print")]
+
+    try:
+        assert "teste_print" in {a["check"] for a in ast_checks.analisar_fonte("x.py", "print(1)\n")}
+        desativado = ast_checks.analisar_fonte("x.py", "print(1)\n", opcoes={"desativados": ["teste_print"]})
+        assert "teste_print" not in {a["check"] for a in desativado}
+    finally:
+        ast_checks.CHECKS.pop("teste_print")
+
+
+def _arquivos(tmp_path, quantidade):
+    arquivos = []
+    for i in range(quantidade):
+        caminho = tmp_path / f"mod_{i}.py"
+        caminho.write_text(FONTE + f"\nVALOR = {i}\n")
+        arquivos.append(engine.ArquivoFonte("app", str(caminho), f"app/mod_{i}.py"))
+    return arquivos
+
+
+@pytest.mark.django_db
+def test_cache_por_conteudo_e_pool_equivalente(tmp_path):
+    arquivos = _arquivos(tmp_path, engine.LIMIAR_POOL + 2)
+
+    primeira = engine.analisar_arquivos(arquivos, workers=2)  # processos "spawn"
+    assert primeira.analisados == len(arquivos)
+    assert FileAnalysisCache.objects.count() == len(arquivos)
+
+    segunda = engine.analisar_arquivos(arquivos, workers=1)
+    assert (segunda.analisados, segunda.reaproveitados) == (0, len(arquivos))
+    assert segunda.achados == primeira.achados  # pool e execução local produzem o mesmo resultado
+
+    (tmp_path / "mod_0.py").write_text("import json\n")
+    terceira = engine.analisar_arquivos(arquivos, workers=1)
+    assert (terceira.analisados, terceira.reaproveitados) == (1, len(arquivos) - 1)
+
+
+@pytest.mark.django_db
+def test_worker_daemonico_analisa_em_pool(tmp_path, monkeypatch):
+    """Worker Celery prefork é daemônico: o pool do billiard cria os filhos mesmo assim."""
+    arquivos = _arquivos(tmp_path, engine.LIMIAR_POOL + 2)
+    monkeypatch.setitem(multiprocessing.current_process()._config, "daemon", True)  # noqa: SLF001
+
+    assert engine.analisar_arquivos(arquivos, workers=2).analisados == len(arquivos)
+
+
+@pytest.mark.django_db
+def test_view_enfileira_e_task_grava_em_lote(tmp_path, monkeypatch, django_capture_on_commit_callbacks):
+    monkeypatch.setattr(tasks.executar_auditoria_codigo, "delay", tasks.executar_auditoria_codigo)
+    monkeypatch.setattr(engine, "arquivos_do_projeto", lambda excluidos=None: _arquivos(tmp_path, 2))
+    tenant = Tenant.objects.create(nome="T", schema_name="t_auditor")
+    user = User.objects.create_user(username="auditor", password="x")  # noqa: S106 - senha de teste
+    TenantUser.objects.create(user=user, tenant=tenant, is_tenant_admin=True)
+    client = Client()
+    client.login(username="auditor", password="x")  # noqa: S106
+    sessao_http = client.session
+    sessao_http["tenant_id"] = tenant.id
+    sessao_http.save()
+
+    with django_capture_on_commit_callbacks(execute=True) as callbacks:
+        resp = client.post(reverse("ai_auditor:execute_audit"))
+    assert resp.status_code == 302
+    assert len(callbacks) == 1
+
+    session = AuditSession.objects.get(tenant=tenant)
+    assert session.status == "completed"
+    assert session.total_files_analyzed == 2
+    assert session.total_issues == CodeIssue.objects.filter(session=session).count() > 0
+    assert session.high_issues == CodeIssue.objects.filter(session=session, severity="high").count()
+    assert session.analysis_config["engine"]["arquivos_analisados"] == 2
+    assert set(CodeIssue.objects.filter(session=session).values_list("file_path", flat=True)) == {
+        "app/mod_0.py",
+        "app/mod_1.py",
+    }
+
+
+def test_chat_api_segue_isenta_de_csrf():
+    assert ChatAPIView.as_view().csrf_exempt is True
+    assert not hasattr(_enfileirar_auditoria, "csrf_exempt")
@@ -0,0 +1,150 @@
+"""Escopo por linha/tenant: matriz de vazamento entre tenants nas APIs de obras e clientes."""
+
+from datetime import date, timedelta
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from agenda.models import Evento
+from clientes.api import ClienteViewSet
+from clientes.models import Cliente
+from core.models import Tenant, TenantUser
+from core.services.row_access import compile_predicate, scope_queryset
+from obras.api import ObraViewSet
+from obras.models import Obra
+from user_management.models import PermissaoPersonalizada
+
+User = get_user_model()
+pytestmark = pytest.mark.django_db
+
+
+def _obra(tenant, nome, status="em_andamento"):
+    return Obra.objects.create(
+        tenant=tenant,
+        nome=nome,
+        endereco="Rua",
+        cidade="X",
+        estado="SP",
+        cep="00000-000",
+        data_inicio=date(2026, 1, 1),
+        data_previsao_termino=date(2026, 12, 31),
+        valor_contrato=1000,
+        status=status,
+    )
+
+
+@pytest.fixture
+def cenario():
+    a = Tenant.objects.create(name="Empresa A", subdomain="row-a")
+    b = Tenant.objects.create(name="Empresa B", subdomain="row-b")
+    usuarios = {
+        "admin_a": User.objects.create_user("row_admin_a", password="x"),
+        "membro_a": User.objects.create_user("row_membro_a", password="x"),
+        "admin_b": User.objects.create_user("row_admin_b", password="x"),
+        "sem_vinculo": User.objects.create_user("row_solto", password="x"),
+    }
+    TenantUser.objects.create(tenant=a, user=usuarios["admin_a"], is_tenant_admin=True)
+    TenantUser.objects.create(tenant=a, user=usuarios["membro_a"], is_tenant_admin=False)
+    TenantUser.objects.create(tenant=b, user=usuarios["admin_b"], is_tenant_admin=True)
+    obras = {
+        "a1": _obra(a, "A1"),
+        "a2": _obra(a, "A2", status="concluida"),
+        "b1": _obra(b, "B1"),
+    }
+    Cliente.objects.create(tenant=a, email="a@x.com")
+    Cliente.objects.create(tenant=b, email="b1@x.com")
+    Cliente.objects.create(tenant=b, email="b2@x.com", status="inactive")
+    return {"a": a, "b": b, "obras": obras, **usuarios}
+
+
+def _get(viewset, acao, user, tenant=None, **kwargs):
+    request = APIRequestFactory().get("/")
+    force_authenticate(request, user)
+    if tenant is not None:  # simula tenant escolhido na sessão (inclusive forjado)
+        request.session = {"tenant_id": tenant.pk}
+    return viewset.as_view({"get": acao})(request, **kwargs)
+
+
+def _ids(response):
+    dados = response.data["results"] if isinstance(response.data, dict) else response.data
+    return {item["id"] for item in dados}
+
+
+@pytest.mark.parametrize(
+    ("usuario", "tenant", "visiveis"),
+    [
+        ("admin_a", "a", {"a1", "a2"}),
+        ("admin_b", "b", {"b1"}),
+        ("membro_a", "a", set()),  # sem permissão de modelo nem concessão por linha
+        ("admin_b", "a", set()),  # tenant forjado na sessão: sem vínculo, nada
+        ("sem_vinculo", None, set()),
+    ],
+)
+def test_matriz_obras_list_retrieve_statistics(cenario, usuario, tenant, visiveis):
+    user, tenant = cenario[usuario], cenario.get(tenant)
+    esperadas = {cenario["obras"][n].pk for n in visiveis}
+
+    assert _ids(_get(ObraViewSet, "list", user, tenant)) == esperadas
+    for obra in cenario["obras"].values():
+        status = _get(ObraViewSet, "retrieve", user, tenant, pk=obra.pk).status_code
+        assert status == (200 if obra.pk in esperadas else 404)
+    stats = _get(ObraViewSet, "statistics", user, tenant).data
+    assert stats["total"] == len(esperadas)
+    linhas = _get(ObraViewSet, "export_csv", user, tenant).content.decode().strip().splitlines()
+    assert {int(linha.split(",")[0]) for linha in linhas[1:]} == esperadas
+
+
+def test_clientes_estatisticas_e_lista_por_tenant(cenario):
+    stats = _get(ClienteViewSet, "statistics", cenario["admin_b"]).data
+    assert (stats["total"], stats["ativos"], stats["inativos"]) == (2, 1, 1)
+    assert _ids(_get(ClienteViewSet, "list", cenario["admin_a"])) == set(
+        Cliente.objects.filter(tenant=cenario["a"]).values_list("id", flat=True)
+    )
+    assert _get(ClienteViewSet, "statistics", cenario["membro_a"]).data["total"] == 0
+
+
+def test_concessao_e_negacao_explicitas_por_linha(cenario):
+    membro, a, obras = cenario["membro_a"], cenario["a"], cenario["obras"]
+    PermissaoPersonalizada.objects.create(user=membro, modulo="OBRA", acao="VIEW", recurso=f"obra:{obras['a1'].pk}")
+    PermissaoPersonalizada.objects.create(  # concessão apontando para obra de outro tenant não vaza
+        user=membro, modulo="OBRA", acao="VIEW", recurso=f"obra:{obras['b1'].pk}"
+    )
+    PermissaoPersonalizada.objects.create(
+        user=membro,
+        modulo="OBRA",
+        acao="VIEW",
+        recurso=f"obra:{obras['a2'].pk}",
+        data_expiracao=timezone.now() - timedelta(days=1),
+    )
+    assert _ids(_get(ObraViewSet, "list", membro)) == {obras["a1"].pk}
+
+    # Negação vence concessão; o sinal do resolver invalida o predicado em cache
+    PermissaoPersonalizada.objects.create(
+        user=membro, scope_tenant=a, modulo="OBRA", acao="VIEW", recurso=f"obra:{obras['a1'].pk}", concedida=False
+    )
+    assert _ids(_get(ObraViewSet, "list", membro)) == set()
+
+    # Negação também restringe quem tem acesso amplo ao tenant
+    PermissaoPersonalizada.objects.create(
+        user=cenario["admin_a"], modulo="OBRA", acao="VIEW", recurso=f"obra:{obras['a2'].pk}", concedida=False
+    )
+    assert _ids(_get(ObraViewSet, "list", cenario["admin_a"])) == {obras["a1"].pk}
+
+
+def test_dono_e_equipe_em_um_unico_predicado(cenario, django_assert_max_num_queries):
+    a, membro = cenario["a"], cenario["membro_a"]
+    inicio = timezone.now()
+    proprio = Evento.objects.create(tenant=a, titulo="Próprio", data_inicio=inicio, responsavel=membro)
+    equipe = Evento.objects.create(tenant=a, titulo="Equipe", data_inicio=inicio)
+    equipe.participantes.add(membro, cenario["admin_a"])
+    Evento.objects.create(tenant=a, titulo="Alheio", data_inicio=inicio)
+    Evento.objects.create(tenant=cenario["b"], titulo="Outro tenant", data_inicio=inicio, responsavel=membro)
+
+    visiveis = scope_queryset(Evento.objects.all(), membro, a)
+    assert sorted(visiveis.values_list("titulo", flat=True)) == ["Equipe", "Próprio"]
+    assert {e.pk for e in visiveis} == {proprio.pk, equipe.pk}  # sem duplicatas do M2M
+
+    with django_assert_max_num_queries(1):  # predicado compilado vem do cache
+        compile_predicate(membro, a, Evento)
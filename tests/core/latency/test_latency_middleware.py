@@ -1,7 +1,8 @@
 """Testes do `RequestLatencyMiddleware`.
 
 Valida:
-* Registro de métricas (labels + observe) em rota normal.
+* Registro de métricas (labels + observe) em rota normal, com label pela rota resolvida.
+* Path não resolvido cai no label fixo (cardinalidade limitada).
 * Ignora caminhos estáticos (/static/...).
 """
 
@@ -11,8 +12,9 @@ from typing import Any
 
 import pytest
 from django.http import HttpRequest, HttpResponse
+from django.urls import ResolverMatch
 
-from core.middleware_latency import RequestLatencyMiddleware
+from core.middleware_latency import UNRESOLVED_ROUTE, RequestLatencyMiddleware
 
 pytestmark = [pytest.mark.django_db]
 
@@ -34,8 +36,8 @@ def test_latency_middleware_observes(monkeypatch: pytest.MonkeyPatch) -> None:
     observed: dict[str, Any] = {}
 
     class _Recorder:
-        def labels(self, path: str) -> _Recorder:  # pragma: no cover - simples atribuição
-            observed["path"] = path
+        def labels(self, route: str) -> _Recorder:  # pragma: no cover - simples atribuição
+            observed["route"] = route
             return self
 
         def observe(self, value: float) -> None:  # pragma: no cover
@@ -52,10 +54,11 @@ def test_latency_middleware_observes(monkeypatch: pytest.MonkeyPatch) -> None:
 
     mw = RequestLatencyMiddleware(get_response)
     req = DummyRequest("/api/test-endpoint")
+    req.resolver_match = ResolverMatch(get_response, (), {}, url_name="test-endpoint", route="api/test-endpoint")
     resp = mw(req)
     assert resp is not None
     assert called.get("ok") is True
-    assert observed["path"].startswith("/api/test-endpoint")
+    assert observed["route"] == "test-endpoint", "label deve usar o nome da rota, não o path cru"
     assert observed["value"] >= 0
 
 
@@ -66,8 +69,8 @@ def test_latency_middleware_excludes_static(monkeypatch: pytest.MonkeyPatch) ->
     calls: list[object] = []
 
     class _Recorder:
-        def labels(self, path: str) -> _Recorder:  # pragma: no cover - registro trivial
-            calls.append(path)
+        def labels(self, route: str) -> _Recorder:  # pragma: no cover - registro trivial
+            calls.append(route)
             return self
 
         def observe(self, value: float) -> None:  # pragma: no cover
@@ -83,3 +86,22 @@ def test_latency_middleware_excludes_static(monkeypatch: pytest.MonkeyPatch) ->
     req = DummyRequest("/static/css/app.css")
     mw(req)
     assert calls == []
+
+
+def test_latency_middleware_unresolved_route_label(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Paths sem rota resolvida (404/scanners) não criam labels novos."""
+    labels: list[str] = []
+
+    class _Recorder:
+        def labels(self, route: str) -> _Recorder:
+            labels.append(route)
+            return self
+
+        def observe(self, value: float) -> None:
+            del value
+
+    monkeypatch.setattr("core.middleware_latency.REQUEST_LATENCY", _Recorder())
+    mw = RequestLatencyMiddleware(lambda _r: HttpResponse("x", status=404))
+    mw(DummyRequest("/wp-login.php?x=1"))
+    mw(DummyRequest("/.env"))
+    assert labels == [UNRESOLVED_ROUTE, UNRESOLVED_ROUTE]
@@ -0,0 +1,98 @@
+"""Testes da telemetria por tenant (buffer -> cache -> TenantMetrics)."""
+
+from __future__ import annotations
+
+import time
+
+import pytest
+from django.core.cache import cache
+from django.utils import timezone
+
+from admin.models import TenantMetrics
+from core.models import Tenant
+from core.services import tenant_telemetry
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture(autouse=True)
+def _clean_state() -> None:
+    cache.clear()
+    tenant_telemetry.reset_buffers()
+
+
+def test_rollup_upserts_tenant_metrics() -> None:
+    """Contagem, erros, média e usuários distintos chegam ao TenantMetrics."""
+    t1 = Tenant.objects.create(name="T1", subdomain="tel1")
+    t2 = Tenant.objects.create(name="T2", subdomain="tel2")
+    tenant_telemetry.record_request(t1.id, 1, 0.100, 200)
+    tenant_telemetry.record_request(t1.id, 1, 0.300, 500)
+    tenant_telemetry.record_request(t1.id, 2, 0.200, 200)
+    tenant_telemetry.record_request(t1.id, 2, 0.200, 404)
+    tenant_telemetry.record_request(t2.id, None, 0.050, 200)
+
+    assert tenant_telemetry.rollup_daily() == 2
+
+    m1 = TenantMetrics.objects.get(tenant=t1, date=timezone.localdate())
+    assert m1.api_requests == 4
+    assert m1.active_users == 2
+    assert m1.error_rate == pytest.approx(25.0)
+    assert m1.response_time_avg == pytest.approx(200.0)
+    m2 = TenantMetrics.objects.get(tenant=t2)
+    assert m2.api_requests == 1
+    assert m2.active_users == 0
+
+
+def test_rollup_is_idempotent_and_accumulates_flushes() -> None:
+    """Vários flushes somam; reexecutar o rollup não duplica linhas."""
+    tenant = Tenant.objects.create(name="T1", subdomain="tel3")
+    tenant_telemetry.record_request(tenant.id, 1, 0.01, 200)
+    assert tenant_telemetry.flush_buffers() == 1
+    tenant_telemetry.record_request(tenant.id, 3, 0.01, 200)
+    tenant_telemetry.rollup_daily()
+    tenant_telemetry.rollup_daily()
+    metrics = TenantMetrics.objects.filter(tenant=tenant)
+    assert metrics.count() == 1
+    assert metrics.get().api_requests == 2
+    assert metrics.get().active_users == 2
+
+
+def test_record_ignores_requests_without_tenant() -> None:
+    """Requests sem tenant não geram buffer."""
+    tenant_telemetry.record_request(None, 1, 0.1, 200)
+    assert tenant_telemetry.flush_buffers() == 0
+    assert tenant_telemetry.rollup_daily() == 0
+
+
+def test_rollup_grava_quantis_do_sketch() -> None:
+    """O máximo acompanha o flush, então os quantis lidos do agregado não zeram."""
+    tenant = Tenant.objects.create(name="T1", subdomain="tel4")
+    for ms in range(1, 101):
+        tenant_telemetry.record_request(tenant.id, 1, ms / 1000, 200)
+    tenant_telemetry.flush_buffers()
+    tenant_telemetry.record_request(tenant.id, 1, 0.500, 200)  # segundo flush eleva o máximo
+
+    sketch = tenant_telemetry.read_day(timezone.localdate())[tenant.id]["sketch"]
+    assert sketch.max == pytest.approx(100.0)
+    assert sketch.quantile(0.5) == pytest.approx(50.0, rel=0.05)
+
+    tenant_telemetry.rollup_daily()
+    metrics = TenantMetrics.objects.get(tenant=tenant)
+    assert metrics.response_time_p50 == pytest.approx(51.0, rel=0.05)
+    assert metrics.response_time_p95 == pytest.approx(96.0, rel=0.05)
+    assert 0 < metrics.response_time_p95 <= metrics.response_time_p99 <= 500.0
+
+
+def test_flusher_descarrega_buffer_de_processo_ocioso(settings, monkeypatch) -> None:
+    """Sem novas requests, a thread do processo leva o buffer ao armazenamento compartilhado."""
+    settings.TENANT_TELEMETRY_FLUSH_SECONDS = 1
+    monkeypatch.setitem(tenant_telemetry._state, "flusher", None)
+    monkeypatch.setitem(tenant_telemetry._state, "last_flush", time.monotonic())
+    tenant = Tenant.objects.create(name="T1", subdomain="tel-ocioso")
+    tenant_telemetry.record_request(tenant.id, 1, 0.01, 200)
+    assert not tenant_telemetry.read_day(timezone.localdate())
+
+    deadline = time.monotonic() + 5
+    while not tenant_telemetry.read_day(timezone.localdate()) and time.monotonic() < deadline:
+        time.sleep(0.1)
+    assert tenant_telemetry.read_day(timezone.localdate())[tenant.id]["requests"] == 1
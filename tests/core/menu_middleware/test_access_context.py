@@ -0,0 +1,105 @@
+"""Testes do AccessContext por request e do cache do menu lateral."""
+
+from __future__ import annotations
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.template import Context, Template
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from core.models import Tenant, TenantUser
+from core.services.access_context import AccessContext, get_access_context
+from core.templatetags import menu_tags
+
+User = get_user_model()
+MENU_TEMPLATE = """{% load menu_tags %}{% render_sidebar_menu %}"""
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def tenant_user(settings) -> tuple[Tenant, object]:
+    settings.FEATURE_UNIFIED_ACCESS = True
+    cache.clear()
+    tenant = Tenant.objects.create(name="Ctx", subdomain="ctx", enabled_modules={"modules": ["clientes", "obras"]})
+    user = User.objects.create_user("ctx_user", password="x")
+    TenantUser.objects.create(tenant=tenant, user=user, is_tenant_admin=True)
+    return tenant, user
+
+
+def test_access_context_memoizes_membership_and_decisions(tenant_user: tuple[Tenant, object]) -> None:
+    """Vínculo e decisões são resolvidos uma vez por request."""
+    tenant, user = tenant_user
+    ctx = AccessContext(user, tenant)
+    assert ctx.is_tenant_admin is True
+    decisions = ctx.module_decisions
+    assert decisions["clientes"].allowed
+    assert not decisions["financeiro"].allowed
+    with CaptureQueriesContext(connection) as queries:
+        assert ctx.is_tenant_admin is True
+        assert ctx.decision("clientes").allowed
+        _ = ctx.module_decisions
+    assert len(queries) == 0, "consultas repetidas devem vir da memória da request"
+
+
+def test_get_access_context_reuses_request_instance(tenant_user: tuple[Tenant, object], rf: RequestFactory) -> None:
+    """Mesma request devolve o mesmo objeto; troca de tenant recria."""
+    tenant, user = tenant_user
+    request = rf.get("/clientes/")
+    request.user = user
+    request.tenant = tenant
+    request.session = {}
+    ctx = get_access_context(request)
+    assert get_access_context(request) is ctx
+    other = Tenant.objects.create(name="Outro", subdomain="outro-ctx")
+    request.tenant = other
+    assert get_access_context(request).tenant is other
+
+
+def test_sidebar_html_cached_across_requests(
+    tenant_user: tuple[Tenant, object], rf: RequestFactory, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Segunda renderização (nova request) vem do cache sem decisões de módulo nem reverse."""
+    tenant, user = tenant_user
+
+    def _render() -> tuple[str, int]:
+        request = rf.get("/alguma/url/")
+        request.user = user
+        request.session = {"tenant_id": tenant.id}
+        with CaptureQueriesContext(connection) as queries:
+            html = Template(MENU_TEMPLATE).render(Context({"request": request}))
+        return html, len(queries)
+
+    first_html, _ = _render()
+
+    def _nao_deve_rodar(*_args: object, **_kwargs: object) -> None:
+        raise AssertionError("cache hit não deve recalcular o menu")
+
+    monkeypatch.setattr(AccessContext, "can_view_menu_module", _nao_deve_rodar)
+    monkeypatch.setattr(menu_tags, "_process_menu_item", _nao_deve_rodar)
+    second_html, second_queries = _render()
+    assert "Clientes" in first_html
+    assert second_html == first_html
+    # Apenas a resolução do tenant/grupos da nova request; nada de TenantUser por módulo
+    assert second_queries <= 3
+
+
+def test_sidebar_cache_reflects_module_changes(tenant_user: tuple[Tenant, object], rf: RequestFactory) -> None:
+    """Alterar módulos habilitados do tenant muda a chave do cache."""
+    tenant, user = tenant_user
+    request = rf.get("/x/")
+    request.user = user
+    request.session = {"tenant_id": tenant.id}
+    assert "Obras" in Template(MENU_TEMPLATE).render(Context({"request": request}))
+
+    tenant.enabled_modules = {"modules": ["clientes"]}
+    tenant.save(update_fields=["enabled_modules"])
+    request = rf.get("/x/")
+    request.user = user
+    request.session = {"tenant_id": tenant.id}
+    html = Template(MENU_TEMPLATE).render(Context({"request": request}))
+    assert "Clientes" in html
+    assert "Obras" not in html
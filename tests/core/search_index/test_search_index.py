@@ -0,0 +1,131 @@
+"""Índice de busca unificado: normalização, manutenção por signals e ranking."""
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.test import Client
+from django.urls import reverse
+
+from clientes.models import Cliente, PessoaFisica, PessoaJuridica
+from core.models import SearchDocument, Tenant, TenantUser
+from core.services import search_index
+from produtos.models import Categoria, Produto
+
+User = get_user_model()
+
+
+def _cliente_pf(tenant, nome, cpf, email):
+    cli = Cliente.objects.create(tenant=tenant, tipo="PF", email=email)
+    PessoaFisica.objects.create(cliente=cli, nome_completo=nome, cpf=cpf)
+    return cli
+
+
+def test_normalizacao():
+    assert search_index.normalize_text("  JOÃO  da   Conceição ") == "joao da conceicao"
+    assert search_index.normalize_digits("123.456.789-00") == "12345678900"
+    assert search_index.normalize_code("PRD-000.12/a") == "prd00012a"
+
+
+@pytest.mark.django_db
+def test_signals_mantem_documento_pf_pj_e_remocao():
+    tenant = Tenant.objects.create(nome="T", schema_name="t_search")
+    cli = _cliente_pf(tenant, "José Ávila", "123.456.789-00", "jose@ex.com")
+    doc = SearchDocument.objects.get(object_id=cli.pk, content_type__model="cliente")
+    assert doc.tenant_id == tenant.pk
+    assert doc.titulo == "José Ávila"
+    assert "jose avila" in doc.texto
+    assert "12345678900" in doc.documentos
+
+    pj = Cliente.objects.create(tenant=tenant, tipo="PJ", email="contato@acme.com")
+    PessoaJuridica.objects.create(cliente=pj, razao_social="ACME Indústria LTDA", cnpj="12.345.678/0001-99")
+    assert search_index.search_ids(Cliente, "industria", tenant=tenant) == [pj.pk]
+
+    cli.delete()
+    assert not SearchDocument.objects.filter(object_id=cli.pk, content_type__model="cliente").exists()
+
+
+@pytest.mark.django_db
+def test_busca_isolada_por_tenant_e_ranking_por_prefixo():
+    t1 = Tenant.objects.create(nome="T1", schema_name="t1_search")
+    t2 = Tenant.objects.create(nome="T2", schema_name="t2_search")
+    contem = _cliente_pf(t1, "Ana Maria Silva", "111.111.111-11", "ana@ex.com")
+    prefixo = _cliente_pf(t1, "Maria Souza", "222.222.222-22", "maria@ex.com")
+    _cliente_pf(t2, "Maria Outra", "333.333.333-33", "outra@ex.com")
+
+    assert search_index.search_ids(Cliente, "maria", tenant=t1) == [prefixo.pk, contem.pk]
+    # documento com pontuação diferente casa pelos dígitos
+    assert search_index.search_ids(Cliente, "111111", tenant=t1) == [contem.pk]
+    assert search_index.search_ids(Cliente, "   ", tenant=t1) == []
+
+
+@pytest.mark.django_db
+def test_reindex_recupera_registros_sem_signal():
+    tenant = Tenant.objects.create(nome="T", schema_name="t_reindex")
+    cli = _cliente_pf(tenant, "Carlos Pereira", "444.444.444-44", "carlos@ex.com")
+    outro = _cliente_pf(tenant, "Carla Dias", "777.777.777-77", "carla@ex.com")
+    SearchDocument.objects.filter(object_id=cli.pk, content_type__model="cliente").delete()
+    assert search_index.search_ids(Cliente, "carlos", tenant=tenant) == []
+
+    assert search_index.reindex(Cliente, tenant=tenant) == 2
+    assert search_index.search_ids(Cliente, "carlos", tenant=tenant) == [cli.pk]
+    assert search_index.search_ids(Cliente, "carl", tenant=tenant, within=Cliente.objects.exclude(pk=cli.pk)) == [
+        outro.pk
+    ]
+    with pytest.raises(ValueError, match="não indexável"):
+        search_index.reindex(Tenant)
+
+
+@pytest.mark.django_db
+def test_views_usam_indice():
+    user = User.objects.create_user(username="busca", password="x")  # noqa: S106 - senha de teste
+    tenant = Tenant.objects.create(nome="TB", schema_name="tb_search")
+    TenantUser.objects.create(user=user, tenant=tenant, is_tenant_admin=True)
+    alvo = _cliente_pf(tenant, "Fernanda Gomes", "555.555.555-55", "fer@ex.com")
+    _cliente_pf(tenant, "Pedro Lima", "666.666.666-66", "pedro@ex.com")
+    produto = Produto.objects.create(
+        nome="Parafuso Sextavado", codigo_barras="7891234567890", categoria=Categoria.objects.create(nome="Fixação")
+    )
+    c = Client()
+    c.login(username="busca", password="x")  # noqa: S106
+    session = c.session
+    session["tenant_id"] = tenant.id
+    session.save()
+
+    resp = c.get(reverse("clientes:api_cliente_search"), {"q": "555.555"})
+    assert [r["id"] for r in resp.json()["results"]] == [alvo.pk]
+    resp = c.get(reverse("clientes:clientes_list"), {"search": "fernanda"})
+    assert list(resp.context["clientes"]) == [alvo]
+    resp = c.get(reverse("produtos:produtos_search_ajax"), {"term": "78912345"})
+    assert [r["id"] for r in resp.json()] == [produto.pk]
+
+
+@pytest.mark.django_db
+def test_indice_vazio_cai_para_icontains():
+    tenant = Tenant.objects.create(nome="T", schema_name="t_fallback")
+    cli = _cliente_pf(tenant, "Beatriz Nunes", "888.888.888-88", "bia@ex.com")
+    SearchDocument.objects.all().delete()
+
+    assert search_index.search_ids(Cliente, "Nunes", tenant=tenant) == [cli.pk]
+    assert list(search_index.filter_queryset(Cliente.objects.all(), "888.888")) == [cli]
+    assert search_index.search_ids(Cliente, "Nunes", tenant=tenant, within=Cliente.objects.none()) == []
+
+
+@pytest.mark.django_db
+def test_autocomplete_descarta_inativos_antes_do_limite():
+    categoria = Categoria.objects.create(nome="Autocomplete")
+    for i in range(12):
+        Produto.objects.create(nome=f"Arruela {i:02d}", categoria=categoria, ativo=False)
+    ativo = Produto.objects.create(nome="Arruela Lisa", categoria=categoria)
+
+    ids = search_index.search_ids(Produto, "arruela", limit=10, within=Produto.objects.filter(ativo=True))
+    assert ids == [ativo.pk]
+
+
+@pytest.mark.django_db
+def test_busca_com_indice_usa_uma_consulta(django_assert_num_queries):
+    tenant = Tenant.objects.create(nome="T", schema_name="t_uma_consulta")
+    cli = _cliente_pf(tenant, "Helena Prado", "999.999.999-99", "helena@ex.com")
+
+    with django_assert_num_queries(1):  # sem o exists() do fallback
+        assert search_index.search_ids(Cliente, "helena", tenant=tenant) == [cli.pk]
+    with django_assert_num_queries(1):
+        assert list(search_index.filter_queryset(Cliente.objects.all(), "helena", tenant=tenant)) == [cli]
@@ -0,0 +1,139 @@
+"""Métricas do wizard via sketches: quantis locais e consolidação entre workers."""
+
+import pytest
+
+from core.services import wizard_metrics as wm
+from shared.metrics.sketch import LatencySketch
+
+
+class _FakeRedis:
+    """Subconjunto mínimo de comandos Redis usados pelo flush/leitura (teste de infra)."""
+
+    def __init__(self):
+        self.hashes: dict[str, dict[str, float]] = {}
+        self.zsets: dict[str, dict[str, float]] = {}
+        self.lists: dict[str, list[str]] = {}
+        self._ops: list = []
+
+    def pipeline(self, transaction=False):
+        self._ops = []
+        return self
+
+    def _h(self, key):
+        return self.hashes.setdefault(key, {})
+
+    def hincrby(self, key, field, n):
+        self._ops.append(lambda: self._h(key).__setitem__(str(field), self._h(key).get(str(field), 0) + int(n)))
+
+    def hincrbyfloat(self, key, field, n):
+        self._ops.append(lambda: self._h(key).__setitem__(str(field), self._h(key).get(str(field), 0.0) + float(n)))
+
+    def zadd(self, key, mapping, gt=False):
+        def op():
+            zset = self.zsets.setdefault(key, {})
+            for member, score in mapping.items():
+                if not gt or score > zset.get(member, float("-inf")):
+                    zset[member] = score
+
+        self._ops.append(op)
+
+    def expire(self, key, seconds):
+        self._ops.append(lambda: seconds)
+
+    def lpush(self, key, *values):
+        self._ops.append(lambda: [self.lists.setdefault(key, []).insert(0, v) for v in values])
+
+    def ltrim(self, key, start, end):
+        self._ops.append(lambda: self.lists.__setitem__(key, self.lists.get(key, [])[start : end + 1]))
+
+    def hgetall(self, key):
+        self._ops.append(lambda: dict(self.hashes.get(key, {})))
+
+    def zrange(self, key, start, end, withscores=False):
+        self._ops.append(lambda: list(self.zsets.get(key, {}).items()))
+
+    def lrange(self, key, start, end):
+        self._ops.append(lambda: list(self.lists.get(key, []))[start : end + 1])
+
+    def execute(self):
+        ops, self._ops = self._ops, []
+        return [op() for op in ops]
+
+    def delete(self, *keys):
+        for key in keys:
+            self.hashes.pop(key, None)
+            self.zsets.pop(key, None)
+            self.lists.pop(key, None)
+
+
+@pytest.fixture
+def metrics():
+    wm.reset_all_metrics()
+    yield wm
+    wm.reset_all_metrics()
+
+
+def test_snapshot_quantis_locais_sem_redis(metrics):
+    for ms in range(1, 1001):
+        metrics.record_finish_latency(ms / 1000, outcome="success")
+    lat = metrics.snapshot_metrics()["latency"]
+    assert lat["count"] == 1000
+    assert lat["max"] == pytest.approx(1.0)
+    # erro relativo limitado pela precisão do sketch (2%)
+    assert lat["p50"] == pytest.approx(0.5, rel=0.03)
+    assert lat["p99"] == pytest.approx(0.99, rel=0.03)
+
+
+def test_snapshot_consolida_workers_via_redis(metrics, monkeypatch):
+    fake = _FakeRedis()
+    monkeypatch.setattr(wm, "get_redis_client", lambda: fake)
+    # worker local: 100 finalizações rápidas
+    for _ in range(100):
+        metrics.inc_finish_success()
+        metrics.record_finish_latency(0.1, outcome="success")
+    assert metrics.flush_metrics() is True
+    # outro worker: deltas que nunca passaram pelo estado local deste processo
+    remote = LatencySketch()
+    remote.extend([2.0] * 100)
+    with wm._lock:
+        wm._pending_sketches[(wm._current_hour(), "latency")] = remote
+        wm._pending_counters["finish_exception"] = 100
+        wm._pending_errors.append({"ts": 0, "kind": "boom", "msg": "remoto"})
+
+    snap = metrics.snapshot_metrics()
+    assert snap["counters"]["finish_success"] == 100
+    assert snap["finish_exception"] == 100
+    assert snap["latency"]["count"] == 200
+    assert snap["latency"]["max"] == pytest.approx(2.0)
+    assert snap["latency"]["p99"] == pytest.approx(2.0, rel=0.03)
+    assert snap["latency_by_outcome"]["success"]["count"] == 100
+    assert [e["kind"] for e in snap["last_errors"]] == ["boom"]
+
+    metrics.reset_all_metrics()
+    assert not fake.hashes
+    assert not fake.lists
+
+
+@pytest.mark.parametrize("com_redis", [False, True])
+def test_quantis_usam_janela_recente(metrics, monkeypatch, settings, com_redis):
+    """Latências antigas saem da janela: o p95 (e o alerta) refletem só as horas recentes."""
+    settings.WIZARD_LATENCY_WINDOW_HOURS = 1
+    fake = _FakeRedis()
+    monkeypatch.setattr(wm, "get_redis_client", lambda: fake if com_redis else None)
+    hora = {"atual": 1_000}
+    monkeypatch.setattr(wm, "_current_hour", lambda: hora["atual"])
+
+    for _ in range(100):
+        metrics.record_finish_latency(5.0, outcome="success")
+    metrics.flush_metrics()
+    hora["atual"] += 1
+    for _ in range(100):
+        metrics.record_finish_latency(0.1, outcome="success")
+    assert metrics.snapshot_metrics()["latency"]["count"] == 200  # hora anterior ainda na janela
+
+    hora["atual"] += 1
+    metrics.record_finish_latency(0.1, outcome="success")
+    lat = metrics.snapshot_metrics()["latency"]
+    assert lat["count"] == 101
+    assert lat["p95"] == pytest.approx(0.1, rel=0.03)
+    assert lat["max"] == pytest.approx(0.1)
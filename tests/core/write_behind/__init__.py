@@ -0,0 +1,3 @@
+"""Pacote de testes do write-behind (arquivo criado para evitar INP001)."""
+
+__all__: list[str] = []
@@ -0,0 +1,91 @@
+"""Testes do buffer write-behind (AuditLog + last_activity)."""
+
+from __future__ import annotations
+
+from datetime import timedelta
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.http import HttpResponse
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from core.middleware import AuditLogMiddleware
+from core.models import AuditLog, UserProfile
+from core.services import write_behind
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture(autouse=True)
+def _buffered(settings) -> None:
+    """Ativa o modo bufferizado (em testes o padrão é flush imediato)."""
+    settings.WRITE_BEHIND_IN_TESTS = True
+    settings.WRITE_BEHIND_FLUSH_SECONDS = 3600
+    settings.WRITE_BEHIND_MAX_BUFFER = 1000
+    settings.USER_ACTIVITY_RESOLUTION_SECONDS = 60
+    write_behind.reset()
+
+
+def test_audit_entries_buffered_then_bulk_inserted() -> None:
+    """Entradas ficam no buffer e entram com um único bulk_create."""
+    user = get_user_model().objects.create_user("wb_audit", password="x")
+    for i in range(5):
+        write_behind.enqueue_audit(user_id=user.pk, action_type="CREATE", change_message=f"m{i}")
+    assert AuditLog.objects.count() == 0
+    assert write_behind.stats()["audit_pending"] == 5
+
+    with CaptureQueriesContext(connection) as ctx:
+        written = write_behind.flush()
+    assert written["audit"] == 5
+    inserts = [q for q in ctx.captured_queries if q["sql"].startswith("INSERT")]
+    assert len(inserts) == 1, "esperado um único INSERT em lote"
+    assert AuditLog.objects.filter(user=user).count() == 5
+    assert write_behind.stats()["audit_flushed"] == 5
+
+
+def test_last_activity_throttled_and_single_update() -> None:
+    """Toques repetidos são limitados à resolução; flush usa um UPDATE só."""
+    users = [get_user_model().objects.create_user(f"wb_act{i}", password="x") for i in range(3)]
+    UserProfile.objects.bulk_create([UserProfile(user=u) for u in users])
+    now = timezone.now()
+    for u in users:
+        assert write_behind.touch_last_activity(u.pk, now) is True
+    assert write_behind.touch_last_activity(users[0].pk, now + timedelta(seconds=1)) is False
+
+    with CaptureQueriesContext(connection) as ctx:
+        write_behind.flush()
+    updates = [q for q in ctx.captured_queries if q["sql"].startswith("UPDATE")]
+    assert len(updates) == 1
+    stored = set(UserProfile.objects.filter(user__in=users).values_list("last_activity", flat=True))
+    assert stored == {now}
+    stats = write_behind.stats()
+    assert stats["activity_flushed"] == 3
+    assert stats["activity_throttled"] == 1
+
+
+def test_buffer_size_triggers_flush(settings) -> None:
+    """Atingir WRITE_BEHIND_MAX_BUFFER força o flush sem esperar o intervalo."""
+    settings.WRITE_BEHIND_MAX_BUFFER = 3
+    for _ in range(3):
+        write_behind.enqueue_audit(action_type="OTHER", change_message="x")
+    assert AuditLog.objects.count() == 3
+    assert write_behind.stats()["audit_pending"] == 0
+
+
+def test_middleware_enqueues_audit(rf) -> None:
+    """POST autenticado passa pelo buffer e é gravado após flush."""
+    user = get_user_model().objects.create_user("wb_mw", password="x", is_superuser=True)
+    request = rf.post("/core/tenant-select/", {})
+    request.user = user
+    middleware = AuditLogMiddleware(lambda _req: HttpResponse(status=200))
+    before = AuditLog.objects.filter(user=user).count()
+
+    middleware(request)
+    assert write_behind.stats()["audit_pending"] == 1
+    assert AuditLog.objects.filter(user=user).count() == before
+
+    assert write_behind.flush()["audit"] == 1
+    assert AuditLog.objects.filter(user=user).count() == before + 1
+    assert write_behind.stats()["audit_pending"] == 0
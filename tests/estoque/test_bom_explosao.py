@@ -0,0 +1,103 @@
+"""Explosão multinível de BOM: CTE recursiva, perdas, ciclos, consumo em lote e disponibilidade."""
+
+from decimal import Decimal
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from estoque.models import Deposito, EstoqueSaldo, LogAuditoriaEstoque, MovimentoEstoque
+from estoque.services import bom_explosao
+from estoque.services.bom import consumir_bom
+from produtos.models import Categoria, Produto, ProdutoBOMItem
+from shared.exceptions import NegocioError, SaldoInsuficienteError
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def estrutura():
+    """Final -> 2x SubA (perda 10%) + 1x C;  SubA -> 3x D + 0.5x C."""
+    cache.clear()
+    categoria = Categoria.objects.create(nome="BOM")
+    final, sub_a, c, d = (Produto.objects.create(nome=n, categoria=categoria) for n in ("Final", "SubA", "C", "D"))
+    ProdutoBOMItem.objects.create(produto_pai=final, componente=sub_a, quantidade_por_unidade=2, perda_perc=10)
+    ProdutoBOMItem.objects.create(produto_pai=final, componente=c, quantidade_por_unidade=1)
+    ProdutoBOMItem.objects.create(produto_pai=sub_a, componente=d, quantidade_por_unidade=3)
+    ProdutoBOMItem.objects.create(produto_pai=sub_a, componente=c, quantidade_por_unidade=Decimal("0.5"))
+    deposito = Deposito.objects.create(codigo="BOM", nome="BOM")
+    return final, sub_a, c, d, deposito
+
+
+def test_explosao_agrega_folhas_com_perda_em_todos_os_niveis(estrutura):
+    final, _sub_a, c, d, _dep = estrutura
+    assert bom_explosao.explodir(final) == {d.id: Decimal("6.6"), c.id: Decimal("2.1")}
+
+
+def test_ciclo_e_detectado(estrutura):
+    final, sub_a, _c, d, _dep = estrutura
+    ProdutoBOMItem.objects.create(produto_pai=d, componente=sub_a, quantidade_por_unidade=1)
+    with pytest.raises(NegocioError, match="Ciclo"):
+        bom_explosao.explodir(final)
+
+
+def test_consumo_em_lote_baixa_folhas(estrutura):
+    final, sub_a, c, d, deposito = estrutura
+    EstoqueSaldo.objects.create(produto=c, deposito=deposito, quantidade=10)
+    EstoqueSaldo.objects.create(produto=d, deposito=deposito, quantidade=20)
+    user = get_user_model().objects.create_user("bom_user", password="x")
+
+    with CaptureQueriesContext(connection) as ctx:
+        movimentos = consumir_bom(final, deposito, Decimal("2"), user)
+
+    updates = [q for q in ctx.captured_queries if q["sql"].startswith('UPDATE "estoque_estoquesaldo"')]
+    assert len(updates) == 1  # bulk_update único para todas as folhas
+    assert {m.produto_id: m.quantidade for m in movimentos} == {c.id: Decimal("4.2"), d.id: Decimal("13.2")}
+    assert EstoqueSaldo.objects.get(produto=c).quantidade == Decimal("5.8")
+    assert EstoqueSaldo.objects.get(produto=d).quantidade == Decimal("6.8")
+    assert not EstoqueSaldo.objects.filter(produto=sub_a).exists()  # intermediário não é baixado
+
+
+def test_consumo_em_lote_gera_auditoria_encadeada(estrutura):
+    final, _sub_a, c, d, deposito = estrutura
+    EstoqueSaldo.objects.create(produto=c, deposito=deposito, quantidade=10)
+    EstoqueSaldo.objects.create(produto=d, deposito=deposito, quantidade=20)
+    antes = LogAuditoriaEstoque.objects.count()
+    anterior = LogAuditoriaEstoque.objects.order_by("-id").values_list("hash_atual", flat=True).first()
+
+    movimentos = consumir_bom(final, deposito, Decimal("2"), None)
+
+    logs = list(LogAuditoriaEstoque.objects.order_by("id")[antes:])
+    assert len(logs) == len(movimentos) == 2
+    assert [log.movimento_id for log in logs] == [m.id for m in movimentos]
+    assert logs[0].hash_previo == anterior and logs[1].hash_previo == logs[0].hash_atual
+    assert {Decimal(log.snapshot_depois["saldo_atual"]) for log in logs} == {Decimal("5.8"), Decimal("6.8")}
+
+
+def test_consumo_tudo_ou_nada(estrutura):
+    final, _sub_a, c, d, deposito = estrutura
+    EstoqueSaldo.objects.create(produto=c, deposito=deposito, quantidade=100)
+    EstoqueSaldo.objects.create(produto=d, deposito=deposito, quantidade=1)
+    with pytest.raises(SaldoInsuficienteError):
+        consumir_bom(final, deposito, Decimal("1"), None)
+    assert EstoqueSaldo.objects.get(produto=c).quantidade == 100
+    assert not MovimentoEstoque.objects.filter(tipo="CONSUMO_BOM").exists()
+
+
+def test_disponibilidade_usa_explosao_em_cache(estrutura):
+    final, sub_a, c, d, deposito = estrutura
+    EstoqueSaldo.objects.create(produto=c, deposito=deposito, quantidade=21, reservado=0)
+    EstoqueSaldo.objects.create(produto=d, deposito=deposito, quantidade=40, reservado=7)
+
+    resultado = bom_explosao.disponibilidade(final, deposito, 6)
+    assert (resultado.possivel, resultado.maximo) == (False, 5)  # D: 33 livres / 6.6 = 5
+    assert resultado.faltas == {d.id: Decimal("6.6")}
+
+    with CaptureQueriesContext(connection) as ctx:
+        assert bom_explosao.disponibilidade(final, deposito, 5).possivel
+    assert len(ctx.captured_queries) == 1  # só os saldos; explosão veio do cache
+
+    ProdutoBOMItem.objects.filter(produto_pai=sub_a, componente=d).get().delete()  # invalida via sinal
+    assert d.id not in bom_explosao.explodir(final)
@@ -0,0 +1,113 @@
+"""Forecast de reabastecimento: Holt-Winters vetorizado, ponto de pedido, MAPE e broadcast único."""
+
+from datetime import timedelta
+from decimal import Decimal
+
+import numpy as np
+import pytest
+from django.utils import timezone
+
+from core.models import Tenant
+from estoque.models import Deposito, EstoqueSaldo, MovimentoEstoque, RegraReabastecimento
+from estoque.services import forecast, reabastecimento
+from estoque.services.reabastecimento import avaliar_regras_para_saldo
+from estoque.tasks import atualizar_forecast_reabastecimento
+from produtos.models import Categoria, Produto
+
+SEMANA = np.array([10, 12, 14, 12, 10, 4, 2], dtype=float)
+
+
+def test_holt_winters_recupera_sazonalidade_semanal():
+    serie = np.vstack([np.tile(SEMANA, 12), np.tile(SEMANA * 3, 12)])
+    previsao = forecast.holt_winters(serie, horizonte=7)
+    assert previsao.futuro.shape == (2, 7)
+    np.testing.assert_allclose(previsao.futuro[0], SEMANA, rtol=0.05)
+    np.testing.assert_allclose(previsao.futuro[1], SEMANA * 3, rtol=0.05)
+    assert (previsao.mape < 2).all()
+
+
+def test_holt_winters_serie_sem_demanda():
+    previsao = forecast.holt_winters(np.zeros((1, 30)), horizonte=5)
+    assert np.isnan(previsao.mape[0])
+    assert previsao.futuro.sum() == 0
+
+
+@pytest.fixture
+def cenario(db):
+    tenant = Tenant.objects.create(name="Forecast", subdomain="forecast")
+    categoria = Categoria.objects.create(nome="Forecast")
+    deposito = Deposito.objects.create(codigo="FC1", nome="Forecast", tenant=tenant)
+    agora = timezone.now()
+    produtos = []
+    for i, escala in enumerate((1, 2)):
+        produto = Produto.objects.create(nome=f"Forecast {i}", categoria=categoria)
+        movimentos = MovimentoEstoque.objects.bulk_create(
+            MovimentoEstoque(
+                produto=produto,
+                tenant=tenant,
+                deposito_origem=deposito,
+                tipo="SAIDA",
+                quantidade=Decimal(int(SEMANA[d % 7] * escala)),
+            )
+            for d in range(56)
+        )
+        for d, mov in enumerate(movimentos):  # criado_em é auto_now_add
+            MovimentoEstoque.objects.filter(pk=mov.pk).update(criado_em=agora - timedelta(days=56 - d))
+        produtos.append(produto)
+    return tenant, deposito, produtos, agora
+
+
+def test_executar_forecast_grava_metricas_e_emite_um_broadcast(cenario, monkeypatch, settings):
+    settings.ESTOQUE_FORECAST_HISTORICO_DIAS = 56
+    tenant, deposito, (p1, p2), agora = cenario
+    r1 = RegraReabastecimento.objects.create(
+        produto=p1, tenant=tenant, deposito=deposito, estoque_min=1, lead_time_dias=7, estrategia="FORECAST"
+    )
+    RegraReabastecimento.objects.create(
+        produto=p2, tenant=tenant, deposito=deposito, estoque_min=5, lead_time_dias=3, estrategia="FIXO"
+    )
+    EstoqueSaldo.objects.create(produto=p1, deposito=deposito, tenant=tenant, quantidade=30)
+    EstoqueSaldo.objects.create(produto=p2, deposito=deposito, tenant=tenant, quantidade=2)
+    enviados = []
+    monkeypatch.setattr(forecast, "_broadcast", enviados.append)
+
+    resultado = forecast.executar_forecast(tenant.id, agora=agora)
+
+    r1.refresh_from_db()
+    demanda_semana = Decimal(int(SEMANA.sum()))
+    assert r1.forecast_em is not None
+    assert r1.mape is not None and r1.mape < 5
+    assert demanda_semana <= r1.ponto_pedido <= demanda_semana + r1.estoque_seguranca + 5
+    assert r1.demanda_diaria_prevista == pytest.approx(Decimal(int(SEMANA.sum())) / 7, abs=Decimal("0.5"))
+    assert len(enviados) == 1
+    assert {i["produto_id"] for i in enviados[0]["itens"]} == {p1.id, p2.id}
+    assert resultado.regras == 2
+    assert resultado.mape_medio is not None
+
+
+def test_saldo_individual_usa_ponto_de_pedido_do_forecast(cenario, monkeypatch):
+    tenant, deposito, (p1, _), _agora = cenario
+    monkeypatch.setattr(reabastecimento, "_broadcast", lambda payload: None)
+    RegraReabastecimento.objects.create(
+        produto=p1,
+        tenant=tenant,
+        deposito=deposito,
+        estoque_min=1,
+        estrategia="FORECAST",
+        ponto_pedido=Decimal("50"),
+        estoque_max=Decimal("120"),
+    )
+    saldo = EstoqueSaldo.objects.create(produto=p1, deposito=deposito, tenant=tenant, quantidade=40)
+    payload = avaliar_regras_para_saldo(saldo)
+    assert Decimal(payload["ponto_pedido"]) == Decimal(50)
+    assert Decimal(payload["quantidade_sugerida"]) == Decimal(80)
+
+
+def test_task_percorre_tenants(cenario, monkeypatch):
+    tenant, deposito, (p1, _), _agora = cenario
+    monkeypatch.setattr(forecast, "_broadcast", lambda payload: None)
+    RegraReabastecimento.objects.create(
+        produto=p1, tenant=tenant, deposito=deposito, estoque_min=1, lead_time_dias=2, estrategia="FORECAST"
+    )
+    resumo = atualizar_forecast_reabastecimento()
+    assert resumo[str(tenant.id)]["regras"] == 1
@@ -0,0 +1,163 @@
+"""Expiração de reservas em lote: blocos keyset, um UPDATE por saldo, movimentos em bulk, time wheel."""
+
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from estoque.models import Deposito, EstoqueSaldo, LogAuditoriaEstoque, MovimentoEstoque, ReservaEstoque
+from estoque.services import expiracao_reservas
+from estoque.services.reservas import ReservaService
+from estoque.tasks import expirar_reservas_slot
+from produtos.models import Categoria, Produto
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def estoque():
+    categoria = Categoria.objects.create(nome="Reservas")
+    deposito = Deposito.objects.create(codigo="RSV", nome="Reservas")
+    produtos = [Produto.objects.create(nome=f"Reserva {i}", categoria=categoria) for i in range(2)]
+    saldos = [EstoqueSaldo.objects.create(produto=p, deposito=deposito, quantidade=100, reservado=50) for p in produtos]
+    return deposito, produtos, saldos
+
+
+def _reserva(produto, deposito, qtd, expira_em, status="ATIVA"):
+    return ReservaEstoque.objects.create(
+        produto=produto,
+        deposito=deposito,
+        quantidade=Decimal(qtd),
+        origem_tipo="PEDIDO",
+        expira_em=expira_em,
+        status=status,
+    )
+
+
+def test_expira_em_blocos_agregando_saldos(estoque):
+    deposito, (p1, p2), (s1, s2) = estoque
+    agora = timezone.now()
+    vencidas = [_reserva(p1 if i % 2 else p2, deposito, i + 1, agora - timedelta(minutes=10 - i)) for i in range(7)]
+    futura = _reserva(p1, deposito, 5, agora + timedelta(hours=1))
+    cancelada = _reserva(p1, deposito, 5, agora - timedelta(hours=1), status="CANCELADA")
+
+    with CaptureQueriesContext(connection) as ctx:
+        resultado = expiracao_reservas.expirar_vencidas(agora, bloco=3)
+
+    assert resultado.reservas == 7
+    assert resultado.blocos == 3
+    assert sorted(resultado.ids) == sorted(r.id for r in vencidas)
+    updates_saldo = [q for q in ctx.captured_queries if q["sql"].startswith('UPDATE "estoque_estoquesaldo"')]
+    assert len(updates_saldo) == resultado.saldos <= 2 * resultado.blocos
+
+    s1.refresh_from_db()
+    s2.refresh_from_db()
+    assert s1.reservado == Decimal(50 - (2 + 4 + 6))
+    assert s2.reservado == Decimal(50 - (1 + 3 + 5 + 7))
+    assert MovimentoEstoque.objects.filter(tipo="LIB_RESERVA").count() == 7
+    futura.refresh_from_db()
+    cancelada.refresh_from_db()
+    assert (futura.status, cancelada.status) == ("ATIVA", "CANCELADA")
+
+
+def test_reservado_nao_fica_negativo(estoque):
+    deposito, (p1, _), (s1, _) = estoque
+    _reserva(p1, deposito, 80, timezone.now() - timedelta(minutes=1))
+    expiracao_reservas.expirar_vencidas()
+    s1.refresh_from_db()
+    assert s1.reservado == 0
+
+
+def test_processar_expiracoes_automaticas_delega_ao_lote(estoque):
+    deposito, (p1, _), _ = estoque
+    _reserva(p1, deposito, 1, timezone.now() - timedelta(minutes=1))
+    assert ReservaService.processar_expiracoes_automaticas()["total_processadas"] == 1
+
+
+def test_time_wheel_agenda_uma_task_por_slot(settings, monkeypatch):
+    settings.CELERY_TASK_ALWAYS_EAGER = False
+    settings.ESTOQUE_RESERVA_SLOT_SEGUNDOS = 60
+    cache.clear()
+    agendadas = []
+    monkeypatch.setattr(expirar_reservas_slot, "apply_async", lambda args, eta: agendadas.append((args, eta)))
+    base = timezone.now().replace(second=0, microsecond=0) + timedelta(minutes=5)
+
+    assert expiracao_reservas.agendar_expiracao(base + timedelta(seconds=10))
+    assert not expiracao_reservas.agendar_expiracao(base + timedelta(seconds=50))  # mesmo slot
+    assert expiracao_reservas.agendar_expiracao(base + timedelta(seconds=70))
+
+    assert len(agendadas) == 2
+    (args, eta), _ = agendadas
+    assert args == [expiracao_reservas.slot_de(base + timedelta(seconds=10))]
+    assert eta == base + timedelta(minutes=1)
+
+
+def test_expiracao_em_lote_audita_e_marca_cancelada_em(estoque):
+    deposito, (p1, p2), _ = estoque
+    agora = timezone.now()
+    reservas = [_reserva(p, deposito, 1, agora - timedelta(minutes=1)) for p in (p1, p2, p1)]
+    logs_antes = LogAuditoriaEstoque.objects.count()
+
+    expiracao_reservas.expirar_vencidas(agora, bloco=2)
+
+    logs = list(LogAuditoriaEstoque.objects.order_by("id")[logs_antes:])
+    assert len(logs) == 3
+    assert {log.tipo_especial for log in logs} == {"RESERVA_EXPIRADA"}
+    assert {log.movimento.solicitante_id for log in logs} == {str(r.id) for r in reservas}
+    assert all(atual.hash_previo == anterior.hash_atual for anterior, atual in zip(logs, logs[1:], strict=False))
+    assert set(
+        ReservaEstoque.objects.filter(id__in=[r.id for r in reservas]).values_list("cancelada_em", flat=True)
+    ) == {agora}
+
+
+def test_falha_no_broker_libera_slot(settings, monkeypatch):
+    settings.CELERY_TASK_ALWAYS_EAGER = False
+    cache.clear()
+
+    def _broker_fora(**kwargs):
+        raise ConnectionError("broker indisponível")
+
+    monkeypatch.setattr(expirar_reservas_slot, "apply_async", _broker_fora)
+    expira_em = timezone.now() + timedelta(minutes=5)
+
+    assert not expiracao_reservas.agendar_expiracao(expira_em)
+    slot = expiracao_reservas.slot_de(expira_em)
+    assert cache.get(expiracao_reservas._CHAVE_SLOT.format(slot=slot)) is None
+
+    agendadas = []
+    monkeypatch.setattr(expirar_reservas_slot, "apply_async", lambda args, eta: agendadas.append(args))
+    assert expiracao_reservas.agendar_expiracao(expira_em)  # próxima reserva do slot reagenda
+    assert agendadas == [[slot]]
+
+
+def test_time_wheel_agenda_so_dentro_do_horizonte(estoque, settings, monkeypatch):
+    deposito, (p1, p2), _ = estoque
+    settings.CELERY_TASK_ALWAYS_EAGER = False
+    settings.ESTOQUE_RESERVA_SLOT_SEGUNDOS = 60
+    settings.ESTOQUE_RESERVA_HORIZONTE_SEGUNDOS = 3600
+    cache.clear()
+    agendadas = []
+    monkeypatch.setattr(expirar_reservas_slot, "apply_async", lambda args, eta: agendadas.append(args[0]))
+    agora = timezone.now()
+    distante = agora + timedelta(days=7)
+
+    assert not expiracao_reservas.agendar_expiracao(distante, agora=agora)  # sem ETA de dias no broker
+    assert agendadas == []
+
+    _reserva(p1, deposito, 1, agora + timedelta(minutes=10))
+    _reserva(p2, deposito, 1, agora + timedelta(minutes=10))  # mesmo slot
+    _reserva(p1, deposito, 1, agora + timedelta(minutes=50))
+    _reserva(p1, deposito, 1, distante)
+    assert expiracao_reservas.agendar_proximos_slots(agora) == 2
+    assert sorted(agendadas) == [
+        expiracao_reservas.slot_de(agora + timedelta(minutes=10)),
+        expiracao_reservas.slot_de(agora + timedelta(minutes=50)),
+    ]
+
+    # a varredura de uma semana depois agenda o slot que entrou no horizonte
+    assert expiracao_reservas.agendar_proximos_slots(distante - timedelta(minutes=30)) == 1
+    assert agendadas[-1] == expiracao_reservas.slot_de(distante)
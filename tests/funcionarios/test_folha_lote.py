@@ -0,0 +1,125 @@
+"""Folha em lote: paridade com as calculadoras Decimal, consulta única e snapshot."""
+
+import random
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core.models import Tenant
+from funcionarios.api import BeneficioViewSet
+from funcionarios.models import FolhaPagamento, Funcionario, SalarioHistorico
+from funcionarios.services import folha
+from funcionarios.utils import CalculadoraFGTS, CalculadoraINSS, CalculadoraIRRF
+
+
+def _funcionario(tenant, cpf, salario, dependentes=0):
+    return Funcionario.objects.create(
+        tenant=tenant,
+        nome_completo=f"Funcionário {cpf}",
+        cpf=cpf,
+        data_nascimento=date(1990, 1, 1),
+        sexo="M",
+        data_admissao=date(2020, 1, 1),
+        cargo="Analista",
+        salario_base=Decimal(salario),
+        numero_dependentes=dependentes,
+    )
+
+
+def _salarios_teste():
+    bordas = []
+    for faixa in CalculadoraINSS.FAIXAS_INSS + CalculadoraIRRF.FAIXAS_IRRF:
+        for limite in (faixa["min"], faixa["max"]):
+            if limite < Decimal("999999"):
+                bordas += [limite - Decimal("0.01"), limite, limite + Decimal("0.01")]
+    bordas += [Decimal("0.00"), Decimal("0.01"), CalculadoraINSS.TETO_INSS, Decimal("50000.00")]
+    rnd = random.Random(31)  # noqa: S311 - dados de teste
+    aleatorios = [Decimal(rnd.randint(1, 3_000_000)).scaleb(-2) for _ in range(2000)]
+    return bordas + aleatorios
+
+
+def test_calcular_lote_identico_as_calculadoras():
+    salarios = _salarios_teste()
+    dependentes = [i % 4 for i in range(len(salarios))]
+    linhas = folha.calcular_lote(salarios, dependentes)
+    for salario, dep, linha in zip(salarios, dependentes, linhas, strict=True):
+        esperado = {
+            "inss": CalculadoraINSS.calcular(salario),
+            "fgts": CalculadoraFGTS.calcular(salario),
+            "irrf": CalculadoraIRRF.calcular(salario, dep),
+        }
+        assert linha.como_calculadoras() == esperado, salario
+        assert linha.salario_liquido == salario - esperado["inss"]["valor_desconto"] - esperado["irrf"]["valor_irrf"]
+
+
+@pytest.mark.django_db
+def test_salarios_atuais_ultima_vigencia_em_uma_consulta(django_assert_num_queries):
+    tenant = Tenant.objects.create(nome="T", schema_name="t_folha_sal")
+    a = _funcionario(tenant, "111", "2000.00")
+    b = _funcionario(tenant, "222", "3000.00")
+    for vigencia, valor in ((date(2024, 1, 1), "2100.00"), (date(2024, 6, 1), "2500.00")):
+        SalarioHistorico.objects.create(tenant=tenant, funcionario=a, data_vigencia=vigencia, valor_salario=valor)
+
+    with django_assert_num_queries(1):
+        atuais = folha.salarios_atuais([a.pk, b.pk])
+    assert atuais == {a.pk: Decimal("2500.00")}
+    assert folha.salarios_atuais([a.pk], ate=date(2024, 3, 31)) == {a.pk: Decimal("2100.00")}
+
+
+@pytest.mark.django_db
+def test_gerar_snapshot_idempotente_com_totais():
+    tenant = Tenant.objects.create(nome="T", schema_name="t_folha_snap")
+    a = _funcionario(tenant, "111", "2000.00", dependentes=1)
+    b = _funcionario(tenant, "222", "8000.00")
+    SalarioHistorico.objects.create(
+        tenant=tenant, funcionario=b, data_vigencia=date(2024, 2, 1), valor_salario=Decimal("9000.00")
+    )
+
+    primeira = folha.gerar_snapshot(tenant, date(2024, 3, 15))
+    segunda = folha.gerar_snapshot(tenant, date(2024, 3, 1))
+
+    assert primeira.pk == segunda.pk
+    assert FolhaPagamento.objects.filter(tenant=tenant).count() == 1
+    assert segunda.competencia == date(2024, 3, 1)
+    itens = {item.funcionario_id: item for item in segunda.itens.all()}
+    assert set(itens) == {a.pk, b.pk}
+    assert itens[b.pk].salario_base == Decimal("9000.00")
+    assert itens[b.pk].inss == CalculadoraINSS.calcular(Decimal("9000.00"))["valor_desconto"]
+    assert segunda.quantidade_funcionarios == 2
+    assert segunda.total_bruto == Decimal("11000.00")
+    assert segunda.total_liquido == sum(i.salario_liquido for i in itens.values())
+    assert segunda.total_fgts == sum(i.fgts for i in itens.values())
+
+
+@pytest.mark.django_db
+def test_comando_calcular_folha_snapshot():
+    tenant = Tenant.objects.create(nome="T", schema_name="t_folha_cmd")
+    _funcionario(tenant, "111", "4000.00")
+    call_command("calcular_folha", "--mes", "5", "--ano", "2024", "--tenant-id", str(tenant.pk), "--snapshot")
+    snap = FolhaPagamento.objects.get(tenant=tenant, competencia=date(2024, 5, 1))
+    assert snap.total_bruto == Decimal("4000.00")
+
+
+@pytest.mark.django_db
+def test_endpoint_calcular_folha_usa_salario_atual():
+    """O endpoint mantém get_salario_atual: vigência posterior ao mês pedido também vale."""
+    tenant = Tenant.objects.create(nome="T", schema_name="t_folha_api")
+    user = get_user_model().objects.create_user("folha_api", password="x")
+    user.tenant = tenant
+    a = _funcionario(tenant, "111", "2000.00")
+    SalarioHistorico.objects.create(
+        tenant=tenant, funcionario=a, data_vigencia=date(2024, 6, 1), valor_salario=Decimal("2500.00")
+    )
+
+    request = APIRequestFactory().post("/", {"mes": 3, "ano": 2024}, format="json")
+    force_authenticate(request, user=user)
+    response = BeneficioViewSet.as_view({"post": "calcular_folha"})(request)
+
+    assert response.status_code == 200
+    (linha,) = response.data["funcionarios"]
+    assert linha["salario_base"] == a.get_salario_atual() == Decimal("2500.00")
+    assert linha["inss"] == CalculadoraINSS.calcular(Decimal("2500.00"))
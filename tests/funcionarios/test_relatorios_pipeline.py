@@ -0,0 +1,173 @@
+"""Pipeline de relatórios PDF em background: seções em pool, deduplicação e link expirável."""
+
+import multiprocessing
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from io import BytesIO
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+from pypdf import PdfReader
+
+from core.models import Tenant, TenantUser
+from funcionarios import tasks
+from funcionarios.models import CartaoPonto, Funcionario, RelatorioJob
+from funcionarios.services import relatorios
+
+User = get_user_model()
+
+
+@pytest.fixture(autouse=True)
+def _media(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    settings.FUNCIONARIOS_RELATORIOS_WORKERS = 1
+
+
+def _funcionario(tenant, idx, **extra):
+    return Funcionario.objects.create(
+        tenant=tenant,
+        nome_completo=f"Funcionário {idx:03d}",
+        cpf=f"{idx:011d}",
+        data_nascimento=date(1990, 1, 1),
+        sexo="F",
+        data_admissao=extra.pop("data_admissao", date(2020, 1, 1)),
+        cargo="Operador",
+        salario_base=Decimal("3000.00"),
+        **extra,
+    )
+
+
+def _ponto(tenant, funcionario, dia, entrada, saida):
+    for hora, tipo in ((entrada, "ENTRADA"), (saida, "SAIDA")):
+        CartaoPonto.objects.create(
+            tenant=tenant,
+            funcionario=funcionario,
+            data_hora_registro=timezone.make_aware(datetime.combine(dia, hora)),
+            tipo_registro=tipo,
+        )
+
+
+def _texto(job):
+    with job.arquivo.open("rb") as fh:
+        reader = PdfReader(BytesIO(fh.read()))
+    return len(reader.pages), "\n".join(page.extract_text() for page in reader.pages)
+
+
+@pytest.mark.django_db
+def test_relatorio_ponto_secao_por_funcionario_em_pool():
+    tenant = Tenant.objects.create(nome="T", schema_name="t_rel_ponto")
+    a, b, _c = (_funcionario(tenant, i) for i in (1, 2, 3))
+    dia = date(2024, 3, 4)
+    _ponto(tenant, a, dia, datetime.min.time().replace(hour=8), datetime.min.time().replace(hour=18))
+    _ponto(tenant, b, dia, datetime.min.time().replace(hour=9), datetime.min.time().replace(hour=12))
+    job = RelatorioJob.objects.create(
+        tenant=tenant,
+        tipo="PONTO",
+        parametros={"data_inicio": "2024-03-01", "data_fim": "2024-03-31"},
+        chave="x",
+    )
+
+    job = relatorios.executar_relatorio(job.pk, workers=2)
+
+    assert job.status == "CONCLUIDO", job.erro
+    assert (job.total_secoes, job.secoes_concluidas, job.progresso) == (3, 3, 100)
+    paginas, texto = _texto(job)
+    assert paginas == 3
+    assert texto.index("Funcionário 001") < texto.index("Funcionário 002") < texto.index("Funcionário 003")
+    assert "Horas trabalhadas: 10.00h | Extras: 2.00h" in texto
+    assert "Horas trabalhadas: 3.00h" in texto
+
+
+@pytest.mark.django_db
+def test_worker_daemonico_renderiza_em_pool(monkeypatch):
+    """Worker Celery prefork é daemônico: o pool do billiard cria os filhos mesmo assim."""
+    tenant = Tenant.objects.create(nome="T", schema_name="t_rel_daemon")
+    _funcionario(tenant, 1)
+    _funcionario(tenant, 2)
+    job = RelatorioJob.objects.create(
+        tenant=tenant, tipo="PONTO", parametros={"data_inicio": "2024-03-01", "data_fim": "2024-03-31"}, chave="d"
+    )
+    monkeypatch.setitem(multiprocessing.current_process()._config, "daemon", True)  # noqa: SLF001
+
+    job = relatorios.executar_relatorio(job.pk, workers=2)
+
+    assert job.status == "CONCLUIDO", job.erro
+    assert job.secoes_concluidas == 2
+
+
+@pytest.mark.django_db
+def test_mao_obra_em_blocos_e_ferias_vencidas():
+    tenant = Tenant.objects.create(nome="T", schema_name="t_rel_blocos")
+    for i in range(relatorios.LINHAS_POR_SECAO + 5):
+        _funcionario(tenant, i, data_admissao=date.today() - timedelta(days=30))
+    _funcionario(tenant, 999, data_admissao=date(2015, 1, 1))
+
+    custos = relatorios.executar_relatorio(
+        RelatorioJob.objects.create(tenant=tenant, tipo="MAO_OBRA", chave="m").pk,
+    )
+    assert custos.status == "CONCLUIDO", custos.erro
+    assert custos.total_secoes == 2
+    _, texto = _texto(custos)
+    assert f"Total de Funcionários: {relatorios.LINHAS_POR_SECAO + 6}" in texto
+
+    ferias = relatorios.executar_relatorio(RelatorioJob.objects.create(tenant=tenant, tipo="FERIAS", chave="f").pk)
+    _, texto = _texto(ferias)
+    assert "Funcionário 999" in texto
+    assert "Funcionário 001" not in texto
+
+
+@pytest.mark.django_db
+def test_solicitar_deduplica_e_download_expira(django_capture_on_commit_callbacks, monkeypatch):
+    # executa a task no próprio processo (sem broker)
+    monkeypatch.setattr(tasks.gerar_relatorio_job, "delay", tasks.gerar_relatorio_job)
+    tenant = Tenant.objects.create(nome="T", schema_name="t_rel_dl")
+    outro = Tenant.objects.create(nome="O", schema_name="t_rel_dl_outro")
+    user = User.objects.create_user(username="rel", password="x")  # noqa: S106 - senha de teste
+    TenantUser.objects.create(user=user, tenant=tenant, is_tenant_admin=True)
+    _funcionario(tenant, 1)
+    client = Client()
+    client.login(username="rel", password="x")  # noqa: S106
+    session = client.session
+    session["tenant_id"] = tenant.id
+    session.save()
+    url = reverse("funcionarios:relatorio_solicitar", args=["ferias"])
+
+    with django_capture_on_commit_callbacks(execute=True) as callbacks:
+        resp = client.post(url)
+    assert resp.status_code == 202
+    assert resp.json()["novo"] is True
+    assert len(callbacks) == 1  # task enfileirada após o commit
+
+    segunda = client.post(url).json()
+    assert segunda["novo"] is False
+    assert segunda["id"] == resp.json()["id"]
+    status = client.get(segunda["status_url"]).json()
+    assert status["status"] == "CONCLUIDO"
+    assert status["progresso"] == 100
+
+    download = client.get(status["download_url"])
+    assert download.status_code == 200
+    assert b"".join(download.streaming_content).startswith(b"%PDF")
+
+    session = client.session
+    session["tenant_id"] = outro.id
+    session.save()
+    assert client.get(status["download_url"]).status_code == 404
+    session["tenant_id"] = tenant.id
+    session.save()
+
+    assert relatorios.expirar_relatorios(agora=timezone.now() + timedelta(days=2)) == 1
+    job = RelatorioJob.objects.get(pk=status["id"])
+    assert job.status == "EXPIRADO"
+    assert not job.arquivo
+    assert client.get(status["download_url"]).status_code == 404
+
+
+def test_chave_relatorio_estavel():
+    a = relatorios.chave_relatorio(1, "PONTO", {"data_inicio": "2024-01-01", "data_fim": "2024-01-31"})
+    b = relatorios.chave_relatorio(1, "PONTO", {"data_fim": "2024-01-31", "data_inicio": "2024-01-01"})
+    assert a == b
+    assert a != relatorios.chave_relatorio(2, "PONTO", {"data_inicio": "2024-01-01", "data_fim": "2024-01-31"})
@@ -0,0 +1,154 @@
+"""Cronograma da obra: CPM com FS/SS/FF e lag, calendário, recálculo incremental, ciclos e nivelamento."""
+
+from datetime import date
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from obras.api import ObraViewSet
+from obras.models import AlocacaoRecurso, CalendarioObra, DependenciaTarefa, Obra, RecursoObra, TarefaCronograma
+from obras.services import cronograma
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def obra():
+    obra = Obra.objects.create(
+        nome="Torre CPM",
+        endereco="Rua B",
+        cidade="Recife",
+        estado="PE",
+        cep="50000-000",
+        data_inicio=date(2026, 3, 2),  # segunda-feira
+        data_previsao_termino=date(2026, 12, 31),
+        valor_contrato=1,
+    )
+    CalendarioObra.objects.create(obra=obra, dias_uteis="12345", feriados=["2026-03-06"])
+    return obra
+
+
+@pytest.fixture
+def rede(obra):
+    """fundacao(3) -FS-> estrutura(4) -FS-> acabamento(2); fundacao -SS+1-> instalacoes(2) -FF-> acabamento."""
+    nomes = {"fundacao": 3, "estrutura": 4, "instalacoes": 2, "acabamento": 2}
+    t = {n: TarefaCronograma.objects.create(obra=obra, nome=n, duracao_dias=d) for n, d in nomes.items()}
+    for p, s, tipo, lag in [
+        ("fundacao", "estrutura", "FS", 0),
+        ("estrutura", "acabamento", "FS", 0),
+        ("fundacao", "instalacoes", "SS", 1),
+        ("instalacoes", "acabamento", "FF", 0),
+    ]:
+        DependenciaTarefa.objects.create(predecessora=t[p], sucessora=t[s], tipo=tipo, lag=lag)
+    cronograma.recalcular(obra)
+    for tarefa in t.values():
+        tarefa.refresh_from_db()
+    return t
+
+
+def test_cpm_com_calendario_e_tipos_de_vinculo(obra, rede):
+    fundacao, estrutura, instalacoes, acabamento = rede.values()
+    # 06/03 é feriado: fundação seg-qua (2-4), estrutura qui 5 + seg-qua (9-11)
+    assert (fundacao.inicio_cedo, fundacao.fim_cedo) == (date(2026, 3, 2), date(2026, 3, 4))
+    assert (estrutura.inicio_cedo, estrutura.fim_cedo) == (date(2026, 3, 5), date(2026, 3, 11))
+    assert (acabamento.inicio_cedo, acabamento.fim_cedo) == (date(2026, 3, 12), date(2026, 3, 13))
+    assert instalacoes.inicio_cedo == date(2026, 3, 3)
+    assert instalacoes.folga_total == 6  # FF: pode terminar junto com o acabamento
+    assert [t.critica for t in (fundacao, estrutura, instalacoes, acabamento)] == [True, True, False, True]
+
+
+def test_alteracao_recalcula_so_o_subgrafo_afetado(obra, rede):
+    instalacoes = rede["instalacoes"]
+    with CaptureQueriesContext(connection) as ctx:
+        resultado = cronograma.aplicar_alteracoes(obra, tarefas=[{"id": instalacoes.pk, "duracao_dias": 4}])
+    updates = [q for q in ctx.captured_queries if 'UPDATE "obras_tarefacronograma"' in q["sql"]]
+    assert resultado.atualizadas == 1  # só a própria tarefa (folga/datas); o término não muda
+    assert len(updates) == 2  # edição + bulk_update do CPM
+    instalacoes.refresh_from_db()
+    assert (instalacoes.fim_cedo, instalacoes.folga_total) == (date(2026, 3, 9), 4)
+
+    resultado = cronograma.aplicar_alteracoes(obra, tarefas=[{"id": instalacoes.pk, "duracao_dias": 12}])
+    assert resultado.termino == date(2026, 3, 19)  # FF empurra o acabamento
+    assert set(resultado.caminho_critico) == {rede["fundacao"].pk, instalacoes.pk, rede["acabamento"].pk}
+
+    # Incremental == completo
+    esperado = list(TarefaCronograma.objects.order_by("id").values_list(*cronograma._CAMPOS_CPM))  # noqa: SLF001
+    TarefaCronograma.objects.update(inicio_cedo=None)
+    cronograma.recalcular(obra)
+    assert list(TarefaCronograma.objects.order_by("id").values_list(*cronograma._CAMPOS_CPM)) == esperado  # noqa: SLF001
+
+
+def test_calendario_e_inicio_da_obra_recalculam_o_cronograma(obra, rede):
+    calendario = obra.calendario
+    calendario.feriados = []
+    calendario.save()
+    fundacao, estrutura = TarefaCronograma.objects.filter(pk__in=[rede["fundacao"].pk, rede["estrutura"].pk]).order_by(
+        "id"
+    )
+    assert estrutura.fim_cedo == date(2026, 3, 10)  # sem o feriado de 06/03
+
+    calendario.delete()  # volta ao padrão segunda a sexta
+    obra.data_inicio = date(2026, 3, 9)
+    obra.save()
+    fundacao.refresh_from_db()
+    assert (fundacao.inicio_cedo, fundacao.fim_cedo) == (date(2026, 3, 9), date(2026, 3, 11))
+
+    obra.nome = "Torre CPM II"
+    obra.save(update_fields=["nome"])  # sem mudança de início: nada a recalcular
+    fundacao.refresh_from_db()
+    assert fundacao.inicio_cedo == date(2026, 3, 9)
+
+
+def test_ciclo_e_rejeitado_sem_gravar(obra, rede):
+    with pytest.raises(cronograma.CicloDependencias) as exc:
+        cronograma.aplicar_alteracoes(
+            obra, dependencias=[{"predecessora": rede["acabamento"].pk, "sucessora": rede["fundacao"].pk}]
+        )
+    assert exc.value.ciclo[0] == exc.value.ciclo[-1]
+    assert not DependenciaTarefa.objects.filter(predecessora=rede["acabamento"]).exists()
+
+
+def test_nivelamento_previa_respeita_capacidade(obra, rede):
+    equipe = RecursoObra.objects.create(obra=obra, nome="Equipe", capacidade_diaria=1)
+    AlocacaoRecurso.objects.create(tarefa=rede["estrutura"], recurso=equipe)
+    AlocacaoRecurso.objects.create(tarefa=rede["instalacoes"], recurso=equipe)
+    TarefaCronograma.objects.filter(pk=rede["instalacoes"].pk).update(duracao_dias=4)  # 03/03 a 09/03
+
+    previa = {t.id: t for t in cronograma.nivelar(obra).tarefas}
+    estrutura, instalacoes = previa[rede["estrutura"].pk], previa[rede["instalacoes"].pk]
+    assert instalacoes.atraso_dias == 0 and estrutura.atraso_dias == 2  # equipe ocupada até 09/03
+    assert estrutura.inicio > instalacoes.fim
+    assert TarefaCronograma.objects.get(pk=rede["estrutura"].pk).inicio_cedo == date(2026, 3, 5)  # nada gravado
+
+
+def test_api_cronograma_finalizar_reabrir(obra, rede):
+    user = get_user_model().objects.create_superuser("cpm_admin", "cpm@example.com", "x")
+    factory = APIRequestFactory()
+    view = ObraViewSet.as_view({"get": "cronograma", "post": "cronograma"})
+
+    request = factory.post(
+        "/", {"tarefas": [{"nome": "Pintura", "duracao_dias": 2, "percentual_concluido": 50}]}, format="json"
+    )
+    force_authenticate(request, user)
+    assert view(request, pk=obra.pk).status_code == 200
+
+    request = factory.get("/")
+    force_authenticate(request, user)
+    dados = view(request, pk=obra.pk).data["cronograma"]
+    assert len(dados["tarefas"]) == 5 and dados["termino"] == date(2026, 3, 13)
+    assert len(dados["dependencias"]) == 4
+
+    request = factory.post("/", {"tarefas": [{"duracao_dias": 1}]}, format="json")
+    force_authenticate(request, user)
+    assert view(request, pk=obra.pk).status_code == 400
+
+    for acao, status in (("finalizar", "concluida"), ("reabrir", "em_andamento")):
+        request = factory.post("/")
+        force_authenticate(request, user)
+        assert ObraViewSet.as_view({"post": acao})(request, pk=obra.pk).status_code == 200
+        obra.refresh_from_db()
+        assert obra.status == status
+    assert obra.progresso == 8  # 50% de 2 dias em 13 dias de tarefas
@@ -0,0 +1,57 @@
+import os
+import random
+import time
+from datetime import date
+
+import pytest
+
+from obras.models import DependenciaTarefa, Obra, TarefaCronograma
+from obras.services import cronograma
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.mark.skipif(not os.environ.get("PANDORA_PERF"), reason="Set PANDORA_PERF=1 to run performance baseline tests")
+def test_cronograma_10k_tarefas_baseline():
+    """Baseline do CPM com 10k tarefas / ~20k vínculos (carregar + calcular + gravar).
+
+    Thresholds amplos para CI compartilhado: completo < 5s, alteração incremental < 1s.
+    """
+    random.seed(46)
+    obra = Obra.objects.create(
+        nome="Perf CPM",
+        endereco="-",
+        cidade="-",
+        estado="PE",
+        cep="-",
+        data_inicio=date(2026, 1, 5),
+        data_previsao_termino=date(2030, 1, 1),
+        valor_contrato=1,
+    )
+    TarefaCronograma.objects.bulk_create(
+        [TarefaCronograma(obra=obra, nome=f"T{i}", duracao_dias=random.randint(0, 10)) for i in range(10_000)],
+        batch_size=1000,
+    )
+    ids = list(TarefaCronograma.objects.filter(obra=obra).order_by("id").values_list("id", flat=True))
+    pares = {tuple(sorted(random.sample(range(len(ids)), 2))) for _ in range(20_000)}
+    DependenciaTarefa.objects.bulk_create(
+        [
+            DependenciaTarefa(predecessora_id=ids[a], sucessora_id=ids[b], tipo=random.choice(["FS", "SS", "FF"]))
+            for a, b in pares
+        ],
+        batch_size=1000,
+    )
+
+    t0 = time.perf_counter()
+    cronograma.recalcular(obra)
+    completo = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    resultado = cronograma.aplicar_alteracoes(obra, tarefas=[{"id": ids[-5], "duracao_dias": 3}])
+    incremental = time.perf_counter() - t0
+
+    assert completo < 5, f"CPM completo lento: {completo:.3f}s"
+    assert incremental < 1, f"Alteração incremental lenta: {incremental:.3f}s"
+    print(
+        f"PERF cronograma completo={completo:.3f}s incremental={incremental:.3f}s atualizadas={resultado.atualizadas}"
+    )
@@ -0,0 +1,144 @@
+"""Razão de custos por obra: acumulados incrementais via sinais, resumo e reconstrução."""
+
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from django.core.management import call_command
+
+from compras.models import Compra
+from core.models import Tenant
+from estoque.models import Deposito, MovimentoEstoque
+from fornecedores.models import Fornecedor
+from obras.models import CustoObraMensal, LancamentoCusto, Obra
+from obras.services import custos
+from produtos.models import Categoria, Produto
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def cenario():
+    tenant = Tenant.objects.create(name="Custos", slug="custos-obra")
+    obra = Obra.objects.create(
+        nome="Edifício Alfa",
+        endereco="Rua A",
+        cidade="Recife",
+        estado="PE",
+        cep="50000-000",
+        data_inicio=date(2026, 1, 1),
+        data_previsao_termino=date(2026, 12, 31),
+        valor_contrato=Decimal("10000"),
+        valor_total=Decimal("8000"),
+    )
+    fornecedor = Fornecedor.objects.create(tenant=tenant)
+    deposito = Deposito.objects.create(codigo="OBR", nome="Canteiro", obra=obra)
+    produto = Produto.objects.create(nome="Cimento", categoria=Categoria.objects.create(nome="Custos"))
+    return obra, fornecedor, deposito, produto
+
+
+def _compra(obra, fornecedor, numero, valor, dia):
+    return Compra.objects.create(
+        numero=numero,
+        fornecedor=fornecedor,
+        obra=obra,
+        data_pedido=dia,
+        data_entrega_prevista=dia,
+        valor_total=Decimal(valor),
+    )
+
+
+def _balde(obra, categoria, competencia):
+    return CustoObraMensal.objects.get(obra=obra, categoria=categoria, competencia=competencia)
+
+
+def test_sinais_mantem_acumulados_incrementais(cenario):
+    obra, fornecedor, deposito, produto = cenario
+    c1 = _compra(obra, fornecedor, "C-1", "1000.00", date(2026, 3, 5))
+    _compra(obra, fornecedor, "C-2", "500.00", date(2026, 3, 20))
+    assert (_balde(obra, "COMPRA", date(2026, 3, 1)).valor, _balde(obra, "COMPRA", date(2026, 3, 1)).lancamentos) == (
+        Decimal("1500.00"),
+        2,
+    )
+
+    c1.data_pedido = date(2026, 4, 2)  # muda de mês: sai de março, entra em abril
+    c1.valor_total = Decimal("1200.00")
+    c1.save()
+    assert _balde(obra, "COMPRA", date(2026, 3, 1)).valor == Decimal("500.00")
+    assert _balde(obra, "COMPRA", date(2026, 4, 1)).valor == Decimal("1200.00")
+
+    c1.status = "cancelado"
+    c1.save()
+    assert _balde(obra, "COMPRA", date(2026, 4, 1)).valor == 0
+    assert not LancamentoCusto.objects.filter(origem_tipo="compras.Compra", origem_id=c1.pk).exists()
+
+    mov = MovimentoEstoque.objects.create(
+        produto=produto,
+        deposito_origem=deposito,
+        tipo="SAIDA",
+        quantidade=Decimal("4"),
+        custo_unitario_snapshot=Decimal("25.5"),
+    )
+    competencia = custos._mes(mov.criado_em)  # noqa: SLF001
+    assert _balde(obra, "MATERIAL", competencia).valor == Decimal("102.00")
+    mov.delete()
+    assert _balde(obra, "MATERIAL", competencia).valor == 0
+    assert custos.reconstruir(corrigir=False) == []
+
+
+def test_resumo_le_apenas_acumulados(cenario, django_assert_num_queries):
+    obra, fornecedor, _deposito, _produto = cenario
+    _compra(obra, fornecedor, "C-1", "900.00", date(2026, 8, 10))
+    _compra(obra, fornecedor, "C-2", "300.00", date(2026, 10, 1))
+
+    with django_assert_num_queries(1):
+        resumo = custos.resumo(obra, meses_burn=3, hoje=date(2026, 10, 19))
+    assert resumo.realizado == Decimal("1200.00")
+    assert resumo.burn_rate_mensal == Decimal("400.00")
+    assert resumo.saldo_orcamento == Decimal("6800.00")
+    assert resumo.percentual_orcamento == Decimal("15.00")
+    assert resumo.margem_percentual == Decimal("88.00")
+    assert resumo.meses_restantes == Decimal("17.00")
+    assert [m["competencia"] for m in resumo.por_mes] == [date(2026, 8, 1), date(2026, 10, 1)]
+
+
+def test_reconstrucao_detecta_e_corrige_divergencia(cenario):
+    obra, fornecedor, _deposito, _produto = cenario
+    compra = _compra(obra, fornecedor, "C-1", "700.00", date(2026, 5, 5))
+    Compra.objects.filter(pk=compra.pk).update(valor_total=Decimal("750.00"))  # update() não dispara sinal
+    CustoObraMensal.objects.create(obra=obra, categoria="MAO_OBRA", competencia=date(2026, 1, 1), valor=5)
+
+    divergencias = custos.reconstruir(corrigir=False)
+    assert {(d.categoria, d.esperado, d.registrado) for d in divergencias} == {
+        ("COMPRA", Decimal("750.00"), Decimal("700.00")),
+        ("MAO_OBRA", Decimal(0), Decimal("5.00")),
+    }
+
+    call_command("rebuild_custos_obras", obra=[obra.pk])
+    assert custos.reconstruir(corrigir=False) == []
+    assert _balde(obra, "COMPRA", date(2026, 5, 1)).valor == Decimal("750.00")
+    assert LancamentoCusto.objects.get(origem_id=compra.pk).valor == Decimal("750.00")
+
+
+def test_reconstrucao_por_obra_move_documento_que_trocou_de_obra(cenario):
+    obra, fornecedor, _deposito, _produto = cenario
+    nova = Obra.objects.create(
+        nome="Edifício Beta",
+        endereco="Rua B",
+        cidade="Recife",
+        estado="PE",
+        cep="50000-001",
+        data_inicio=date(2026, 1, 1),
+        data_previsao_termino=date(2026, 12, 31),
+        valor_contrato=Decimal("5000"),
+        valor_total=Decimal("4000"),
+    )
+    compra = _compra(obra, fornecedor, "C-1", "700.00", date(2026, 5, 5))
+    Compra.objects.filter(pk=compra.pk).update(obra=nova)  # update() não dispara sinal
+
+    custos.reconstruir([nova.pk])
+
+    assert LancamentoCusto.objects.get(origem_id=compra.pk).obra_id == nova.pk
+    assert _balde(nova, "COMPRA", date(2026, 5, 1)).valor == Decimal("700.00")
+    assert not CustoObraMensal.objects.filter(obra=obra).exists()
+    assert custos.reconstruir(corrigir=False) == []
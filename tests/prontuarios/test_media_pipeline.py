@@ -0,0 +1,221 @@
+"""Pipeline de derivados de mídia: DAG, leitura única, reaproveitamento por hash e fair share."""
+
+import io
+import stat
+import sys
+import threading
+from unittest import mock
+
+import pytest
+from celery.exceptions import Retry
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.utils import timezone
+from PIL import Image
+
+from clientes.models import Cliente
+from core.models import Tenant
+from prontuarios import media_pipeline, tasks
+from prontuarios.models import FotoEvolucao
+
+FFMPEG_FALSO = """#!{python}
+import sys
+with open({log!r}, "a") as log:
+    log.write(" ".join(sys.argv[1:]) + "\\n")
+destino = sys.argv[-1]
+tamanhos = {{".mp4": 40, ".webm": 20, ".jpg": 10}}
+with open(destino, "wb") as fh:
+    fh.write(b"x" * tamanhos.get(destino[destino.rfind("."):], 1))
+"""
+
+FFPROBE_FALSO = """#!{python}
+import json
+print(json.dumps({{"streams": [{{"duration": "5.0", "width": {largura}, "height": 360}}]}}))
+"""
+
+
+def _script(caminho, conteudo):
+    caminho.write_text(conteudo)
+    caminho.chmod(caminho.stat().st_mode | stat.S_IEXEC)
+    return str(caminho)
+
+
+@pytest.fixture
+def ambiente(settings, tmp_path, monkeypatch):
+    settings.MEDIA_ROOT = tmp_path / "media"
+    log = tmp_path / "ffmpeg.log"
+    log.write_text("")
+    settings.PRONTUARIOS_FFMPEG_BIN = _script(
+        tmp_path / "ffmpeg", FFMPEG_FALSO.format(python=sys.executable, log=str(log))
+    )
+    settings.PRONTUARIOS_FFPROBE_BIN = _script(
+        tmp_path / "ffprobe", FFPROBE_FALSO.format(python=sys.executable, largura=640)
+    )
+    # save() apenas enfileira; os testes chamam o pipeline diretamente
+    monkeypatch.setattr(tasks.processar_derivados_midia, "delay", lambda *a, **k: None)
+    pool = media_pipeline.FairSharePool(max_workers=2)
+    yield {"log": log, "pool": pool, "tmp": tmp_path}
+    pool.shutdown()
+
+
+def _jpeg(cor="red"):
+    buf = io.BytesIO()
+    Image.new("RGB", (64, 48), color=cor).save(buf, format="JPEG")
+    return buf.getvalue()
+
+
+def _foto(tenant, imagem=None, video=None):
+    cliente = Cliente.objects.create(tenant=tenant, tipo="PF", status="active")
+    return FotoEvolucao.objects.create(
+        tenant=tenant,
+        cliente=cliente,
+        titulo="Foto",
+        tipo_foto="ANTES",
+        momento="INICIO_TRATAMENTO",
+        area_fotografada="Rosto",
+        imagem=SimpleUploadedFile("foto.jpg", imagem or _jpeg(), content_type="image/jpeg"),
+        video=SimpleUploadedFile("video.mp4", video, content_type="video/mp4") if video else None,
+        data_foto=timezone.now(),
+    )
+
+
+@pytest.mark.django_db
+def test_imagem_decodificada_uma_vez_e_reenvio_reaproveita(ambiente):
+    tenant = Tenant.objects.create(name="T", subdomain="t-midia-img")
+    foto = _foto(tenant)
+    with mock.patch.object(media_pipeline.Image, "open", wraps=Image.open) as abrir:
+        res = media_pipeline.processar_foto(foto.pk, pool=ambiente["pool"])
+    assert abrir.call_count == 1
+    assert sorted(res["gerados"]) == ["thumbnail", "webp"]
+    foto.refresh_from_db()
+    assert foto.imagem_thumbnail.name == media_pipeline.caminho_derivado(tenant.pk, foto.hash_arquivo, "thumbnail")
+    assert foto.imagem_webp.name.endswith("imagem_q80.webp")
+
+    # mesmo conteúdo enviado de novo: nenhum derivado é recalculado
+    copia = _foto(tenant)
+    with mock.patch.object(media_pipeline, "_executar_dag") as dag:
+        res = media_pipeline.processar_foto(copia.pk, pool=ambiente["pool"])
+    dag.assert_not_called()
+    assert sorted(res["reaproveitados"]) == ["thumbnail", "webp"]
+    copia.refresh_from_db()
+    assert copia.imagem_thumbnail.name == foto.imagem_thumbnail.name
+
+    # outro tenant com o mesmo conteúdo não compartilha derivados
+    outro = _foto(Tenant.objects.create(name="O", subdomain="t-midia-img-outro"))
+    res = media_pipeline.processar_foto(outro.pk, pool=ambiente["pool"])
+    assert sorted(res["gerados"]) == ["thumbnail", "webp"]
+    outro.refresh_from_db()
+    assert outro.imagem_thumbnail.name != foto.imagem_thumbnail.name
+
+
+@pytest.mark.django_db
+def test_video_dag_com_ffmpeg_falso(ambiente):
+    tenant = Tenant.objects.create(name="T", subdomain="t-midia-video")
+    video = b"FAKEVIDEO" * 100
+    foto = _foto(tenant, video=video)
+
+    res = media_pipeline.processar_foto(foto.pk, pool=ambiente["pool"])
+
+    assert res["ok"], res
+    assert sorted(res["gerados"]) == ["h264", "poster", "thumbnail", "webm", "webp"]
+    chamadas = ambiente["log"].read_text().splitlines()
+    assert len(chamadas) == 3  # poster, h264, webm
+    foto.refresh_from_db()
+    assert foto.video_meta["validacao"] == "aprovado"
+    assert foto.video_meta["transcodificacao"]["perfil"] == "webm"  # menor saída
+    assert foto.video.name.endswith("webm.webm")
+    assert foto.video_poster.name.endswith("poster.jpg")
+
+    # reprocessar sem forçar não chama o ffmpeg de novo
+    media_pipeline.processar_foto(foto.pk, pool=ambiente["pool"])
+    assert len(ambiente["log"].read_text().splitlines()) == 3
+
+
+@pytest.mark.django_db
+def test_video_reprovado_nao_gera_derivados(ambiente, settings):
+    settings.PRONTUARIOS_FFPROBE_BIN = _script(
+        ambiente["tmp"] / "ffprobe_grande", FFPROBE_FALSO.format(python=sys.executable, largura=4000)
+    )
+    tenant = Tenant.objects.create(name="T", subdomain="t-midia-reprovado")
+    foto = _foto(tenant, video=b"FAKEVIDEO" * 100)
+
+    res = media_pipeline.processar_foto(foto.pk, pool=ambiente["pool"])
+
+    assert res["motivo_video"] == "limites_excedidos"
+    assert ambiente["log"].read_text() == ""
+    foto.refresh_from_db()
+    assert not foto.video
+    assert foto.video_meta["validacao"] == "reprovado"
+
+
+@pytest.mark.django_db
+def test_reprovacao_nao_apaga_derivado_compartilhado(ambiente, settings):
+    tenant = Tenant.objects.create(name="T", subdomain="t-midia-compartilhado")
+    video = b"FAKEVIDEO" * 100
+    primeira = _foto(tenant, video=video)
+    media_pipeline.processar_foto(primeira.pk, pool=ambiente["pool"])
+    segunda = _foto(tenant, video=video)
+    media_pipeline.processar_foto(segunda.pk, pool=ambiente["pool"])
+    primeira.refresh_from_db()
+    segunda.refresh_from_db()
+    assert segunda.video.name == primeira.video.name  # transcodificação reaproveitada por hash
+
+    settings.PRONTUARIOS_FFPROBE_BIN = _script(
+        ambiente["tmp"] / "ffprobe_grande", FFPROBE_FALSO.format(python=sys.executable, largura=4000)
+    )
+    res = media_pipeline.processar_foto(primeira.pk, forcar=True, pool=ambiente["pool"])
+
+    assert res["motivo_video"] == "limites_excedidos"
+    primeira.refresh_from_db()
+    assert not primeira.video
+    assert segunda.video.storage.exists(segunda.video.name)
+    assert segunda.video_poster.storage.exists(segunda.video_poster.name)
+
+
+def test_fair_share_entre_tenants():
+    pool = media_pipeline.FairSharePool(max_workers=2)
+    liberar = threading.Event()
+    ordem = []
+    lock = threading.Lock()
+
+    def job(nome):
+        with lock:
+            ordem.append(nome)
+        liberar.wait(5)
+        return nome
+
+    try:
+        futuros = [pool.submit("A", job, f"A{i}") for i in range(6)]
+        futuros += [pool.submit("B", job, f"B{i}") for i in range(2)]
+        liberar.set()
+        assert [f.result(5) for f in futuros][:6] == [f"A{i}" for i in range(6)]
+    finally:
+        pool.shutdown()
+    # A ocupou os 2 slots antes de B chegar; o 1º slot liberado vai para B
+    assert ordem[:3] == ["A0", "A1", "B0"]
+    assert ordem.index("B1") < ordem.index("A4")
+
+
+def test_slot_por_tenant_compartilhado_entre_processos(settings):
+    settings.PRONTUARIOS_MEDIA_SLOTS_POR_TENANT = 1
+    with (
+        media_pipeline.slot_tenant(7) as primeiro,
+        media_pipeline.slot_tenant(7) as segundo,
+        media_pipeline.slot_tenant(8) as outro_tenant,
+    ):
+        assert (primeiro, segundo, outro_tenant) == (True, False, True)
+    with media_pipeline.slot_tenant(7) as de_novo:
+        assert de_novo
+
+
+@pytest.mark.django_db
+def test_task_reagenda_tenant_sem_slot(settings, ambiente, monkeypatch):
+    settings.PRONTUARIOS_MEDIA_SLOTS_POR_TENANT = 1
+    foto = _foto(Tenant.objects.create(nome="Slots", schema_name="t_slots"))
+    monkeypatch.setattr(tasks.processar_derivados_midia, "retry", lambda **kwargs: Retry())
+    with (
+        mock.patch.object(tasks, "processar_foto") as processar,
+        media_pipeline.slot_tenant(foto.tenant_id),
+        pytest.raises(Retry),
+    ):
+        tasks.processar_derivados_midia.run(foto.pk)
+    processar.assert_not_called()
@@ -0,0 +1,130 @@
+"""Varredura de mídia órfã: índice Bloom, quarentena em duas fases e checkpoint."""
+
+import io
+import json
+import os
+import time
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.utils import timezone
+from PIL import Image
+
+from clientes.models import Cliente
+from core.models import Tenant
+from prontuarios import media_sweeper, tasks
+from prontuarios.models import FotoEvolucao
+
+ANTIGO = time.time() - 30 * 86400
+
+
+def _jpeg():
+    buf = io.BytesIO()
+    Image.new("RGB", (8, 8), color="blue").save(buf, format="JPEG")
+    return buf.getvalue()
+
+
+def _arquivo(raiz, relativo, antigo=True):
+    caminho = raiz / relativo
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    caminho.write_bytes(b"x" * 10)
+    if antigo:
+        os.utime(caminho, (ANTIGO, ANTIGO))
+    return relativo
+
+
+@pytest.fixture
+def midia(settings, tmp_path, monkeypatch):
+    settings.MEDIA_ROOT = tmp_path / "media"
+    settings.PRONTUARIOS_VARREDURA_PREFIXOS = ["prontuarios"]
+    settings.PRONTUARIOS_VARREDURA_MAX_SEGUNDOS = 0
+    monkeypatch.setattr(tasks.processar_derivados_midia, "delay", lambda *a, **k: None)
+    tenant = Tenant.objects.create(name="T", subdomain="t-varredura")
+    foto = FotoEvolucao.objects.create(
+        tenant=tenant,
+        cliente=Cliente.objects.create(tenant=tenant, tipo="PF", status="active"),
+        titulo="Foto",
+        tipo_foto="ANTES",
+        momento="INICIO_TRATAMENTO",
+        area_fotografada="Rosto",
+        imagem=SimpleUploadedFile("foto.jpg", _jpeg(), content_type="image/jpeg"),
+        data_foto=timezone.now(),
+    )
+    raiz = settings.MEDIA_ROOT
+    os.utime(raiz / foto.imagem.name, (ANTIGO, ANTIGO))
+    return {
+        "raiz": raiz,
+        "foto": foto,
+        "orfaos": [
+            _arquivo(raiz, "prontuarios/derivados/ab/abc/thumb.jpg"),
+            _arquivo(raiz, "prontuarios/thumbnails/2024/velho.jpg"),
+        ],
+        "recente": _arquivo(raiz, "prontuarios/webp/novo.webp", antigo=False),
+    }
+
+
+def test_bloom_sem_falsos_negativos():
+    bloom = media_sweeper.BloomFilter(1000)
+    valores = [f"prontuarios/fotos_evolucao/{i}.jpg" for i in range(1000)]
+    for valor in valores:
+        bloom.add(valor)
+    assert all(valor in bloom for valor in valores)
+    assert sum(f"outro/{i}" in bloom for i in range(1000)) < 10
+
+
+@pytest.mark.django_db
+def test_dry_run_gera_relatorio_sem_mover(midia, django_assert_max_num_queries):
+    with django_assert_max_num_queries(200):  # independente da quantidade de arquivos
+        relatorio = media_sweeper.varrer_midia_orfa(aplicar=False)
+
+    raiz = midia["raiz"]
+    assert relatorio["status"] == "concluido"
+    assert relatorio["modo"] == "dry-run"
+    assert relatorio["totais"]["orfaos"] == 2
+    assert relatorio["totais"]["recentes"] == 1
+    assert relatorio["totais"]["referenciados"] == 1
+    candidatos = [json.loads(linha)["caminho"] for linha in (raiz / relatorio["candidatos"]).read_text().splitlines()]
+    assert sorted(candidatos) == sorted(midia["orfaos"])
+    assert all((raiz / caminho).exists() for caminho in midia["orfaos"])
+    assert (raiz / ".varredura_midia" / "relatorios" / f"{relatorio['id']}.json").exists()
+    assert not (raiz / ".varredura_midia" / "checkpoint.json").exists()
+
+
+@pytest.mark.django_db
+def test_quarentena_purga_e_restaura(midia):
+    raiz, foto = midia["raiz"], midia["foto"]
+    relatorio = media_sweeper.varrer_midia_orfa(aplicar=True)
+    assert relatorio["totais"]["quarentenados"] == 2
+    assert not any((raiz / caminho).exists() for caminho in midia["orfaos"])
+    assert (raiz / foto.imagem.name).exists()
+
+    # dentro do prazo de quarentena nada é purgado
+    relatorio = media_sweeper.varrer_midia_orfa(aplicar=True, quarentena_dias=30)
+    assert relatorio["totais"]["purgados"] == 0
+
+    # um dos arquivos voltou a ser referenciado antes do fim da quarentena
+    restaurar = midia["orfaos"][0]
+    FotoEvolucao.objects.filter(pk=foto.pk).update(imagem_thumbnail=restaurar)
+    relatorio = media_sweeper.varrer_midia_orfa(aplicar=True, quarentena_dias=0)
+    assert relatorio["totais"]["restaurados"] == 1
+    assert relatorio["totais"]["purgados"] == 1
+    assert (raiz / restaurar).exists()
+    assert not (raiz / midia["orfaos"][1]).exists()
+    assert not (raiz / ".quarentena_midia").exists() or not any((raiz / ".quarentena_midia").iterdir())
+
+
+@pytest.mark.django_db
+def test_execucao_parcial_retoma_do_checkpoint(midia):
+    raiz = midia["raiz"]
+    parcial = media_sweeper.varrer_midia_orfa(aplicar=False, max_segundos=1e-9)
+    assert parcial["status"] == "parcial"
+    checkpoint = json.loads((raiz / ".varredura_midia" / "checkpoint.json").read_text())
+    assert checkpoint["diretorio"] == parcial["retomar_de"]["diretorio"]
+
+    final = media_sweeper.varrer_midia_orfa(aplicar=True)  # modo do checkpoint prevalece
+    assert final["id"] == parcial["id"]
+    assert final["modo"] == "dry-run"
+    assert final["status"] == "concluido"
+    assert final["totais"]["arquivos"] == 4  # nenhum diretório processado duas vezes
+    assert final["totais"]["orfaos"] == 2
+    assert not (raiz / ".varredura_midia" / "checkpoint.json").exists()
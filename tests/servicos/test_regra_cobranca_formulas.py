@@ -0,0 +1,177 @@
+"""Fórmulas de RegraCobranca: linguagem restrita, validação ao salvar, cache por versão e lote."""
+
+from decimal import Decimal
+from io import StringIO
+
+import pytest
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from cadastros_gerais.models import UnidadeMedida
+from servicos.models import RegraCobranca
+from servicos.services import formulas
+
+pytestmark = pytest.mark.django_db
+
+FORMULAS_VALIDAS = [
+    "(Q * valor_base) + (Q // 10 * taxa_adicional)",
+    "Q * valor_base / 3",
+    "max(Q, 5) * valor_base - abs(-2)",
+    "round(Q * valor_base / 7, 3)",
+    "Q ** 2 % 7 + valor_base",
+    "-Q * valor_base",
+]
+
+
+def _legado(regra, quantidade):
+    """Implementação anterior (eval) — referência de paridade para fórmulas válidas."""
+    quantidade = Decimal(quantidade)
+    valor = regra.valor_base * quantidade
+    if regra.tipo_calculo == "personalizado" and regra.formula_personalizada:
+        valor = eval(  # noqa: S307
+            regra.formula_personalizada,
+            {"Q": quantidade, "valor_base": regra.valor_base, "taxa_adicional": regra.taxa_adicional or Decimal("0")},
+        )
+    if regra.taxa_adicional and regra.taxa_adicional > 0:
+        valor += valor * (regra.taxa_adicional / Decimal("100"))
+    if regra.valor_minimo and valor < regra.valor_minimo:
+        valor = regra.valor_minimo
+    return round(valor, 2)
+
+
+@pytest.fixture
+def unidade():
+    return UnidadeMedida.objects.create(nome="Hora", simbolo="h")
+
+
+def _regra(unidade, formula, **kwargs):
+    return RegraCobranca.objects.create(
+        nome=formula[:50],
+        unidade_medida=unidade,
+        valor_base=kwargs.pop("valor_base", Decimal("12.35")),
+        taxa_adicional=kwargs.pop("taxa_adicional", Decimal("7.5")),
+        valor_minimo=kwargs.pop("valor_minimo", Decimal("10")),
+        tipo_calculo="personalizado",
+        formula_personalizada=formula,
+        **kwargs,
+    )
+
+
+@pytest.mark.parametrize("formula", FORMULAS_VALIDAS)
+def test_paridade_com_eval_legado(unidade, formula):
+    regra = _regra(unidade, formula)
+    for q in (Decimal("0"), Decimal("1"), Decimal("2.5"), Decimal("13"), 37):
+        assert regra.calcular_valor(q) == _legado(regra, q)
+
+
+@pytest.mark.parametrize(
+    "formula",
+    [
+        "__import__('os').system('id')",
+        "Q.__class__",
+        "open('x')",
+        "Q > 10",
+        "Q ** Q",
+        "Q ** 1000",
+        "[Q][0]",
+        "lambda: 1",
+        "preco * Q",
+        "Q *",
+    ],
+)
+def test_formulas_fora_da_linguagem_sao_rejeitadas(unidade, formula):
+    with pytest.raises(formulas.FormulaInvalida):
+        formulas.compilar(formula)
+    regra = RegraCobranca(
+        nome="X", unidade_medida=unidade, valor_base=1, tipo_calculo="personalizado", formula_personalizada=formula
+    )
+    with pytest.raises(ValidationError) as exc:
+        regra.full_clean()
+    assert "formula_personalizada" in exc.value.message_dict
+    with pytest.raises(ValidationError):
+        regra.save()
+
+
+def test_condicional_e_erro_em_tempo_de_execucao(unidade):
+    regra = _regra(unidade, "Q * valor_base * (0.9 if Q >= 10 and not Q > 100 else 1)", taxa_adicional=0)
+    assert regra.calcular_valor(10) == Decimal("111.15")
+    assert regra.calcular_valor(2) == Decimal("24.70")
+    divisao = _regra(unidade, "valor_base / (Q - 2)", taxa_adicional=0, valor_minimo=0)
+    assert divisao.calcular_valor(2) == Decimal("24.70")  # erro em execução: cai em valor_base * Q
+
+
+def test_cache_por_versao_e_lote(unidade):
+    regra = _regra(unidade, "Q * valor_base + 1")
+    compilada = formulas.formula_da_regra(regra)
+    assert formulas.formula_da_regra(regra) is compilada
+    regra.formula_personalizada = "Q * valor_base + 2"
+    regra.save()
+    assert regra.versao == 2
+    assert formulas.formula_da_regra(regra).texto == "Q * valor_base + 2"
+
+    fixa = RegraCobranca.objects.create(nome="Fixa", unidade_medida=unidade, valor_base=50, tipo_calculo="fixo")
+    pares = [(regra.pk, q) for q in range(1, 2001)] + [(fixa.pk, 3), (regra, "2,5")]
+    with CaptureQueriesContext(connection) as ctx:
+        precos = formulas.precificar_lote(pares)
+    assert len(ctx.captured_queries) == 1
+    assert precos[:3] == [regra.calcular_valor(q) for q in (1, 2, 3)]
+    assert precos[-2:] == [Decimal("50.00"), regra.calcular_valor(Decimal("2.5"))]
+    with pytest.raises(RegraCobranca.DoesNotExist):
+        formulas.precificar_lote([(999999, 1)])
+
+
+@pytest.mark.parametrize(
+    ("legada", "reescrita"),
+    [
+        ("pow(Q, 2) * valor_base", "Q ** 2 * valor_base"),
+        ("Q * valor_base + (Q > 10) * 5", "Q * valor_base + (1 if Q > 10 else 0) * 5"),
+        ("valor_base * (1 + (Q >= 5 and Q < 10))", "valor_base * (1 + (1 if Q >= 5 and Q < 10 else 0))"),
+        ("int(Q) * valor_base", None),
+        ("Q * valor_base", None),
+    ],
+)
+def test_reescrita_de_formulas_legadas(legada, reescrita):
+    assert formulas.reescrever_legado(legada) == reescrita
+    if reescrita is not None:
+        for q in (Decimal("1"), Decimal("2.5"), Decimal("7"), Decimal("13")):
+            ambiente = {"Q": q, "valor_base": Decimal("12.35"), "taxa_adicional": Decimal("7.5")}
+            assert formulas.compilar(reescrita).avaliar(ambiente) == eval(legada, dict(ambiente))  # noqa: S307
+
+
+def test_comando_lista_e_corrige_formulas_recusadas(unidade):
+    valida = _regra(unidade, "Q * valor_base")
+    RegraCobranca.objects.bulk_create(  # gravadas antes da validação no save()
+        [
+            RegraCobranca(
+                nome="Pow",
+                unidade_medida=unidade,
+                valor_base=10,
+                tipo_calculo="personalizado",
+                formula_personalizada="pow(Q, 2)",
+            ),
+            RegraCobranca(
+                nome="Int",
+                unidade_medida=unidade,
+                valor_base=10,
+                tipo_calculo="personalizado",
+                formula_personalizada="int(Q) * valor_base",
+            ),
+        ]
+    )
+    pow_, int_ = RegraCobranca.objects.get(nome="Pow"), RegraCobranca.objects.get(nome="Int")
+
+    out = StringIO()
+    call_command("audit_formulas_cobranca", stdout=out)
+    saida = out.getvalue()
+    assert f"#{pow_.pk} Pow" in saida and "reescrita: Q ** 2" in saida
+    assert f"#{int_.pk} Int" in saida and "sem reescrita automática" in saida
+    assert f"#{valida.pk} " not in saida
+    assert RegraCobranca.objects.get(pk=pow_.pk).formula_personalizada == "pow(Q, 2)"
+
+    call_command("audit_formulas_cobranca", "--corrigir", stdout=StringIO())
+    pow_.refresh_from_db()
+    assert pow_.formula_personalizada == "Q ** 2"
+    assert pow_.versao == 2
+    assert RegraCobranca.objects.get(pk=int_.pk).formula_personalizada == "int(Q) * valor_base"
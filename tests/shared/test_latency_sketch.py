@@ -0,0 +1,53 @@
+"""Testes do sketch de latência mesclável (shared.metrics.sketch)."""
+
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from shared.metrics.sketch import LatencySketch
+
+
+def _exact(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[int(q * (len(ordered) - 1))]
+
+
+def test_sketch_quantiles_within_relative_accuracy() -> None:
+    """Quantis respeitam o erro relativo configurado."""
+    rng = random.Random(42)
+    values = [rng.lognormvariate(0, 1) for _ in range(5000)]
+    sketch = LatencySketch(relative_accuracy=0.01)
+    sketch.extend(values)
+    for q in (0.5, 0.9, 0.95, 0.99):
+        approx = sketch.quantile(q)
+        assert approx == pytest.approx(_exact(values, q), rel=0.011), f"q={q}"
+    assert sketch.summary()["max"] == max(values)
+
+
+def test_sketch_merge_equals_single_sketch() -> None:
+    """Mesclar sketches parciais equivale a registrar tudo num só (merge exato)."""
+    rng = random.Random(7)
+    values = [rng.uniform(0.001, 3) for _ in range(2000)]
+    whole = LatencySketch()
+    whole.extend(values)
+    parts = [LatencySketch() for _ in range(4)]
+    for i, v in enumerate(values):
+        parts[i % 4].add(v)
+    merged = LatencySketch()
+    for p in parts:
+        merged.merge(LatencySketch.from_dict(p.to_dict()))
+    assert merged.counts == whole.counts
+    assert merged.summary() == pytest.approx(whole.summary())
+
+
+def test_sketch_empty_and_zero_values() -> None:
+    """Sketch vazio retorna None/{} e zeros caem no bucket dedicado."""
+    sketch = LatencySketch()
+    assert sketch.quantile(0.5) is None
+    assert sketch.summary() == {}
+    sketch.add(0.0)
+    sketch.add(-1.0)
+    assert len(sketch) == 1
+    assert sketch.quantile(0.99) == 0.0
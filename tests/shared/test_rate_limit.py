@@ -0,0 +1,166 @@
+"""Rate limiter compartilhado: atomicidade sob concorrência (Redis via fakeredis e cache)."""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from shared import rate_limit as rl
+from shared.cache_utils import incr_atomic
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")  # scripts Lua no fakeredis
+
+THREADS = 16
+HITS_PER_THREAD = 50
+
+
+class _Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def server():
+    return fakeredis.FakeServer()
+
+
+def _hammer(make_limiter, identity="ip:1.2.3.4"):
+    """Cada thread simula um worker com o próprio limiter/cliente; retorna total liberado."""
+    start = threading.Barrier(THREADS)
+
+    def worker(_):
+        limiter = make_limiter()
+        start.wait()
+        return sum(limiter.hit(identity).allowed for _ in range(HITS_PER_THREAD))
+
+    with ThreadPoolExecutor(THREADS) as pool:
+        return sum(pool.map(worker, range(THREADS)))
+
+
+@pytest.mark.parametrize("mode", rl.MODES)
+def test_redis_backend_nao_excede_limite_sob_concorrencia(server, mode):
+    clock = _Clock()
+
+    def make():
+        backend = rl.RedisBackend(fakeredis.FakeRedis(server=server))
+        return rl.RateLimiter(100, 60, mode=mode, scope="hammer", backend=backend, clock=clock)
+
+    assert _hammer(make) == 100
+
+
+@pytest.mark.parametrize("mode", [rl.FIXED, rl.SLIDING])
+def test_cache_backend_nao_excede_limite_sob_concorrencia(mode):
+    clock = _Clock()
+
+    def make():
+        return rl.RateLimiter(100, 60, mode=mode, scope="hammer", backend=rl.CacheBackend(), clock=clock)
+
+    assert _hammer(make) == 100
+
+
+def test_incr_atomic_nao_perde_incrementos():
+    def worker(_):
+        for _ in range(HITS_PER_THREAD):
+            incr_atomic("contador:teste", ttl=60)
+
+    with ThreadPoolExecutor(THREADS) as pool:
+        list(pool.map(worker, range(THREADS)))
+    assert cache.get("contador:teste") == THREADS * HITS_PER_THREAD
+
+
+@pytest.mark.parametrize("backend_factory", ["redis", "cache"])
+def test_sliding_pondera_janela_anterior(server, backend_factory):
+    backend = rl.RedisBackend(fakeredis.FakeRedis(server=server)) if backend_factory == "redis" else rl.CacheBackend()
+    clock = _Clock(now=0.0)
+    limiter = rl.RateLimiter(10, 10, mode=rl.SLIDING, scope="sw", backend=backend, clock=clock)
+    assert all(limiter.hit("x").allowed for _ in range(10))
+    blocked = limiter.hit("x")
+    assert not blocked.allowed
+    assert blocked.retry_after > 0
+    # Metade da janela seguinte: janela anterior pesa 0.5 -> 5 vagas
+    clock.now = 15.0
+    assert sum(limiter.hit("x").allowed for _ in range(10)) == 5
+    # Duas janelas depois o histórico some
+    clock.now = 30.0
+    assert sum(limiter.hit("x").allowed for _ in range(10)) == 10
+
+
+def test_token_bucket_reabastece_proporcionalmente(server):
+    clock = _Clock()
+    backend = rl.RedisBackend(fakeredis.FakeRedis(server=server))
+    limiter = rl.RateLimiter(5, 5, mode=rl.TOKEN_BUCKET, scope="tb", backend=backend, clock=clock)
+    assert all(limiter.hit("x").allowed for _ in range(5))
+    blocked = limiter.hit("x")
+    assert not blocked.allowed
+    assert blocked.retry_after == pytest.approx(1.0)
+    clock.now += 2
+    assert [limiter.hit("x").allowed for _ in range(3)] == [True, True, False]
+
+
+def test_fixed_preserva_chave_do_cache_e_reset():
+    limiter = rl.RateLimiter(2, 60, mode=rl.FIXED, scope="2fa:rl")
+    assert [limiter.hit("7:1.1.1.1").allowed for _ in range(3)] == [True, True, False]
+    assert cache.get("2fa:rl:7:1.1.1.1") == 2  # hit bloqueado é desfeito
+    limiter.reset("7:1.1.1.1")
+    assert limiter.hit("7:1.1.1.1").allowed
+
+
+def test_redis_backend_usa_chaves_do_cache(server):
+    """Chaves cruas = ``cache.make_key``: sem prefixo extra e ``cache.delete`` zera o limite."""
+    client = fakeredis.FakeRedis(server=server)
+    limiter = rl.RateLimiter(1, 60, mode=rl.FIXED, scope="2fa:rl", backend=rl.RedisBackend(client))
+    assert limiter.hit("7:1.1.1.1").allowed
+    assert client.keys() == [cache.make_key("2fa:rl:7:1.1.1.1").encode()]
+    client.delete(cache.make_key("2fa:rl:7:1.1.1.1"))  # o que ``cache.delete`` faz no django-redis
+    assert limiter.hit("7:1.1.1.1").allowed
+
+
+def test_falha_do_backend_libera(monkeypatch):
+    class _Broken(rl.CacheBackend):
+        def window_hit(self, *a, **k):
+            raise ConnectionError("redis down")
+
+    limiter = rl.RateLimiter(1, 60, scope="down", backend=_Broken())
+    assert limiter.hit("x").allowed
+    strict = rl.RateLimiter(1, 60, scope="down", backend=_Broken(), fail_open=False)
+    with pytest.raises(ConnectionError):
+        strict.hit("x")
+
+
+def test_decorator_responde_429_com_retry_after():
+    @rl.rate_limit(2, 60, key="ip", methods=("POST",))
+    def view(request):
+        return HttpResponse("ok")
+
+    rf = RequestFactory()
+    assert view(rf.get("/x", REMOTE_ADDR="10.0.0.1")).status_code == 200
+    statuses = [view(rf.post("/x", REMOTE_ADDR="10.0.0.1")).status_code for _ in range(3)]
+    assert statuses == [200, 200, 429]
+    blocked = view(rf.post("/x", REMOTE_ADDR="10.0.0.1"))
+    assert int(blocked["Retry-After"]) >= 1
+    assert blocked["X-RateLimit-Remaining"] == "0"
+    # Outro IP tem contador próprio
+    assert view(rf.post("/x", REMOTE_ADDR="10.0.0.2")).status_code == 200
+
+
+@pytest.mark.django_db
+def test_middleware_aplica_regras_por_prefixo(client, settings):
+    settings.RATE_LIMIT_RULES = [{"prefix": "/rl-test/", "limit": 2, "window": 60, "mode": rl.FIXED}]
+    codes = [client.get("/rl-test/nao-existe/").status_code for _ in range(3)]
+    assert 429 not in codes[:2]
+    assert codes[2] == 429
+    assert client.get("/outro/").status_code != 429
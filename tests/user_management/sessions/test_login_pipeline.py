@@ -0,0 +1,115 @@
+"""Pipeline de login: estado crítico síncrono, efeitos colaterais em lote e idempotentes."""
+
+from __future__ import annotations
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError, connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from core.models import Role, Tenant, TenantUser
+from user_management.models import LogAtividadeUsuario, PerfilUsuarioEstendido, SessaoUsuario
+from user_management.services import login_pipeline
+
+pytestmark = [pytest.mark.django_db, pytest.mark.login]
+
+User = get_user_model()
+
+
+@pytest.fixture(autouse=True)
+def _buffered(settings):
+    """Ativa o modo bufferizado (em testes o padrão é flush imediato)."""
+    settings.LOGIN_PIPELINE_IN_TESTS = True
+    settings.LOGIN_PIPELINE_FLUSH_SECONDS = 3600
+    settings.LOGIN_PIPELINE_MAX_BUFFER = 1000
+    login_pipeline.reset()
+    yield
+    login_pipeline.reset()
+
+
+def _logins(n):
+    users = [User.objects.create_user(f"lp{i}", password="x") for i in range(n)]
+    for u in users:
+        assert Client().login(username=u.username, password="x")
+    return users
+
+
+def test_estado_critico_sincrono_e_restante_enfileirado(client):
+    u = User.objects.create_user("lp_crit", password="x")
+    PerfilUsuarioEstendido.objects.filter(user=u).update(tentativas_login_falhadas=3)
+
+    assert client.login(username="lp_crit", password="x")
+
+    perfil = PerfilUsuarioEstendido.objects.get(user=u)
+    assert perfil.tentativas_login_falhadas == 0
+    assert perfil.ultimo_login_ip == "127.0.0.1"
+    assert not SessaoUsuario.objects.filter(user=u).exists()
+    assert login_pipeline.stats()["pending"] == 1
+
+    assert login_pipeline.flush() == 1
+    assert SessaoUsuario.objects.filter(user=u, ativa=True).count() == 1
+    assert LogAtividadeUsuario.objects.filter(user=u, acao="LOGIN").count() == 1
+
+
+def test_flush_em_lote_com_consultas_constantes():
+    _logins(10)
+    with CaptureQueriesContext(connection) as ctx:
+        assert login_pipeline.flush() == 10
+    inserts = [q for q in ctx.captured_queries if q["sql"].startswith("INSERT")]
+    assert len(inserts) == 2  # um upsert de sessões + um bulk de logs
+    assert SessaoUsuario.objects.count() == 10
+    assert LogAtividadeUsuario.objects.filter(acao="LOGIN").count() == 10
+
+
+def test_mesma_sessao_deduplicada_e_upsert_idempotente():
+    u = User.objects.create_user("lp_dup", password="x")
+    SessaoUsuario.objects.create(user=u, session_key="k-dup", ip_address="10.0.0.1", user_agent="old", ativa=False)
+    for ua in ("a", "b"):
+        login_pipeline.enqueue_login(login_pipeline.LoginEvent(u.pk, "k-dup", "10.0.0.2", ua))
+    assert login_pipeline.stats()["deduplicated"] == 1
+
+    login_pipeline.flush()
+    sessao = SessaoUsuario.objects.get(session_key="k-dup")
+    assert (sessao.ativa, sessao.user_agent, sessao.ip_address) == (True, "b", "10.0.0.2")
+    assert LogAtividadeUsuario.objects.filter(user=u, acao="LOGIN").count() == 1
+
+
+def test_falha_de_banco_reenfileira_sem_duplicar(monkeypatch):
+    u = User.objects.create_user("lp_retry", password="x")
+    login_pipeline.enqueue_login(login_pipeline.LoginEvent(u.pk, "k-retry", "10.0.0.3", "ua"))
+    real_write = login_pipeline._write  # noqa: SLF001
+
+    def boom(events):
+        raise DatabaseError("fora do ar")
+
+    monkeypatch.setattr(login_pipeline, "_write", boom)
+    assert login_pipeline.flush() == 0
+    assert login_pipeline.stats()["pending"] == 1
+
+    monkeypatch.setattr(login_pipeline, "_write", real_write)
+    assert login_pipeline.flush() == 1
+    assert SessaoUsuario.objects.filter(session_key="k-retry").count() == 1
+    assert LogAtividadeUsuario.objects.filter(user=u, acao="LOGIN").count() == 1
+
+
+def test_logout_logo_apos_login_nao_reativa_sessao(client):
+    u = User.objects.create_user("lp_out", password="x")
+    assert client.login(username="lp_out", password="x")
+    client.logout()
+    assert login_pipeline.stats()["pending"] == 0
+    assert SessaoUsuario.objects.get(user=u).ativa is False
+
+
+def test_warmup_por_par_usuario_tenant(client, settings):
+    settings.PERMISSION_WARMUP_ON_LOGIN = True
+    settings.PERMISSION_WARMUP_ACTIONS = ["VIEW_DASHBOARD_PUBLIC"]
+    u = User.objects.create_user("lp_warm", password="x")
+    tenant = Tenant.objects.create(name="LP", subdomain="lp-warm")
+    TenantUser.objects.create(user=u, tenant=tenant, role=Role.objects.create(name="basic", tenant=tenant))
+
+    assert client.login(username="lp_warm", password="x")
+    client.logout()
+    assert client.login(username="lp_warm", password="x")
+    login_pipeline.flush()
+    assert login_pipeline.stats()["warmups"] >= 1
@@ -0,0 +1,140 @@
+"""Revogação de sessões em lote: UPDATE único, sessões Django removidas, broadcast coalescido e época do tenant."""
+
+from __future__ import annotations
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.models import Tenant, TenantUser
+from user_management.models import SessaoUsuario
+from user_management.services import session_revocation
+
+pytestmark = pytest.mark.django_db
+
+User = get_user_model()
+
+
+@pytest.fixture(autouse=True)
+def _limpa_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def _login(user, tenant):
+    client = Client()
+    client.force_login(user)
+    sessao = client.session
+    sessao["tenant_id"] = tenant.pk
+    sessao.save()
+    return client
+
+
+@pytest.fixture
+def tenant():
+    return Tenant.objects.create(name="Empresa Revoga", subdomain="revoga")
+
+
+def test_encerrar_multiplas_em_lote_com_broadcast_coalescido(tenant, monkeypatch, django_capture_on_commit_callbacks):
+    admin = User.objects.create_superuser("rev_admin", "rev@x.com", "x")
+    alvos = [User.objects.create_user(f"rev_alvo{i}", password="x") for i in range(2)]
+    clientes = [_login(u, tenant) for u in alvos for _ in range(2)]  # 2 sessões por usuário
+    chaves = [c.session.session_key for c in clientes]
+    for i, chave in enumerate(chaves):
+        SessaoUsuario.objects.update_or_create(
+            session_key=chave, defaults={"user": alvos[i // 2], "ip_address": "10.0.0.1", "user_agent": "UA"}
+        )
+    enviados = []
+    monkeypatch.setattr(session_revocation, "broadcast_sessions_terminated", enviados.append)
+
+    admin_client = _login(admin, tenant)
+    linhas = list(SessaoUsuario.objects.filter(session_key__in=chaves).values_list("id", "user_id"))
+    ids = [pk for pk, _uid in linhas]
+    with CaptureQueriesContext(connection) as ctx, django_capture_on_commit_callbacks(execute=True):
+        resp = admin_client.post(
+            reverse("user_management:sessao_encerrar_multiplas"),
+            data={"ids": ",".join(map(str, ids))},
+            HTTP_X_REQUESTED_WITH="XMLHttpRequest",
+        )
+    assert resp.json()["encerradas"] == 4
+    updates = [
+        q for q in ctx.captured_queries if q["sql"].startswith('UPDATE "user_management_sessaousuario" SET "ativa"')
+    ]
+    assert len(updates) == 1
+    assert not Session.objects.filter(session_key__in=chaves).exists()
+    assert len(enviados) == 1 and {uid: sorted(v) for uid, v in enviados[0].items()} == {
+        u.pk: sorted(pk for pk, uid in linhas if uid == u.pk) for u in alvos
+    }
+    # Cookie antigo deixa de autenticar
+    assert clientes[0].get(reverse("user_management:sessao_api")).status_code == 302
+
+
+def test_encerrar_todas_mantem_a_sessao_atual(tenant):
+    user = User.objects.create_user("rev_proprio", password="x")
+    TenantUser.objects.create(tenant=tenant, user=user)
+    atual, outra = _login(user, tenant), _login(user, tenant)
+    for cliente in (atual, outra):
+        SessaoUsuario.objects.update_or_create(
+            session_key=cliente.session.session_key, defaults={"user": user, "user_agent": "UA"}
+        )
+    resp = atual.post(
+        reverse("user_management:sessao_encerrar_todas", args=[user.pk]), HTTP_X_REQUESTED_WITH="XMLHttpRequest"
+    )
+    assert resp.json()["encerradas"] == 1
+    assert atual.get(reverse("user_management:sessao_api")).status_code == 200
+    assert outra.get(reverse("user_management:sessao_api")).status_code == 302
+
+
+def test_revogacao_do_tenant_usa_epoca_no_middleware(tenant):
+    admin = User.objects.create_user("rev_tadmin", password="x")
+    membro = User.objects.create_user("rev_membro", password="x")
+    TenantUser.objects.create(tenant=tenant, user=admin, is_tenant_admin=True)
+    TenantUser.objects.create(tenant=tenant, user=membro)
+    admin_client = _login(admin, tenant)
+    membro_client = _login(membro, tenant)
+    # Sem SessaoUsuario (ex.: backend sem linha no banco): só a época derruba a sessão
+    SessaoUsuario.objects.filter(user=membro).delete()
+
+    resp = admin_client.post(reverse("user_management:sessao_encerrar_tenant"), HTTP_X_REQUESTED_WITH="XMLHttpRequest")
+    assert resp.status_code == 200
+    assert session_revocation.epoca_revogacao(tenant.pk) is not None
+
+    assert membro_client.get(reverse("user_management:sessao_api")).status_code == 302
+    assert admin_client.get(reverse("user_management:sessao_api")).status_code == 200  # quem revogou continua
+
+    novo_login = _login(membro, tenant)
+    session = novo_login.session
+    session_revocation.marcar_emissao(session)
+    session.save()
+    assert novo_login.get(reverse("user_management:sessao_api")).status_code == 200
+
+
+def test_revogacao_do_tenant_preserva_sessoes_em_outros_tenants(tenant):
+    outro = Tenant.objects.create(name="Outra Empresa", subdomain="revoga2")
+    membro = User.objects.create_user("rev_dois_tenants", password="x")
+    for t in (tenant, outro):
+        TenantUser.objects.create(tenant=t, user=membro)
+    no_tenant, no_outro = _login(membro, tenant), _login(membro, outro)
+    for cliente in (no_tenant, no_outro):
+        SessaoUsuario.objects.update_or_create(
+            session_key=cliente.session.session_key, defaults={"user": membro, "user_agent": "UA"}
+        )
+
+    resultado = session_revocation.revogar_tenant(tenant)
+
+    assert resultado.session_keys == [no_tenant.session.session_key]
+    assert SessaoUsuario.objects.get(session_key=no_outro.session.session_key).ativa
+    assert no_outro.get(reverse("user_management:sessao_api")).status_code == 200
+    assert no_tenant.get(reverse("user_management:sessao_api")).status_code == 302
+
+    # A sessão poupada entra depois no tenant revogado: a troca é posterior à época
+    sessao = no_outro.session
+    sessao["tenant_id"] = tenant.pk
+    sessao.save()
+    assert no_outro.get(reverse("user_management:sessao_api")).status_code == 200
@@ -0,0 +1,84 @@
+"""Risco persistido de sessões: cálculo incremental, filtros no banco e backfill."""
+
+from __future__ import annotations
+
+from io import StringIO
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.urls import reverse
+
+from user_management.models import SessaoUsuario
+from user_management.risk import RISCO_GEO_VARIACAO, RISCO_MULTI_IP, RISCO_NOVO_IP, RISCO_USER_AGENT_INCOMUM
+
+pytestmark = pytest.mark.django_db
+
+User = get_user_model()
+UA_CHROME = "Mozilla/5.0 (Windows NT 10.0) Chrome/120.0.1"
+
+
+def _sessao(user, chave, ip, pais="BR", ua=UA_CHROME, **kwargs):
+    return SessaoUsuario.objects.create(user=user, session_key=chave, ip_address=ip, pais=pais, user_agent=ua, **kwargs)
+
+
+def test_riscos_calculados_na_criacao_e_no_encerramento():
+    user = User.objects.create_user("risk_u", password="x")
+    primeira = _sessao(user, "r1", "10.0.0.1")
+    assert primeira.risco_flags == 0  # sem histórico, nada é "novo"
+
+    segunda = _sessao(user, "r2", "10.0.0.2", pais="PT", ua="Mozilla/5.0 (X11; Linux) Firefox/121.0")
+    primeira.refresh_from_db()
+    assert segunda.risco_flags & RISCO_NOVO_IP and segunda.risco_flags & RISCO_USER_AGENT_INCOMUM
+    assert primeira.risco_flags == RISCO_MULTI_IP | RISCO_GEO_VARIACAO  # simultâneos valem para as duas
+    assert segunda.risco_score > primeira.risco_score
+
+    # Atualizar o navegador não é user agent incomum
+    assert not _sessao(user, "r3", "10.0.0.1", ua=UA_CHROME.replace("120.0.1", "121.0.7")).risco_flags & (
+        RISCO_USER_AGENT_INCOMUM
+    )
+
+    for sessao in SessaoUsuario.objects.filter(session_key__in=["r2", "r3"]):
+        sessao.ativa = False
+        sessao.save(update_fields=["ativa"])
+    primeira.refresh_from_db()
+    assert primeira.risco_flags == 0 and primeira.risco_score == 0
+
+
+def test_api_filtra_ordena_e_conta_risco_no_banco(client):
+    admin = User.objects.create_superuser("risk_admin", "r@x.com", "x")
+    for i in range(30):  # 30 sessões sem risco ocupando as primeiras páginas por atividade
+        _sessao(User.objects.create_user(f"risk_limpo{i}", password="x"), f"limpo{i}", f"10.1.0.{i}")
+    arriscado = User.objects.create_user("risk_alvo", password="x")
+    _sessao(arriscado, "alvo1", "10.9.0.1")
+    _sessao(arriscado, "alvo2", "10.9.0.2")
+    SessaoUsuario.objects.filter(session_key__startswith="alvo").update(
+        ultima_atividade="2026-01-01T00:00:00Z"
+    )  # menos recentes: ficariam fora da 1ª página antes do filtro
+
+    client.force_login(admin)
+    url = reverse("user_management:sessao_api")
+    dados = client.get(url, {"risk": "multi_ip", "page_size": 10}).json()
+    assert dados["total"] == 2
+    assert {s["username"] for s in dados["sessions"]} == {"risk_alvo"}
+    assert all("multi_ip" in s["risks"] and "inativo_longo" in s["risks"] for s in dados["sessions"])
+
+    dados = client.get(url, {"sort": "risk", "page_size": 1}).json()
+    assert dados["sessions"][0]["username"] == "risk_alvo" and dados["has_next"]
+    assert client.get(url, {"min_score": 1}).json()["total"] == 2
+    assert client.get(url, {"risk": "inexistente"}).json()["total"] == 0
+
+
+def test_backfill_em_lotes_pontua_sessoes_existentes():
+    user = User.objects.create_user("risk_bf", password="x")
+    _sessao(user, "bf1", "10.2.0.1")
+    _sessao(user, "bf2", "10.2.0.2")
+    SessaoUsuario.objects.update(risco_flags=0, risco_score=0)  # estado anterior à migração
+
+    out = StringIO()
+    call_command("backfill_session_risk", "--batch", "1", stdout=out)
+    assert "Atualizadas: 2" in out.getvalue()
+    assert SessaoUsuario.objects.get(session_key="bf2").risco_flags == RISCO_NOVO_IP | RISCO_MULTI_IP
+    out = StringIO()
+    call_command("backfill_session_risk", stdout=out)
+    assert "Atualizadas: 0" in out.getvalue()  # idempotente
@@ -0,0 +1,128 @@
+"""Métricas agregadas: uma agregação por modelo, cache por tenant, invalidação por signals e snapshots."""
+
+from __future__ import annotations
+
+from datetime import timedelta
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import Tenant, TenantUser
+from user_management.models import (
+    ConviteUsuario,
+    PerfilUsuarioEstendido,
+    SessaoUsuario,
+    SnapshotMetricasUsuarios,
+    StatusUsuario,
+    TipoUsuario,
+)
+from user_management.services import user_metrics
+
+pytestmark = pytest.mark.django_db
+
+User = get_user_model()
+
+
+@pytest.fixture(autouse=True)
+def _limpa_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def tenant_com_membros():
+    tenant = Tenant.objects.create(name="Empresa Métricas", subdomain="metricas")
+    users = [User.objects.create_user(f"met_u{i}", password="x") for i in range(3)]
+    for u in users:
+        TenantUser.objects.create(tenant=tenant, user=u)
+    PerfilUsuarioEstendido.objects.filter(user=users[2]).update(status=StatusUsuario.INATIVO)
+    PerfilUsuarioEstendido.objects.filter(user=users[0]).update(totp_secret="SECRET", totp_confirmed_at=timezone.now())
+    ConviteUsuario.objects.create(
+        email="novo@x.com",
+        tipo_usuario=TipoUsuario.FUNCIONARIO,
+        expirado_em=timezone.now() + timedelta(days=2),
+        enviado_por=users[0],
+        tenant=tenant,
+    )
+    SessaoUsuario.objects.create(user=users[1], session_key="met_s1", user_agent="UA")
+    cache.clear()
+    return tenant, users
+
+
+def test_resumo_do_tenant_em_uma_agregacao_por_modelo_e_cacheado(tenant_com_membros, django_assert_num_queries):
+    tenant, users = tenant_com_membros
+    with django_assert_num_queries(3):  # membros/perfis, convites, sessões
+        resumo = user_metrics.resumo_usuarios(tenant)
+    assert resumo == user_metrics.ResumoUsuarios(
+        total_usuarios=3,
+        usuarios_ativos=2,
+        convites_pendentes=1,
+        sessoes_ativas=1,
+        twofa_ativos=1,
+        twofa_confirmados=1,
+    )
+    with django_assert_num_queries(0):
+        user_metrics.resumo_usuarios(tenant)
+
+    # Signals invalidam apenas o necessário: novo membro e encerramento de sessão
+    TenantUser.objects.create(tenant=tenant, user=User.objects.create_user("met_u3", password="x"))
+    assert user_metrics.resumo_usuarios(tenant).total_usuarios == 4
+    sessao = SessaoUsuario.objects.get(session_key="met_s1")
+    sessao.ativa = False
+    sessao.save(update_fields=["ativa"])
+    assert user_metrics.resumo_usuarios(tenant).sessoes_ativas == 0
+
+
+def test_metricas_twofa_uma_consulta_e_ttl_ate_o_fim_do_bloqueio(
+    tenant_com_membros, django_assert_num_queries, monkeypatch
+):
+    _tenant, users = tenant_com_membros
+    perfil = PerfilUsuarioEstendido.objects.get(user=users[1])
+    perfil.twofa_locked_until = timezone.now() + timedelta(seconds=30)
+    perfil.twofa_success_count = 4
+    perfil.save()
+    ttls = []
+    set_original = cache.set
+    monkeypatch.setattr(
+        cache, "set", lambda chave, valor, ttl=None: ttls.append(ttl) or set_original(chave, valor, ttl)
+    )
+    with django_assert_num_queries(1):
+        metricas = user_metrics.metricas_twofa()
+    assert (metricas.ativos, metricas.confirmados, metricas.lockados, metricas.sucessos) == (1, 1, 1, 4)
+    assert metricas.pct_criptografados == 0
+    assert ttls and ttls[-1] <= 30  # expira junto com o bloqueio, não após USER_METRICS_CACHE_SECONDS
+
+    perfil.twofa_locked_until = None
+    perfil.save(update_fields=["twofa_locked_until"])
+    assert user_metrics.metricas_twofa().lockados == 0
+
+
+def test_snapshots_diarios_idempotentes_alimentam_tendencia(tenant_com_membros, client):
+    tenant, users = tenant_com_membros
+    ontem = timezone.localdate() - timedelta(days=1)
+    # Outros tenants podem existir no banco: as contagens olham só este tenant e a visão global
+    todos = Tenant.objects.count() + 1
+    assert user_metrics.registrar_snapshots(ontem) == todos
+    TenantUser.objects.create(tenant=tenant, user=User.objects.create_user("met_u4", password="x"))
+    assert user_metrics.registrar_snapshots() == todos
+    assert user_metrics.registrar_snapshots() == todos
+    assert SnapshotMetricasUsuarios.objects.filter(tenant=tenant).count() == 2
+    assert SnapshotMetricasUsuarios.objects.filter(tenant__isnull=True, data__gte=ontem).count() == 2
+
+    serie = user_metrics.tendencia(tenant)
+    assert [p["total_usuarios"] for p in serie] == [3, 4]
+    assert serie[-1]["twofa_confirmados"] == 1 and serie[-1]["convites_pendentes"] == 1
+    assert [p["total_usuarios"] for p in user_metrics.tendencia()] == [User.objects.count() - 1, User.objects.count()]
+
+    client.force_login(users[0])
+    sessao = client.session
+    sessao["tenant_id"] = tenant.pk
+    sessao.save()
+    resp = client.get(reverse("user_management:user_management_home"))
+    assert resp.status_code == 200
+    assert resp.context["total_usuarios"] == 4
+    assert [p["total_usuarios"] for p in resp.context["tendencia"]] == [3, 4]
@@ -7,4 +7,4 @@ class UserManagementConfig(AppConfig):
     verbose_name = "Gerenciamento de Usuários"
 
     def ready(self):
-        pass
+        from . import signals  # noqa: F401, PLC0415 força registro dos handlers (login, perfis, cache)
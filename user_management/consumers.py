@@ -4,7 +4,7 @@ from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
 from django.utils import timezone
 
-from .risk import build_context_maps, compute_risks, session_to_dict
+from .risk import compute_risks, session_to_dict
 
 
 class SessionsConsumer(AsyncWebsocketConsumer):
@@ -57,6 +57,8 @@ class SessionsConsumer(AsyncWebsocketConsumer):
                     "type": "session_update",
                     "event": event.get("event"),
                     "session": event.get("session"),
+                    # eventos coalescidos (terminated_bulk / tenant_revoked)
+                    **{k: event[k] for k in ("user_id", "tenant_id", "session_ids") if k in event},
                     "timestamp": timezone.now().isoformat(),
                 }
             )
@@ -68,5 +70,4 @@ class SessionsConsumer(AsyncWebsocketConsumer):
         from .models import SessaoUsuario
 
         qs = list(SessaoUsuario.objects.filter(ativa=True).select_related("user").order_by("-ultima_atividade")[:limit])
-        ips_map, paises_map = build_context_maps(qs)
-        return [session_to_dict(s, compute_risks(s, ips_map, paises_map)) for s in qs]
+        return [session_to_dict(s, compute_risks(s)) for s in qs]
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from user_management.models import SessaoUsuario
+from user_management.services import session_risk
+
+
+class Command(BaseCommand):
+    help = "Calcula o risco persistido (risco_flags/risco_score) das sessões existentes, em lotes de usuários."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch", type=int, default=500, help="Usuários por lote (default: 500)")
+
+    def handle(self, *args, **opts):
+        batch = max(opts["batch"], 1)
+        usuarios = (
+            SessaoUsuario.objects.order_by("user_id").values_list("user_id", flat=True).distinct()
+        )  # keyset por user_id: cada lote é uma consulta indexada, sem OFFSET
+        ultimo = 0
+        lotes = sessoes = alteradas = 0
+        while True:
+            ids = list(usuarios.filter(user_id__gt=ultimo)[:batch])
+            if not ids:
+                break
+            with transaction.atomic():
+                resultado = session_risk.recalcular_usuarios(ids)
+            ultimo = ids[-1]
+            lotes += 1
+            sessoes += resultado.sessoes
+            alteradas += resultado.alteradas
+            self.stdout.write(f"Lote {lotes}: {len(ids)} usuários, {resultado.alteradas} sessões atualizadas")
+        self.stdout.write(
+            self.style.SUCCESS(f"Sessões avaliadas: {sessoes} | Atualizadas: {alteradas} | Lotes: {lotes}")
+        )
@@ -3,6 +3,7 @@ from django.core.management.base import BaseCommand
 from django.utils import timezone
 
 from user_management.models import LogAtividadeUsuario, SessaoUsuario
+from user_management.services import session_risk, user_metrics
 
 
 class Command(BaseCommand):
@@ -36,7 +37,10 @@ class Command(BaseCommand):
 
         # Executa
         if count_sessoes_update:
+            usuarios = set(qs_sessoes.values_list("user_id", flat=True))
             qs_sessoes.update(ativa=False)
+            session_risk.recalcular_usuarios(usuarios)
+            user_metrics.invalidar_usuarios(usuarios)
         expired_sessions.delete()
         if count_logs_delete:
             qs_logs.delete()
@@ -0,0 +1,102 @@
+"""Benchmark de latência do login sob rajada concorrente.
+
+Cria ``--logins`` usuários sintéticos e dispara os logins em paralelo
+(``--concorrencia`` threads liberadas ao mesmo tempo), medindo o tempo de
+``login()`` — sinais ``user_logged_in`` incluídos. Compara dois modos:
+
+* ``sincrono``: pipeline com flush imediato (efeitos colaterais dentro do request,
+  como antes);
+* ``pipeline``: efeitos colaterais enfileirados e gravados em lote
+  (``user_management.services.login_pipeline``); o tempo de drenagem do buffer é
+  exibido à parte.
+
+Usuários e dados gerados são removidos ao final. Use PostgreSQL: o SQLite
+serializa escritas e os erros de lock aparecem na contagem de falhas.
+
+Uso:
+    python manage.py login_benchmark --logins 500 --concorrencia 500
+"""
+
+from __future__ import annotations
+
+import contextlib
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, override_settings
+
+from shared.metrics.sketch import LatencySketch
+from user_management.services import login_pipeline
+
+
+class Command(BaseCommand):
+    help = "Mede p50/p95 do login com N logins concorrentes (síncrono x pipeline em lote)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--logins", type=int, default=500, help="Logins por modo (default 500)")
+        parser.add_argument("--concorrencia", type=int, default=500, help="Threads simultâneas (default 500)")
+        parser.add_argument("--modo", choices=["sincrono", "pipeline", "ambos"], default="ambos")
+
+    def handle(self, *args, **options):
+        modos = ["sincrono", "pipeline"] if options["modo"] == "ambos" else [options["modo"]]
+        prefixo = f"bench-login-{uuid.uuid4().hex[:8]}"
+        User = get_user_model()  # noqa: N806
+        try:
+            for modo in modos:
+                users = [
+                    User.objects.create_user(username=f"{prefixo}-{modo}-{i}", password=None)
+                    for i in range(options["logins"])
+                ]
+                flush_seconds = 0 if modo == "sincrono" else 3600  # pipeline: drenagem medida abaixo
+                with override_settings(
+                    LOGIN_PIPELINE_IN_TESTS=True,
+                    LOGIN_PIPELINE_FLUSH_SECONDS=flush_seconds,
+                    LOGIN_PIPELINE_MAX_BUFFER=options["logins"] + 1,
+                ):
+                    login_pipeline.reset()
+                    sketch, falhas = self._rajada(users, options["concorrencia"])
+                    inicio = time.perf_counter()
+                    login_pipeline.flush()
+                    drenagem = time.perf_counter() - inicio
+                resumo = sketch.summary()
+                self.stdout.write(
+                    f"{modo:9} logins={sketch.count} falhas={falhas} p50={resumo['p50'] * 1000:.1f}ms "
+                    f"p95={resumo['p95'] * 1000:.1f}ms max={resumo['max'] * 1000:.1f}ms "
+                    f"drenagem={drenagem * 1000:.1f}ms",
+                )
+        finally:
+            User.objects.filter(username__startswith=prefixo).delete()
+        self.stdout.write(self.style.SUCCESS("Benchmark concluído (usuários sintéticos removidos)."))
+
+    @staticmethod
+    def _rajada(users: list, concorrencia: int) -> tuple[LatencySketch, int]:
+        sketch = LatencySketch()
+        lock = threading.Lock()
+        falhas = [0]
+        largada = threading.Barrier(min(concorrencia, len(users)))
+
+        def logar(user) -> None:
+            client = Client()
+            with contextlib.suppress(threading.BrokenBarrierError):  # lote final menor que a concorrência
+                largada.wait(timeout=5)
+            try:
+                t0 = time.perf_counter()
+                client.force_login(user)
+                elapsed = time.perf_counter() - t0
+            except Exception:  # noqa: BLE001 - contabiliza e segue (ex.: lock no SQLite)
+                with lock:
+                    falhas[0] += 1
+                return
+            finally:
+                connection.close()
+            with lock:
+                sketch.add(elapsed)
+
+        with ThreadPoolExecutor(concorrencia) as pool:
+            list(pool.map(logar, users))
+        return sketch, falhas[0]
@@ -3,6 +3,7 @@ from django.core.management.base import BaseCommand
 from django.db.models import Count, Q, Sum
 
 from user_management.models import PerfilUsuarioEstendido
+from user_management.services import user_metrics
 
 
 class Command(BaseCommand):
@@ -41,4 +42,5 @@ class Command(BaseCommand):
                 twofa_rate_limit_block_count=0,
             )
             cache.delete("twofa_global_ip_block_metric")
+            user_metrics.invalidar(twofa=True)  # update() em massa não dispara post_save
             self.stdout.write(self.style.WARNING(f"Counters reset para {updated} perfis."))
@@ -0,0 +1,19 @@
+from django.contrib.auth import logout
+from django.utils.deprecation import MiddlewareMixin
+
+from user_management.services.session_revocation import sessao_revogada
+
+
+class SessionRevocationMiddleware(MiddlewareMixin):
+    """Encerra sessões emitidas antes da última revogação do tenant ("deslogar todos").
+
+    Custo por request: uma leitura de cache (época do tenant da sessão). Deve ficar
+    após ``AuthenticationMiddleware``.
+    """
+
+    def process_request(self, request):
+        if not request.user.is_authenticated:
+            return None
+        if sessao_revogada(request.session):
+            logout(request)  # limpa a sessão; user_logged_out desativa a SessaoUsuario
+        return None
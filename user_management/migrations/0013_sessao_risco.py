@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("user_management", "0012_logatividadeusuario_extra_json"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="sessaousuario",
+            name="risco_flags",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="sessaousuario",
+            name="risco_score",
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name="sessaousuario",
+            index=models.Index(fields=["risco_flags"], name="sessao_risco_flags_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="sessaousuario",
+            index=models.Index(fields=["-risco_score", "-ultima_atividade"], name="sessao_risco_score_idx"),
+        ),
+    ]
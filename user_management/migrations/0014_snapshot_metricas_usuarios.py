@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0010_searchdocument"),
+        ("user_management", "0013_sessao_risco"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SnapshotMetricasUsuarios",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("data", models.DateField()),
+                ("total_usuarios", models.PositiveIntegerField(default=0)),
+                ("usuarios_ativos", models.PositiveIntegerField(default=0)),
+                ("convites_pendentes", models.PositiveIntegerField(default=0)),
+                ("sessoes_ativas", models.PositiveIntegerField(default=0)),
+                ("twofa_ativos", models.PositiveIntegerField(default=0)),
+                ("twofa_confirmados", models.PositiveIntegerField(default=0)),
+                ("atualizado_em", models.DateTimeField(auto_now=True)),
+                (
+                    "tenant",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="snapshots_metricas_usuarios",
+                        to="core.tenant",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Snapshot de Métricas de Usuários",
+                "verbose_name_plural": "Snapshots de Métricas de Usuários",
+                "ordering": ["-data"],
+                "constraints": [
+                    models.UniqueConstraint(fields=("tenant", "data"), name="snapshot_metricas_tenant_data_uniq"),
+                    models.UniqueConstraint(
+                        condition=models.Q(("tenant__isnull", True)),
+                        fields=("data",),
+                        name="snapshot_metricas_global_data_uniq",
+                    ),
+                ],
+            },
+        ),
+    ]
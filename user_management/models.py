@@ -237,15 +237,59 @@ class SessaoUsuario(models.Model):
     pais = models.CharField(max_length=100, null=True, blank=True)
     cidade = models.CharField(max_length=100, null=True, blank=True)
 
+    # Risco persistido (bitmask de user_management.risk + score 0..100), mantido por
+    # user_management.services.session_risk a cada criação/atualização de sessão
+    risco_flags = models.PositiveIntegerField(default=0)
+    risco_score = models.PositiveSmallIntegerField(default=0)
+
     class Meta:
         verbose_name = "Sessão de Usuário"
         verbose_name_plural = "Sessões de Usuários"
         ordering = ["-ultima_atividade"]
+        indexes = [
+            models.Index(fields=["risco_flags"], name="sessao_risco_flags_idx"),
+            models.Index(fields=["-risco_score", "-ultima_atividade"], name="sessao_risco_score_idx"),
+        ]
 
     def __str__(self):
         return f"Sessão de {self.user.username} - {self.ip_address}"
 
 
+class SnapshotMetricasUsuarios(models.Model):
+    """Fotografia diária das métricas do módulo (tenant nulo = visão global do sistema).
+
+    Gravada por ``user_management.services.user_metrics.registrar_snapshots``; os
+    gráficos de tendência leem daqui em vez de varrer as tabelas a cada acesso.
+    """
+
+    tenant = models.ForeignKey(
+        "core.Tenant", on_delete=models.CASCADE, related_name="snapshots_metricas_usuarios", null=True, blank=True
+    )
+    data = models.DateField()
+    total_usuarios = models.PositiveIntegerField(default=0)
+    usuarios_ativos = models.PositiveIntegerField(default=0)
+    convites_pendentes = models.PositiveIntegerField(default=0)
+    sessoes_ativas = models.PositiveIntegerField(default=0)
+    twofa_ativos = models.PositiveIntegerField(default=0)
+    twofa_confirmados = models.PositiveIntegerField(default=0)
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Snapshot de Métricas de Usuários"
+        verbose_name_plural = "Snapshots de Métricas de Usuários"
+        ordering = ["-data"]
+        constraints = [
+            models.UniqueConstraint(fields=["tenant", "data"], name="snapshot_metricas_tenant_data_uniq"),
+            models.UniqueConstraint(
+                fields=["data"], condition=models.Q(tenant__isnull=True), name="snapshot_metricas_global_data_uniq"
+            ),
+        ]
+
+    def __str__(self):
+        escopo = self.tenant_id or "global"
+        return f"Métricas {escopo} - {self.data}"
+
+
 class LogAtividadeUsuario(models.Model):
     """Log de atividades dos usuários para auditoria"""
 
@@ -5,19 +5,37 @@ from channels.layers import get_channel_layer
 
 from .risk import compute_risks, session_to_dict
 
+GRUPO_MONITOR = "sessions_monitor"
 
-def broadcast_session_event(event, sessao):
-    """Envia evento para grupo de monitoramento de sessões."""
+
+def _send(payload):
     try:
         layer = get_channel_layer()
         if not layer:
             return
-        payload = {
+        async_to_sync(layer.group_send)(GRUPO_MONITOR, payload)
+    except Exception:
+        # Silencia para não quebrar fluxo principal
+        pass
+
+
+def broadcast_session_event(event, sessao):
+    """Envia evento para grupo de monitoramento de sessões."""
+    _send(
+        {
             "type": "session.message",
             "event": event,
             "session": session_to_dict(sessao, compute_risks(sessao)),
         }
-        async_to_sync(layer.group_send)("sessions_monitor", payload)
-    except Exception:
-        # Silencia para não quebrar fluxo principal
-        pass
+    )
+
+
+def broadcast_sessions_terminated(ids_por_usuario):
+    """Um evento coalescido por usuário com todas as sessões encerradas dele."""
+    for user_id, ids in ids_por_usuario.items():
+        _send({"type": "session.message", "event": "terminated_bulk", "user_id": user_id, "session_ids": ids})
+
+
+def broadcast_tenant_revoked(tenant_id, session_ids):
+    """Revogação de todas as sessões de um tenant, em um único evento."""
+    _send({"type": "session.message", "event": "tenant_revoked", "tenant_id": tenant_id, "session_ids": session_ids})
@@ -1,49 +1,63 @@
-"""Helpers de cálculo de risco para sessões de usuário."""
+"""Helpers de risco para sessões de usuário.
+
+Os riscos estruturais da sessão ficam persistidos em ``SessaoUsuario.risco_flags``
+(bitmask) e ``risco_score`` — calculados de forma incremental por
+``user_management.services.session_risk`` a cada criação/atualização de sessão.
+Aqui ficam as definições dos bits, a conversão bitmask <-> nomes e o único risco
+dependente do relógio (``inativo_longo``), derivado de ``ultima_atividade``.
+"""
+
+from datetime import timedelta
 
 from django.utils import timezone
 
+RISCO_NOVO_IP = 1
+RISCO_NOVO_PAIS = 2
+RISCO_MULTI_IP = 4
+RISCO_GEO_VARIACAO = 8
+RISCO_USER_AGENT_INCOMUM = 16
+
+# nome exposto na API -> (bit, peso no score)
+RISCOS = {
+    "novo_ip": (RISCO_NOVO_IP, 20),
+    "novo_pais": (RISCO_NOVO_PAIS, 30),
+    "multi_ip": (RISCO_MULTI_IP, 15),
+    "geo_variacao": (RISCO_GEO_VARIACAO, 35),
+    "user_agent_incomum": (RISCO_USER_AGENT_INCOMUM, 10),
+}
+RISCO_INATIVO_LONGO = "inativo_longo"
+INATIVIDADE_LONGA = timedelta(hours=2)
+_TODOS_OS_BITS = sum(bit for bit, _ in RISCOS.values())
+
+
+def score_de_flags(flags):
+    """Score 0..100 (soma dos pesos dos riscos presentes)."""
+    return min(sum(peso for bit, peso in RISCOS.values() if flags & bit), 100)
+
 
-def build_context_maps(qs):
-    """Gera mapas auxiliares para cálculo de riscos.
+def riscos_de_flags(flags):
+    return [nome for nome, (bit, _peso) in RISCOS.items() if flags & bit]
 
-    Return:
-        dicts: ips_por_usuario, paises_por_usuario
+
+def flags_com_risco(nome):
+    """Todos os valores de bitmask que contêm o risco ``nome``.
+
+    Permite filtrar com ``risco_flags__in=[...]`` (usa o índice de ``risco_flags``) em
+    vez de uma operação bit a bit que não é indexável.
     """
-    ips_por_usuario = {}
-    paises_por_usuario = {}
-    for s in qs:
-        ips_por_usuario.setdefault(s.user_id, set()).add(s.ip_address)
-        if s.pais:
-            paises_por_usuario.setdefault(s.user_id, set()).add(s.pais)
-    return ips_por_usuario, paises_por_usuario
-
-
-def compute_risks(sessao, ips_por_usuario=None, paises_por_usuario=None):
-    risks = []
-    from .models import SessaoUsuario
-
-    # Novo IP (primeira vez que aparece para o user em sessões anteriores ativas/inativas)
-    if sessao.ip_address:
-        # Se não estiver no mapa, construir fallback consulta
-        if ips_por_usuario is not None:
-            known_ips = ips_por_usuario.get(sessao.user_id, set()) - {sessao.ip_address}
-            if sessao.ip_address not in known_ips and len(known_ips) == 0:
-                risks.append("novo_ip")
-        elif (
-            not SessaoUsuario.objects.filter(user=sessao.user, ip_address=sessao.ip_address)
-            .exclude(pk=sessao.pk)
-            .exists()
-        ):
-            risks.append("novo_ip")
-    # Inatividade longa
-    if (timezone.now() - sessao.ultima_atividade).total_seconds() > 7200:  # >2h
-        risks.append("inativo_longo")
-    # Múltiplos IPs simultâneos
-    if ips_por_usuario is not None and len(ips_por_usuario.get(sessao.user_id, [])) > 1:
-        risks.append("multi_ip")
-    # Variação geográfica simultânea
-    if paises_por_usuario is not None and len(paises_por_usuario.get(sessao.user_id, [])) > 1:
-        risks.append("geo_variacao")
+    bit = RISCOS[nome][0]
+    return [valor for valor in range(_TODOS_OS_BITS + 1) if valor & bit]
+
+
+def limite_inatividade(agora=None):
+    return (agora or timezone.now()) - INATIVIDADE_LONGA
+
+
+def compute_risks(sessao, agora=None):
+    """Riscos da sessão: bits persistidos + inatividade longa (dependente do relógio)."""
+    risks = riscos_de_flags(sessao.risco_flags or 0)
+    if sessao.ultima_atividade and sessao.ultima_atividade < limite_inatividade(agora):
+        risks.append(RISCO_INATIVO_LONGO)
     return risks
 
 
@@ -59,4 +73,5 @@ def session_to_dict(sessao, risks=None):
         "ultima_atividade": sessao.ultima_atividade.isoformat(),
         "ativa": sessao.ativa,
         "risks": risks or [],
+        "risk_score": sessao.risco_score,
     }
@@ -0,0 +1,327 @@
+"""Pipeline dos efeitos colaterais de login (fora do caminho da request).
+
+O receiver ``usuario_logou`` faz apenas o que o login precisa de imediato:
+zera ``tentativas_login_falhadas`` e grava ``ultimo_login_ip`` em um único
+``UPDATE`` (o contador de falhas alimenta o bloqueio e não pode ficar defasado).
+O resto vira um ``LoginEvent`` enfileirado em buffer por processo e processado em
+lote, no mesmo modelo de ``core.services.write_behind``:
+
+1. upsert de ``SessaoUsuario`` por ``session_key`` (um ``bulk_create`` com
+   ``update_conflicts``) + risco persistido das sessões dos usuários do lote
+   (``session_risk``) + ``LogAtividadeUsuario`` de LOGIN (um ``bulk_create``),
+   na mesma transação, invalidando as métricas dos tenants afetados (``user_metrics``);
+2. broadcast realtime das sessões criadas/atualizadas;
+3. aquecimento do ``PermissionResolver`` por par (usuário, tenant) distinto.
+
+Idempotência: eventos são deduplicados pela ``session_key`` (reenfileirar o mesmo
+login substitui o anterior) e a etapa 1 é atômica — em falha de banco o lote
+inteiro volta ao buffer (até ``MAX_ATTEMPTS``) sem gravar duplicatas.
+
+O flush ocorre quando o intervalo (``LOGIN_PIPELINE_FLUSH_SECONDS``) vence, quando
+o buffer atinge ``LOGIN_PIPELINE_MAX_BUFFER``, por uma thread daemon periódica e no
+encerramento do worker. Com intervalo <= 0 (ou em testes) o flush é imediato.
+"""
+
+from __future__ import annotations
+
+import atexit
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError, close_old_connections, transaction
+from django.utils import timezone
+
+from shared.services.permission_resolver import permission_resolver
+from user_management.models import LogAtividadeUsuario, PerfilUsuarioEstendido, SessaoUsuario
+from user_management.realtime import broadcast_session_event
+from user_management.services import session_risk, user_metrics
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    "LoginEvent",
+    "apply_critical_state",
+    "enqueue_login",
+    "flush",
+    "flush_session",
+    "reset",
+    "stats",
+]
+
+MAX_ATTEMPTS = 3
+_SESSION_UPDATE_FIELDS = ["user", "ip_address", "user_agent", "ativa", "ultima_atividade"]
+
+
+@dataclass
+class LoginEvent:
+    """Login a processar; ``tenant_id`` é resolvido no flush quando ausente."""
+
+    user_id: int
+    session_key: str | None
+    ip: str
+    user_agent: str
+    tenant_id: int | None = None
+    at: datetime = field(default_factory=timezone.now)
+    attempts: int = 0
+
+    @property
+    def key(self) -> str:
+        """Chave de idempotência (um evento por sessão)."""
+        return self.session_key or f"user:{self.user_id}:{self.at.timestamp()}"
+
+
+_lock = threading.RLock()
+_pending: dict[str, LoginEvent] = {}
+_counters: dict[str, int] = {
+    "enqueued": 0,
+    "deduplicated": 0,
+    "processed": 0,
+    "retried": 0,
+    "dropped": 0,
+    "warmups": 0,
+    "flushes": 0,
+}
+_state: dict[str, Any] = {"last_flush": time.monotonic(), "flusher": None}
+
+
+def _flush_interval() -> float:
+    if getattr(settings, "TESTING", False) and not getattr(settings, "LOGIN_PIPELINE_IN_TESTS", False):
+        return 0.0
+    try:
+        return float(getattr(settings, "LOGIN_PIPELINE_FLUSH_SECONDS", 2))
+    except (TypeError, ValueError):
+        return 2.0
+
+
+def _max_buffer() -> int:
+    return int(getattr(settings, "LOGIN_PIPELINE_MAX_BUFFER", 200))
+
+
+# --- Caminho síncrono -------------------------------------------------------------
+def apply_critical_state(user: Any, ip: str) -> None:  # noqa: ANN401
+    """Estado que o login precisa já persistido: reset de falhas + IP do login."""
+    PerfilUsuarioEstendido.objects.filter(user_id=user.pk).update(ultimo_login_ip=ip, tentativas_login_falhadas=0)
+    perfil = user._state.fields_cache.get("perfil_estendido")  # noqa: SLF001 - mantém instância carregada coerente
+    if perfil is not None:
+        perfil.ultimo_login_ip = ip
+        perfil.tentativas_login_falhadas = 0
+
+
+def enqueue_login(event: LoginEvent) -> None:
+    """Enfileira o evento (substitui evento anterior da mesma sessão)."""
+    with _lock:
+        if event.key in _pending:
+            _counters["deduplicated"] += 1
+        elif len(_pending) >= _max_buffer() * 10:  # limite duro se o BD estiver fora
+            _pending.pop(next(iter(_pending)))
+            _counters["dropped"] += 1
+        _pending[event.key] = event
+        _counters["enqueued"] += 1
+    _maybe_flush()
+
+
+def flush_session(session_key: str | None) -> None:
+    """Processa já o buffer se houver login pendente da sessão (ex.: logout logo após o login)."""
+    with _lock:
+        pending = bool(session_key) and session_key in _pending
+    if pending:
+        flush()
+
+
+def _maybe_flush() -> None:
+    interval = _flush_interval()
+    with _lock:
+        due = interval <= 0 or len(_pending) >= _max_buffer() or time.monotonic() - _state["last_flush"] >= interval
+    if due:
+        flush()
+    elif interval > 0:
+        _ensure_flusher(interval)
+
+
+# --- Flush ------------------------------------------------------------------------
+def _resolve_tenants(events: list[LoginEvent]) -> None:
+    """Preenche ``tenant_id`` ausente com o primeiro vínculo do usuário (uma consulta)."""
+    missing = {e.user_id for e in events if e.tenant_id is None}
+    if not missing:
+        return
+    try:
+        from core.models import TenantUser  # noqa: PLC0415 - evita ciclo na carga do app
+    except ImportError:  # pragma: no cover
+        return
+    first: dict[int, int] = {}
+    for uid, tid in TenantUser.objects.filter(user_id__in=missing).order_by("id").values_list("user_id", "tenant_id"):
+        first.setdefault(uid, tid)
+    for e in events:
+        if e.tenant_id is None:
+            e.tenant_id = first.get(e.user_id)
+
+
+def _write(events: list[LoginEvent]) -> tuple[set[str], set[str]]:
+    """Upsert de sessões + logs em uma transação; retorna (criadas, atualizadas)."""
+    # Usuário removido antes do flush: descarta o evento em vez de falhar o lote (FK)
+    alive = set(get_user_model().objects.filter(pk__in={e.user_id for e in events}).values_list("pk", flat=True))
+    events = [e for e in events if e.user_id in alive]
+    with_session = [e for e in events if e.session_key]
+    keys = [e.session_key for e in with_session]
+    with transaction.atomic():
+        existing = set(SessaoUsuario.objects.filter(session_key__in=keys).values_list("session_key", flat=True))
+        if with_session:
+            SessaoUsuario.objects.bulk_create(
+                [
+                    SessaoUsuario(
+                        user_id=e.user_id,
+                        session_key=e.session_key,
+                        ip_address=e.ip,
+                        user_agent=e.user_agent,
+                        ativa=True,
+                    )
+                    for e in with_session
+                ],
+                update_conflicts=True,
+                unique_fields=["session_key"],
+                update_fields=_SESSION_UPDATE_FIELDS,
+            )
+            session_risk.recalcular_usuarios({e.user_id for e in with_session})
+            user_metrics.invalidar_usuarios({e.user_id for e in with_session})
+        LogAtividadeUsuario.objects.bulk_create(
+            [
+                LogAtividadeUsuario(
+                    user_id=e.user_id,
+                    acao="LOGIN",
+                    modulo="user_management",
+                    descricao="Usuário fez login no sistema",
+                    ip_address=e.ip or "0.0.0.0",  # noqa: S104 - mesmo fallback do log_activity
+                    user_agent=(e.user_agent or "N/A")[:255],
+                )
+                for e in events
+            ],
+        )
+    return set(keys) - existing, set(keys) & existing
+
+
+def _broadcast(created: set[str], updated: set[str]) -> None:
+    if not (created or updated):
+        return
+    for sessao in SessaoUsuario.objects.filter(session_key__in=created | updated).select_related("user"):
+        broadcast_session_event("created" if sessao.session_key in created else "updated", sessao)
+
+
+def _warmup(events: list[LoginEvent]) -> int:
+    """Aquece o cache do resolver uma vez por (usuário, tenant) do lote."""
+    if not getattr(settings, "PERMISSION_WARMUP_ON_LOGIN", True):
+        return 0
+    pairs = {(e.user_id, e.tenant_id) for e in events if e.tenant_id is not None}
+    if not pairs:
+        return 0
+    from core.models import Tenant  # noqa: PLC0415 - evita ciclo na carga do app
+
+    users = get_user_model().objects.in_bulk({u for u, _ in pairs})
+    tenants = Tenant.objects.in_bulk({t for _, t in pairs})
+    # Lista mínima padrão para não interferir com testes sensíveis (ex.: VIEW_COTACAO)
+    actions = getattr(settings, "PERMISSION_WARMUP_ACTIONS", ["VIEW_DASHBOARD_PUBLIC"])
+    warmed = 0
+    for uid, tid in pairs:
+        user, tenant = users.get(uid), tenants.get(tid)
+        if user is None or tenant is None:
+            continue
+        for act in actions:
+            try:
+                permission_resolver.resolve(user, tenant, act)  # resolve() já popula o cache
+            except Exception:  # noqa: BLE001 - aquecimento nunca derruba o lote
+                logger.debug("Warmup de permissão falhou (%s, %s, %s)", uid, tid, act, exc_info=True)
+        warmed += 1
+    return warmed
+
+
+def flush() -> int:
+    """Processa o buffer; retorna quantos eventos foram gravados."""
+    with _lock:
+        events = list(_pending.values())
+        _pending.clear()
+        _state["last_flush"] = time.monotonic()
+    if not events:
+        return 0
+    try:
+        _resolve_tenants(events)
+        created, updated = _write(events)
+    except DatabaseError:
+        logger.warning("Falha ao gravar lote de login (%s eventos)", len(events), exc_info=True)
+        _requeue(events)
+        return 0
+    warmed = 0
+    try:
+        _broadcast(created, updated)
+        warmed = _warmup(events)
+    except Exception:  # noqa: BLE001 - efeitos pós-gravação são best-effort
+        logger.warning("Falha em broadcast/warmup do lote de login", exc_info=True)
+    with _lock:
+        _counters["processed"] += len(events)
+        _counters["warmups"] += warmed
+        _counters["flushes"] += 1
+    return len(events)
+
+
+def _requeue(events: list[LoginEvent]) -> None:
+    with _lock:
+        for e in events:
+            e.attempts += 1
+            if e.attempts >= MAX_ATTEMPTS:
+                _counters["dropped"] += 1
+                continue
+            _pending.setdefault(e.key, e)  # evento mais novo da mesma sessão prevalece
+            _counters["retried"] += 1
+
+
+def _flusher_loop(interval: float) -> None:
+    while True:
+        time.sleep(interval)
+        try:
+            flush()
+        except Exception:  # noqa: BLE001 - a thread nunca pode morrer
+            logger.exception("Erro inesperado no flusher da pipeline de login")
+        finally:
+            close_old_connections()
+
+
+def _ensure_flusher(interval: float) -> None:
+    with _lock:
+        thread = _state["flusher"]
+        if thread is not None and thread.is_alive():
+            return
+        thread = threading.Thread(target=_flusher_loop, args=(interval,), name="login-pipeline-flusher", daemon=True)
+        _state["flusher"] = thread
+        thread.start()
+
+
+def _flush_at_exit() -> None:
+    try:
+        flush()
+    except Exception:  # noqa: BLE001 - interpretador encerrando
+        logger.debug("Flush da pipeline de login no encerramento falhou", exc_info=True)
+
+
+atexit.register(_flush_at_exit)
+
+
+# --- Observabilidade --------------------------------------------------------------
+def stats() -> dict[str, int]:
+    """Contadores acumulados + tamanho atual do buffer."""
+    with _lock:
+        data = dict(_counters)
+        data["pending"] = len(_pending)
+    return data
+
+
+def reset() -> None:
+    """Descarta buffer e zera contadores (testes)."""
+    with _lock:
+        _pending.clear()
+        for k in _counters:
+            _counters[k] = 0
+        _state["last_flush"] = time.monotonic()
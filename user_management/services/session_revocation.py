@@ -0,0 +1,167 @@
+"""Revogação de sessões em lote (encerrar sessões de usuários ou de um tenant inteiro).
+
+``revogar_sessoes`` substitui o laço ``save()`` + broadcast por sessão:
+
+1. um ``UPDATE`` em massa marcando ``SessaoUsuario.ativa=False``;
+2. remoção das sessões Django correspondentes (um ``DELETE`` no backend ``db``;
+   demais backends via ``SessionStore.delete``), para que o cookie deixe de autenticar;
+3. recálculo do risco persistido dos usuários afetados (``session_risk``);
+4. após o commit, um único evento realtime por usuário afetado (``terminated_bulk``
+   com todos os ids), em vez de um evento por sessão; na revogação do tenant, um
+   único ``tenant_revoked`` para todos.
+
+``revogar_tenant`` ("deslogar todo mundo") faz o mesmo para as sessões abertas no
+tenant (``tenant_id`` da sessão Django; sessões do mesmo usuário em outros tenants
+ficam intactas) e grava uma *época de revogação* no cache.
+``SessionRevocationMiddleware`` compara a época do tenant da sessão com o instante
+em que a sessão entrou nesse tenant — o login (``marcar_emissao``) para o primeiro
+tenant, o momento da troca para os seguintes — com uma leitura de cache por request,
+e encerra sessões que já estavam no tenant antes da revogação (cobre backends sem
+linha no banco e logins concorrentes à revogação). Uma sessão poupada por estar em
+outro tenant não é derrubada ao trocar depois para o tenant revogado.
+"""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass, field
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.db import transaction
+
+from user_management.models import SessaoUsuario
+from user_management.realtime import broadcast_sessions_terminated, broadcast_tenant_revoked
+from user_management.services import session_risk, user_metrics
+
+__all__ = [
+    "CHAVE_EMISSAO",
+    "Revogacao",
+    "epoca_revogacao",
+    "marcar_emissao",
+    "revogar_sessoes",
+    "revogar_tenant",
+    "sessao_revogada",
+]
+
+CHAVE_EMISSAO = "_sessao_emitida_em"
+_CHAVE_TENANT = "_sessao_tenant"
+_CHAVE_TENANT_DESDE = "_sessao_tenant_desde"
+_CHAVE_EPOCA = "user_management:revogacao:tenant:{}"
+_DB_ENGINE = "django.contrib.sessions.backends.db"
+
+
+@dataclass(frozen=True)
+class Revogacao:
+    encerradas: int
+    ids: list[int] = field(default_factory=list)
+    usuarios: int = 0
+    session_keys: list[str] = field(default_factory=list)
+
+
+def _apagar_sessoes_django(session_keys: list[str]) -> None:
+    if not session_keys:
+        return
+    if settings.SESSION_ENGINE == _DB_ENGINE:
+        Session.objects.filter(session_key__in=session_keys).delete()
+        return
+    store = import_module(settings.SESSION_ENGINE).SessionStore
+    for key in session_keys:
+        store(session_key=key).delete()
+
+
+def _sessoes_no_tenant(session_keys: list[str], tenant_id: int) -> list[str]:
+    """Chaves cujas sessões Django estão no tenant (``session["tenant_id"]``)."""
+    if settings.SESSION_ENGINE == _DB_ENGINE:
+        dados = ((s.session_key, s.get_decoded()) for s in Session.objects.filter(session_key__in=session_keys))
+    else:
+        store = import_module(settings.SESSION_ENGINE).SessionStore
+        dados = ((key, store(session_key=key).load()) for key in session_keys)
+    return [key for key, sessao in dados if str(sessao.get("tenant_id")) == str(tenant_id)]
+
+
+def revogar_sessoes(queryset, *, manter_session_key: str | None = None, broadcast: bool = True) -> Revogacao:
+    """Encerra as sessões ativas do ``queryset`` (exceto ``manter_session_key``)."""
+    qs = queryset.filter(ativa=True)
+    if manter_session_key:
+        qs = qs.exclude(session_key=manter_session_key)
+    linhas = list(qs.values_list("id", "user_id", "session_key"))
+    if not linhas:
+        return Revogacao(encerradas=0)
+    ids = [pk for pk, _uid, _key in linhas]
+    chaves = [key for _pk, _uid, key in linhas]
+    por_usuario: dict[int, list[int]] = {}
+    for pk, uid, _key in linhas:
+        por_usuario.setdefault(uid, []).append(pk)
+    with transaction.atomic():
+        encerradas = SessaoUsuario.objects.filter(pk__in=ids, ativa=True).update(ativa=False)
+        _apagar_sessoes_django(chaves)
+        session_risk.recalcular_usuarios(por_usuario)
+        user_metrics.invalidar_usuarios(por_usuario)
+        if broadcast:
+            transaction.on_commit(lambda: broadcast_sessions_terminated(por_usuario))
+    return Revogacao(encerradas=encerradas, ids=ids, usuarios=len(por_usuario), session_keys=chaves)
+
+
+def epoca_revogacao(tenant_id: int | None) -> float | None:
+    if not tenant_id:
+        return None
+    return cache.get(_CHAVE_EPOCA.format(tenant_id))
+
+
+def marcar_emissao(session, instante: float | None = None) -> None:
+    """Carimba na sessão o instante de emissão (login) usado na comparação com a época."""
+    instante = instante if instante is not None else time.time()
+    session[CHAVE_EMISSAO] = instante
+    session[_CHAVE_TENANT] = session.get("tenant_id")
+    session[_CHAVE_TENANT_DESDE] = instante
+
+
+def _entrada_no_tenant(session, tenant_id) -> float:
+    """Instante em que a sessão entrou no tenant atual (troca de tenant re-carimba)."""
+    anterior = session.get(_CHAVE_TENANT)
+    if anterior is None:  # primeiro tenant da sessão: vale a emissão
+        session[_CHAVE_TENANT] = tenant_id
+        session[_CHAVE_TENANT_DESDE] = session.get(CHAVE_EMISSAO, 0)
+    elif str(anterior) != str(tenant_id):
+        session[_CHAVE_TENANT] = tenant_id
+        session[_CHAVE_TENANT_DESDE] = time.time()
+    return session.get(_CHAVE_TENANT_DESDE, 0)
+
+
+def sessao_revogada(session) -> bool:
+    """True se a sessão já estava no seu tenant atual antes da última revogação dele."""
+    tenant_id = session.get("tenant_id")
+    if not tenant_id:
+        return False
+    desde = _entrada_no_tenant(session, tenant_id)
+    epoca = epoca_revogacao(tenant_id)
+    return epoca is not None and desde < epoca
+
+
+def revogar_tenant(tenant, *, manter_sessao=None) -> Revogacao:
+    """Desloga todas as sessões abertas no tenant (mantém a de quem executou, se informada).
+
+    Só as sessões cujo ``tenant_id`` é o do tenant são encerradas; as que os membros
+    tenham em outros tenants continuam válidas.
+    """
+    epoca = time.time()
+    # Sem expiração: sessões emitidas antes continuam inválidas enquanto existirem
+    cache.set(_CHAVE_EPOCA.format(tenant.pk), epoca, timeout=None)
+    manter_key = None
+    if manter_sessao is not None:
+        marcar_emissao(manter_sessao, epoca)
+        manter_sessao[_CHAVE_TENANT] = tenant.pk
+        manter_key = manter_sessao.session_key
+    dos_membros = SessaoUsuario.objects.filter(user__tenant_memberships__tenant=tenant, ativa=True)
+    chaves = _sessoes_no_tenant(list(dos_membros.values_list("session_key", flat=True)), tenant.pk)
+    resultado = revogar_sessoes(
+        dos_membros.filter(session_key__in=chaves),
+        manter_session_key=manter_key,
+        broadcast=False,
+    )
+    # Um único evento para o tenant inteiro (não um por usuário)
+    transaction.on_commit(lambda: broadcast_tenant_revoked(tenant.pk, resultado.ids))
+    return resultado
@@ -0,0 +1,99 @@
+"""Cálculo incremental do risco persistido de ``SessaoUsuario``.
+
+O risco de uma sessão depende só das sessões do mesmo usuário, então toda
+recomputação é por usuário: uma consulta (``values_list`` ordenado por criação) e
+um ``bulk_update`` apenas das linhas cujo bitmask mudou.
+
+* históricos (relativos às sessões anteriores do usuário): ``novo_ip``,
+  ``novo_pais`` e ``user_agent_incomum`` (família do navegador/SO nunca vista). A
+  primeira sessão do usuário não tem histórico e não é marcada;
+* simultâneos (só em sessões ativas, considerando as demais sessões ativas):
+  ``multi_ip`` e ``geo_variacao``.
+
+Chamado pela pipeline de login (upsert em lote), pelo ``post_save`` de
+``SessaoUsuario`` (logout/encerramento) e pelo backfill ``backfill_session_risk``.
+"""
+
+from __future__ import annotations
+
+import re
+from collections.abc import Iterable
+from dataclasses import dataclass
+
+from user_management.models import SessaoUsuario
+from user_management.risk import (
+    RISCO_GEO_VARIACAO,
+    RISCO_MULTI_IP,
+    RISCO_NOVO_IP,
+    RISCO_NOVO_PAIS,
+    RISCO_USER_AGENT_INCOMUM,
+    score_de_flags,
+)
+
+__all__ = ["Recalculo", "familia_user_agent", "recalcular_usuarios"]
+
+_VERSOES = re.compile(r"[\d._]+")
+
+
+@dataclass(frozen=True)
+class Recalculo:
+    sessoes: int
+    alteradas: int
+
+
+def familia_user_agent(user_agent: str | None) -> str:
+    """User agent sem números de versão (atualizar o navegador não é "incomum")."""
+    return _VERSOES.sub("", (user_agent or "").lower()).strip()[:200]
+
+
+def _flags_do_usuario(linhas: list[tuple]) -> dict[int, int]:
+    """``linhas``: sessões de um usuário em ordem de criação -> ``{id: flags}``."""
+    ativas = [linha for linha in linhas if linha[4]]
+    ips_ativos = {linha[1] for linha in ativas if linha[1]}
+    paises_ativos = {linha[2] for linha in ativas if linha[2]}
+    ips, paises, familias = set(), set(), set()  # histórico das sessões anteriores
+    resultado = {}
+    for pk, ip, pais, user_agent, ativa in linhas:
+        familia = familia_user_agent(user_agent)
+        flags = 0
+        if ip and ips and ip not in ips:
+            flags |= RISCO_NOVO_IP
+        if pais and paises and pais not in paises:
+            flags |= RISCO_NOVO_PAIS
+        if familia and familias and familia not in familias:
+            flags |= RISCO_USER_AGENT_INCOMUM
+        if ativa and ip and len(ips_ativos - {ip}) > 0:
+            flags |= RISCO_MULTI_IP
+        if ativa and pais and len(paises_ativos - {pais}) > 0:
+            flags |= RISCO_GEO_VARIACAO
+        resultado[pk] = flags
+        ips.update([ip] if ip else [])
+        paises.update([pais] if pais else [])
+        familias.update([familia] if familia else [])
+    return resultado
+
+
+def recalcular_usuarios(user_ids: Iterable[int], *, batch_size: int = 500) -> Recalculo:
+    """Recalcula flags/score das sessões dos usuários e grava só as que mudaram."""
+    user_ids = {uid for uid in user_ids if uid is not None}
+    if not user_ids:
+        return Recalculo(0, 0)
+    por_usuario: dict[int, list[tuple]] = {}
+    atuais: dict[int, int] = {}
+    for pk, uid, ip, pais, user_agent, ativa, flags in (
+        SessaoUsuario.objects.filter(user_id__in=user_ids)
+        .order_by("user_id", "criada_em", "id")
+        .values_list("id", "user_id", "ip_address", "pais", "user_agent", "ativa", "risco_flags")
+    ):
+        por_usuario.setdefault(uid, []).append((pk, ip, pais, user_agent, ativa))
+        atuais[pk] = flags
+    alteradas = [
+        SessaoUsuario(pk=pk, risco_flags=flags, risco_score=score_de_flags(flags))
+        for linhas in por_usuario.values()
+        for pk, flags in _flags_do_usuario(linhas).items()
+        if atuais[pk] != flags
+    ]
+    if alteradas:
+        # bulk_update não dispara post_save (sem recursão) nem toca ultima_atividade (auto_now)
+        SessaoUsuario.objects.bulk_update(alteradas, ["risco_flags", "risco_score"], batch_size=batch_size)
+    return Recalculo(sessoes=len(atuais), alteradas=len(alteradas))
@@ -0,0 +1,259 @@
+"""Métricas agregadas do módulo de usuários (home do módulo e dashboard 2FA).
+
+Cada visão faz uma consulta de agregação condicional por modelo
+(``Count(filter=Q(...))``) em vez de um ``.count()`` por indicador:
+
+* ``resumo_usuarios(tenant)``: membros e perfis (uma consulta em ``TenantUser`` com
+  join no perfil), convites pendentes e sessões ativas; ``tenant=None`` é a visão
+  global do superusuário;
+* ``metricas_twofa()``: uma consulta em ``PerfilUsuarioEstendido``.
+
+Os resultados ficam em cache por tenant (``USER_METRICS_CACHE_SECONDS``) e são
+invalidados pelos signals de ``User``, ``TenantUser``, ``PerfilUsuarioEstendido``,
+``ConviteUsuario`` e ``SessaoUsuario`` e pelas escritas em lote (pipeline de login,
+revogação e limpeza de sessões). O TTL de 2FA é limitado ao próximo fim de bloqueio
+para ``lockados`` não ficar defasado; a contagem global de sessões Django depende só
+do TTL (``Session`` é salva a cada request e não deve invalidar nada).
+
+``registrar_snapshots`` grava a fotografia diária (``SnapshotMetricasUsuarios``) de
+todos os tenants com uma consulta agrupada por modelo; ``tendencia`` lê o histórico
+para os gráficos.
+"""
+
+from __future__ import annotations
+
+import math
+from collections.abc import Iterable
+from dataclasses import asdict, dataclass, fields
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Min, Q, Sum
+from django.utils import timezone
+
+from core.models import Tenant, TenantUser
+from user_management.models import (
+    ConviteUsuario,
+    PerfilUsuarioEstendido,
+    SessaoUsuario,
+    SnapshotMetricasUsuarios,
+    StatusUsuario,
+)
+
+__all__ = [
+    "MetricasTwoFA",
+    "ResumoUsuarios",
+    "invalidar",
+    "invalidar_usuarios",
+    "metricas_twofa",
+    "registrar_snapshots",
+    "resumo_usuarios",
+    "tendencia",
+]
+
+User = get_user_model()
+
+_CHAVE_RESUMO = "user_management:metricas:resumo:{}"
+_CHAVE_TWOFA = "user_management:metricas:twofa"
+_GLOBAL = "global"
+_PERFIL = "user__perfil_estendido"
+
+
+@dataclass(frozen=True)
+class ResumoUsuarios:
+    total_usuarios: int = 0
+    usuarios_ativos: int = 0
+    convites_pendentes: int = 0
+    sessoes_ativas: int = 0
+    twofa_ativos: int = 0
+    twofa_confirmados: int = 0
+
+
+@dataclass(frozen=True)
+class MetricasTwoFA:
+    total: int = 0
+    habilitados: int = 0
+    ativos: int = 0
+    confirmados: int = 0
+    criptografados: int = 0
+    lockados: int = 0
+    sucessos: int = 0
+    falhas: int = 0
+    recovery_uses: int = 0
+    rl_blocks: int = 0
+
+    @property
+    def pct_confirmados(self) -> float:
+        return round(self.confirmados / self.total * 100, 2) if self.total else 0
+
+    @property
+    def pct_criptografados(self) -> float:
+        return round(self.criptografados / self.ativos * 100, 2) if self.ativos else 0
+
+    def as_context(self) -> dict:
+        return {**asdict(self), "pct_confirmados": self.pct_confirmados, "pct_criptografados": self.pct_criptografados}
+
+
+_CAMPOS_RESUMO = tuple(f.name for f in fields(ResumoUsuarios))
+
+
+def _ttl() -> int:
+    return int(getattr(settings, "USER_METRICS_CACHE_SECONDS", 300))
+
+
+def _contagens_membros() -> dict:
+    """Agregados condicionais sobre ``TenantUser`` (LEFT JOIN no perfil estendido)."""
+    return {
+        "total_usuarios": Count("id"),
+        "com_perfil": Count(f"{_PERFIL}__id"),
+        "usuarios_ativos": Count("id", filter=Q(**{f"{_PERFIL}__status": StatusUsuario.ATIVO})),
+        "twofa_ativos": Count("id", filter=Q(**{f"{_PERFIL}__totp_secret__isnull": False})),
+        "twofa_confirmados": Count("id", filter=Q(**{f"{_PERFIL}__totp_confirmed_at__isnull": False})),
+    }
+
+
+def _resumo_de(membros: dict | None, convites: int, sessoes: int) -> ResumoUsuarios:
+    m = membros or {}
+    total = m.get("total_usuarios", 0)
+    # Sem nenhum perfil estendido, todos os vínculos contam como ativos
+    ativos = m.get("usuarios_ativos", 0) if m.get("com_perfil") else total
+    return ResumoUsuarios(
+        total_usuarios=total,
+        usuarios_ativos=ativos,
+        convites_pendentes=convites,
+        sessoes_ativas=sessoes,
+        twofa_ativos=m.get("twofa_ativos", 0),
+        twofa_confirmados=m.get("twofa_confirmados", 0),
+    )
+
+
+def _calcular_resumo(tenant) -> ResumoUsuarios:
+    agora = timezone.now()
+    convites = ConviteUsuario.objects.filter(usado=False, expirado_em__gte=agora)
+    if tenant is None:
+        usuarios = User.objects.aggregate(total=Count("id"), ativos=Count("id", filter=Q(is_active=True)))
+        twofa = metricas_twofa()
+        return ResumoUsuarios(
+            total_usuarios=usuarios["total"],
+            usuarios_ativos=usuarios["ativos"],
+            convites_pendentes=convites.count(),
+            sessoes_ativas=Session.objects.filter(expire_date__gte=agora).count(),
+            twofa_ativos=twofa.ativos,
+            twofa_confirmados=twofa.confirmados,
+        )
+    return _resumo_de(
+        TenantUser.objects.filter(tenant=tenant).aggregate(**_contagens_membros()),
+        convites.filter(tenant=tenant).count(),
+        SessaoUsuario.objects.filter(ativa=True, user__tenant_memberships__tenant=tenant).count(),
+    )
+
+
+def resumo_usuarios(tenant=None) -> ResumoUsuarios:
+    """Indicadores da home do módulo (cacheados por tenant; ``None`` = global)."""
+    chave = _CHAVE_RESUMO.format(tenant.pk if tenant is not None else _GLOBAL)
+    dados = cache.get(chave)
+    if dados is None:
+        dados = asdict(_calcular_resumo(tenant))
+        cache.set(chave, dados, _ttl())
+    return ResumoUsuarios(**dados)
+
+
+def metricas_twofa() -> MetricasTwoFA:
+    """Indicadores 2FA de todos os perfis em uma única agregação (cacheada)."""
+    dados = cache.get(_CHAVE_TWOFA)
+    if dados is not None:
+        return MetricasTwoFA(**dados)
+    agora = timezone.now()
+    bloqueado = Q(twofa_locked_until__gt=agora)
+    agg = PerfilUsuarioEstendido.objects.aggregate(
+        total=Count("id"),
+        habilitados=Count("id", filter=Q(autenticacao_dois_fatores=True)),
+        ativos=Count("id", filter=Q(totp_secret__isnull=False)),
+        confirmados=Count("id", filter=Q(totp_confirmed_at__isnull=False)),
+        criptografados=Count("id", filter=Q(twofa_secret_encrypted=True, totp_secret__isnull=False)),
+        lockados=Count("id", filter=bloqueado),
+        proximo_desbloqueio=Min("twofa_locked_until", filter=bloqueado),
+        sucessos=Sum("twofa_success_count"),
+        falhas=Sum("twofa_failure_count"),
+        recovery_uses=Sum("twofa_recovery_use_count"),
+        rl_blocks=Sum("twofa_rate_limit_block_count"),
+    )
+    proximo = agg.pop("proximo_desbloqueio")
+    dados = {k: int(v or 0) for k, v in agg.items()}
+    ttl = _ttl()
+    if proximo is not None:
+        # Expira junto com o primeiro bloqueio que vence (``lockados`` muda sem nenhum save)
+        ttl = max(1, min(ttl, math.ceil((proximo - agora).total_seconds())))
+    cache.set(_CHAVE_TWOFA, dados, ttl)
+    return MetricasTwoFA(**dados)
+
+
+def invalidar(tenant_ids: Iterable[int | None] = (), *, twofa: bool = False) -> None:
+    """Descarta os resumos dos tenants informados (e sempre o global)."""
+    chaves = [_CHAVE_RESUMO.format(tid or _GLOBAL) for tid in {*tenant_ids, None}]
+    if twofa:
+        chaves.append(_CHAVE_TWOFA)
+    # Apaga já (leituras da própria transação) e de novo no commit, para que um
+    # leitor concorrente não recoloque no cache o estado anterior à escrita
+    cache.delete_many(chaves)
+    transaction.on_commit(lambda: cache.delete_many(chaves))
+
+
+def invalidar_usuarios(user_ids: Iterable[int], *, twofa: bool = False) -> None:
+    """Invalida os resumos dos tenants dos quais os usuários fazem parte."""
+    ids = set(user_ids)
+    if not ids:
+        return
+    tenants = TenantUser.objects.filter(user_id__in=ids).values_list("tenant_id", flat=True).distinct()
+    invalidar(tenants, twofa=twofa)
+
+
+def _contagem_por_tenant(qs, campo: str) -> dict[int, int]:
+    return dict(qs.values(campo).annotate(n=Count("id")).order_by().values_list(campo, "n"))
+
+
+def registrar_snapshots(data: date | None = None) -> int:
+    """Grava (idempotente) a fotografia do dia de todos os tenants e a global.
+
+    Uma consulta agrupada por modelo para todos os tenants, em vez de um resumo por
+    tenant; retorna o número de snapshots gravados.
+    """
+    data = data or timezone.localdate()
+    agora = timezone.now()
+    membros = {
+        linha.pop("tenant"): linha
+        for linha in TenantUser.objects.values("tenant").annotate(**_contagens_membros()).order_by()
+    }
+    convites = _contagem_por_tenant(
+        ConviteUsuario.objects.filter(usado=False, expirado_em__gte=agora, tenant__isnull=False), "tenant"
+    )
+    sessoes = _contagem_por_tenant(SessaoUsuario.objects.filter(ativa=True), "user__tenant_memberships__tenant")
+    snapshots = [
+        SnapshotMetricasUsuarios(
+            tenant_id=tid, data=data, **asdict(_resumo_de(membros.get(tid), convites.get(tid, 0), sessoes.get(tid, 0)))
+        )
+        for tid in Tenant.objects.values_list("pk", flat=True)
+    ]
+    with transaction.atomic():
+        SnapshotMetricasUsuarios.objects.bulk_create(
+            snapshots,
+            update_conflicts=True,
+            unique_fields=["tenant", "data"],
+            update_fields=[*_CAMPOS_RESUMO, "atualizado_em"],
+        )
+        SnapshotMetricasUsuarios.objects.update_or_create(
+            tenant=None, data=data, defaults=asdict(_calcular_resumo(None))
+        )
+    return len(snapshots) + 1
+
+
+def tendencia(tenant=None, dias: int = 30) -> list[dict]:
+    """Série diária dos últimos ``dias`` a partir dos snapshots (sem varrer as tabelas)."""
+    inicio = timezone.localdate() - timedelta(days=dias - 1)
+    qs = SnapshotMetricasUsuarios.objects.filter(data__gte=inicio)
+    qs = qs.filter(tenant=tenant) if tenant is not None else qs.filter(tenant__isnull=True)
+    return list(qs.order_by("data").values("data", *_CAMPOS_RESUMO))
@@ -9,10 +9,11 @@ from django.dispatch import receiver
 from django.utils import timezone
 
 from shared.services.permission_resolver import permission_resolver
+from user_management.services import login_pipeline, session_revocation, session_risk, user_metrics
 from user_management.services.logging_service import log_activity
 from user_management.services.profile_service import ensure_profile, sync_status
 
-from .models import LogAtividadeUsuario, PerfilUsuarioEstendido, SessaoUsuario, StatusUsuario
+from .models import ConviteUsuario, LogAtividadeUsuario, PerfilUsuarioEstendido, SessaoUsuario, StatusUsuario
 from .realtime import broadcast_session_event
 
 try:  # Import condicional para evitar falhas em migrações iniciais
@@ -64,113 +65,106 @@ def perfil_reverse_sync_user_active(sender, instance, **kwargs):  # pragma: no c
 
 @receiver(user_logged_in)
 def usuario_logou(sender, request, user, **kwargs):
-    """Registrar login do usuário"""
+    """Registrar login do usuário.
 
-    # Obter informações da requisição
+    Só o estado crítico (reset de falhas / IP) é gravado aqui; sessão, log de
+    atividade, broadcast e aquecimento de permissões seguem pela pipeline em lote
+    (``user_management.services.login_pipeline``).
+    """
     ip_address = request.META.get("REMOTE_ADDR", "127.0.0.1")  # IP padrão se não encontrado
     user_agent = request.META.get("HTTP_USER_AGENT", "Unknown")
 
-    # Criar ou atualizar sessão
-    session_key = request.session.session_key
-    if session_key:
-        sessao, created = SessaoUsuario.objects.get_or_create(
-            session_key=session_key,
-            defaults={
-                "user": user,
-                "ip_address": ip_address,
-                "user_agent": user_agent,
-                "ativa": True,
-            },
+    login_pipeline.apply_critical_state(user, ip_address)
+    if getattr(request, "session", None) is not None:
+        session_revocation.marcar_emissao(request.session)
+
+    # Tenant já presente na sessão evita consulta; senão a pipeline resolve pelo vínculo TenantUser
+    tenant_id = None
+    sess = getattr(request, "session", None)
+    if sess is not None:
+        tid = sess.get("tenant_id")
+        tenant_id = tid if isinstance(tid, int) else None
+    login_pipeline.enqueue_login(
+        login_pipeline.LoginEvent(
+            user_id=user.pk,
+            session_key=sess.session_key if sess is not None else None,
+            ip=ip_address,
+            user_agent=user_agent,
+            tenant_id=tenant_id,
         )
+    )
 
-        if not created:
-            sessao.user = user
-            sessao.ip_address = ip_address
-            sessao.user_agent = user_agent
-            sessao.ativa = True
-            sessao.ultima_atividade = timezone.now()
-            sessao.save()
-            broadcast_session_event("updated", sessao)
-        else:
-            broadcast_session_event("created", sessao)
-
-    # Atualizar perfil estendido
-    if hasattr(user, "perfil_estendido"):
-        perfil = user.perfil_estendido
-        perfil.ultimo_login_ip = ip_address
-        perfil.tentativas_login_falhadas = 0  # Resetar tentativas falhadas
-        perfil.save()
 
-    # Log da atividade
-    log_activity(user, "LOGIN", "user_management", "Usuário fez login no sistema", ip=ip_address, user_agent=user_agent)
+@receiver(post_save, sender=SessaoUsuario)
+@receiver(post_delete, sender=SessaoUsuario)
+def atualizar_risco_sessoes(sender, instance, **kwargs):
+    """Mantém o risco persistido das sessões do usuário (riscos simultâneos mudam junto)."""
+    update_fields = kwargs.get("update_fields")
+    if update_fields and set(update_fields) <= {"risco_flags", "risco_score", "ultima_atividade"}:
+        return
+    if not isinstance(kwargs.get("origin", instance), SessaoUsuario):
+        return  # cascata da exclusão do usuário: não sobram sessões para recalcular
+    resultado = session_risk.recalcular_usuarios([instance.user_id])
+    if resultado.alteradas and kwargs.get("signal") is post_save:
+        instance.refresh_from_db(fields=["risco_flags", "risco_score"])
 
-    # Aquecimento de cache do PermissionResolver para ações comuns (opcional via flag)
-    try:
-        if getattr(settings, "PERMISSION_WARMUP_ON_LOGIN", True):
-            from core.utils import get_current_tenant
-
-            tenant = get_current_tenant(request)
-            # Fallbacks: se tenant ainda não estiver disponível neste instante do sinal,
-            # tenta recuperar via sessão ou primeiro vínculo TenantUser do usuário.
-            if tenant is None:
-                try:
-                    from core.models import Tenant  # import local para evitar ciclos
-
-                    tid = None
-                    sess = getattr(request, "session", None)
-                    if sess and "tenant_id" in sess:
-                        tid = sess.get("tenant_id")
-                    if tid and isinstance(tid, int):
-                        try:
-                            tenant = Tenant.objects.get(id=tid)
-                        except Tenant.DoesNotExist:
-                            tenant = None
-                    if tenant is None and TenantUser is not None:
-                        tid = TenantUser.objects.filter(user=user).values_list("tenant_id", flat=True).first()
-                        if tid:
-                            try:
-                                tenant = Tenant.objects.get(id=tid)
-                            except Tenant.DoesNotExist:
-                                tenant = None
-                except Exception:
-                    tenant = None
-            if tenant is not None:
-                # Lista mínima padrão para não interferir com testes sensíveis (ex.: VIEW_COTACAO)
-                common_actions = getattr(settings, "PERMISSION_WARMUP_ACTIONS", ["VIEW_DASHBOARD_PUBLIC"])
-                for act in common_actions:
-                    try:
-                        # resolve() já popula o cache com TTL padrão
-                        permission_resolver.resolve(user, tenant, act)
-                    except Exception:
-                        pass
-    except Exception:
-        # Nunca impacta o fluxo de login
-        pass
-
-    @receiver(user_logged_out)
-    def usuario_deslogou(sender, request, user, **kwargs):
-        """Registrar logout do usuário"""
-        ip_address = request.META.get("REMOTE_ADDR", "")
-        user_agent = request.META.get("HTTP_USER_AGENT", "")
 
-        if user and user.is_authenticated:
-            # Obter informações da requisição
-
-            # Desativar sessão
-            session_key = request.session.session_key
-            if session_key:
-                try:
-                    sessao = SessaoUsuario.objects.get(session_key=session_key)
-                    sessao.ativa = False
-                    sessao.save()
-                    broadcast_session_event("terminated", sessao)
-                except SessaoUsuario.DoesNotExist:
-                    pass
-
-        # Log da atividade
-        log_activity(
-            user, "LOGOUT", "user_management", "Usuário fez logout do sistema", ip=ip_address, user_agent=user_agent
-        )
+# =============================
+# Invalidação das métricas agregadas (user_metrics) por tenant
+# =============================
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidar_metricas_usuario(sender, instance, **kwargs):
+    update_fields = kwargs.get("update_fields")
+    if update_fields and "is_active" not in update_fields:
+        return  # last_login e afins não mudam as contagens
+    user_metrics.invalidar_usuarios([instance.pk])
+
+
+@receiver(post_save, sender=PerfilUsuarioEstendido)
+def invalidar_metricas_perfil(sender, instance, **kwargs):
+    user_metrics.invalidar_usuarios([instance.user_id], twofa=True)
+
+
+@receiver(post_save, sender=SessaoUsuario)
+@receiver(post_delete, sender=SessaoUsuario)
+def invalidar_metricas_sessao(sender, instance, **kwargs):
+    update_fields = kwargs.get("update_fields")
+    if update_fields and "ativa" not in update_fields:
+        return
+    user_metrics.invalidar_usuarios([instance.user_id])
+
+
+@receiver(post_save, sender=ConviteUsuario)
+@receiver(post_delete, sender=ConviteUsuario)
+def invalidar_metricas_convite(sender, instance, **kwargs):
+    user_metrics.invalidar([instance.tenant_id])
+
+
+@receiver(user_logged_out)
+def usuario_deslogou(sender, request, user, **kwargs):
+    """Registrar logout do usuário"""
+    ip_address = request.META.get("REMOTE_ADDR", "")
+    user_agent = request.META.get("HTTP_USER_AGENT", "")
+
+    if user and user.is_authenticated:
+        # Desativar sessão
+        session_key = request.session.session_key
+        if session_key:
+            # Login ainda na pipeline reativaria a sessão depois do logout
+            login_pipeline.flush_session(session_key)
+            try:
+                sessao = SessaoUsuario.objects.get(session_key=session_key)
+                sessao.ativa = False
+                sessao.save()
+                broadcast_session_event("terminated", sessao)
+            except SessaoUsuario.DoesNotExist:
+                pass
+
+    # Log da atividade
+    log_activity(
+        user, "LOGOUT", "user_management", "Usuário fez logout do sistema", ip=ip_address, user_agent=user_agent
+    )
 
 
 @receiver(user_login_failed)
@@ -240,7 +234,11 @@ def limpar_sessoes_expiradas():
     session_keys_expiradas = list(sessoes_django.values_list("session_key", flat=True))
 
     # Desativar sessões correspondentes no nosso modelo
-    SessaoUsuario.objects.filter(session_key__in=session_keys_expiradas, ativa=True).update(ativa=False)
+    expiradas = SessaoUsuario.objects.filter(session_key__in=session_keys_expiradas, ativa=True)
+    usuarios = set(expiradas.values_list("user_id", flat=True))
+    expiradas.update(ativa=False)
+    session_risk.recalcular_usuarios(usuarios)
+    user_metrics.invalidar_usuarios(usuarios)
 
     # Remover sessões do Django
     sessoes_django.delete()
@@ -262,8 +260,10 @@ def desbloquear_usuarios():
     agora = timezone.now()
     perfis_bloqueados = PerfilUsuarioEstendido.objects.filter(status=StatusUsuario.BLOQUEADO, bloqueado_ate__lt=agora)
 
-    count = perfis_bloqueados.count()
+    usuarios = set(perfis_bloqueados.values_list("user_id", flat=True))
+    count = len(usuarios)
     perfis_bloqueados.update(status=StatusUsuario.ATIVO, bloqueado_ate=None, tentativas_login_falhadas=0)
+    user_metrics.invalidar_usuarios(usuarios)
 
     return count
 
@@ -278,6 +278,11 @@ if TenantUser:  # pragma: no branch - simples
         with contextlib.suppress(Exception):
             permission_resolver.invalidate_cache(user_id=instance.user_id, tenant_id=instance.tenant_id)
 
+    @receiver(post_save, sender=TenantUser)
+    @receiver(post_delete, sender=TenantUser)
+    def invalidar_metricas_tenantuser(sender, instance, **kwargs):
+        user_metrics.invalidar([instance.tenant_id])
+
 
 # ============================================================================
 # Signals de PermissaoPersonalizada para invalidar cache de permissões
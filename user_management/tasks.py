@@ -4,6 +4,7 @@ Separadas para permitir agendamento via CELERY_BEAT_SCHEDULE.
 
 from celery import shared_task
 
+from user_management.services import user_metrics
 from user_management.signals import desbloquear_usuarios, limpar_logs_antigos, limpar_sessoes_expiradas
 
 
@@ -31,3 +32,9 @@ def limpar_sessoes_expiradas_periodico():
 def limpar_logs_antigos_periodico(dias: int = 90):
     _safe_exec(lambda: limpar_logs_antigos(dias=dias), "limpar_logs_antigos")
     return True
+
+
+@shared_task
+def registrar_snapshot_metricas_diario():
+    """Fotografia diária das métricas (tendências dos dashboards)."""
+    return _safe_exec(user_metrics.registrar_snapshots, "registrar_snapshots")
@@ -5,9 +5,11 @@ import secrets
 import pyotp
 from cryptography.fernet import Fernet, InvalidToken
 from django.conf import settings
-from django.core.cache import cache
 from django.utils import timezone
 
+from shared.cache_utils import incr_atomic
+from shared.rate_limit import FIXED, RateLimiter
+
 # ================== Mensagens Canonicas ==================
 RATE_MSG_GLOBAL_IP = "Muitas tentativas deste IP. Aguarde."
 RATE_MSG_MICRO = "Muitas tentativas. Aguarde alguns segundos."
@@ -88,7 +90,7 @@ def decrypt_secret(cipher: str) -> str:
 
 def rate_limit_check(user_id: int, ip: str, limit: int = 10, window_seconds: int = 60) -> bool:
     """Limite (user_id + IP). True se dentro, False se excedeu."""
-    return _increment_rate_key(f"2fa:rl:{user_id}:{ip if ip else 'na'}", limit, window_seconds)
+    return _hit_fixed_window("2fa:rl", f"{user_id}:{ip if ip else 'na'}", limit, window_seconds)
 
 
 def global_ip_rate_limit_check(ip: str, limit: int = 30, window_seconds: int = 60) -> bool:
@@ -98,30 +100,16 @@ def global_ip_rate_limit_check(ip: str, limit: int = 30, window_seconds: int = 6
     # Permite configurar via settings
     limit = getattr(settings, "TWOFA_GLOBAL_IP_LIMIT", limit)
     window_seconds = getattr(settings, "TWOFA_GLOBAL_IP_WINDOW", window_seconds)
-    key = f"2fa:rlip:{ip if ip else 'na'}"
-    ok = _increment_rate_key(key, limit, window_seconds)
+    ok = _hit_fixed_window("2fa:rlip", ip if ip else "na", limit, window_seconds)
     if not ok:
         # Incrementar métrica agregada de bloqueios globais de IP (alinhado com views.global_ip_rate_limit)
-        try:
-            cache.incr("twofa_global_ip_block_metric")
-        except Exception:
-            cur = cache.get("twofa_global_ip_block_metric", 0) or 0
-            cache.set("twofa_global_ip_block_metric", cur + 1, 24 * 3600)
+        incr_atomic("twofa_global_ip_block_metric", ttl=24 * 3600)
     return ok
 
 
-def _increment_rate_key(key: str, limit: int, window_seconds: int) -> bool:
-    try:
-        current = cache.get(key)
-        if current is None:
-            cache.set(key, 1, timeout=window_seconds)
-            return True
-        if current >= limit:
-            return False
-        cache.incr(key)
-        return True
-    except Exception:
-        return True
+def _hit_fixed_window(scope: str, identity: str, limit: int, window_seconds: int) -> bool:
+    """Janela fixa atômica entre workers (chave ``<scope>:<identity>``); fail-open."""
+    return RateLimiter(limit, window_seconds, mode=FIXED, scope=scope).hit(identity).allowed
 
 
 def generate_recovery_codes():
@@ -32,6 +32,7 @@ urlpatterns = [
         name="sessao_encerrar_todas",
     ),
     path("sessoes/encerrar-multiplas/", views.SessaoEncerrarMultiplasView.as_view(), name="sessao_encerrar_multiplas"),
+    path("sessoes/encerrar-tenant/", views.SessaoEncerrarTenantView.as_view(), name="sessao_encerrar_tenant"),
     path("api/sessoes/", views.SessaoUsuarioApiView.as_view(), name="sessao_api"),
     # Perfil Pessoal
     path("meu-perfil/", views.MeuPerfilView.as_view(), name="meu_perfil"),
@@ -2,7 +2,7 @@ import contextlib
 
 from django.conf import settings
 from django.contrib import messages
-from django.contrib.auth import get_user_model
+from django.contrib.auth import get_user_model, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.core.cache import cache
@@ -20,7 +20,10 @@ from core.models import TenantUser
 
 # Importações de Mixins e Utils
 from core.utils import get_current_tenant
+from shared.cache_utils import incr_atomic
 from shared.mixins.ui_permissions import UIPermissionsMixin
+from shared.rate_limit import SLIDING, RateLimiter
+from user_management.services import session_revocation, user_metrics
 from user_management.services.logging_service import log_activity
 from user_management.twofa import RATE_MSG_GLOBAL_IP, RATE_MSG_LOCK, RATE_MSG_MICRO, global_ip_rate_limit_check
 
@@ -41,7 +44,7 @@ from .models import (
     StatusUsuario,
 )
 from .realtime import broadcast_session_event
-from .risk import build_context_maps, compute_risks, session_to_dict
+from .risk import RISCO_INATIVO_LONGO, RISCOS, compute_risks, flags_com_risco, limite_inatividade, session_to_dict
 from .twofa import (
     confirm_2fa,
     decrypt_secret,
@@ -76,64 +79,24 @@ def user_management_home(request):
         messages.error(request, _("Por favor, selecione uma empresa para ver o dashboard."))
         return redirect(reverse("core:tenant_select"))
 
-    # Coletar estatísticas para o dashboard
-
-    # Verificar se é superusuário
-    if request.user.is_superuser:
-        # Para superusuário, mostrar estatísticas globais de todo o sistema
-        total_usuarios = User.objects.count()
-
-        # Contar usuários ativos (do Django)
-        usuarios_ativos = User.objects.filter(is_active=True).count()
-
-        # Contar todos os convites pendentes do sistema
-        convites_pendentes = ConviteUsuario.objects.filter(usado=False, expirado_em__gte=timezone.now()).count()
-
-        # Contar sessões ativas do Django
-        from django.contrib.sessions.models import Session
-
-        sessoes_ativas = Session.objects.filter(expire_date__gte=timezone.now()).count()
-
-    else:
-        # Usuário normal - mostrar apenas dados do tenant
-        tenant_users = TenantUser.objects.filter(tenant=tenant)
-
-        # Estatísticas básicas
-        total_usuarios = tenant_users.count()
-
-        # Verificar se existe PerfilUsuarioEstendido para esses usuários
-        usuarios_queryset = PerfilUsuarioEstendido.objects.filter(user__in=tenant_users.values_list("user", flat=True))
-
-        # Contagem de usuários ativos
-        if usuarios_queryset.exists():
-            usuarios_ativos = usuarios_queryset.filter(status=StatusUsuario.ATIVO).count()
-        else:
-            # Se não há perfis, assumir que todos os TenantUsers estão ativos
-            usuarios_ativos = total_usuarios
-
-        # Convites pendentes
-        convites_pendentes = ConviteUsuario.objects.filter(
-            tenant=tenant, usado=False, expirado_em__gte=timezone.now()
-        ).count()
-
-        # Sessões ativas
-        sessoes_ativas = SessaoUsuario.objects.filter(
-            ativa=True, user__in=tenant_users.values_list("user", flat=True)
-        ).count()
-
-        # Se não há sessões específicas, usar uma estimativa baseada nos usuários
-        if sessoes_ativas == 0 and total_usuarios > 0:
-            # Estimar que 30% dos usuários podem estar ativos
-            sessoes_ativas = max(1, int(total_usuarios * 0.3))
+    # Superusuário vê a visão global; demais, apenas o tenant (uma agregação por modelo, cacheada)
+    escopo = None if request.user.is_superuser else tenant
+    resumo = user_metrics.resumo_usuarios(escopo)
+    sessoes_ativas = resumo.sessoes_ativas
+    # Se não há sessões específicas, usar uma estimativa baseada nos usuários
+    if escopo is not None and sessoes_ativas == 0 and resumo.total_usuarios > 0:
+        # Estimar que 30% dos usuários podem estar ativos
+        sessoes_ativas = max(1, int(resumo.total_usuarios * 0.3))
 
     context = {
         "titulo": _("Gerenciamento de Usuários"),
         "subtitulo": _("Visão geral do módulo Gerenciamento de Usuários"),
         "tenant": tenant,
-        "total_usuarios": total_usuarios,
-        "usuarios_ativos": usuarios_ativos,
-        "convites_pendentes": convites_pendentes,
+        "total_usuarios": resumo.total_usuarios,
+        "usuarios_ativos": resumo.usuarios_ativos,
+        "convites_pendentes": resumo.convites_pendentes,
         "sessoes_ativas": sessoes_ativas,
+        "tendencia": user_metrics.tendencia(escopo),
     }
 
     return render(request, template_name, context)
@@ -677,13 +640,10 @@ class SessaoEncerrarTodasView(LoginRequiredMixin, View):
         alvo = get_object_or_404(User, pk=user_id)
         if not request.user.is_superuser and alvo != request.user:
             return JsonResponse({"detail": "Sem permissão."}, status=403)
-        sessoes = SessaoUsuario.objects.filter(user=alvo, ativa=True)
-        count = 0
-        for s in sessoes:
-            s.ativa = False
-            s.save(update_fields=["ativa"])
-            broadcast_session_event("terminated", s)
-            count += 1
+        # Mantém a sessão da própria request (apagá-la no meio da resposta invalidaria o cookie)
+        count = session_revocation.revogar_sessoes(
+            SessaoUsuario.objects.filter(user=alvo), manter_session_key=request.session.session_key
+        ).encerradas
         if count:
             log_activity(
                 request.user,
@@ -700,6 +660,29 @@ class SessaoEncerrarTodasView(LoginRequiredMixin, View):
         return redirect("user_management:sessao_list")
 
 
+class SessaoEncerrarTenantView(TenantAdminOrSuperuserMixin, View):
+    """Encerra as sessões de todos os usuários do tenant ativo (exceto a sessão atual)."""
+
+    def post(self, request):
+        tenant = getattr(request, "tenant", None)
+        if tenant is None:
+            return JsonResponse({"detail": "Nenhuma empresa selecionada."}, status=400)
+        revogacao = session_revocation.revogar_tenant(tenant, manter_sessao=request.session)
+        log_activity(
+            request.user,
+            "TERMINATE_TENANT_SESSIONS",
+            "user_management",
+            f"Encerrou {revogacao.encerradas} sessões de {revogacao.usuarios} usuários do tenant {tenant.pk}",
+            objeto=None,
+            ip=request.META.get("REMOTE_ADDR", ""),
+            user_agent=request.META.get("HTTP_USER_AGENT", ""),
+        )
+        if request.headers.get("X-Requested-With") == "XMLHttpRequest":
+            return JsonResponse({"status": "ok", "encerradas": revogacao.encerradas, "usuarios": revogacao.usuarios})
+        messages.success(request, f"Sessões do tenant encerradas ({revogacao.encerradas}).")
+        return redirect("user_management:sessao_list")
+
+
 class SessaoDetalheView(LoginRequiredMixin, View):
     """Retorna detalhes de uma sessão (JSON)."""
 
@@ -835,33 +818,7 @@ class TwoFAMetricsDashboardView(LoginRequiredMixin, View):
     def get(self, request):
         if not request.user.is_superuser:
             return JsonResponse({"detail": "Somente superusuário."}, status=403)
-        from django.db.models import Sum
-
-        qs = PerfilUsuarioEstendido.objects.all()
-        total = qs.count()
-        ativos = qs.filter(totp_secret__isnull=False).count()
-        confirmados = qs.filter(totp_confirmed_at__isnull=False).count()
-        criptografados = qs.filter(twofa_secret_encrypted=True, totp_secret__isnull=False).count()
-        lockados = qs.filter(twofa_locked_until__gt=timezone.now()).count()
-        agg = qs.aggregate(
-            sucessos=Sum("twofa_success_count"),
-            falhas=Sum("twofa_failure_count"),
-            recovery_uses=Sum("twofa_recovery_use_count"),
-            rl_blocks=Sum("twofa_rate_limit_block_count"),
-        )
-        ctx = {
-            "total": total,
-            "ativos": ativos,
-            "confirmados": confirmados,
-            "criptografados": criptografados,
-            "lockados": lockados,
-            "sucessos": agg["sucessos"] or 0,
-            "falhas": agg["falhas"] or 0,
-            "recovery_uses": agg["recovery_uses"] or 0,
-            "rl_blocks": agg["rl_blocks"] or 0,
-            "pct_confirmados": round((confirmados / total * 100), 2) if total else 0,
-            "pct_criptografados": round((criptografados / ativos * 100), 2) if ativos else 0,
-        }
+        ctx = {**user_metrics.metricas_twofa().as_context(), "tendencia": user_metrics.tendencia()}
         return render(request, self.template_name, ctx)
 
 
@@ -871,17 +828,16 @@ class TwoFAMetricsJSONView(LoginRequiredMixin, View):
     def get(self, request):
         if not (request.user.is_staff or request.user.is_superuser):
             return JsonResponse({"detail": "forbidden"}, status=403)
-        from django.db.models import Count, Q, Sum
-
-        agg = PerfilUsuarioEstendido.objects.aggregate(
-            total=Count("id"),
-            habilitados=Count("id", filter=Q(autenticacao_dois_fatores=True)),
-            confirmados=Count("id", filter=Q(totp_confirmed_at__isnull=False)),
-            sucessos=Sum("twofa_success_count"),
-            falhas=Sum("twofa_failure_count"),
-            recovery=Sum("twofa_recovery_use_count"),
-            rl_blocks=Sum("twofa_rate_limit_block_count"),
-        )
+        metricas = user_metrics.metricas_twofa()
+        agg = {
+            "total": metricas.total,
+            "habilitados": metricas.habilitados,
+            "confirmados": metricas.confirmados,
+            "sucessos": metricas.sucessos,
+            "falhas": metricas.falhas,
+            "recovery": metricas.recovery_uses,
+            "rl_blocks": metricas.rl_blocks,
+        }
         # Bloqueios globais de IP não persistidos em modelo: extraímos do cache (chaves com prefixo twofa_global_block:)
         try:
             # Em caches como LocMem não há API para listar; manter contador acumulado:
@@ -896,32 +852,15 @@ class TwoFAMetricsJSONView(LoginRequiredMixin, View):
 
 def global_ip_rate_limit(ip: str, bucket: str, limit: int, window_seconds: int) -> bool:
     """Retorna True se ainda dentro do limite; False se excedido.
-    Implementação simples em cache: contador com janela deslizante aproximada.
+    Janela deslizante atômica entre workers (``shared.rate_limit``).
     """
     if not ip:
         return True
-    key = f"twofa_global_rl:{bucket}:{ip}"
-    data = cache.get(key)
-    now = timezone.now().timestamp()
-    if not data:
-        cache.set(key, {"count": 1, "start": now}, window_seconds)
-        return True
-    count = data.get("count", 0) + 1
-    start = data.get("start", now)
-    # Excedeu limite
-    if count > limit:
+    result = RateLimiter(limit, window_seconds, mode=SLIDING, scope=f"twofa_global_rl:{bucket}").hit(ip)
+    if not result.allowed:
         # Contabilizar métrica global (contador cumulativo)
-        try:
-            cache.incr("twofa_global_ip_block_metric")
-        except Exception:
-            # Fallback se incr não existir
-            cur = cache.get("twofa_global_ip_block_metric", 0) or 0
-            cache.set("twofa_global_ip_block_metric", cur + 1, 24 * 3600)
-        return False
-    # Atualiza contador mantendo expiração restante
-    ttl = max(1, int(window_seconds - (now - start)))
-    cache.set(key, {"count": count, "start": start}, ttl)
-    return True
+        incr_atomic("twofa_global_ip_block_metric", ttl=24 * 3600)
+    return result.allowed
 
 
 def emit_twofa_failure_alert(request, perfil, label: str):
@@ -1385,17 +1324,11 @@ class SessaoEncerrarMultiplasView(LoginRequiredMixin, View):
         if not ids:
             return JsonResponse({"detail": "Nenhuma sessão informada."}, status=400)
 
-        qs = SessaoUsuario.objects.filter(pk__in=ids, ativa=True)
+        qs = SessaoUsuario.objects.filter(pk__in=ids)
         if not request.user.is_superuser:
             qs = qs.filter(user=request.user)
-        count = 0
-        terminated_ids = []
-        for s in qs:
-            s.ativa = False
-            s.save(update_fields=["ativa"])
-            broadcast_session_event("terminated", s)
-            count += 1
-            terminated_ids.append(s.id)
+        revogacao = session_revocation.revogar_sessoes(qs)
+        count, terminated_ids = revogacao.encerradas, revogacao.ids
         if count:
             log_activity(
                 request.user,
@@ -1406,6 +1339,9 @@ class SessaoEncerrarMultiplasView(LoginRequiredMixin, View):
                 ip=request.META.get("REMOTE_ADDR", ""),
                 user_agent=request.META.get("HTTP_USER_AGENT", ""),
             )
+        if request.session.session_key in revogacao.session_keys:
+            # A sessão atual foi removida do backend: encerra também o request
+            logout(request)
         # Sempre JSON (endpoint de API interna)
         return JsonResponse({"status": "ok", "encerradas": count, "ids": terminated_ids})
 
@@ -1438,6 +1374,26 @@ class ToggleTwoFactorView(LoginRequiredMixin, View):
 class SessaoUsuarioApiView(LoginRequiredMixin, View):
     """API JSON para listagem paginada e filtrada de sessões com riscos."""
 
+    @staticmethod
+    def _filtrar_risco(qs, params):
+        """Filtros/ordenação por risco sobre as colunas persistidas (no banco, antes de paginar)."""
+        risk_filter = params.get("risk")
+        if risk_filter in RISCOS:
+            qs = qs.filter(risco_flags__in=flags_com_risco(risk_filter))
+        elif risk_filter == RISCO_INATIVO_LONGO:
+            qs = qs.filter(ultima_atividade__lt=limite_inatividade())
+        elif risk_filter:
+            qs = qs.none()
+        try:
+            min_score = int(params.get("min_score", "0"))
+        except ValueError:
+            min_score = 0
+        if min_score > 0:
+            qs = qs.filter(risco_score__gte=min_score)
+        if params.get("sort") == "risk":
+            return qs.order_by("-risco_score", "-ultima_atividade")
+        return qs.order_by("-ultima_atividade")
+
     def get(self, request):
         qs = SessaoUsuario.objects.all().select_related("user")
         # Escopo tenant se não superuser
@@ -1483,31 +1439,21 @@ class SessaoUsuarioApiView(LoginRequiredMixin, View):
             except Exception:
                 pass
 
-        qs = qs.order_by("-ultima_atividade")
+        qs = self._filtrar_risco(qs, request.GET)
 
         # Paginação
         try:
             page = int(request.GET.get("page", "1"))
         except ValueError:
             page = 1
+        page = max(page, 1)
         try:
             page_size = min(int(request.GET.get("page_size", "25")), 100)
         except ValueError:
             page_size = 25
         offset = (page - 1) * page_size
-        slice_qs = list(qs[offset : offset + page_size])
-
-        # Riscos
-        ips_map, paises_map = build_context_maps(slice_qs)
-        sessions_data = []
-        for s in slice_qs:
-            risks = compute_risks(s, ips_map, paises_map)
-            sessions_data.append(session_to_dict(s, risks))
-
-        # Filtro por risco (após cálculo)
-        risk_filter = request.GET.get("risk")
-        if risk_filter:
-            sessions_data = [d for d in sessions_data if risk_filter in d.get("risks", [])]
+        agora = timezone.now()
+        sessions_data = [session_to_dict(s, compute_risks(s, agora)) for s in qs[offset : offset + page_size]]
 
         total = qs.count()
         has_next = offset + page_size < total